@@ -0,0 +1,37 @@
+"""add_keyset_pagination_indexes
+
+Composite indexes matching the (created_at, id) keyset order used by cursor
+pagination of follower/following lists and notifications, so a page after
+any cursor is a single index range scan.
+
+Revision ID: a4d8e2f61b97
+Revises: f2c7a91d3e40
+Create Date: 2026-10-17 11:02:15.604318
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d8e2f61b97"
+down_revision: str | Sequence[str] | None = "f2c7a91d3e40"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Create the keyset indexes."""
+    op.create_index("idx_follows_followee_created", "follows", ["followee_id", "created_at", "id"])
+    op.create_index("idx_follows_follower_created", "follows", ["follower_id", "created_at", "id"])
+    op.create_index(
+        "idx_notifications_user_created", "notifications", ["user_id", "created_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    """Drop the keyset indexes."""
+    op.drop_index("idx_notifications_user_created", table_name="notifications")
+    op.drop_index("idx_follows_follower_created", table_name="follows")
+    op.drop_index("idx_follows_followee_created", table_name="follows")
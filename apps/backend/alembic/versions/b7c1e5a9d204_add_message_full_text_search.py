@@ -0,0 +1,78 @@
+"""add_message_full_text_search
+
+Full-text index over messages.content for MessageSearchService:
+
+- PostgreSQL: a GIN index on to_tsvector('simple', content). It is an
+  expression index, so inserts, edits and deletes keep it current.
+- SQLite: an FTS5 table keyed by message id, kept in sync by triggers and
+  backfilled from existing messages.
+
+Revision ID: b7c1e5a9d204
+Revises: a4d8e2f61b97
+Create Date: 2026-10-17 13:26:51.930442
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7c1e5a9d204"
+down_revision: str | Sequence[str] | None = "a4d8e2f61b97"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Same statements as app.models.conversation.MESSAGES_FTS_DDL
+SQLITE_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+    USING fts5(message_id UNINDEXED, content, tokenize='unicode61 remove_diacritics 2')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (message_id, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        UPDATE messages_fts SET content = new.content WHERE message_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        DELETE FROM messages_fts WHERE message_id = old.id;
+    END
+    """,
+)
+
+
+def upgrade() -> None:
+    """Create the full-text index for the current database."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.create_index(
+            "idx_messages_content_fts",
+            "messages",
+            [sa.text("to_tsvector('simple', content)")],
+            postgresql_using="gin",
+        )
+    elif dialect == "sqlite":
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+        op.execute(
+            "INSERT INTO messages_fts (message_id, content) SELECT id, content FROM messages"
+        )
+
+
+def downgrade() -> None:
+    """Drop the full-text index."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("idx_messages_content_fts", table_name="messages")
+    elif dialect == "sqlite":
+        for trigger in ("messages_fts_insert", "messages_fts_update", "messages_fts_delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS messages_fts")
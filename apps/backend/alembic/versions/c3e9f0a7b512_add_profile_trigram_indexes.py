@@ -0,0 +1,44 @@
+"""add_profile_trigram_indexes
+
+pg_trgm GIN indexes on profiles.username and profiles.display_name for
+typeahead suggestions and substring profile search. PostgreSQL only; other
+databases use the in-memory typeahead index.
+
+Revision ID: c3e9f0a7b512
+Revises: b7c1e5a9d204
+Create Date: 2026-10-17 15:40:08.277915
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e9f0a7b512"
+down_revision: str | Sequence[str] | None = "b7c1e5a9d204"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Enable pg_trgm and index profile names."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in ("username", "display_name"):
+        op.create_index(
+            f"idx_profiles_{column}_trgm",
+            "profiles",
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    """Drop the trigram indexes (the extension is left installed)."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in ("username", "display_name"):
+        op.drop_index(f"idx_profiles_{column}_trgm", table_name="profiles")
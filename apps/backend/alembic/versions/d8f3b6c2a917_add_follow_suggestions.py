@@ -0,0 +1,64 @@
+"""add_follow_suggestions
+
+Materialized friends-of-friends follow suggestions, maintained by the follow
+service on follow/unfollow and backfilled here from the existing follows.
+
+Revision ID: d8f3b6c2a917
+Revises: c3e9f0a7b512
+Create Date: 2026-10-17 17:12:44.391027
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d8f3b6c2a917"
+down_revision: str | Sequence[str] | None = "c3e9f0a7b512"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Create follow_suggestions and fill it from follows."""
+    op.create_table(
+        "follow_suggestions",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("candidate_id", sa.UUID(), nullable=False),
+        sa.Column("mutual_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["candidate_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "candidate_id"),
+    )
+    op.create_index(
+        "idx_follow_suggestions_rank",
+        "follow_suggestions",
+        ["user_id", "mutual_count", "candidate_id"],
+    )
+    op.execute(
+        """
+        INSERT INTO follow_suggestions (user_id, candidate_id, mutual_count)
+        SELECT mine.follower_id, theirs.followee_id, count(*)
+        FROM follows AS mine
+        JOIN follows AS theirs ON theirs.follower_id = mine.followee_id
+        WHERE theirs.followee_id != mine.follower_id
+          AND NOT EXISTS (
+            SELECT 1 FROM follows AS followed
+            WHERE followed.follower_id = mine.follower_id
+              AND followed.followee_id = theirs.followee_id
+          )
+        GROUP BY mine.follower_id, theirs.followee_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop follow_suggestions."""
+    op.drop_index("idx_follow_suggestions_rank", table_name="follow_suggestions")
+    op.drop_table("follow_suggestions")
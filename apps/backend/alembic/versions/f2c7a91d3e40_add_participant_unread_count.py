@@ -0,0 +1,54 @@
+"""add_participant_unread_count
+
+Adds a denormalized unread counter to conversation_participants so the
+inbox can show unread counts without counting messages per conversation.
+Existing rows are backfilled from last_read_message_id.
+
+Revision ID: f2c7a91d3e40
+Revises: e911c19e1eb5
+Create Date: 2026-10-17 09:12:44.118203
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c7a91d3e40"
+down_revision: str | Sequence[str] | None = "e911c19e1eb5"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add and backfill conversation_participants.unread_count."""
+    op.add_column(
+        "conversation_participants",
+        sa.Column("unread_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        UPDATE conversation_participants
+        SET unread_count = (
+            SELECT count(*) FROM messages m
+            WHERE m.conversation_id = conversation_participants.conversation_id
+              AND m.sender_id != conversation_participants.user_id
+              AND NOT m.is_deleted
+              AND (
+                conversation_participants.last_read_message_id IS NULL
+                OR m.created_at > (
+                    SELECT r.created_at FROM messages r
+                    WHERE r.id = conversation_participants.last_read_message_id
+                )
+              )
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop conversation_participants.unread_count."""
+    op.drop_column("conversation_participants", "unread_count")
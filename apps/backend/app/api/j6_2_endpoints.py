@@ -246,6 +246,16 @@ async def schedule_notification_endpoint(
         raise HTTPException(status_code=500, detail=f"Failed to schedule notification: {e!s}")
 
 
+@router.get("/schedule/metrics")
+async def get_schedule_metrics(current_user: User = Depends(get_current_user)):
+    """Get scheduled delivery metrics, including lag between due time and delivery"""
+    try:
+        metrics = await smart_notification_processor.scheduler.get_metrics()
+        return JSONResponse(content=metrics)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get schedule metrics: {e!s}")
+
+
 # Batch Management Endpoints
 
 
@@ -263,17 +273,14 @@ async def get_pending_batches(current_user: User = Depends(get_current_user)):
 async def force_deliver_batch(batch_id: str, current_user: User = Depends(get_current_user)):
     """Force immediate delivery of a pending batch"""
     try:
-        if batch_id in smart_notification_processor.pending_batches:
-            batch = smart_notification_processor.pending_batches[batch_id]
-            delivery_result = await smart_notification_processor._deliver_batch(batch)
-            del smart_notification_processor.pending_batches[batch_id]
-
+        delivered = await smart_notification_processor.deliver_batch_now(batch_id)
+        if delivered:
             return JSONResponse(
                 content={
                     "success": True,
                     "batch_id": batch_id,
-                    "delivered": delivery_result,
-                    "notification_count": len(batch.notifications),
+                    "delivered": delivered["notification_id"],
+                    "notification_count": delivered["notification_count"],
                     "message": "Batch delivered successfully",
                 }
             )
@@ -412,7 +419,9 @@ async def get_system_status(current_user: User = Depends(get_current_user)):
         status = {
             "j6_2_features_active": True,
             "redis_connected": await redis_client.is_available(),
-            "pending_batches": len(smart_notification_processor.pending_batches),
+            "pending_batches": (await smart_notification_processor.get_pending_batches_summary(1))[
+                "total_batches"
+            ],
             "ab_tests_active": len(smart_notification_processor.a_b_test_variants),
             "system_health": "operational",
             "version": "J6.2",
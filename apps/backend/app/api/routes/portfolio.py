@@ -11,9 +11,11 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.redis_cache import cache_portfolio_data
-from app.db.db import get_session, init_db
+from app.db.db import get_session, init_db, run_in_session
 from app.db.models import PortfolioPosition, User
 from app.services.auth import require_handle
+from app.services.portfolio_valuation import portfolio_valuation
+from app.services.smart_price_service import PRICE_TTL
 
 # Optional alerts integration
 try:
@@ -72,6 +74,44 @@ def _user_by_handle(db: Session, handle: str) -> User:
     return u
 
 
+def _positions_for(db: Session, handle: str) -> list[PortfolioPosition]:
+    u = _user_by_handle(db, handle)
+    return list(
+        db.execute(select(PortfolioPosition).where(PortfolioPosition.user_id == u.id))
+        .scalars()
+        .all()
+    )
+
+
+def _upsert_position(db: Session, handle: str, payload: PositionIn) -> PortfolioPosition:
+    u = _user_by_handle(db, handle)
+    existing = db.execute(
+        select(PortfolioPosition).where(
+            PortfolioPosition.user_id == u.id,
+            PortfolioPosition.symbol == payload.symbol,
+        )
+    ).scalar_one_or_none()
+    now = datetime.now(UTC)
+    if existing:
+        existing.qty = payload.qty
+        existing.cost_basis = payload.cost_basis
+        existing.tags = _tags_to_str(payload.tags)
+        existing.updated_at = now
+        return existing
+    p = PortfolioPosition(
+        user_id=u.id,
+        symbol=payload.symbol,
+        qty=payload.qty,
+        cost_basis=payload.cost_basis,
+        tags=_tags_to_str(payload.tags),
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(p)
+    db.flush()
+    return p
+
+
 def _tags_to_str(tags: list[str] | None) -> str | None:
     if not tags:
         return None
@@ -85,30 +125,20 @@ def _tags_to_list(s: str | None) -> list[str] | None:
     return [t for t in s.split(",") if t]
 
 
-def _latest_price(symbol: str, timeframe: str = "1h") -> float | None:
-    try:
-        # Simplified pricing - return None for now to avoid async complexity
-        return None
-    except Exception:
-        return None
-
-
-def _compute_fields(p: PortfolioPosition) -> dict[str, Any]:
-    cur = _latest_price(p.symbol)
-    market_value = cur * p.qty if cur is not None else None
-    cost_value = p.qty * p.cost_basis
-    unreal = (market_value - cost_value) if market_value is not None else None
-    pl_pct = (
-        ((cur - p.cost_basis) / p.cost_basis * 100.0)
-        if (cur is not None and p.cost_basis)
-        else None
-    )
-    return dict(
-        current_price=cur,
-        market_value=market_value,
-        cost_value=cost_value,
-        unrealized_pl=unreal,
-        pl_pct=pl_pct,
+def _position_out(p: PortfolioPosition, valuation: dict[str, Any]) -> PositionOut:
+    return PositionOut(
+        id=p.id,
+        symbol=p.symbol,
+        qty=p.qty,
+        cost_basis=p.cost_basis,
+        tags=_tags_to_list(p.tags),
+        created_at=p.created_at.isoformat(),
+        updated_at=p.updated_at.isoformat(),
+        current_price=valuation["current_price"],
+        market_value=valuation["market_value"],
+        cost_value=valuation["cost_value"],
+        unrealized_pl=valuation["unrealized_pl"],
+        pl_pct=valuation["pl_pct"],
     )
 
 
@@ -150,36 +180,16 @@ async def _maybe_create_alerts(owner: str, symbol: str, cost_basis: float):
 
 
 @router.get("/portfolio", response_model=list[PositionOut])
-@cache_portfolio_data(ttl=300)  # Cache for 5 minutes
-def list_positions(
+@cache_portfolio_data(ttl=PRICE_TTL)  # No staler than the prices it is valued at
+async def list_positions(
     request: Request,
     handle: str | None = Query(None),
     authorization: str | None = Header(None),
 ):
     me = require_handle(authorization, handle)
-    with get_session() as db:
-        u = _user_by_handle(db, me)
-        rows = (
-            db.execute(select(PortfolioPosition).where(PortfolioPosition.user_id == u.id))
-            .scalars()
-            .all()
-        )
-        out: list[PositionOut] = []
-        for r in rows:
-            comp = _compute_fields(r)
-            out.append(
-                PositionOut(
-                    id=r.id,
-                    symbol=r.symbol,
-                    qty=r.qty,
-                    cost_basis=r.cost_basis,
-                    tags=_tags_to_list(r.tags),
-                    created_at=r.created_at.isoformat(),
-                    updated_at=r.updated_at.isoformat(),
-                    **comp,
-                )
-            )
-        return out
+    rows = await run_in_session(_positions_for, me)
+    book = await portfolio_valuation.value(rows)
+    return [_position_out(r, v) for r, v in zip(rows, book.positions(), strict=True)]
 
 
 @router.post("/portfolio/position", response_model=PositionOut)
@@ -189,46 +199,11 @@ async def add_or_update_position(
     authorization: str | None = Header(None),
 ):
     me = require_handle(authorization, payload.handle)
-    with get_session() as db:
-        u = _user_by_handle(db, me)
-        existing = db.execute(
-            select(PortfolioPosition).where(
-                PortfolioPosition.user_id == u.id,
-                PortfolioPosition.symbol == payload.symbol,
-            )
-        ).scalar_one_or_none()
-        now = datetime.now(UTC)
-        if existing:
-            existing.qty = payload.qty
-            existing.cost_basis = payload.cost_basis
-            existing.tags = _tags_to_str(payload.tags)
-            existing.updated_at = now
-            p = existing
-        else:
-            p = PortfolioPosition(
-                user_id=u.id,
-                symbol=payload.symbol,
-                qty=payload.qty,
-                cost_basis=payload.cost_basis,
-                tags=_tags_to_str(payload.tags),
-                created_at=now,
-                updated_at=now,
-            )
-            db.add(p)
-            db.flush()
-        comp = _compute_fields(p)
+    p = await run_in_session(_upsert_position, me, payload)
+    book = await portfolio_valuation.value([p])
     if create_alerts:
         await _maybe_create_alerts(me, payload.symbol, payload.cost_basis)
-    return PositionOut(
-        id=p.id,
-        symbol=p.symbol,
-        qty=p.qty,
-        cost_basis=p.cost_basis,
-        tags=_tags_to_list(p.tags),
-        created_at=p.created_at.isoformat(),
-        updated_at=p.updated_at.isoformat(),
-        **comp,
-    )
+    return _position_out(p, book.positions()[0])
 
 
 @router.delete("/portfolio/{position_id}")
@@ -282,60 +257,34 @@ async def import_text(
 
 
 @router.get("/portfolio/summary", response_model=SummaryOut)
-@cache_portfolio_data(ttl=300)  # Cache for 5 minutes
-def portfolio_summary(
+@cache_portfolio_data(ttl=PRICE_TTL)  # No staler than the prices it is valued at
+async def portfolio_summary(
     request: Request,
     handle: str | None = Query(None),
     authorization: str | None = Header(None),
 ):
     me = require_handle(authorization, handle)
-    with get_session() as db:
-        u = _user_by_handle(db, me)
-        rows = (
-            db.execute(select(PortfolioPosition).where(PortfolioPosition.user_id == u.id))
-            .scalars()
-            .all()
-        )
+    rows = await run_in_session(_positions_for, me)
+    book = await portfolio_valuation.value(rows)
 
-    total_cost = 0.0
-    total_value = 0.0
     by_symbol: dict[str, dict[str, float]] = {}
-
-    for r in rows:
-        cur = _latest_price(r.symbol)
-        cost_val = r.qty * r.cost_basis
-        total_cost += cost_val
-        if cur is not None:
-            val = r.qty * cur
-            total_value += val
-            by_symbol[r.symbol] = {  # type: ignore
-                "qty": r.qty,
-                "cost_basis": r.cost_basis,
-                "cost_value": cost_val,
-                "current_price": cur,
-                "market_value": val,
-                "unrealized_pl": val - cost_val,
-                "pl_pct": (((cur - r.cost_basis) / r.cost_basis * 100.0) if r.cost_basis else 0.0),
-            }
-        else:
-            by_symbol[r.symbol] = {  # type: ignore
-                "qty": r.qty,
-                "cost_basis": r.cost_basis,
-                "cost_value": cost_val,
-                "current_price": None,
-                "market_value": None,
-                "unrealized_pl": None,
-                "pl_pct": None,
-            }
-
-    total_pl = total_value - total_cost
-    total_pl_pct = (total_pl / total_cost * 100.0) if total_cost else 0.0
+    for r, v in zip(rows, book.positions(), strict=True):
+        by_symbol[r.symbol] = {  # type: ignore
+            "qty": r.qty,
+            "cost_basis": r.cost_basis,
+            "cost_value": v["cost_value"],
+            "current_price": v["current_price"],
+            "market_value": v["market_value"],
+            "unrealized_pl": v["unrealized_pl"],
+            "pl_pct": v["pl_pct"],
+        }
+    totals = book.totals()
 
     return SummaryOut(
         handle=me,
-        total_cost=round(total_cost, 8),
-        total_value=round(total_value, 8),
-        total_pl=round(total_pl, 8),
-        total_pl_pct=round(total_pl_pct, 4),
+        total_cost=round(totals["total_cost"], 8),
+        total_value=round(totals["total_value"], 8),
+        total_pl=round(totals["total_pl"], 8),
+        total_pl_pct=round(totals["total_pl_pct"], 4),
         by_symbol=by_symbol,
     )
@@ -5,9 +5,10 @@ from pydantic import BaseModel, Field
 from sqlalchemy import desc, func, select
 from sqlalchemy.orm import Session
 
-from app.db.db import get_session, init_db
+from app.db.db import get_session, init_db, run_in_session
 from app.db.models import Follow, Post, User
 from app.services.auth import require_handle
+from app.services.timeline_service import timeline_service
 
 router = APIRouter()
 
@@ -105,55 +106,76 @@ def get_user(handle: str):
 
 
 # ===== Follow / Unfollow =====
+def _follow(db: Session, me: str, handle: str) -> tuple[int, int] | None:
+    me_u = _user_by_handle(db, me)
+    target = _user_by_handle(db, handle)
+    if me_u.id == target.id:
+        raise HTTPException(status_code=400, detail="Cannot follow yourself")
+    exists = db.execute(
+        select(Follow).where(Follow.follower_id == me_u.id, Follow.followee_id == target.id)
+    ).scalar_one_or_none()
+    if exists:
+        return None
+    db.add(Follow(follower_id=me_u.id, followee_id=target.id))
+    return me_u.id, target.id
+
+
+def _unfollow(db: Session, me: str, handle: str) -> tuple[int, int] | None:
+    me_u = _user_by_handle(db, me)
+    target = _user_by_handle(db, handle)
+    f = db.execute(
+        select(Follow).where(Follow.follower_id == me_u.id, Follow.followee_id == target.id)
+    ).scalar_one_or_none()
+    if not f:
+        return None
+    db.delete(f)
+    return me_u.id, target.id
+
+
 @router.post("/social/follow/{handle}")
-def follow(handle: str, authorization: str | None = Header(None)):
-    with get_session() as db:
-        me = require_handle(authorization)
-        me_u = _user_by_handle(db, me)
-        target = _user_by_handle(db, handle)
-        if me_u.id == target.id:
-            raise HTTPException(status_code=400, detail="Cannot follow yourself")
-        exists = db.execute(
-            select(Follow).where(Follow.follower_id == me_u.id, Follow.followee_id == target.id)
-        ).scalar_one_or_none()
-        if exists:
-            return {"ok": True, "following": True}
-        db.add(Follow(follower_id=me_u.id, followee_id=target.id))
-        return {"ok": True, "following": True}
+async def follow(handle: str, authorization: str | None = Header(None)):
+    me = require_handle(authorization)
+    followed = await run_in_session(_follow, me, handle)
+    if followed:
+        await timeline_service.on_follow(*followed)
+    return {"ok": True, "following": True}
 
 
 @router.delete("/social/follow/{handle}")
-def unfollow(handle: str, authorization: str | None = Header(None)):
-    with get_session() as db:
-        me = require_handle(authorization)
-        me_u = _user_by_handle(db, me)
-        target = _user_by_handle(db, handle)
-        f = db.execute(
-            select(Follow).where(Follow.follower_id == me_u.id, Follow.followee_id == target.id)
-        ).scalar_one_or_none()
-        if not f:
-            return {"ok": True, "following": False}
-        db.delete(f)
-        return {"ok": True, "following": False}
+async def unfollow(handle: str, authorization: str | None = Header(None)):
+    me = require_handle(authorization)
+    unfollowed = await run_in_session(_unfollow, me, handle)
+    if unfollowed:
+        await timeline_service.on_unfollow(*unfollowed)
+    return {"ok": True, "following": False}
 
 
 # ===== Posts =====
+def _post_out(p: Post, u: User) -> PostOut:
+    return PostOut(
+        id=p.id,
+        handle=u.handle,
+        content=p.content,
+        symbol=p.symbol,
+        created_at=p.created_at.isoformat(),
+        avatar_url=u.avatar_url,
+    )
+
+
+def _create_post(db: Session, payload: PostCreate) -> tuple[Post, User]:
+    u = _user_by_handle(db, payload.handle)
+    p = Post(user_id=u.id, content=payload.content, symbol=payload.symbol)
+    db.add(p)
+    db.flush()
+    return p, u
+
+
 @router.post("/social/posts", response_model=PostOut)
-def create_post(payload: PostCreate, authorization: str | None = Header(None)):
-    with get_session() as db:
-        require_handle(authorization, payload.handle)
-        u = _user_by_handle(db, payload.handle)
-        p = Post(user_id=u.id, content=payload.content, symbol=payload.symbol)
-        db.add(p)
-        db.flush()
-        return PostOut(
-            id=p.id,
-            handle=u.handle,
-            content=p.content,
-            symbol=p.symbol,
-            created_at=p.created_at.isoformat(),
-            avatar_url=u.avatar_url,
-        )
+async def create_post(payload: PostCreate, authorization: str | None = Header(None)):
+    require_handle(authorization, payload.handle)
+    p, u = await run_in_session(_create_post, payload)
+    await timeline_service.on_post(u.id, p.id)
+    return _post_out(p, u)
 
 
 @router.get("/social/posts", response_model=list[PostOut])
@@ -167,62 +189,15 @@ def list_posts(symbol: str | None = None, limit: int = 50, after_id: int | None
             stmt = stmt.where(Post.id < after_id)
         stmt = stmt.order_by(desc(Post.id)).limit(limit)
         rows = db.execute(stmt).all()
-        out: list[PostOut] = []
-        for p, u in rows:
-            out.append(
-                PostOut(
-                    id=p.id,
-                    handle=u.handle,
-                    content=p.content,
-                    symbol=p.symbol,
-                    created_at=p.created_at.isoformat(),
-                    avatar_url=u.avatar_url,
-                )
-            )
-        return out
+        return [_post_out(p, u) for p, u in rows]
 
 
 # ===== Feed (people I follow) =====
 @router.get("/social/feed", response_model=list[PostOut])
-def feed(handle: str, symbol: str | None = None, limit: int = 50, after_id: int | None = None):
+async def feed(
+    handle: str, symbol: str | None = None, limit: int = 50, after_id: int | None = None
+):
     limit = max(1, min(200, limit))
-    with get_session() as db:
-        me = _user_by_handle(db, handle)
-
-        # get followee ids
-        followee_ids = [
-            row[0]
-            for row in db.execute(
-                select(Follow.followee_id).where(Follow.follower_id == me.id)
-            ).all()
-        ]
-
-        stmt = select(Post, User).join(User, User.id == Post.user_id)
-
-        if followee_ids:
-            stmt = stmt.where(Post.user_id.in_(followee_ids))
-        else:
-            # if user follows no one, fall back to global feed
-            pass
-
-        if symbol:
-            stmt = stmt.where(Post.symbol == symbol)
-        if after_id:
-            stmt = stmt.where(Post.id < after_id)
-
-        stmt = stmt.order_by(desc(Post.id)).limit(limit)
-        rows = db.execute(stmt).all()
-
-        out: list[PostOut] = []
-        for p, u in rows:
-            out.append(
-                PostOut(
-                    id=p.id,
-                    handle=u.handle,
-                    content=p.content,
-                    symbol=p.symbol,
-                    created_at=p.created_at.isoformat(),
-                    avatar_url=u.avatar_url,
-                )
-            )
-        return out
+    me = await run_in_session(_user_by_handle, handle)
+    rows = await timeline_service.feed(me.id, before=after_id, limit=limit, symbol=symbol)
+    return [_post_out(p, u) for p, u in rows]
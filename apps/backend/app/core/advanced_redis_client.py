@@ -9,9 +9,11 @@ Production-ready Redis client with advanced features:
 """
 
 import asyncio
+import json
 import logging
 import time
 from collections import defaultdict, deque
+from collections.abc import Mapping
 from datetime import UTC, datetime
 from typing import Any
 
@@ -303,6 +305,82 @@ class AdvancedRedisClient:
             self.metrics.record_error()
             return False
 
+    @staticmethod
+    def _decode(raw: Any) -> Any:
+        """Decode a raw Redis value, deserializing JSON when possible"""
+        value = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return value
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Get several keys in one MGET round-trip; missing keys are omitted"""
+        start_time = time.time()
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        try:
+            if not await self.is_available():
+                self.metrics.record_miss(time.time() - start_time)
+                return {}
+
+            raw_values = await self.client.mget(keys)
+            elapsed = time.time() - start_time
+
+            found = {}
+            for key, raw in zip(keys, raw_values, strict=True):
+                if raw:
+                    found[key] = self._decode(raw)
+                    self.metrics.record_hit(elapsed)
+                else:
+                    self.metrics.record_miss(elapsed)
+
+            self.operation_stats["get_many"]["count"] += 1
+            self.operation_stats["get_many"]["total_time"] += elapsed
+            return found
+
+        except Exception as e:
+            logger.error(f"Failed to get {len(keys)} cache keys: {e}")
+            self.metrics.record_error()
+            return {}
+
+    async def set_many(
+        self, items: Mapping[str, Any], expire: int | Mapping[str, int] | None = None
+    ) -> bool:
+        """
+        Set several keys in one pipelined round-trip.
+
+        ``expire`` is a TTL for every key or a per-key mapping; keys missing
+        from the mapping are stored without expiry.
+        """
+        if not items:
+            return True
+
+        try:
+            if not await self.is_available():
+                return False
+
+            pipeline = self.client.pipeline(transaction=False)
+            for key, value in items.items():
+                if not isinstance(value, str):
+                    value = json.dumps(value, default=str)
+                ttl = expire.get(key) if isinstance(expire, Mapping) else expire
+                pipeline.set(key, value, ex=ttl or None)
+            await pipeline.execute()
+
+            for _ in items:
+                self.metrics.record_write()
+            self.operation_stats["set_many"]["count"] += 1
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to set {len(items)} cache keys: {e}")
+            self.metrics.record_error()
+            return False
+
     async def get_with_layers(self, key: str, layer: str = "warm") -> str | None:
         """Get value with multi-layer cache support"""
         start_time = time.time()
@@ -0,0 +1,97 @@
+"""
+Opaque keyset (cursor) pagination.
+
+OFFSET pagination makes the database walk and discard every skipped row, so
+deep pages get linearly slower. A cursor instead records the sort key of the
+last row served, and the next page starts with ``WHERE key < cursor``, which
+an index on the sort columns answers at the same cost on any page.
+
+Cursors are urlsafe base64 JSON of the last row's sort values, e.g.
+``(created_at, id)``. Clients treat them as opaque; a token that does not
+decode is rejected with HTTP 400.
+"""
+
+import base64
+import json
+import uuid
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from typing import Any, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+T = TypeVar("T")
+
+# A sort column and whether it is descending
+Order = Sequence[tuple[ColumnElement[Any], bool]]
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _load(value: Any, kind: type) -> Any:
+    if kind is datetime:
+        return datetime.fromisoformat(value)
+    if kind is uuid.UUID:
+        return uuid.UUID(value)
+    if not isinstance(value, kind):
+        raise TypeError(f"expected {kind.__name__}")
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque token for a row's sort key."""
+    raw = json.dumps([_dump(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, *kinds: type) -> tuple[Any, ...]:
+    """Sort key from ``encode_cursor``, checked against ``kinds``. Raises HTTP 400."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(kinds):
+            raise ValueError("wrong cursor length")
+        return tuple(_load(v, k) for v, k in zip(values, kinds, strict=True))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from e
+
+
+def after(order: Order, key: Sequence[Any]) -> ColumnElement[bool]:
+    """
+    Rows strictly after ``key`` in ``order``.
+
+    Expands to ``(a < x) OR (a = x AND b < y) ...`` (``>`` for ascending
+    columns), which works for mixed directions and on every backend.
+    """
+    clauses = []
+    for i, ((column, descending), value) in enumerate(zip(order, key, strict=True)):
+        step = column < value if descending else column > value
+        ties = [c == v for (c, _), v in zip(order[:i], key[:i], strict=False)]
+        clauses.append(and_(*ties, step))
+    return or_(*clauses)
+
+
+def order_by(order: Order) -> list[ColumnElement[Any]]:
+    return [column.desc() if descending else column.asc() for column, descending in order]
+
+
+def next_page(
+    rows: Sequence[T], limit: int, key: Callable[[T], Sequence[Any]]
+) -> tuple[list[T], str | None]:
+    """
+    Trim a ``limit + 1`` fetch to ``limit`` rows.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = list(rows[:limit])
+    return rows, encode_cursor(*key(rows[-1]))
@@ -22,6 +22,9 @@ class RedisKeyspace(str, Enum):
     MESSAGES = "messages"
     PRESENCE = "presence"
 
+    # Market data
+    MARKET = "market"
+
     # Caching
     CACHE = "cache"
     API_CACHE = "api"
@@ -81,6 +84,14 @@ class RedisKeyManager:
         """User preferences: lokifi:dev:users:preferences:{user_id}"""
         return self._build_key(RedisKeyspace.USERS, "preferences", user_id)
 
+    def feed_timeline_key(self, user_id: str | int) -> str:
+        """Home feed post ids: lokifi:dev:users:timeline:{user_id}"""
+        return self._build_key(RedisKeyspace.USERS, "timeline", user_id)
+
+    def feed_celebrities_key(self) -> str:
+        """Authors whose posts are merged on read: lokifi:dev:users:timeline_celebrities"""
+        return self._build_key(RedisKeyspace.USERS, "timeline_celebrities")
+
     # Authentication keys
     def auth_token_key(self, token_hash: str) -> str:
         """Auth token blacklist: lokifi:dev:auth:tokens:{hash}"""
@@ -121,6 +132,42 @@ class RedisKeyManager:
         """Unread notification count: lokifi:dev:notifications:unread:{user_id}"""
         return self._build_key(RedisKeyspace.NOTIFICATIONS, "unread", user_id)
 
+    def notification_unread_expiry_key(self, user_id: str) -> str:
+        """Expiry of counted unread notifications: lokifi:dev:notifications:unread_expiry:{user_id}"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "unread_expiry", user_id)
+
+    def notification_batches_open_key(self) -> str:
+        """Open batch per (user, grouping key): lokifi:dev:notifications:batches:open"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "batches", "open")
+
+    def notification_batches_due_key(self) -> str:
+        """Batches by delivery time: lokifi:dev:notifications:batches:due"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "batches", "due")
+
+    def notification_batches_processing_key(self) -> str:
+        """Claimed batches by lease expiry: lokifi:dev:notifications:batches:processing"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "batches", "processing")
+
+    def notification_batch_key(self, batch_id: str) -> str:
+        """Batch metadata: lokifi:dev:notifications:batch:{batch_id}"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "batch", batch_id)
+
+    def notification_batch_items_key(self, batch_id: str) -> str:
+        """Batched notifications: lokifi:dev:notifications:batch_items:{batch_id}"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "batch_items", batch_id)
+
+    def notification_scheduled_items_key(self) -> str:
+        """Scheduled notifications by id: lokifi:dev:notifications:scheduled:items"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "scheduled", "items")
+
+    def notification_scheduled_due_key(self) -> str:
+        """Scheduled notifications by due time: lokifi:dev:notifications:scheduled:due"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "scheduled", "due")
+
+    def notification_scheduled_processing_key(self) -> str:
+        """Claimed scheduled notifications by lease expiry: lokifi:dev:notifications:scheduled:processing"""
+        return self._build_key(RedisKeyspace.NOTIFICATIONS, "scheduled", "processing")
+
     def notification_preferences_key(self, user_id: str) -> str:
         """Notification preferences: lokifi:dev:notifications:prefs:{user_id}"""
         return self._build_key(RedisKeyspace.NOTIFICATIONS, "prefs", user_id)
@@ -147,6 +194,15 @@ class RedisKeyManager:
         """User presence heartbeat: lokifi:dev:presence:heartbeat:{user_id}"""
         return self._build_key(RedisKeyspace.PRESENCE, "heartbeat", user_id)
 
+    # Market data keys
+    def indicator_state_key(self, symbol: str, timeframe: str) -> str:
+        """Streaming indicator state: lokifi:dev:market:indicators:{symbol}:{timeframe}"""
+        return self._build_key(RedisKeyspace.MARKET, "indicators", symbol.upper(), timeframe)
+
+    def price_demand_key(self) -> str:
+        """Symbols subscribed on any worker: lokifi:dev:market:price_demand"""
+        return self._build_key(RedisKeyspace.MARKET, "price_demand")
+
     # Caching keys
     def api_cache_key(self, endpoint: str, params_hash: str) -> str:
         """API response cache: lokifi:dev:api:cache:{endpoint}:{params_hash}"""
@@ -156,6 +212,18 @@ class RedisKeyManager:
         """Database query cache: lokifi:dev:db:cache:{query_hash}"""
         return self._build_key(RedisKeyspace.DB_CACHE, "cache", query_hash)
 
+    def single_flight_lease_key(self, key: str) -> str:
+        """Single-flight refresh lease: lokifi:dev:cache:lease:{key}"""
+        return self._build_key(RedisKeyspace.CACHE, "lease", key)
+
+    def typeahead_version_key(self, index: str) -> str:
+        """Typeahead index version: lokifi:dev:cache:typeahead:{index}:version"""
+        return self._build_key(RedisKeyspace.CACHE, "typeahead", index, "version")
+
+    def typeahead_changes_key(self, index: str) -> str:
+        """Typeahead change log (entry -> version): lokifi:dev:cache:typeahead:{index}:changes"""
+        return self._build_key(RedisKeyspace.CACHE, "typeahead", index, "changes")
+
     def system_stats_cache_key(self) -> str:
         """System statistics cache: lokifi:dev:cache:system:stats"""
         return self._build_key(RedisKeyspace.CACHE, "system", "stats")
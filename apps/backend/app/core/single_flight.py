@@ -0,0 +1,460 @@
+"""
+Fleet-wide single-flight with stale-while-revalidate.
+
+Concurrent callers for a key inside one process share a single in-flight
+task. Across workers a short Redis lease (``SET NX PX``) elects the one that
+calls upstream; the others poll Redis for its result instead of fetching.
+
+Entries are stored as ``{"v": value, "exp": fresh_until}`` with a Redis TTL of
+``ttl + stale_ttl``. Past ``exp`` a value is stale but is still returned while
+one background refresh runs, so a hot key expiring never produces a burst of
+upstream requests. When Redis is unavailable everything degrades to the
+in-process path.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Mapping
+from typing import Any
+
+from app.core.advanced_redis_client import advanced_redis_client
+from app.core.redis_keys import redis_keys
+
+logger = logging.getLogger(__name__)
+
+# Delete the lease only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class SingleFlight:
+    """Request coalescing backed by in-process tasks and Redis leases"""
+
+    def __init__(
+        self,
+        lease_seconds: float = 15.0,
+        wait_timeout: float = 5.0,
+        poll_interval: float = 0.05,
+    ):
+        self.lease_seconds = lease_seconds
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "lease_waits": 0,
+            "upstream_calls": 0,
+        }
+
+    @property
+    def _client(self):
+        return advanced_redis_client.client
+
+    async def read(self, key: str) -> tuple[Any, bool] | None:
+        """Cached ``(value, is_fresh)`` for ``key``, or None."""
+        client = self._client
+        if client is None:
+            return None
+        try:
+            raw = await client.get(key)
+        except Exception as e:
+            logger.debug(f"single-flight read failed for {key}: {e}")
+            return None
+        return self._unwrap(raw)
+
+    async def read_many(self, keys: list[str]) -> dict[str, tuple[Any, bool]]:
+        """Cached ``(value, is_fresh)`` for each key present, in one round-trip."""
+        if self._client is None:
+            return {}
+        found = await advanced_redis_client.get_many(keys)
+        entries = {key: self._unwrap(envelope) for key, envelope in found.items()}
+        return {key: entry for key, entry in entries.items() if entry is not None}
+
+    @staticmethod
+    def _unwrap(raw: Any) -> tuple[Any, bool] | None:
+        if not raw:
+            return None
+        if isinstance(raw, str | bytes):
+            try:
+                envelope = json.loads(raw)
+            except (TypeError, ValueError):
+                return None
+        else:
+            envelope = raw
+        if not isinstance(envelope, dict) or "v" not in envelope or "exp" not in envelope:
+            return None
+        return envelope["v"], time.time() < envelope["exp"]
+
+    async def write(self, key: str, value: Any, ttl: int, stale_ttl: int = 0) -> bool:
+        """Store ``value`` as fresh for ``ttl`` seconds and servable for ``stale_ttl`` more."""
+        client = self._client
+        if client is None:
+            return False
+        envelope = {"v": value, "exp": time.time() + ttl}
+        try:
+            await client.set(key, json.dumps(envelope, default=str), ex=ttl + stale_ttl)
+            return True
+        except Exception as e:
+            logger.debug(f"single-flight write failed for {key}: {e}")
+            return False
+
+    async def write_many(self, values: Mapping[str, Any], ttl: int, stale_ttl: int = 0) -> bool:
+        """Store several values with the same freshness window in one round-trip."""
+        if self._client is None or not values:
+            return False
+        exp = time.time() + ttl
+        envelopes = {key: {"v": value, "exp": exp} for key, value in values.items()}
+        return await advanced_redis_client.set_many(envelopes, expire=ttl + stale_ttl)
+
+    async def _acquire(self, key: str) -> str | bool | None:
+        """Lease token if acquired, False if another worker holds it, None without Redis."""
+        client = self._client
+        if client is None:
+            return None
+        token = uuid.uuid4().hex
+        try:
+            acquired = await client.set(
+                redis_keys.single_flight_lease_key(key),
+                token,
+                nx=True,
+                px=int(self.lease_seconds * 1000),
+            )
+        except Exception as e:
+            logger.debug(f"single-flight lease failed for {key}: {e}")
+            return None
+        return token if acquired else False
+
+    async def _release(self, key: str, token: str) -> None:
+        try:
+            await self._client.eval(
+                _RELEASE_SCRIPT, 1, redis_keys.single_flight_lease_key(key), token
+            )
+        except Exception as e:
+            logger.debug(f"single-flight release failed for {key}: {e}")
+
+    async def _acquire_many(self, keys: list[str]) -> dict[str, str | bool | None]:
+        """``_acquire`` for several keys in one pipelined round-trip."""
+        client = self._client
+        if client is None:
+            return dict.fromkeys(keys)
+        tokens = [uuid.uuid4().hex for _ in keys]
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, token in zip(keys, tokens, strict=True):
+                pipe.set(
+                    redis_keys.single_flight_lease_key(key),
+                    token,
+                    nx=True,
+                    px=int(self.lease_seconds * 1000),
+                )
+            acquired = await pipe.execute()
+        except Exception as e:
+            logger.debug(f"single-flight batch lease failed: {e}")
+            return dict.fromkeys(keys)
+        return {
+            key: token if ok else False
+            for key, token, ok in zip(keys, tokens, acquired, strict=True)
+        }
+
+    async def _release_many(self, tokens: Mapping[str, str]) -> None:
+        if not tokens:
+            return
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, token in tokens.items():
+                pipe.eval(_RELEASE_SCRIPT, 1, redis_keys.single_flight_lease_key(key), token)
+            await pipe.execute()
+        except Exception as e:
+            logger.debug(f"single-flight batch release failed: {e}")
+
+    async def _wait_for(self, key: str) -> Any | None:
+        """Poll for a fresh value written by the lease holder."""
+        self.stats["lease_waits"] += 1
+        deadline = time.monotonic() + self.wait_timeout
+        lease_key = redis_keys.single_flight_lease_key(key)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            cached = await self.read(key)
+            if cached and cached[1]:
+                return cached[0]
+            try:
+                if not await self._client.exists(lease_key):
+                    return None  # holder finished without a value
+            except Exception:
+                return None
+        return None
+
+    async def _load(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        encode: Callable[[Any], Any],
+        decode: Callable[[Any], Any],
+        wait: bool,
+    ) -> Any:
+        token = await self._acquire(key)
+        if token is False:
+            if not wait:
+                return None
+            value = await self._wait_for(key)
+            if value is not None:
+                return decode(value)
+            token = await self._acquire(key)
+        try:
+            self.stats["upstream_calls"] += 1
+            result = await fetch()
+            if result:
+                await self.write(key, encode(result), ttl, stale_ttl)
+            return result
+        finally:
+            if token:
+                await self._release(key, token)
+
+    async def _wait_for_many(self, keys: list[str]) -> dict[str, Any]:
+        """Poll for fresh values written by the holders of several leases."""
+        self.stats["lease_waits"] += len(keys)
+        deadline = time.monotonic() + self.wait_timeout
+        pending = list(keys)
+        found: dict[str, Any] = {}
+        while pending and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            for key, (value, fresh) in (await self.read_many(pending)).items():
+                if fresh:
+                    found[key] = value
+            pending = [key for key in pending if key not in found]
+            if not pending:
+                break
+            try:
+                held = await self._client.exists(
+                    *(redis_keys.single_flight_lease_key(key) for key in pending)
+                )
+            except Exception:
+                break
+            if not held:
+                break  # holders finished without a value for the rest
+        return found
+
+    async def _load_many(
+        self,
+        keys: list[str],
+        fetch_many: Callable[[list[str]], Awaitable[Mapping[str, Any]]],
+        ttl: int,
+        stale_ttl: int,
+        encode: Callable[[Any], Any],
+        decode: Callable[[Any], Any],
+        wait: bool,
+    ) -> dict[str, Any]:
+        tokens = await self._acquire_many(keys)
+        held = [key for key in keys if tokens[key] is False]
+        results: dict[str, Any] = {}
+        try:
+            if held and wait:
+                for key, value in (await self._wait_for_many(held)).items():
+                    results[key] = decode(value)
+                retry = [key for key in held if key not in results]
+                if retry:
+                    tokens.update(await self._acquire_many(retry))
+                # Like _load, fetch whatever is still missing even without the lease
+                todo = [key for key in keys if key not in results]
+            else:
+                todo = [key for key in keys if tokens[key] is not False]
+            if todo:
+                self.stats["upstream_calls"] += 1
+                fetched = {key: value for key, value in (await fetch_many(todo)).items() if value}
+                if fetched:
+                    await self.write_many(
+                        {key: encode(value) for key, value in fetched.items()}, ttl, stale_ttl
+                    )
+                results.update(fetched)
+            return results
+        finally:
+            await self._release_many({key: token for key, token in tokens.items() if token})
+
+    @staticmethod
+    async def _pick(group: asyncio.Task, key: str) -> Any:
+        return (await asyncio.shield(group)).get(key)
+
+    def _start_many(
+        self, keys: list[str], factory: Callable[[list[str]], Awaitable[dict[str, Any]]]
+    ) -> dict[str, asyncio.Task]:
+        """
+        Per-key in-flight tasks for ``keys``, sharing any already running and
+        starting one group task for the rest.
+        """
+        tasks = {key: self._inflight[key] for key in keys if key in self._inflight}
+        self.stats["coalesced"] += len(tasks)
+        new = [key for key in keys if key not in tasks]
+        if new:
+            group = asyncio.create_task(factory(new))
+            group.add_done_callback(self._log_background)
+            for key in new:
+                tasks[key] = self._start(key, lambda key=key: self._pick(group, key))
+                tasks[key].add_done_callback(self._consume)
+        return tasks
+
+    @staticmethod
+    def _consume(task: asyncio.Task) -> None:
+        # Failures are logged once on the group task
+        if not task.cancelled():
+            task.exception()
+
+    def _start(self, key: str, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return task
+        task = asyncio.create_task(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    @staticmethod
+    def _log_background(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh failed: {task.exception()}")
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int = 0,
+        *,
+        force_refresh: bool = False,
+        encode: Callable[[Any], Any] = _identity,
+        decode: Callable[[Any], Any] = _identity,
+    ) -> Any:
+        """
+        Return the cached value for ``key`` or fetch it exactly once.
+
+        ``fetch`` must be safe to run after the caller has returned (stale
+        refreshes run in the background). ``encode`` turns its result into
+        JSON-serializable data for Redis and ``decode`` reverses it.
+        """
+        if not force_refresh:
+            cached = await self.read(key)
+            if cached is not None:
+                value, fresh = cached
+                if fresh:
+                    self.stats["hits"] += 1
+                else:
+                    self.stats["stale_hits"] += 1
+                    if key not in self._inflight:
+                        self._start(
+                            key,
+                            lambda: self._load(key, fetch, ttl, stale_ttl, encode, decode, False),
+                        ).add_done_callback(self._log_background)
+                return decode(value)
+
+        self.stats["misses"] += 1
+        task = self._start(
+            key, lambda: self._load(key, fetch, ttl, stale_ttl, encode, decode, True)
+        )
+        return await asyncio.shield(task)
+
+    async def get_or_fetch_many(
+        self,
+        keys: list[str],
+        fetch_many: Callable[[list[str]], Awaitable[Mapping[str, Any]]],
+        ttl: int,
+        stale_ttl: int = 0,
+        *,
+        force_refresh: bool = False,
+        encode: Callable[[Any], Any] = _identity,
+        decode: Callable[[Any], Any] = _identity,
+    ) -> dict[str, Any]:
+        """
+        Batch form of ``get_or_fetch``: one cache read for all ``keys``.
+
+        Stale entries are served and refreshed in the background. Misses are
+        leased per key; ``fetch_many`` is called once with the keys this worker
+        won and returns ``{key: value}`` for those it could fetch. Keys missing
+        from the result are absent from the returned dict.
+        """
+        results: dict[str, Any] = {}
+        missing = list(keys)
+        if not force_refresh:
+            cached = await self.read_many(missing)
+            missing, stale = [], []
+            for key in keys:
+                if key not in cached:
+                    missing.append(key)
+                    continue
+                value, fresh = cached[key]
+                results[key] = decode(value)
+                if fresh:
+                    self.stats["hits"] += 1
+                else:
+                    self.stats["stale_hits"] += 1
+                    if key not in self._inflight:
+                        stale.append(key)
+            if stale:
+                self._start_many(
+                    stale,
+                    lambda todo: self._load_many(
+                        todo, fetch_many, ttl, stale_ttl, encode, decode, False
+                    ),
+                )
+
+        if missing:
+            self.stats["misses"] += len(missing)
+            tasks = self._start_many(
+                missing,
+                lambda todo: self._load_many(
+                    todo, fetch_many, ttl, stale_ttl, encode, decode, True
+                ),
+            )
+            values = await asyncio.gather(
+                *(asyncio.shield(task) for task in tasks.values()), return_exceptions=True
+            )
+            for key, value in zip(tasks, values, strict=True):
+                if value is not None and not isinstance(value, BaseException):
+                    results[key] = value
+        return results
+
+    async def coalesce(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Share one in-process run of ``fn`` among concurrent callers for ``key``."""
+        return await asyncio.shield(self._start(key, fn))
+
+    async def run_exclusive(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[bool, Any]:
+        """
+        Run ``fn`` at most once at a time for ``key`` across the fleet.
+
+        Returns ``(ran, result)``; ``ran`` is False when another worker holds
+        the lease, so the caller can serve what it already has.
+        """
+
+        async def guarded() -> tuple[bool, Any]:
+            token = await self._acquire(key)
+            if token is False:
+                return False, None
+            try:
+                self.stats["upstream_calls"] += 1
+                return True, await fn()
+            finally:
+                if token:
+                    await self._release(key, token)
+
+        return await asyncio.shield(self._start(key, guarded))
+
+    def get_stats(self) -> dict[str, int]:
+        return {**self.stats, "inflight": len(self._inflight)}
+
+
+single_flight = SingleFlight()
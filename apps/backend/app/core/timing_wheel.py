@@ -0,0 +1,94 @@
+"""
+Hierarchical timing wheel.
+
+Holds a large number of timers with O(1) insertion and O(1) amortized
+expiry, instead of one heap entry or sleeping task per timer. Time is cut
+into ticks; level 0 has one bucket per tick, and each level above covers
+``slots`` times the span of the one below. A timer goes into the lowest
+level whose span reaches its deadline and is moved down a level each time
+the hand reaches its bucket, until it lands in a level-0 bucket and fires.
+Timers further out than the top level wait in an overflow list.
+"""
+
+import math
+from typing import Any
+
+
+class TimingWheel:
+    """Timers keyed by deadline (seconds), fired by ``advance``"""
+
+    def __init__(self, start: float, tick: float = 0.1, slots: int = 64, levels: int = 4):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current = math.floor(start / tick)
+        # Timers are (expiry tick, item)
+        self._wheels: list[list[list[tuple[int, Any]]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: list[tuple[int, Any]] = []
+        self._ready: list[Any] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, deadline: float, item: Any) -> None:
+        """Fire ``item`` once ``advance`` reaches ``deadline``."""
+        self._size += 1
+        self._place(math.ceil(deadline / self.tick), item)
+
+    def _place(self, expiry: int, item: Any) -> None:
+        delta = expiry - self.current
+        if delta <= 0:
+            self._ready.append(item)
+            return
+        unit = 1  # Ticks per bucket at this level
+        for level in range(self.levels):
+            if delta < unit * self.slots:
+                self._wheels[level][(expiry // unit) % self.slots].append((expiry, item))
+                return
+            unit *= self.slots
+        self._overflow.append((expiry, item))
+
+    def advance(self, now: float) -> list[Any]:
+        """Move the hand to ``now``; returns the items that are due, in tick order."""
+        target = math.floor(now / self.tick)
+        if self._size == len(self._ready):
+            # Nothing pending: skip the empty ticks
+            self.current = max(self.current, target)
+        while self.current < target:
+            self.current += 1
+            self._cascade()
+        fired, self._ready = self._ready, []
+        self._size -= len(fired)
+        return fired
+
+    def _cascade(self) -> None:
+        unit = self.slots**self.levels
+        if self.current % unit == 0 and self._overflow:
+            overflow, self._overflow = self._overflow, []
+            for timer in overflow:
+                self._place(*timer)
+        # Top down, so timers moved down a level are cascaded on the same tick
+        for level in range(self.levels - 1, -1, -1):
+            unit //= self.slots
+            if self.current % unit == 0:
+                bucket = self._wheels[level][(self.current // unit) % self.slots]
+                timers = bucket[:]
+                bucket.clear()
+                for timer in timers:
+                    self._place(*timer)
+
+    def drain(self) -> list[Any]:
+        """Remove and return every pending item."""
+        items = list(self._ready)
+        for level in self._wheels:
+            for bucket in level:
+                items.extend(item for _, item in bucket)
+                bucket.clear()
+        items.extend(item for _, item in self._overflow)
+        self._overflow.clear()
+        self._ready.clear()
+        self._size = 0
+        return items
@@ -1,22 +1,52 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from typing import Any, TypeVar
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.db.models import Base
 
+T = TypeVar("T")
+
 DB_PATH = os.getenv(
     "LOKIFI_DB_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "data", "lokifi.sqlite")
 )
 DB_URI = f"sqlite:///{DB_PATH}"
+# Threads that run blocking session work off the event loop; also the pool size
+DB_THREADS = int(os.getenv("LOKIFI_DB_THREADS", "4"))
+# Milliseconds a writer waits on SQLite's lock before "database is locked"
+DB_BUSY_TIMEOUT_MS = 5000
 
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
-engine = create_engine(DB_URI, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+engine = create_engine(
+    DB_URI,
+    connect_args={"check_same_thread": False},
+    pool_size=DB_THREADS,
+    max_overflow=DB_THREADS,
+    pool_pre_ping=True,
+)
+# Objects stay readable after the session closes, as with the async session factory
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="lokifi-db")
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets readers proceed while a write is in progress
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.close()
 
 
 def init_db():
@@ -34,3 +64,24 @@ def get_session() -> Session:
         raise
     finally:
         db.close()
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database code on the bounded DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+async def run_in_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run ``fn(db, *args, **kwargs)`` in one ``get_session()`` unit of work on
+    the DB thread pool, so async handlers never block the event loop on
+    SQLite. The session is created, used, committed and closed on the same
+    thread; returned ORM objects are detached but keep their loaded values.
+    """
+
+    def work() -> T:
+        with get_session() as db:
+            return fn(db, *args, **kwargs)
+
+    return await run_db(work)
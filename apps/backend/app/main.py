@@ -15,6 +15,7 @@ from app.api.routes.monitoring import router as monitoring_router
 from app.core.advanced_redis_client import advanced_redis_client
 from app.core.config import settings
 from app.core.database import db_manager
+from app.core.redis_client import redis_client
 
 # Security middleware imports
 from app.middleware.security import RequestLoggingMiddleware
@@ -42,6 +43,8 @@ from app.routers import (
     websocket_prices,
 )
 from app.routers.profile_enhanced import router as profile_enhanced_router
+from app.services.smart_notifications import smart_notification_processor
+from app.services.unified_asset_service import start_registry_refresh, stop_registry_refresh
 from app.websockets.advanced_websocket_manager import advanced_websocket_manager
 
 logger = logging.getLogger(__name__)
@@ -71,6 +74,20 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ Redis initialization error (continuing): {e}")
 
+    # Notifications (unread counters, scheduling) use the J6.2 client
+    try:
+        if not await redis_client.initialize():
+            logger.warning("⚠️ Notification Redis unavailable (counting unread in the database)")
+    except Exception as e:
+        logger.warning(f"⚠️ Notification Redis initialization error (continuing): {e}")
+
+    # Delivers smart-batched and scheduled notifications from their Redis delay queues
+    smart_notification_processor.start_batch_worker()
+    smart_notification_processor.scheduler.start()
+
+    # Keeps the asset registry and the symbol search index current on this worker
+    start_registry_refresh()
+
     logger.info("🔌 Starting WebSocket manager...")
     try:
         advanced_websocket_manager.start_background_tasks()
@@ -111,6 +128,14 @@ async def lifespan(app: FastAPI):
     # logger.info("🗄️ Shutting down data services...")
     # await shutdown_data_services()
 
+    await smart_notification_processor.stop_batch_worker()
+    await smart_notification_processor.scheduler.stop()
+    await stop_registry_refresh()
+    try:
+        await redis_client.close()
+    except Exception as e:
+        logger.error(f"❌ Error closing notification Redis: {e}")
+
     logger.info("🗄️ Shutting down database...")
     try:
         await db_manager.close()
@@ -5,7 +5,7 @@ Database models package.
 # Import all models to ensure they are registered with SQLAlchemy
 from .ai_thread import AiMessage, AiThread, AiUsage
 from .conversation import Conversation, ConversationParticipant, Message, MessageReceipt
-from .follow import Follow
+from .follow import Follow, FollowSuggestion
 from .notification_models import Notification, NotificationPreference
 from .profile import Profile
 from .user import User
@@ -17,6 +17,7 @@ __all__ = [
     "Conversation",
     "ConversationParticipant",
     "Follow",
+    "FollowSuggestion",
     "Message",
     "MessageReceipt",
     "Notification",
@@ -7,9 +7,9 @@ from datetime import datetime
 from enum import Enum
 
 from app.db.database import Base
-from sqlalchemy import Boolean, DateTime
+from sqlalchemy import DDL, Boolean, DateTime, event, text
 from sqlalchemy import Enum as SqlEnum
-from sqlalchemy import ForeignKey, Index, String, Text, func
+from sqlalchemy import ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -76,6 +76,8 @@ class ConversationParticipant(Base):
     last_read_message_id: Mapped[uuid.UUID | None] = mapped_column(
         UUID(as_uuid=True), ForeignKey("messages.id", ondelete="SET NULL"), nullable=True
     )
+    # Messages from others since last_read_message_id, kept in step on send/read
+    unread_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
     # Participant metadata
     joined_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -96,6 +98,35 @@ class ConversationParticipant(Base):
         return f"<ConversationParticipant(conversation_id={self.conversation_id}, user_id={self.user_id})>"
 
 
+# Text search configuration of the PostgreSQL full-text index on messages.content
+MESSAGE_SEARCH_CONFIG = "simple"
+
+# SQLite keeps message text in an FTS5 table instead, synced by triggers. It is
+# keyed by message_id rather than rowid because messages has no INTEGER
+# PRIMARY KEY, so VACUUM may renumber its rowids.
+MESSAGES_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+    USING fts5(message_id UNINDEXED, content, tokenize='unicode61 remove_diacritics 2')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (message_id, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        UPDATE messages_fts SET content = new.content WHERE message_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        DELETE FROM messages_fts WHERE message_id = old.id;
+    END
+    """,
+)
+
+
 class Message(Base):
     """Message model."""
 
@@ -140,6 +171,12 @@ class Message(Base):
     __table_args__ = (
         Index("idx_messages_conversation_created", "conversation_id", "created_at"),
         Index("idx_messages_sender_created", "sender_id", "created_at"),
+        # Full-text search (PostgreSQL); must match MessageSearchService's expression
+        Index(
+            "idx_messages_content_fts",
+            text(f"to_tsvector('{MESSAGE_SEARCH_CONFIG}', content)"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
     )
 
     def __repr__(self) -> str:
@@ -148,6 +185,10 @@ class Message(Base):
         )
 
 
+for _statement in MESSAGES_FTS_DDL:
+    event.listen(Message.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+
 class MessageReceipt(Base):
     """Message receipt model for read tracking."""
 
@@ -5,7 +5,7 @@ Follow model for user follow relationships.
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, UniqueConstraint, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -35,8 +35,43 @@ class Follow(Base):
     follower = relationship("User", foreign_keys=[follower_id], back_populates="following")
     followee = relationship("User", foreign_keys=[followee_id], back_populates="followers")
 
-    # Constraints
-    __table_args__ = (UniqueConstraint("follower_id", "followee_id", name="unique_follow"),)
+    # Constraints, and indexes matching the (created_at, id) keyset of follower lists
+    __table_args__ = (
+        UniqueConstraint("follower_id", "followee_id", name="unique_follow"),
+        Index("idx_follows_followee_created", "followee_id", "created_at", "id"),
+        Index("idx_follows_follower_created", "follower_id", "created_at", "id"),
+    )
 
     def __repr__(self) -> str:
         return f"<Follow(id={self.id}, follower_id={self.follower_id}, followee_id={self.followee_id})>"
+
+
+class FollowSuggestion(Base):
+    """
+    Materialized friends-of-friends candidate.
+
+    ``mutual_count`` of the users ``user_id`` follows follow ``candidate_id``.
+    Rows only exist for candidates ``user_id`` does not follow yet; the follow
+    service keeps them in step on follow/unfollow.
+    """
+
+    __tablename__ = "follow_suggestions"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    candidate_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    mutual_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    # A user's candidates, best first
+    __table_args__ = (
+        Index("idx_follow_suggestions_rank", "user_id", "mutual_count", "candidate_id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<FollowSuggestion(user_id={self.user_id}, candidate_id={self.candidate_id}, mutual_count={self.mutual_count})>"
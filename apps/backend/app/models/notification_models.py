@@ -98,6 +98,7 @@ class Notification(Base):
     __table_args__ = (
         Index("idx_notifications_user_unread", "user_id", "is_read"),
         Index("idx_notifications_user_type", "user_id", "type"),
+        Index("idx_notifications_user_created", "user_id", "created_at", "id"),
         Index("idx_notifications_created_at", "created_at"),
         Index("idx_notifications_expires_at", "expires_at"),
         Index("idx_notifications_batch_id", "batch_id"),
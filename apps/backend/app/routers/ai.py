@@ -15,6 +15,7 @@ from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_db
+from app.db.db import run_db, run_in_session
 from app.db.models import AIMessage, User
 from app.schemas.ai_schemas import (
     AIChatRequest,
@@ -285,7 +286,6 @@ async def export_conversations(
     compress: bool = False,
     thread_ids: str | None = None,  # Comma-separated IDs
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
     """Export user's AI conversations in various formats."""
 
@@ -302,8 +302,9 @@ async def export_conversations(
             thread_ids=thread_id_list,
         )
 
-        content = conversation_exporter.export_conversations(
-            user_id=current_user.id, options=options, db=db
+        # Runs on the DB thread pool with its own session
+        content = await run_db(
+            conversation_exporter.export_conversations, user_id=current_user.id, options=options
         )
 
         # Determine content type and filename
@@ -343,7 +344,6 @@ async def import_conversations(
     file: UploadFile = File(...),
     merge_strategy: str = "skip",  # skip, overwrite, merge
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
     """Import AI conversations from uploaded file."""
 
@@ -359,12 +359,12 @@ async def import_conversations(
         content = await file.read()
 
         # Import conversations
-        result = conversation_importer.import_conversations(
+        result = await run_db(
+            conversation_importer.import_conversations,
             user_id=current_user.id,
             content=content,
             format="json",
             merge_strategy=merge_strategy,
-            db=db,
         )
 
         return {
@@ -492,7 +492,6 @@ async def upload_file_to_thread(
     file: UploadFile = File(...),
     prompt: str | None = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
 ):
     """Upload and analyze a file within an AI conversation thread."""
     try:
@@ -513,8 +512,7 @@ async def upload_file_to_thread(
                 created_at=datetime.now(UTC),
             )
 
-            db.add(user_message)
-            db.commit()
+            await run_in_session(lambda db: db.add(user_message))
 
             # Determine file type and analyze accordingly
             file_data = file_result["processed_content"]
@@ -116,6 +116,10 @@ async def get_conversation_messages(
     conversation_id: uuid.UUID,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=100, description="Items per page"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    include_total: bool | None = Query(
+        None, description="Count all matches (default: only without a cursor)"
+    ),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -123,8 +127,10 @@ async def get_conversation_messages(
     try:
         conv_service = ConversationService(db)
         return await conv_service.get_conversation_messages(
-            conversation_id, current_user.id, page, page_size
+            conversation_id, current_user.id, page, page_size, cursor, include_total
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting messages: {e}")
         raise HTTPException(
@@ -352,6 +358,7 @@ async def delete_message(
             .values(is_deleted=True, content="[deleted]")
         )
         await db.execute(update_stmt)
+        await ConversationService(db).discount_unread(message)
         await db.commit()
 
         # TODO: Broadcast message deletion via WebSocket
@@ -385,6 +392,10 @@ async def search_messages(
     ),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    include_total: bool | None = Query(
+        None, description="Count all matches (default: only without a cursor)"
+    ),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -395,8 +406,12 @@ async def search_messages(
             query=q, content_type=content_type, conversation_id=conversation_id
         )
 
-        return await search_service.search_messages(current_user.id, search_filter, page, page_size)
+        return await search_service.search_messages(
+            current_user.id, search_filter, page, page_size, cursor, include_total
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching messages: {e}")
         raise HTTPException(
@@ -156,6 +156,8 @@ async def get_user_followers(
     user_id: UUID,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Number of results per page"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    include_total: bool = Query(True, description="Include the total count"),
     current_user: User | None = Depends(get_current_user_optional),
     db: AsyncSession = Depends(get_db),
 ):
@@ -164,7 +166,12 @@ async def get_user_followers(
     current_user_id = current_user.id if current_user else None
 
     return await follow_service.get_followers(
-        user_id=user_id, page=page, page_size=page_size, current_user_id=current_user_id
+        user_id=user_id,
+        page=page,
+        page_size=page_size,
+        current_user_id=current_user_id,
+        cursor=cursor,
+        include_total=include_total,
     )
 
 
@@ -173,6 +180,8 @@ async def get_user_following(
     user_id: UUID,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Number of results per page"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    include_total: bool = Query(True, description="Include the total count"),
     current_user: User | None = Depends(get_current_user_optional),
     db: AsyncSession = Depends(get_db),
 ):
@@ -181,7 +190,12 @@ async def get_user_following(
     current_user_id = current_user.id if current_user else None
 
     return await follow_service.get_following(
-        user_id=user_id, page=page, page_size=page_size, current_user_id=current_user_id
+        user_id=user_id,
+        page=page,
+        page_size=page_size,
+        current_user_id=current_user_id,
+        cursor=cursor,
+        include_total=include_total,
     )
 
 
@@ -189,6 +203,8 @@ async def get_user_following(
 async def get_my_followers(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Number of results per page"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    include_total: bool = Query(True, description="Include the total count"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -200,6 +216,8 @@ async def get_my_followers(
         page=page,
         page_size=page_size,
         current_user_id=current_user.id,
+        cursor=cursor,
+        include_total=include_total,
     )
 
 
@@ -207,6 +225,8 @@ async def get_my_followers(
 async def get_my_following(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Number of results per page"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    include_total: bool = Query(True, description="Include the total count"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -218,6 +238,8 @@ async def get_my_following(
         page=page,
         page_size=page_size,
         current_user_id=current_user.id,
+        cursor=cursor,
+        include_total=include_total,
     )
 
 
@@ -241,6 +263,7 @@ async def get_mutual_follows(
 async def get_follow_suggestions(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=50, description="Number of suggestions per page"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -248,7 +271,7 @@ async def get_follow_suggestions(
     follow_service = FollowService(db)
 
     return await follow_service.get_follow_suggestions(
-        user_id=current_user.id, page=page, page_size=page_size
+        user_id=current_user.id, page=page, page_size=page_size, cursor=cursor
     )
 
 
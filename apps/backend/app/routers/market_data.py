@@ -50,16 +50,20 @@ async def search_symbols(
     q: str = Query(..., min_length=1, max_length=50, description="Search query"),
     asset_type: AssetType | None = Query(None, description="Filter by asset type"),
     limit: int = Query(50, ge=1, le=200, description="Maximum results to return"),
+    fuzzy: bool = Query(False, description="Also match misspelled names"),
 ):
     """
     Search for symbols by name or ticker.
 
-    - **q**: Search query (symbol or company name)
+    - **q**: Search query (symbol, company name or CoinGecko ID)
     - **asset_type**: Filter by asset type (stock, crypto, forex, etc.)
     - **limit**: Maximum number of results
+    - **fuzzy**: Add similar names after exact and prefix matches
     """
     try:
-        symbols = await symbol_directory.search_symbols(query=q, asset_type=asset_type, limit=limit)
+        symbols = await symbol_directory.search_symbols(
+            query=q, asset_type=asset_type, limit=limit, fuzzy=fuzzy
+        )
 
         return SymbolSearchResponse(symbols=symbols, total=len(symbols), query=q)
 
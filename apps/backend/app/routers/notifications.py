@@ -8,6 +8,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
 from app.core.auth_deps import get_current_user
+from app.core.pagination import encode_cursor
 from app.core.redis_cache import cache_notifications
 from app.models.notification_models import NotificationPriority
 from app.models.user import User
@@ -53,6 +54,7 @@ class NotificationListResponse(BaseModel):
     unread_count: int
     has_more: bool
     next_offset: int | None
+    next_cursor: str | None = None
 
 
 class NotificationStatsResponse(BaseModel):
@@ -130,6 +132,7 @@ async def get_notifications(
     request: Request,
     limit: int = Query(50, ge=1, le=100, description="Number of notifications to retrieve"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
     unread_only: bool = Query(False, description="Only return unread notifications"),
     type_filter: str | None = Query(None, description="Filter by notification type"),
     category_filter: str | None = Query(None, description="Filter by category"),
@@ -150,6 +153,7 @@ async def get_notifications(
             notification_type=type_filter,
             category=category_filter,
             include_dismissed=include_dismissed,
+            cursor=cursor,
         )
 
         # Get unread count
@@ -163,7 +167,11 @@ async def get_notifications(
 
         # Determine if there are more notifications
         has_more = len(notifications) == limit
-        next_offset = offset + limit if has_more else None
+        next_offset = offset + limit if has_more and not cursor else None
+        next_cursor = None
+        if has_more:
+            last = notifications[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
 
         return NotificationListResponse(
             notifications=notification_responses,
@@ -171,8 +179,11 @@ async def get_notifications(
             unread_count=unread_count,
             has_more=has_more,
             next_offset=next_offset,
+            next_cursor=next_cursor,
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get notifications for user {current_user.id}: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve notifications")
@@ -16,6 +16,7 @@ from app.schemas.profile import (
     NotificationPreferencesUpdateRequest,
     ProfileResponse,
     ProfileSearchResponse,
+    ProfileSuggestion,
     ProfileUpdateRequest,
     PublicProfileResponse,
     UserSettingsResponse,
@@ -51,6 +52,16 @@ async def update_my_profile(
     return await profile_service.update_profile(current_user.id, profile_data)
 
 
+@router.get("/suggest", response_model=list[ProfileSuggestion])
+async def suggest_profiles(
+    q: str = Query(..., min_length=1, max_length=50, description="What the user has typed"),
+    limit: int = Query(8, ge=1, le=20, description="Maximum number of suggestions"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Typeahead suggestions for public profiles."""
+    return await ProfileService(db).suggest_profiles(q, limit)
+
+
 @router.get("/{profile_id}", response_model=PublicProfileResponse)
 async def get_profile(
     profile_id: UUID,
@@ -87,6 +98,10 @@ async def search_profiles(
     q: str = Query(..., min_length=2, max_length=50, description="Search query"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(20, ge=1, le=100, description="Number of results per page"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    include_total: bool | None = Query(
+        None, description="Count all matches (default: only without a cursor)"
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: User | None = Depends(get_current_user_optional),
 ):
@@ -95,7 +110,12 @@ async def search_profiles(
     current_user_id = current_user.id if current_user else None
 
     return await profile_service.search_profiles(
-        query=q, page=page, page_size=page_size, current_user_id=current_user_id
+        query=q,
+        page=page,
+        page_size=page_size,
+        current_user_id=current_user_id,
+        cursor=cursor,
+        include_total=include_total,
     )
 
 
@@ -497,6 +497,7 @@ async def get_top_cryptocurrencies(
 async def search_cryptocurrencies(
     q: str = Query(..., min_length=1, description="Search query (name or symbol)"),
     limit: int = Query(default=50, ge=1, le=100, description="Max results"),
+    fuzzy: bool = Query(default=False, description="Also match misspelled names"),
     service: CryptoDiscoveryService = Depends(get_crypto_service),
 ):
     """
@@ -510,7 +511,7 @@ async def search_cryptocurrencies(
     Returns full market data for matching cryptos
     """
     try:
-        results = await service.search_cryptos(query=q, limit=limit)
+        results = await service.search_cryptos(query=q, limit=limit, fuzzy=fuzzy)
 
         return CryptoSearchResponse(
             success=True,
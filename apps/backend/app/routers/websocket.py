@@ -8,13 +8,14 @@ import logging
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
 from app.db.database import AsyncSessionLocal
 from app.models.conversation import ConversationParticipant
 from app.schemas.conversation import MarkReadRequest
 from app.services.conversation_service import ConversationService
 from app.services.websocket_manager import authenticate_websocket, connection_manager
+from app.websockets.encoding import decode, encode, receive_frame, send_frame
 from app.websockets.notifications import NotificationWebSocketManager
 
 logger = logging.getLogger(__name__)
@@ -182,8 +183,16 @@ async def websocket_health():
 
 # J6 Notification WebSocket endpoint
 @router.websocket("/ws/notifications")
-async def notification_websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time notifications (J6)."""
+async def notification_websocket_endpoint(
+    websocket: WebSocket,
+    encoding: str = Query(default=None, description="Wire encoding: json (default) or msgpack"),
+):
+    """
+    WebSocket endpoint for real-time notifications (J6).
+
+    Frames are JSON text by default; pass ``encoding=msgpack`` (or offer the
+    ``lokifi.msgpack`` subprotocol) for binary MessagePack frames.
+    """
     user_id = await authenticate_websocket(websocket)
     if not user_id:
         return
@@ -199,22 +208,23 @@ async def notification_websocket_endpoint(websocket: WebSocket):
     user.username = f"user_{user_id_str[:8]}"  # Shortened ID for display
 
     # Connect user to notification manager
-    connected = await notification_websocket_manager.connect(websocket, user)
+    connected = await notification_websocket_manager.connect(websocket, user, encoding=encoding)
     if not connected:
         return
+    encoding = notification_websocket_manager.connection_metadata[websocket]["encoding"]
+
+    async def reply(message: dict[str, Any]):
+        await send_frame(websocket, encode(message, encoding))
 
     try:
         while True:
             # Keep connection alive and handle incoming messages
             try:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                message = decode(await receive_frame(websocket))
 
                 # Handle notification-specific messages
                 if message.get("type") == "ping":
-                    await websocket.send_text(
-                        json.dumps({"type": "pong", "timestamp": message.get("timestamp")})
-                    )
+                    await reply({"type": "pong", "timestamp": message.get("timestamp")})
                 elif message.get("type") == "mark_read":
                     # Handle mark notification as read
                     notification_id = message.get("notification_id")
@@ -227,24 +237,20 @@ async def notification_websocket_endpoint(websocket: WebSocket):
 
                         # Send updated unread count
                         unread_count = await notification_service.get_unread_count(user_id_str)
-                        await websocket.send_text(
-                            json.dumps(
-                                {
-                                    "type": "unread_count_update",
-                                    "data": {"unread_count": unread_count},
-                                }
-                            )
+                        await reply(
+                            {
+                                "type": "unread_count_update",
+                                "data": {"unread_count": unread_count},
+                            }
                         )
 
             except TimeoutError:
                 # Send keepalive ping
-                await websocket.send_text(
-                    json.dumps(
-                        {
-                            "type": "keepalive",
-                            "timestamp": asyncio.get_event_loop().time(),
-                        }
-                    )
+                await reply(
+                    {
+                        "type": "keepalive",
+                        "timestamp": asyncio.get_event_loop().time(),
+                    }
                 )
 
     except WebSocketDisconnect:
@@ -1,20 +1,50 @@
 """WebSocket Router for Real-Time Price Updates"""
 
 import asyncio
-import json
 import logging
+import time
 import uuid
+from dataclasses import replace
 from datetime import datetime
 
 from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
-from app.core.advanced_redis_client import advanced_redis_client
-from app.services.smart_price_service import SmartPriceService
+from app.services.auth import auth_handle_from_header
+from app.services.candle_store import candle_store
+from app.services.portfolio_valuation import PortfolioBook, portfolio_valuation
+from app.services.price_distribution import PriceDistributor
+from app.services.smart_price_service import PriceData, SmartPriceService
+from app.services.streaming_indicators import IndicatorSet, indicator_state_store
+from app.websockets.encoding import (
+    JSON,
+    MSGPACK,
+    decode,
+    dumps_json,
+    encode,
+    msgpack_map_header,
+    negotiate,
+    pack,
+    receive_frame,
+    send_frame,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
+# Frames a client may have queued before it is dropped as a slow consumer
+CLIENT_QUEUE_SIZE = 32
+# Close code sent to dropped slow consumers ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# Relative move below which a numeric field counts as unchanged (1 basis point)
+PRICE_EPSILON = 1e-4
+# Absolute move in percentage points below which change_percent counts as unchanged
+PERCENT_EPSILON = 0.01
+# Seconds between full snapshots that resync every client
+SNAPSHOT_INTERVAL = 300
+# Sent with any delta but never a reason to send one on their own
+_METADATA_FIELDS = ("last_updated", "cached")
+
 
 class ConnectionMetrics:
     """Track WebSocket connection metrics"""
@@ -25,6 +55,10 @@ class ConnectionMetrics:
         self.total_messages_received = 0
         self.total_errors = 0
         self.active_connections = 0
+        self.slow_consumers_dropped = 0
+        self.symbols_encoded = 0
+        self.frames_built = 0
+        self.portfolio_updates = 0
 
     def get_stats(self) -> dict:
         return {
@@ -33,26 +67,107 @@ class ConnectionMetrics:
             "messages_sent": self.total_messages_sent,
             "messages_received": self.total_messages_received,
             "errors": self.total_errors,
+            "slow_consumers_dropped": self.slow_consumers_dropped,
+            "symbols_encoded": self.symbols_encoded,
+            "frames_built": self.frames_built,
+            "portfolio_updates": self.portfolio_updates,
         }
 
 
 connection_metrics = ConnectionMetrics()
 
 
+class ClientConnection:
+    """A connected client with a bounded queue of pre-encoded frames"""
+
+    def __init__(
+        self,
+        client_id: str,
+        websocket: WebSocket,
+        queue_size: int = CLIENT_QUEUE_SIZE,
+        encoding: str = JSON,
+    ):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.encoding = encoding
+        self.queue: asyncio.Queue[str | bytes] = asyncio.Queue(maxsize=queue_size)
+        self.writer: asyncio.Task | None = None
+        # Symbols this client holds a full record for, so deltas apply
+        self.synced: set[str] = set()
+
+
+def _moved(old, new, epsilon: float) -> bool:
+    """Whether ``new`` differs from ``old`` by more than a relative ``epsilon``"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        return old.keys() != new.keys() or any(_moved(old[k], new[k], epsilon) for k in new)
+    if isinstance(old, int | float) and isinstance(new, int | float):
+        return abs(new - old) > epsilon * max(abs(old), abs(new))
+    return old != new
+
+
 class PriceWebSocketManager:
-    """Manage WebSocket connections for price updates"""
+    """
+    Manage WebSocket connections for price updates
+
+    Clients subscribe to symbol topics. Each update is encoded once per
+    symbol and clients with the same set of updated symbols share one frame,
+    so a push costs O(symbols changed) encoding instead of O(clients x
+    symbols). Frames go through a bounded per-client queue drained by a
+    writer task; a client whose queue fills up is dropped rather than
+    stalling everyone else.
+
+    After a client's first full record for a symbol it only receives the
+    fields that moved by more than ``price_epsilon`` (relative) or
+    ``percent_epsilon`` (change_percent, absolute) since the last values
+    sent, and nothing for symbols that did not move. Every
+    ``snapshot_interval`` seconds all clients get full records to resync.
+
+    Across workers only the holder of the producer lease fetches prices
+    (for every worker's subscriptions); each worker fans out what it reads
+    from the shared update stream. See ``PriceDistributor``.
+
+    A client may also subscribe to its portfolio. Its held symbols join the
+    fetched demand, and each update revalues only the positions in symbols
+    that moved (``PortfolioBook.reprice``) and sends those positions with
+    the new totals.
+    """
 
-    def __init__(self):
+    def __init__(self, queue_size: int = CLIENT_QUEUE_SIZE):
         self.active_connections: dict[str, WebSocket] = {}
         self.subscriptions: dict[str, set[str]] = {}
+        self.topics: dict[str, set[str]] = {}
+        self.clients: dict[str, ClientConnection] = {}
+        self.queue_size = queue_size
         self.update_task: asyncio.Task | None = None
         self.update_interval = 30  # 30 seconds
-
-    async def connect(self, websocket: WebSocket, client_id: str):
+        self.poll_interval = 1.0  # seconds between update stream reads
+        self.distributor = PriceDistributor(self.update_interval)
+        self._next_fetch = 0.0
+        self.indicator_timeframe = "1m"
+        self.indicator_states: dict[str, IndicatorSet] = {}
+        self.price_epsilon = PRICE_EPSILON
+        self.percent_epsilon = PERCENT_EPSILON
+        self.snapshot_interval = SNAPSHOT_INTERVAL
+        self.last_sent: dict[str, dict] = {}
+        self._last_snapshot = time.monotonic()
+        self.portfolios: dict[str, PortfolioBook] = {}
+        # Held symbol -> clients whose portfolio holds it
+        self.portfolio_topics: dict[str, set[str]] = {}
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        encoding: str = JSON,
+        subprotocol: str | None = None,
+    ):
         """Accept new WebSocket connection"""
-        await websocket.accept()
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections[client_id] = websocket
         self.subscriptions[client_id] = set()
+        conn = ClientConnection(client_id, websocket, self.queue_size, encoding)
+        conn.writer = asyncio.create_task(self._writer(conn))
+        self.clients[client_id] = conn
 
         # Update metrics
         connection_metrics.total_connections += 1
@@ -69,8 +184,12 @@ class PriceWebSocketManager:
         """Remove WebSocket connection"""
         if client_id in self.active_connections:
             del self.active_connections[client_id]
-        if client_id in self.subscriptions:
-            del self.subscriptions[client_id]
+        for symbol in self.subscriptions.pop(client_id, ()):
+            self._leave_topic(symbol, client_id)
+        self.unsubscribe_portfolio(client_id)
+        conn = self.clients.pop(client_id, None)
+        if conn and conn.writer and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
 
         # Update metrics
         connection_metrics.active_connections = len(self.active_connections)
@@ -89,6 +208,8 @@ class PriceWebSocketManager:
         if client_id in self.subscriptions:
             symbols_upper = [s.upper() for s in symbols]
             self.subscriptions[client_id].update(symbols_upper)
+            for symbol in symbols_upper:
+                self.topics.setdefault(symbol, set()).add(client_id)
             logger.info(
                 f"{client_id} subscribed to {len(symbols)} symbols: {symbols_upper[:10]}..."
             )
@@ -98,113 +219,393 @@ class PriceWebSocketManager:
     async def unsubscribe(self, client_id: str, symbols: list[str]):
         """Unsubscribe from symbols"""
         if client_id in self.subscriptions:
-            self.subscriptions[client_id].difference_update([s.upper() for s in symbols])
+            symbols_upper = [s.upper() for s in symbols]
+            self.subscriptions[client_id].difference_update(symbols_upper)
+            if client_id in self.clients:
+                self.clients[client_id].synced.difference_update(symbols_upper)
+            for symbol in symbols_upper:
+                self._leave_topic(symbol, client_id)
             logger.info(f"{client_id} unsubscribed from: {symbols}")
             return True
         return False
 
+    async def subscribe_portfolio(self, client_id: str, handle: str) -> PortfolioBook | None:
+        """Value ``handle``'s positions and revalue them on every price update"""
+        if client_id not in self.clients:
+            return None
+        book = await portfolio_valuation.load(handle)
+        self.unsubscribe_portfolio(client_id)
+        self.portfolios[client_id] = book
+        for symbol in book.price_symbols:
+            self.portfolio_topics.setdefault(symbol, set()).add(client_id)
+        return book
+
+    def unsubscribe_portfolio(self, client_id: str) -> bool:
+        book = self.portfolios.pop(client_id, None)
+        if book is None:
+            return False
+        for symbol in book.price_symbols:
+            subscribers = self.portfolio_topics.get(symbol)
+            if subscribers is not None:
+                subscribers.discard(client_id)
+                if not subscribers:
+                    del self.portfolio_topics[symbol]
+        return True
+
+    @property
+    def demand(self) -> set[str]:
+        """Symbols to fetch for this worker's clients"""
+        return self.topics.keys() | self.portfolio_topics.keys()
+
+    def _leave_topic(self, symbol: str, client_id: str):
+        subscribers = self.topics.get(symbol)
+        if subscribers is not None:
+            subscribers.discard(client_id)
+            if not subscribers:
+                del self.topics[symbol]
+                self.last_sent.pop(symbol, None)
+
     async def send_message(self, client_id: str, message: dict):
-        """Send message to specific client"""
-        if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id].send_json(message)
+        """Queue a message for a specific client"""
+        conn = self.clients.get(client_id)
+        if conn is not None:
+            self._enqueue(conn, encode(message, conn.encoding))
+
+    def _enqueue(self, conn: ClientConnection, frame: str | bytes) -> bool:
+        """Queue a frame without blocking; drop the client if its queue is full"""
+        try:
+            conn.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(
+                f"🐢 Dropping slow consumer {conn.client_id} ({conn.queue.qsize()} queued)"
+            )
+            connection_metrics.slow_consumers_dropped += 1
+            self.disconnect(conn.client_id)
+            asyncio.create_task(self._close(conn.websocket))
+            return False
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception as e:
+            logger.debug(f"Closing slow consumer failed: {e}")
+
+    async def _writer(self, conn: ClientConnection):
+        """Drain a client's queue onto its socket"""
+        try:
+            while True:
+                frame = await conn.queue.get()
+                await send_frame(conn.websocket, frame)
                 connection_metrics.total_messages_sent += 1
-            except Exception as e:
-                logger.error(f"❌ Error sending to {client_id}: {e}")
-                connection_metrics.total_errors += 1
-                self.disconnect(client_id)
-
-    async def _price_update_loop(self):
-        """Background task to fetch and push price updates every 30 seconds"""
-        logger.info("🔄 Price update loop started")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error sending to {conn.client_id}: {e}")
+            connection_metrics.total_errors += 1
+            self.disconnect(conn.client_id)
+
+    @staticmethod
+    def _price_payload(symbol: str, data, indicators: dict | None) -> dict:
+        return {
+            "symbol": symbol,
+            "price": data.price,
+            "change": data.change,
+            "change_percent": data.change_percent,
+            "high": data.high,
+            "low": data.low,
+            "volume": data.volume,
+            "market_cap": data.market_cap,
+            "last_updated": data.last_updated.isoformat() if data.last_updated else None,
+            "source": data.source,
+            "cached": data.cached,
+            "indicators": indicators,
+        }
 
-        while self.active_connections:
-            try:
-                # Collect all subscribed symbols
-                all_symbols = set()
-                for symbols in self.subscriptions.values():
-                    all_symbols.update(symbols)
-
-                if not all_symbols:
-                    logger.debug("No symbols subscribed, waiting...")
-                    await asyncio.sleep(self.update_interval)
+    def _delta(self, baseline: dict, payload: dict) -> dict:
+        """Fields of ``payload`` that moved past epsilon since ``baseline``"""
+        changed = {}
+        for field, value in payload.items():
+            if field in _METADATA_FIELDS or field == "symbol":
+                continue
+            epsilon = self.percent_epsilon if field == "change_percent" else self.price_epsilon
+            old = baseline.get(field)
+            if field == "change_percent" and isinstance(old, int | float):
+                moved = not isinstance(value, int | float) or abs(value - old) > epsilon
+            else:
+                moved = _moved(old, value, epsilon)
+            if moved:
+                changed[field] = value
+        return changed
+
+    def broadcast(
+        self,
+        prices: dict,
+        indicator_values: dict[str, dict] | None = None,
+        snapshot: bool | None = None,
+    ) -> int:
+        """
+        Fan a price update out to every subscriber.
+
+        Each symbol's full record and delta are encoded at most once per
+        wire encoding in use; a client's ``price_update`` frame is assembled
+        by joining the entries it needs, and clients needing the same entries
+        in the same encoding share one frame.
+        ``snapshot`` forces (or suppresses) full records for everyone; by
+        default one is sent every ``snapshot_interval`` seconds. Returns the
+        number of clients a frame was queued for.
+        """
+        now = time.monotonic()
+        if snapshot is None:
+            snapshot = now - self._last_snapshot >= self.snapshot_interval
+        if snapshot:
+            self._last_snapshot = now
+
+        indicator_values = indicator_values or {}
+        entries: dict[tuple[str, bool], dict] = {}
+        per_client: dict[str, list[tuple[str, bool]]] = {}
+        for symbol, data in prices.items():
+            subscribers = self.topics.get(symbol)
+            if not subscribers:
+                continue
+            payload = self._price_payload(symbol, data, indicator_values.get(symbol))
+            baseline = self.last_sent.get(symbol)
+            changed = self._delta(baseline, payload) if baseline is not None else None
+
+            for client_id in subscribers:
+                conn = self.clients.get(client_id)
+                if conn is None:
                     continue
+                if snapshot or changed is None or symbol not in conn.synced:
+                    full = True
+                    conn.synced.add(symbol)
+                elif changed:
+                    full = False
+                else:
+                    continue
+                if (symbol, full) not in entries:
+                    entry = payload
+                    if not full:
+                        entry = {"symbol": symbol, **changed}
+                        entry.update((f, payload[f]) for f in _METADATA_FIELDS)
+                    entries[symbol, full] = entry
+                per_client.setdefault(client_id, []).append((symbol, full))
+
+            if baseline is None or snapshot:
+                self.last_sent[symbol] = payload
+            else:
+                # Only advance moved fields so slow drift still crosses epsilon
+                baseline.update(changed)
+
+        timestamp = datetime.now().isoformat()
+        heads: dict[str, str | bytes] = {}
+        encoded: dict[tuple[str, bool, str], str | bytes] = {}
+        frames: dict[tuple, str | bytes] = {}
+        queued = 0
+        for client_id, keys in per_client.items():
+            conn = self.clients[client_id]
+            encoding = conn.encoding
+            key = (encoding, *keys)
+            frame = frames.get(key)
+            if frame is None:
+                if encoding not in heads:
+                    heads[encoding] = self._frame_head(encoding, timestamp, snapshot)
+                parts = []
+                for symbol, full in keys:
+                    part = encoded.get((symbol, full, encoding))
+                    if part is None:
+                        entry = entries[symbol, full]
+                        part = encoded[symbol, full, encoding] = (
+                            pack(symbol) + pack(entry)
+                            if encoding == MSGPACK
+                            else f"{dumps_json(symbol)}:{dumps_json(entry)}"
+                        )
+                    parts.append(part)
+                frame = frames[key] = self._assemble(encoding, heads[encoding], parts)
+            queued += self._enqueue(conn, frame)
+        connection_metrics.symbols_encoded += len(encoded)
+        connection_metrics.frames_built += len(frames)
+        return queued
+
+    @staticmethod
+    def portfolio_message(book: PortfolioBook, rows=None, snapshot: bool = False) -> dict:
+        return {
+            "type": "portfolio" if snapshot else "portfolio_update",
+            "timestamp": datetime.now().isoformat(),
+            "positions": book.positions(rows),
+            "totals": book.totals(),
+        }
 
-                logger.info(f"📊 Fetching prices for {len(all_symbols)} symbols...")
+    def revalue_portfolios(self, prices: dict) -> int:
+        """Revalue subscribed portfolios holding a symbol in ``prices``; returns clients updated"""
+        moved: dict[str, dict[str, float]] = {}
+        for symbol, data in prices.items():
+            for client_id in self.portfolio_topics.get(symbol, ()):
+                moved.setdefault(client_id, {})[symbol] = data.price
+        queued = 0
+        for client_id, client_prices in moved.items():
+            book, conn = self.portfolios.get(client_id), self.clients.get(client_id)
+            if book is None or conn is None:
+                continue
+            rows = book.reprice(client_prices)
+            if len(rows):
+                message = self.portfolio_message(book, rows)
+                queued += self._enqueue(conn, encode(message, conn.encoding))
+        connection_metrics.portfolio_updates += queued
+        return queued
+
+    @staticmethod
+    def _frame_head(encoding: str, timestamp: str, snapshot: bool) -> str | bytes:
+        """The fields shared by every client's frame, up to ``count``"""
+        if encoding == MSGPACK:
+            fields = {"type": "price_update", "timestamp": timestamp, "snapshot": snapshot}
+            # Five pairs: these three plus count and data, appended per frame
+            return msgpack_map_header(5) + pack(fields)[1:]
+        return (
+            f'{{"type":"price_update","timestamp":{dumps_json(timestamp)},'
+            f'"snapshot":{dumps_json(snapshot)},'
+        )
 
-                # Fetch prices using SmartPriceService
-                async with SmartPriceService() as price_service:
-                    prices = await price_service.get_batch_prices(list(all_symbols))
+    @staticmethod
+    def _assemble(encoding: str, head: str | bytes, parts: list) -> str | bytes:
+        """Join pre-encoded ``symbol: entry`` pairs into a ``price_update`` frame"""
+        if encoding == MSGPACK:
+            # Drop the map header and the nil placeholder; the data map follows
+            tail = pack({"count": len(parts), "data": None})[1:-1]
+            return b"".join([head, tail, msgpack_map_header(len(parts)), *parts])
+        return f'{head}"count":{len(parts)},"data":{{{",".join(parts)}}}}}'
+
+    async def _update_indicators(self, prices: dict) -> dict[str, dict]:
+        """Advance streaming indicators with the latest prices (O(1) per symbol)"""
+        now = datetime.now().timestamp()
+        missing = [s for s in prices if s not in self.indicator_states]
+        if missing:
+            restored = await asyncio.gather(
+                *(indicator_state_store.load(s, self.indicator_timeframe) for s in missing)
+            )
+            for symbol, state in zip(missing, restored, strict=True):
+                self.indicator_states[symbol] = state or IndicatorSet(
+                    symbol, self.indicator_timeframe
+                )
 
-                if not prices:
-                    logger.warning("No prices fetched")
-                    await asyncio.sleep(self.update_interval)
-                    continue
+        # New states and states that missed bars replay the stored closes
+        stale = [
+            self.indicator_states[s]
+            for s, data in prices.items()
+            if data.price is not None and self.indicator_states[s].needs_prime(now)
+        ]
+        if stale:
+            await asyncio.gather(*(self._prime_indicators(state, now) for state in stale))
+
+        values = {
+            symbol: self.indicator_states[symbol].on_tick(data.price, now)
+            for symbol, data in prices.items()
+            if data.price is not None
+        }
 
-                # Publish to Redis for horizontal scaling
-                if advanced_redis_client.client:
-                    try:
-                        price_payload = {
-                            symbol: {
-                                "price": data.price,
-                                "change": data.change,
-                                "change_percent": data.change_percent,
-                                "volume": data.volume,
-                                "high": data.high,
-                                "low": data.low,
-                                "timestamp": datetime.now().isoformat(),
-                                "source": data.source,
-                            }
-                            for symbol, data in prices.items()
-                        }
-                        await advanced_redis_client.client.publish(
-                            "lokifi:price_updates", json.dumps(price_payload)
-                        )
-                        logger.debug(f"📤 Published {len(price_payload)} prices to Redis")
-                    except Exception as e:
-                        logger.debug(f"Redis publish failed: {e}")
-
-                # Send targeted updates to each client
-                for client_id, subscribed_symbols in self.subscriptions.items():
-                    # Filter for this client's subscriptions
-                    client_prices = {}
-                    for symbol in subscribed_symbols:
-                        if symbol in prices:
-                            data = prices[symbol]
-                            client_prices[symbol] = {
-                                "symbol": symbol,
-                                "price": data.price,
-                                "change": data.change,
-                                "change_percent": data.change_percent,
-                                "high": data.high,
-                                "low": data.low,
-                                "volume": data.volume,
-                                "market_cap": data.market_cap,
-                                "last_updated": data.last_updated.isoformat()
-                                if data.last_updated
-                                else None,
-                                "source": data.source,
-                                "cached": data.cached,
-                            }
-
-                    if client_prices:
-                        await self.send_message(
-                            client_id,
-                            {
-                                "type": "price_update",
-                                "timestamp": datetime.now().isoformat(),
-                                "count": len(client_prices),
-                                "data": client_prices,
-                            },
-                        )
+        try:
+            await asyncio.gather(
+                *(indicator_state_store.save(self.indicator_states[s]) for s in values)
+            )
+        except Exception as e:
+            logger.debug(f"Indicator snapshot failed: {e}")
+        return values
+
+    @staticmethod
+    async def _prime_indicators(state: IndicatorSet, now: float) -> None:
+        """Rebuild ``state`` from the candle store's closed bars before ``now``"""
+        try:
+            bars = await asyncio.to_thread(
+                candle_store.read,
+                state.symbol,
+                state.timeframe,
+                end=state.bar_start_of(now) * 1000 - 1,
+                limit=state.warmup_bars,
+            )
+        except Exception as e:
+            logger.debug(f"Indicator priming failed for {state.symbol}: {e}")
+            bars = None
+        state.reset()
+        if bars is not None and len(bars):
+            state.prime(bars.close.tolist())
+
+    async def _fetch_prices(self, symbols) -> tuple[dict, dict[str, dict]]:
+        """Fetch prices and advance indicators for ``symbols``"""
+        logger.info(f"📊 Fetching prices for {len(symbols)} symbols...")
+        async with SmartPriceService() as price_service:
+            prices = await price_service.get_batch_prices(list(symbols))
+        if not prices:
+            logger.warning("No prices fetched")
+            return {}, {}
+        return prices, await self._update_indicators(prices)
+
+    @staticmethod
+    def _encode_update(prices: dict, indicator_values: dict[str, dict]) -> dict:
+        return {
+            "prices": {s: {**data.to_cache(), "cached": data.cached} for s, data in prices.items()},
+            "indicators": indicator_values,
+        }
 
-                logger.info(f"✅ Sent price updates to {len(self.subscriptions)} clients")
+    @staticmethod
+    def _decode_updates(updates: list[dict]) -> tuple[dict, dict[str, dict]]:
+        """Merge stream updates oldest first so the latest value per symbol wins"""
+        prices, indicator_values = {}, {}
+        for update in updates:
+            for symbol, record in (update.get("prices") or {}).items():
+                data = PriceData.from_cache(record)
+                prices[symbol] = replace(data, cached=bool(record.get("cached")))
+            indicator_values.update(update.get("indicators") or {})
+        return prices, indicator_values
+
+    def _fan_out(self, prices: dict, indicator_values: dict[str, dict]):
+        if prices:
+            # Encode once per symbol and queue shared frames for subscribers
+            queued = self.broadcast(prices, indicator_values)
+            logger.info(f"✅ Queued price updates for {queued} clients")
+            if self.portfolio_topics:
+                self.revalue_portfolios(prices)
+
+    async def _tick(self):
+        """Fetch when due (as producer, or standalone without Redis), then fan out new updates"""
+        now = time.monotonic()
+        if now >= self._next_fetch:
+            self._next_fetch = now + self.update_interval
+            demand = self.demand
+            await self.distributor.advertise(demand)
+            leader = await self.distributor.acquire_leadership()
+            if leader is None:
+                # No Redis: serve this worker's own subscriptions directly
+                if demand:
+                    self._fan_out(*await self._fetch_prices(demand))
+                return
+            if leader:
+                symbols = await self.distributor.demand() | demand
+                if symbols:
+                    prices, indicator_values = await self._fetch_prices(symbols)
+                    update = self._encode_update(prices, indicator_values)
+                    if prices and not await self.distributor.publish(update):
+                        self._fan_out(prices, indicator_values)
+
+        updates = await self.distributor.read_new()
+        if updates:
+            self._fan_out(*self._decode_updates(updates))
 
-            except Exception as e:
-                logger.error(f"❌ Error in price update loop: {e}", exc_info=True)
+    async def _price_update_loop(self):
+        """Background task that keeps subscribers fed every ``update_interval`` seconds"""
+        logger.info("🔄 Price update loop started")
+
+        try:
+            while self.active_connections:
+                try:
+                    await self._tick()
+                except Exception as e:
+                    logger.error(f"❌ Error in price update loop: {e}", exc_info=True)
 
-            # Wait 30 seconds before next update
-            await asyncio.sleep(self.update_interval)
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            # Let another worker take over producing right away
+            await self.distributor.release_leadership()
 
         logger.info("Price update loop stopped (no active connections)")
 
@@ -215,7 +616,9 @@ price_ws_manager = PriceWebSocketManager()
 
 @router.websocket("/prices")
 async def websocket_price_endpoint(
-    websocket: WebSocket, client_id: str = Query(default=None, description="Optional client ID")
+    websocket: WebSocket,
+    client_id: str = Query(default=None, description="Optional client ID"),
+    encoding: str = Query(default=None, description="Wire encoding: json (default) or msgpack"),
 ):
     """
     WebSocket endpoint for real-time price updates
@@ -225,6 +628,11 @@ async def websocket_price_endpoint(
     const ws = new WebSocket('ws://localhost:8000/api/ws/prices?client_id=my-client');
     ```
 
+    **Encoding:** JSON text frames by default. Pass ``encoding=msgpack`` (or
+    offer the ``lokifi.msgpack`` subprotocol) to get binary MessagePack
+    frames with the same structure; the client may then send MessagePack
+    too. permessage-deflate compression is used when the client offers it.
+
     **Message Format (Client → Server):**
     ```json
     {
@@ -240,11 +648,19 @@ async def websocket_price_endpoint(
     }
     ```
 
+    ```json
+    {
+      "action": "subscribe_portfolio",
+      "token": "<access token>"
+    }
+    ```
+
     **Message Format (Server → Client):**
     ```json
     {
       "type": "price_update",
       "timestamp": "2025-10-06T12:00:00",
+      "snapshot": false,
       "count": 3,
       "data": {
         "BTC": {
@@ -258,24 +674,44 @@ async def websocket_price_endpoint(
           "market_cap": 1320000000000,
           "last_updated": "2025-10-06T12:00:00",
           "source": "coingecko",
-          "cached": false
+          "cached": false,
+          "indicators": {"sma_20": 67010.2, "ema_20": 67102.8, "rsi_14": 58.3}
         }
       }
     }
     ```
 
+    The first update for a newly subscribed symbol, and every update with
+    ``"snapshot": true`` (every 5 minutes), carries full records. Otherwise
+    entries are deltas: only ``symbol``, the fields that moved, and
+    ``last_updated``/``cached``; symbols that did not move are omitted.
+    Clients merge each entry into their last record for the symbol.
+
+    ``subscribe_portfolio`` answers with a ``"type": "portfolio"`` message
+    holding every position (``id``, ``symbol``, ``current_price``,
+    ``market_value``, ``cost_value``, ``unrealized_pl``, ``pl_pct``) and the
+    portfolio ``totals``. Each price update that moves a held symbol then
+    sends a ``"type": "portfolio_update"`` with just the positions that moved
+    and the new totals. Subscribe again after editing positions to reload
+    them; ``unsubscribe_portfolio`` stops the updates.
+
     **Features:**
     - Real-time updates every 30 seconds
+    - Streaming SMA/EMA/RSI (1m bars) updated incrementally with each push
     - Subscribe to specific symbols
+    - Each update encoded once and shared by all subscribers; slow clients
+      whose send queue fills up are closed with code 1013
     - Automatic reconnection support
-    - Redis pub/sub for horizontal scaling
+    - One provider fetch per interval across all workers (leader-elected
+      producer, Redis Stream fan-in)
     """
 
     # Generate client ID if not provided
     if not client_id:
         client_id = str(uuid.uuid4())
 
-    await price_ws_manager.connect(websocket, client_id)
+    wire_encoding, subprotocol = negotiate(websocket, encoding)
+    await price_ws_manager.connect(websocket, client_id, wire_encoding, subprotocol)
 
     # Send welcome message
     await price_ws_manager.send_message(
@@ -285,16 +721,17 @@ async def websocket_price_endpoint(
             "client_id": client_id,
             "message": "Connected to Lokifi Price WebSocket",
             "update_interval": price_ws_manager.update_interval,
+            "encoding": wire_encoding,
         },
     )
 
     try:
         while True:
             # Receive messages from client
-            data = await websocket.receive_text()
+            data = await receive_frame(websocket)
 
             try:
-                message = json.loads(data)
+                message = decode(data)
                 action = message.get("action")
 
                 if action == "subscribe":
@@ -314,6 +751,25 @@ async def websocket_price_endpoint(
                             client_id, {"type": "unsubscribed", "symbols": symbols}
                         )
 
+                elif action == "subscribe_portfolio":
+                    handle = auth_handle_from_header(f"Bearer {message.get('token', '')}")
+                    if not handle:
+                        await price_ws_manager.send_message(
+                            client_id, {"type": "error", "message": "Unauthorized"}
+                        )
+                        continue
+                    book = await price_ws_manager.subscribe_portfolio(client_id, handle)
+                    if book is not None:
+                        await price_ws_manager.send_message(
+                            client_id, price_ws_manager.portfolio_message(book, snapshot=True)
+                        )
+
+                elif action == "unsubscribe_portfolio":
+                    price_ws_manager.unsubscribe_portfolio(client_id)
+                    await price_ws_manager.send_message(
+                        client_id, {"type": "portfolio_unsubscribed"}
+                    )
+
                 elif action == "ping":
                     await price_ws_manager.send_message(
                         client_id, {"type": "pong", "timestamp": datetime.now().isoformat()}
@@ -330,9 +786,9 @@ async def websocket_price_endpoint(
                         client_id, {"type": "error", "message": f"Unknown action: {action}"}
                     )
 
-            except json.JSONDecodeError:
+            except ValueError:
                 await price_ws_manager.send_message(
-                    client_id, {"type": "error", "message": "Invalid JSON"}
+                    client_id, {"type": "error", "message": f"Invalid {wire_encoding} message"}
                 )
             except Exception as e:
                 logger.error(f"Error processing message from {client_id}: {e}")
@@ -38,6 +38,15 @@ class MessageResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class MessageSearchHit(MessageResponse):
+    """Schema for a message search result."""
+
+    rank: float | None = Field(None, description="Relevance score (higher is better)")
+    snippet: str | None = Field(
+        None, description="HTML-escaped excerpt with matches wrapped in <mark>"
+    )
+
+
 class ConversationParticipantResponse(BaseModel):
     """Schema for conversation participant."""
 
@@ -89,10 +98,11 @@ class MessagesListResponse(BaseModel):
     """Schema for messages list."""
 
     messages: list[MessageResponse]
-    total: int
+    total: int | None  # None when the caller skipped counting
     page: int
     page_size: int
     has_next: bool
+    next_cursor: str | None = None
     conversation_id: uuid.UUID
 
 
@@ -52,20 +52,22 @@ class FollowersListResponse(BaseModel):
     """Followers list response schema."""
 
     followers: list[UserFollowStatus]
-    total: int
+    total: int | None  # None when the caller skipped counting
     page: int
     page_size: int
     has_next: bool
+    next_cursor: str | None = None
 
 
 class FollowingListResponse(BaseModel):
     """Following list response schema."""
 
     following: list[UserFollowStatus]
-    total: int
+    total: int | None  # None when the caller skipped counting
     page: int
     page_size: int
     has_next: bool
+    next_cursor: str | None = None
 
 
 class FollowStatsResponse(BaseModel):
@@ -98,6 +100,7 @@ class SuggestedUsersResponse(BaseModel):
     page: int
     page_size: int
     has_next: bool
+    next_cursor: str | None = None
 
 
 class FollowActivityResponse(BaseModel):
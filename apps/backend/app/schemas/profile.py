@@ -118,11 +118,23 @@ class PublicProfileResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ProfileSuggestion(BaseModel):
+    """Typeahead suggestion for the user search box."""
+
+    user_id: UUID
+    username: str | None
+    display_name: str | None
+    avatar_url: str | None
+
+    model_config = {"from_attributes": True}
+
+
 class ProfileSearchResponse(BaseModel):
     """Profile search response schema."""
 
     profiles: list[PublicProfileResponse]
-    total: int
+    total: int | None  # None when the caller skipped counting
     page: int
     page_size: int
     has_next: bool
+    next_cursor: str | None = None
@@ -13,7 +13,7 @@ from typing import Any
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 
-from app.db.db import get_session
+from app.db.db import run_in_session
 from app.db.models import AIMessage, AIThread
 from app.services.ai_provider import AIMessage as AIProviderMessage
 from app.services.ai_provider import MessageRole
@@ -51,7 +51,6 @@ class AIContextManager:
     """Manages AI conversation context and memory."""
 
     def __init__(self):
-        self.session_factory = get_session
         self.context_cache: dict[int, ConversationMemory] = {}
         self.max_context_length = 4000  # Max tokens for context
         self.summary_threshold = 20  # Summarize after 20 messages
@@ -64,36 +63,39 @@ class AIContextManager:
         Returns recent messages and optional summary of older context.
         """
 
-        with self.session_factory() as db:
-            # Get recent messages
-            recent_messages = (
-                db.query(AIMessage)
-                .filter(AIMessage.thread_id == thread_id)
-                .order_by(desc(AIMessage.created_at))
-                .limit(max_messages)
-                .all()
-            )
-
-            recent_messages = list(reversed(recent_messages))
-
-            # Convert to provider format
-            provider_messages = []
-            for msg in recent_messages:
-                role = MessageRole.USER if msg.role == "user" else MessageRole.ASSISTANT
-                provider_messages.append(AIProviderMessage(role=role, content=msg.content))
+        recent_messages, total_message_count = await run_in_session(
+            self._load_recent_messages, thread_id, max_messages
+        )
 
-            # Check if we need to summarize older context
-            total_message_count = (
-                db.query(AIMessage).filter(AIMessage.thread_id == thread_id).count()
+        # Convert to provider format
+        provider_messages = []
+        for msg in reversed(recent_messages):
+            role = MessageRole.USER if msg.role == "user" else MessageRole.ASSISTANT
+            provider_messages.append(AIProviderMessage(role=role, content=msg.content))
+
+        # Check if we need to summarize older context
+        context_summary = None
+        if total_message_count > self.summary_threshold:
+            context_summary = await self._get_or_create_context_summary(
+                thread_id, user_id, max_messages
             )
 
-            context_summary = None
-            if total_message_count > self.summary_threshold:
-                context_summary = await self._get_or_create_context_summary(
-                    db, thread_id, user_id, max_messages
-                )
+        return provider_messages, context_summary
 
-            return provider_messages, context_summary
+    @staticmethod
+    def _load_recent_messages(
+        db: Session, thread_id: int, max_messages: int
+    ) -> tuple[list[AIMessage], int]:
+        """Most recent messages (newest first) and the thread's message count."""
+        recent_messages = (
+            db.query(AIMessage)
+            .filter(AIMessage.thread_id == thread_id)
+            .order_by(desc(AIMessage.created_at))
+            .limit(max_messages)
+            .all()
+        )
+        total_message_count = db.query(AIMessage).filter(AIMessage.thread_id == thread_id).count()
+        return recent_messages, total_message_count
 
     async def update_user_preferences(self, user_id: int, preferences: dict[str, Any]) -> None:
         """Update user preferences for AI interactions."""
@@ -106,53 +108,54 @@ class AIContextManager:
     async def analyze_conversation_style(self, thread_id: int) -> dict[str, Any]:
         """Analyze conversation style and user preferences."""
 
-        with self.session_factory() as db:
-            user_messages = (
+        user_messages = await run_in_session(
+            lambda db: (
                 db.query(AIMessage.content)
                 .filter(AIMessage.thread_id == thread_id, AIMessage.role == "user")
                 .all()
             )
+        )
 
-            if not user_messages:
-                return {"style": "neutral", "preferences": {}}
+        if not user_messages:
+            return {"style": "neutral", "preferences": {}}
 
-            # Simple style analysis (in production, use NLP)
-            all_text = " ".join([msg[0] for msg in user_messages])
+        # Simple style analysis (in production, use NLP)
+        all_text = " ".join([msg[0] for msg in user_messages])
 
-            style_indicators = {
-                "formal": ["please", "thank you", "appreciate", "kindly", "would you"],
-                "casual": ["hey", "cool", "awesome", "yeah", "ok", "thanks"],
-                "technical": ["algorithm", "function", "implementation", "optimize", "debug"],
-                "creative": ["imagine", "creative", "brainstorm", "innovative", "design"],
-            }
+        style_indicators = {
+            "formal": ["please", "thank you", "appreciate", "kindly", "would you"],
+            "casual": ["hey", "cool", "awesome", "yeah", "ok", "thanks"],
+            "technical": ["algorithm", "function", "implementation", "optimize", "debug"],
+            "creative": ["imagine", "creative", "brainstorm", "innovative", "design"],
+        }
 
-            style_scores = {}
-            text_lower = all_text.lower()
+        style_scores = {}
+        text_lower = all_text.lower()
 
-            for style, indicators in style_indicators.items():
-                score = sum(1 for indicator in indicators if indicator in text_lower)
-                style_scores[style] = score
+        for style, indicators in style_indicators.items():
+            score = sum(1 for indicator in indicators if indicator in text_lower)
+            style_scores[style] = score
 
-            # Determine dominant style
-            dominant_style = (
-                max(style_scores.keys(), key=lambda k: style_scores.get(k, 0))
-                if style_scores
-                else "neutral"
-            )
+        # Determine dominant style
+        dominant_style = (
+            max(style_scores.keys(), key=lambda k: style_scores.get(k, 0))
+            if style_scores
+            else "neutral"
+        )
 
-            # Extract preferences
-            preferences = {
-                "prefers_detailed_responses": len(all_text) > 500,
-                "uses_technical_language": style_scores.get("technical", 0) > 2,
-                "communication_style": dominant_style,
-                "avg_message_length": len(all_text) / len(user_messages),
-            }
+        # Extract preferences
+        preferences = {
+            "prefers_detailed_responses": len(all_text) > 500,
+            "uses_technical_language": style_scores.get("technical", 0) > 2,
+            "communication_style": dominant_style,
+            "avg_message_length": len(all_text) / len(user_messages),
+        }
 
-            return {
-                "style": dominant_style,
-                "preferences": preferences,
-                "style_scores": style_scores,
-            }
+        return {
+            "style": dominant_style,
+            "preferences": preferences,
+            "style_scores": style_scores,
+        }
 
     async def create_context_summary(
         self, thread_id: int, messages: list[AIMessage]
@@ -261,7 +264,7 @@ class AIContextManager:
         )
 
     async def _get_or_create_context_summary(
-        self, db: Session, thread_id: int, user_id: int, recent_message_limit: int
+        self, thread_id: int, user_id: int, recent_message_limit: int
     ) -> ContextSummary | None:
         """Get existing context summary or create a new one."""
 
@@ -272,12 +275,14 @@ class AIContextManager:
                 return memory.context_summary
 
         # Get older messages (excluding recent ones)
-        older_messages = (
-            db.query(AIMessage)
-            .filter(AIMessage.thread_id == thread_id)
-            .order_by(AIMessage.created_at)
-            .offset(recent_message_limit)
-            .all()
+        older_messages = await run_in_session(
+            lambda db: (
+                db.query(AIMessage)
+                .filter(AIMessage.thread_id == thread_id)
+                .order_by(AIMessage.created_at)
+                .offset(recent_message_limit)
+                .all()
+            )
         )
 
         if older_messages:
@@ -302,44 +307,45 @@ class AIContextManager:
     async def get_user_context_across_threads(self, user_id: int, limit: int = 5) -> dict[str, Any]:
         """Get context about user across all their conversations."""
 
-        with self.session_factory() as db:
-            # Get user's recent threads
-            recent_threads = (
+        # Get user's recent threads
+        recent_threads = await run_in_session(
+            lambda db: (
                 db.query(AIThread)
                 .filter(AIThread.user_id == user_id)
                 .order_by(desc(AIThread.updated_at))
                 .limit(limit)
                 .all()
             )
+        )
 
-            # Aggregate insights
-            all_topics = []
-            communication_styles = []
-
-            for thread in recent_threads:
-                style_analysis = await self.analyze_conversation_style(thread.id)
-                all_topics.extend(style_analysis.get("topic_tags", []))
-                communication_styles.append(style_analysis.get("style", "neutral"))
-
-            # Determine dominant patterns
-            from collections import Counter
-
-            topic_counter = Counter(all_topics)
-            style_counter = Counter(communication_styles)
-
-            return {
-                "user_id": user_id,
-                "favorite_topics": [topic for topic, _ in topic_counter.most_common(5)],
-                "dominant_communication_style": (
-                    style_counter.most_common(1)[0][0] if style_counter else "neutral"
-                ),
-                "total_conversations": len(recent_threads),
-                "context_insights": {
-                    "prefers_detailed": any("technical" in style for style in communication_styles),
-                    "casual_communication": "casual" in communication_styles,
-                    "active_user": len(recent_threads) > 2,
-                },
-            }
+        # Aggregate insights
+        all_topics = []
+        communication_styles = []
+
+        for thread in recent_threads:
+            style_analysis = await self.analyze_conversation_style(thread.id)
+            all_topics.extend(style_analysis.get("topic_tags", []))
+            communication_styles.append(style_analysis.get("style", "neutral"))
+
+        # Determine dominant patterns
+        from collections import Counter
+
+        topic_counter = Counter(all_topics)
+        style_counter = Counter(communication_styles)
+
+        return {
+            "user_id": user_id,
+            "favorite_topics": [topic for topic, _ in topic_counter.most_common(5)],
+            "dominant_communication_style": (
+                style_counter.most_common(1)[0][0] if style_counter else "neutral"
+            ),
+            "total_conversations": len(recent_threads),
+            "context_insights": {
+                "prefers_detailed": any("technical" in style for style in communication_styles),
+                "casual_communication": "casual" in communication_styles,
+                "active_user": len(recent_threads) > 2,
+            },
+        }
 
 
 # Global service instance
@@ -14,8 +14,9 @@ from typing import Any
 
 import sentry_sdk
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 
-from app.db.db import get_session
+from app.db.db import run_in_session
 from app.db.models import AIMessage, AIThread
 from app.services.ai_provider import ProviderError, StreamChunk
 from app.services.ai_provider_manager import ai_provider_manager, get_ai_provider
@@ -189,70 +190,74 @@ class AIService:
 
     async def create_thread(self, user_id: int, title: str | None = None) -> AIThread:
         """Create a new AI chat thread."""
-        with get_session() as db:
-            # Generate title if not provided
-            if not title:
-                title = f"Chat {datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}"
-
-            thread = AIThread(
-                user_id=user_id,
-                title=title[:255],  # Limit title length
-                created_at=datetime.now(UTC),
-                updated_at=datetime.now(UTC),
-            )
-
-            try:
-                db.add(thread)
-                db.commit()
-                db.refresh(thread)
-                logger.info(f"Created AI thread {thread.id} for user {user_id}")
-                return thread
-            except IntegrityError as e:
-                db.rollback()
-                logger.error(f"Failed to create AI thread: {e}")
-                logger.error("AI service error", exc_info=True)
-                raise
+        # Generate title if not provided
+        if not title:
+            title = f"Chat {datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}"
+
+        try:
+            thread = await run_in_session(self._create_thread, user_id, title)
+        except IntegrityError as e:
+            logger.error(f"Failed to create AI thread: {e}")
+            logger.error("AI service error", exc_info=True)
+            raise
+        logger.info(f"Created AI thread {thread.id} for user {user_id}")
+        return thread
+
+    @staticmethod
+    def _create_thread(db: Session, user_id: int, title: str) -> AIThread:
+        thread = AIThread(
+            user_id=user_id,
+            title=title[:255],  # Limit title length
+            created_at=datetime.now(UTC),
+            updated_at=datetime.now(UTC),
+        )
+        db.add(thread)
+        db.commit()
+        db.refresh(thread)
+        return thread
 
     async def get_user_threads(
         self, user_id: int, limit: int = 50, offset: int = 0
     ) -> list[AIThread]:
         """Get AI threads for a user."""
-        with get_session() as db:
-            threads = (
-                db.query(AIThread)
-                .filter(AIThread.user_id == user_id)
-                .order_by(AIThread.updated_at.desc())
-                .limit(limit)
-                .offset(offset)
-                .all()
-            )
-
-            return threads
+        return await run_in_session(self._get_user_threads, user_id, limit, offset)
+
+    @staticmethod
+    def _get_user_threads(db: Session, user_id: int, limit: int, offset: int) -> list[AIThread]:
+        return (
+            db.query(AIThread)
+            .filter(AIThread.user_id == user_id)
+            .order_by(AIThread.updated_at.desc())
+            .limit(limit)
+            .offset(offset)
+            .all()
+        )
 
     async def get_thread_messages(
         self, thread_id: int, user_id: int, limit: int = 50
     ) -> list[AIMessage]:
         """Get messages for a thread."""
-        with get_session() as db:
-            # Verify user owns the thread
-            thread = (
-                db.query(AIThread)
-                .filter(AIThread.id == thread_id, AIThread.user_id == user_id)
-                .first()
-            )
-
-            if not thread:
-                raise ValueError("Thread not found or access denied")
+        return await run_in_session(self._get_thread_messages, thread_id, user_id, limit)
 
-            messages = (
-                db.query(AIMessage)
-                .filter(AIMessage.thread_id == thread_id)
-                .order_by(AIMessage.created_at)
-                .limit(limit)
-                .all()
-            )
-
-            return messages
+    @staticmethod
+    def _get_thread_messages(
+        db: Session, thread_id: int, user_id: int, limit: int
+    ) -> list[AIMessage]:
+        # Verify user owns the thread
+        thread = (
+            db.query(AIThread).filter(AIThread.id == thread_id, AIThread.user_id == user_id).first()
+        )
+
+        if not thread:
+            raise ValueError("Thread not found or access denied")
+
+        return (
+            db.query(AIMessage)
+            .filter(AIMessage.thread_id == thread_id)
+            .order_by(AIMessage.created_at)
+            .limit(limit)
+            .all()
+        )
 
     async def send_message(
         self,
@@ -266,215 +271,241 @@ class AIService:
         Send a message and stream the AI response.
 
         Yields StreamChunk objects during generation, then final AIMessage.
+        Database work runs on the DB thread pool in short units of work, so
+        no session or SQLite connection is held while the response streams.
         """
-        with get_session() as db:
-            # Rate limiting
-            if not self.rate_limiter.check_rate_limit(user_id):
-                raise RateLimitError(
-                    "Rate limit exceeded. Please wait before sending another message."
+        # Rate limiting
+        if not self.rate_limiter.check_rate_limit(user_id):
+            raise RateLimitError("Rate limit exceeded. Please wait before sending another message.")
+
+        # Enhanced safety filtering
+        moderation_result = moderate_ai_input(message, user_id)
+        if moderation_result.level == ModerationLevel.BLOCKED:
+            raise SafetyFilterError(f"Message blocked: {moderation_result.reason}")
+        elif moderation_result.level == ModerationLevel.FLAGGED:
+            logger.warning(f"Flagged content from user {user_id}: {moderation_result.reason}")
+            # Continue but log for review
+
+        # Save the user message and load the conversation history
+        recent_messages = await run_in_session(self._save_user_message, user_id, thread_id, message)
+
+        # Get AI provider
+        try:
+            provider = await get_ai_provider(provider_name)
+        except Exception as e:
+            logger.error(f"Failed to get AI provider: {e}")
+            logger.error("AI service error", exc_info=True)
+            raise ProviderError("AI service temporarily unavailable")
+
+        # Convert to AI provider format
+        from app.services.ai_provider import AIMessage as AIProviderMessage
+        from app.services.ai_provider import MessageRole, StreamOptions
+
+        conversation_history = []
+        for msg in reversed(recent_messages):
+            conversation_history.append(
+                AIProviderMessage(
+                    role=MessageRole.USER if msg.role == "user" else MessageRole.ASSISTANT,
+                    content=msg.content,
                 )
-
-            # Enhanced safety filtering
-            moderation_result = moderate_ai_input(message, user_id)
-            if moderation_result.level == ModerationLevel.BLOCKED:
-                raise SafetyFilterError(f"Message blocked: {moderation_result.reason}")
-            elif moderation_result.level == ModerationLevel.FLAGGED:
-                logger.warning(f"Flagged content from user {user_id}: {moderation_result.reason}")
-                # Continue but log for review
-
-            # Verify thread ownership
-            thread = (
-                db.query(AIThread)
-                .filter(AIThread.id == thread_id, AIThread.user_id == user_id)
-                .first()
             )
 
-            if not thread:
-                raise ValueError("Thread not found or access denied")
+        # Generate AI response
+        ai_message = AIMessage(
+            thread_id=thread_id,
+            role="assistant",
+            content="",
+            model=model or await provider.get_default_model(),
+            provider=provider.name,
+            created_at=datetime.now(UTC),
+        )
+        ai_message = await run_in_session(self._add_message, ai_message)
+
+        response_content = ""
+        token_count = 0
+
+        try:
+            # Stream the response
+            stream_options = StreamOptions(max_tokens=self.max_tokens_per_request, model=model)
+
+            stream_generator = await provider.stream_chat(
+                messages=conversation_history, options=stream_options
+            )
 
-            # Check message limit per thread
-            message_count = db.query(AIMessage).filter(AIMessage.thread_id == thread_id).count()
-            if message_count >= self.max_messages_per_thread:
-                raise ValueError(
-                    f"Thread has reached maximum message limit of {self.max_messages_per_thread}"
-                )
+            async for chunk in stream_generator:
+                # Check token limits
+                if token_count > self.max_tokens_per_request:
+                    chunk.content = "\n\n[Response truncated - token limit reached]"
+                    chunk.is_complete = True
+
+                response_content += chunk.content
+                token_count += 1
+
+                # Yield the chunk to the client
+                yield chunk
+
+                # Stop if we've reached the end
+                if chunk.is_complete:
+                    break
+
+            # Enhanced safety check the final response
+            output_moderation = moderate_ai_output(response_content)
+            if output_moderation.level == ModerationLevel.BLOCKED:
+                response_content = "I apologize, but I can't provide a response to that request."
+                logger.warning(f"AI output blocked: {output_moderation.reason}")
+
+            # Update the message with final content and the thread timestamp
+            ai_message = await run_in_session(
+                self._complete_message,
+                ai_message.id,
+                content=response_content,
+                token_count=token_count,
+            )
 
-            # Save user message
-            user_message = AIMessage(
-                thread_id=thread_id,
-                role="user",
-                content=message,
-                created_at=datetime.now(UTC),
+            # Yield the final message
+            yield ai_message
+
+        except Exception as e:
+            logger.error(f"AI generation error: {e}")
+
+            # Log exception with context
+            sentry_sdk.capture_exception(
+                e,
+                extras={
+                    "user_id": user_id,
+                    "thread_id": thread_id,
+                    "provider": provider.name if provider else "unknown",
+                    "model": model,
+                    "message_length": len(message),
+                },
             )
 
-            db.add(user_message)
-            db.commit()
-            db.refresh(user_message)
-
-            # Get AI provider
-            try:
-                provider = await get_ai_provider(provider_name)
-            except Exception as e:
-                logger.error(f"Failed to get AI provider: {e}")
-                logger.error("AI service error", exc_info=True)
-                raise ProviderError("AI service temporarily unavailable")
-
-            # Prepare conversation history
-            recent_messages = (
-                db.query(AIMessage)
-                .filter(AIMessage.thread_id == thread_id)
-                .order_by(AIMessage.created_at.desc())
-                .limit(20)
-                .all()
+            # Update message with error
+            ai_message = await run_in_session(
+                self._complete_message,
+                ai_message.id,
+                content="I apologize, but I encountered an error while generating a response.",
+                error=str(e),
             )
 
-            # Convert to AI provider format
-            from app.services.ai_provider import AIMessage as AIProviderMessage
-            from app.services.ai_provider import MessageRole, StreamOptions
-
-            conversation_history = []
-            for msg in reversed(recent_messages):
-                conversation_history.append(
-                    AIProviderMessage(
-                        role=MessageRole.USER if msg.role == "user" else MessageRole.ASSISTANT,
-                        content=msg.content,
-                    )
-                )
+            yield ai_message
 
-            # Generate AI response
-            ai_message = AIMessage(
+    def _save_user_message(
+        self, db: Session, user_id: int, thread_id: int, message: str
+    ) -> list[AIMessage]:
+        """Store the user's message; return the 20 most recent messages, newest first."""
+        # Verify thread ownership
+        thread = (
+            db.query(AIThread).filter(AIThread.id == thread_id, AIThread.user_id == user_id).first()
+        )
+
+        if not thread:
+            raise ValueError("Thread not found or access denied")
+
+        # Check message limit per thread
+        message_count = db.query(AIMessage).filter(AIMessage.thread_id == thread_id).count()
+        if message_count >= self.max_messages_per_thread:
+            raise ValueError(
+                f"Thread has reached maximum message limit of {self.max_messages_per_thread}"
+            )
+
+        # Save user message
+        db.add(
+            AIMessage(
                 thread_id=thread_id,
-                role="assistant",
-                content="",
-                model=model or await provider.get_default_model(),
-                provider=provider.name,
+                role="user",
+                content=message,
                 created_at=datetime.now(UTC),
             )
-
-            db.add(ai_message)
-            db.commit()
-            db.refresh(ai_message)
-
-            response_content = ""
-            token_count = 0
-
-            try:
-                # Stream the response
-                stream_options = StreamOptions(max_tokens=self.max_tokens_per_request, model=model)
-
-                stream_generator = await provider.stream_chat(
-                    messages=conversation_history, options=stream_options
-                )
-
-                async for chunk in stream_generator:
-                    # Check token limits
-                    if token_count > self.max_tokens_per_request:
-                        chunk.content = "\n\n[Response truncated - token limit reached]"
-                        chunk.is_complete = True
-
-                    response_content += chunk.content
-                    token_count += 1
-
-                    # Yield the chunk to the client
-                    yield chunk
-
-                    # Stop if we've reached the end
-                    if chunk.is_complete:
-                        break
-
-                # Enhanced safety check the final response
-                output_moderation = moderate_ai_output(response_content)
-                if output_moderation.level == ModerationLevel.BLOCKED:
-                    response_content = (
-                        "I apologize, but I can't provide a response to that request."
-                    )
-                    logger.warning(f"AI output blocked: {output_moderation.reason}")
-
-                # Update the message with final content
-                ai_message.content = response_content
-                ai_message.token_count = token_count
-                ai_message.completed_at = datetime.now(UTC)
-
-                # Update thread timestamp
+        )
+        db.commit()
+
+        return (
+            db.query(AIMessage)
+            .filter(AIMessage.thread_id == thread_id)
+            .order_by(AIMessage.created_at.desc())
+            .limit(20)
+            .all()
+        )
+
+    @staticmethod
+    def _add_message(db: Session, message: AIMessage) -> AIMessage:
+        db.add(message)
+        db.commit()
+        db.refresh(message)
+        return message
+
+    @staticmethod
+    def _complete_message(
+        db: Session,
+        message_id: int,
+        content: str,
+        token_count: int | None = None,
+        error: str | None = None,
+    ) -> AIMessage:
+        ai_message = db.get(AIMessage, message_id)
+        ai_message.content = content
+        ai_message.completed_at = datetime.now(UTC)
+        if error is None:
+            ai_message.token_count = token_count
+            thread = db.get(AIThread, ai_message.thread_id)
+            if thread is not None:
                 thread.updated_at = datetime.now(UTC)
-
-                db.commit()
-                db.refresh(ai_message)
-
-                # Yield the final message
-                yield ai_message
-
-            except Exception as e:
-                logger.error(f"AI generation error: {e}")
-
-                # Log exception with context
-                sentry_sdk.capture_exception(
-                    e,
-                    extras={
-                        "user_id": user_id,
-                        "thread_id": thread_id,
-                        "provider": provider.name if provider else "unknown",
-                        "model": model,
-                        "message_length": len(message),
-                    },
-                )
-
-                # Update message with error
-                ai_message.content = (
-                    "I apologize, but I encountered an error while generating a response."
-                )
-                ai_message.error = str(e)
-                ai_message.completed_at = datetime.now(UTC)
-
-                db.commit()
-                db.refresh(ai_message)
-
-                yield ai_message
+        else:
+            ai_message.error = error
+        db.commit()
+        db.refresh(ai_message)
+        return ai_message
 
     async def delete_thread(self, user_id: int, thread_id: int) -> bool:
         """Delete a thread and all its messages."""
-        with get_session() as db:
-            # Verify ownership
-            thread = (
-                db.query(AIThread)
-                .filter(AIThread.id == thread_id, AIThread.user_id == user_id)
-                .first()
-            )
+        deleted = await run_in_session(self._delete_thread, user_id, thread_id)
+        if deleted:
+            logger.info(f"Deleted AI thread {thread_id} for user {user_id}")
+        return deleted
 
-            if not thread:
-                return False
+    @staticmethod
+    def _delete_thread(db: Session, user_id: int, thread_id: int) -> bool:
+        # Verify ownership
+        thread = (
+            db.query(AIThread).filter(AIThread.id == thread_id, AIThread.user_id == user_id).first()
+        )
 
-            # Delete messages first (foreign key constraint)
-            db.query(AIMessage).filter(AIMessage.thread_id == thread_id).delete()
+        if not thread:
+            return False
 
-            # Delete thread
-            db.delete(thread)
-            db.commit()
+        # Delete messages first (foreign key constraint)
+        db.query(AIMessage).filter(AIMessage.thread_id == thread_id).delete()
 
-            logger.info(f"Deleted AI thread {thread_id} for user {user_id}")
-            return True
+        # Delete thread
+        db.delete(thread)
+        db.commit()
+        return True
 
     async def update_thread_title(
         self, user_id: int, thread_id: int, title: str
     ) -> AIThread | None:
         """Update thread title."""
-        with get_session() as db:
-            thread = (
-                db.query(AIThread)
-                .filter(AIThread.id == thread_id, AIThread.user_id == user_id)
-                .first()
-            )
+        return await run_in_session(self._update_thread_title, user_id, thread_id, title)
+
+    @staticmethod
+    def _update_thread_title(
+        db: Session, user_id: int, thread_id: int, title: str
+    ) -> AIThread | None:
+        thread = (
+            db.query(AIThread).filter(AIThread.id == thread_id, AIThread.user_id == user_id).first()
+        )
 
-            if not thread:
-                return None
+        if not thread:
+            return None
 
-            thread.title = title[:255]
-            thread.updated_at = datetime.now(UTC)
+        thread.title = title[:255]
+        thread.updated_at = datetime.now(UTC)
 
-            db.commit()
-            db.refresh(thread)
+        db.commit()
+        db.refresh(thread)
 
-            return thread
+        return thread
 
     def get_rate_limit_status(self, user_id: int) -> dict[str, Any]:
         """Get rate limit status for a user."""
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
 import builtins
 import json
+import logging
 import os
 import time
-from dataclasses import asdict, dataclass
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Any, Literal
 
-from app.services.prices import fetch_ohlc
+from app.services.prices import get_ohlc
+
+logger = logging.getLogger(__name__)
 
 AlertType = Literal["price_threshold", "pct_change"]
 
@@ -37,6 +43,8 @@ class AlertStore:
         self.path = Path(path)
         self._alerts: dict[str, Alert] = {}
         self._lock = asyncio.Lock()
+        # Bumped whenever the set of alerts or their active flags change
+        self.version = 0
 
     async def load(self) -> None:
         if not self.path.exists():
@@ -49,6 +57,7 @@ class AlertStore:
         except Exception:
             self._alerts = {}
             self._save_sync({})
+        self.version += 1
 
     def _save_sync(self, obj: dict[str, Any]) -> None:
         tmp = self.path.with_suffix(".tmp")
@@ -66,6 +75,7 @@ class AlertStore:
     async def add(self, alert: Alert) -> Alert:
         async with self._lock:
             self._alerts[alert.id] = alert
+            self.version += 1
         await self.save()
         return alert
 
@@ -73,6 +83,7 @@ class AlertStore:
         async with self._lock:
             existed = alert_id in self._alerts
             self._alerts.pop(alert_id, None)
+            self.version += 1
         await self.save()
         return existed
 
@@ -85,6 +96,7 @@ class AlertStore:
             if not a:
                 return None
             a.active = active
+            self.version += 1
         await self.save()
         return a
 
@@ -115,13 +127,132 @@ class SSEHub:
 
 
 # Evaluator
+@dataclass
+class _Levels:
+    """Alerts sorted by the level at which they trigger"""
+
+    levels: list[float] = field(default_factory=list)
+    alerts: list[Alert] = field(default_factory=list)
+
+    def add(self, level: float, alert: Alert) -> None:
+        i = bisect.bisect_right(self.levels, level)
+        self.levels.insert(i, level)
+        self.alerts.insert(i, alert)
+
+    def at_most(self, value: float) -> list[tuple[float, Alert]]:
+        """Alerts whose level is <= ``value``"""
+        i = bisect.bisect_right(self.levels, value)
+        return list(zip(self.levels[:i], self.alerts[:i], strict=True))
+
+    def at_least(self, value: float) -> list[tuple[float, Alert]]:
+        """Alerts whose level is >= ``value``"""
+        i = bisect.bisect_left(self.levels, value)
+        return list(zip(self.levels[i:], self.alerts[i:], strict=True))
+
+
+def _window_bars(a: Alert) -> int:
+    window_min = int(a.config.get("window_minutes", 60))
+    return max(2, window_min * 60 // 60)  # heuristic: at least 2 bars
+
+
+@dataclass
+class _SeriesAlerts:
+    """Active alerts on one (symbol, timeframe) series, indexed by level"""
+
+    above: _Levels = field(default_factory=_Levels)
+    below: _Levels = field(default_factory=_Levels)
+    # bars in the window -> direction -> |threshold_pct| levels
+    pct: dict[int, dict[str, _Levels]] = field(default_factory=dict)
+    # Bars to fetch to evaluate every alert
+    limit: int = 1
+
+    def add(self, a: Alert) -> None:
+        cfg = a.config
+        if a.type == "price_threshold":
+            direction = cfg.get("direction", "above")  # above|below
+            levels = self.above if direction == "above" else self.below
+            if direction in ("above", "below"):
+                levels.add(float(cfg["price"]), a)
+        elif a.type == "pct_change":
+            bars = _window_bars(a)
+            direction = cfg.get("direction", "up")  # up|down|abs
+            thresh = float(cfg.get("threshold_pct", 1.0))
+            # up triggers at pct >= thresh; down and abs compare against |thresh|
+            level = thresh if direction == "up" else abs(thresh)
+            if direction in ("up", "down", "abs"):
+                self.pct.setdefault(bars, {}).setdefault(direction, _Levels()).add(level, a)
+                self.limit = max(self.limit, bars)
+
+    def triggered(self, bars: list[dict[str, Any]]) -> Iterator[tuple[Alert, dict[str, Any]]]:
+        """Alerts whose condition holds on ``bars`` (oldest first) and their payloads"""
+        price = float(bars[-1]["c"])
+        for direction, crossed in (
+            ("above", self.above.at_most(price)),
+            ("below", self.below.at_least(price)),
+        ):
+            for target, a in crossed:
+                yield a, {"price": price, "target": target, "direction": direction}
+
+        for n, by_direction in self.pct.items():
+            window = bars[-n:]
+            if len(window) < 2:
+                continue
+            first, last = float(window[0]["c"]), float(window[-1]["c"])
+            pct = ((last - first) / first) * 100.0 if first != 0 else 0.0
+            for direction, levels in by_direction.items():
+                if direction == "up":
+                    crossed = levels.at_most(pct)
+                elif direction == "down":
+                    crossed = levels.at_most(-pct)
+                else:
+                    crossed = levels.at_most(abs(pct))
+                for level, a in crossed:
+                    thresh = (
+                        -level if direction == "down" else float(a.config.get("threshold_pct", 1.0))
+                    )
+                    yield a, {"pct_change": pct, "threshold_pct": thresh, "direction": direction}
+
+
+def build_index(alerts: Iterable[Alert]) -> dict[tuple[str, str], _SeriesAlerts]:
+    """Group active alerts by (symbol, timeframe); alerts with a bad config are skipped."""
+    index: dict[tuple[str, str], _SeriesAlerts] = defaultdict(_SeriesAlerts)
+    for a in alerts:
+        if not a.active:
+            continue
+        try:
+            index[a.symbol.upper(), a.timeframe].add(a)
+        except (KeyError, TypeError, ValueError):
+            logger.debug(f"Skipping alert {a.id} with invalid config")
+    return {
+        key: series
+        for key, series in index.items()
+        if series.above.alerts or series.below.alerts or series.pct
+    }
+
+
 class AlertEvaluator:
-    def __init__(self, store: AlertStore, hub: SSEHub, interval_sec: int = 15):
+    """
+    Evaluates every active alert each ``interval_sec``.
+
+    Alerts are grouped by (symbol, timeframe) so each series is fetched
+    once per tick, however many alerts watch it, with at most
+    ``max_concurrency`` fetches in flight. Within a series, thresholds are
+    kept in sorted level lists and a bisect finds the triggered ones, so a
+    tick costs O(series + triggered alerts) rather than O(alerts). The index
+    is rebuilt only when the store changes.
+    """
+
+    def __init__(
+        self, store: AlertStore, hub: SSEHub, interval_sec: int = 15, max_concurrency: int = 8
+    ):
         self.store = store
         self.hub = hub
         self.interval_sec = interval_sec
+        self.max_concurrency = max_concurrency
         self._task: asyncio.Task | None = None
         self._stop = asyncio.Event()
+        self._index: dict[tuple[str, str], _SeriesAlerts] = {}
+        self._index_version: int | None = None
 
     def start(self):
         if self._task and not self._task.done():
@@ -143,26 +274,50 @@ class AlertEvaluator:
                 await self._tick()
             except Exception:
                 # swallow to keep loop alive
-                pass
+                logger.exception("Alert evaluation failed")
             await asyncio.wait([self._stop.wait()], timeout=self.interval_sec)
 
+    async def index(self) -> dict[tuple[str, str], _SeriesAlerts]:
+        if self._index_version != self.store.version:
+            self._index_version = self.store.version
+            self._index = build_index(await self.store.list())
+        return self._index
+
+    async def _fetch_series(
+        self, index: dict[tuple[str, str], _SeriesAlerts]
+    ) -> dict[tuple[str, str], list[dict[str, Any]]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(symbol: str, timeframe: str, limit: int):
+            async with semaphore:
+                try:
+                    return await get_ohlc(symbol=symbol, timeframe=timeframe, limit=limit)
+                except Exception as e:
+                    logger.debug(f"Alert series fetch failed for {symbol} {timeframe}: {e}")
+                    return []
+
+        keys = list(index)
+        results = await asyncio.gather(*(fetch(*key, index[key].limit) for key in keys))
+        return {key: bars for key, bars in zip(keys, results, strict=True) if bars}
+
     async def _tick(self):
-        alerts = await self.store.list()
+        index = await self.index()
+        if not index:
+            return
+        series = await self._fetch_series(index)
         now = time.time()
-        for a in alerts:
-            if not a.active:
-                continue
-            try:
-                triggered, payload = await self._evaluate(a)
-            except Exception:
-                continue
-            if not triggered:
-                continue
-            # debounce
-            if a.last_triggered_at and (now - a.last_triggered_at) < a.min_interval_sec:
-                continue
-            a.last_triggered_at = now
-            await self.store.save()
+        fired: list[tuple[Alert, dict[str, Any]]] = []
+        for key, bars in series.items():
+            for a, payload in index[key].triggered(bars):
+                # debounce
+                if a.last_triggered_at and (now - a.last_triggered_at) < a.min_interval_sec:
+                    continue
+                a.last_triggered_at = now
+                fired.append((a, payload))
+        if not fired:
+            return
+        await self.store.save()
+        for a, payload in fired:
             await self.hub.broadcast(
                 {
                     "type": "alert.triggered",
@@ -172,48 +327,6 @@ class AlertEvaluator:
                 }
             )
 
-    async def _evaluate(self, a: Alert) -> tuple[bool, dict[str, Any]]:
-        # Reuse OHLC endpoint logic via services.prices
-        # Fetch minimal data for evaluation
-        tf = a.timeframe
-        if a.type == "price_threshold":
-            bars = fetch_ohlc(symbol=a.symbol, timeframe=tf, limit=1)
-            last = bars[-1]
-            price = float(last["close"])
-            cfg = a.config
-            direction = cfg.get("direction", "above")  # above|below
-            target = float(cfg["price"])
-            if direction == "above" and price >= target:
-                return True, {"price": price, "target": target, "direction": direction}
-            if direction == "below" and price <= target:
-                return True, {"price": price, "target": target, "direction": direction}
-            return False, {"price": price, "target": target, "direction": direction}
-
-        elif a.type == "pct_change":
-            cfg = a.config
-            window_min = int(cfg.get("window_minutes", 60))
-            bars_needed = max(2, window_min * 60 // 60)  # heuristic: at least 2 bars
-            bars = fetch_ohlc(symbol=a.symbol, timeframe=tf, limit=max(2, bars_needed))
-            first = float(bars[0]["close"])
-            last = float(bars[-1]["close"])
-            pct = ((last - first) / first) * 100.0 if first != 0 else 0.0
-            direction = cfg.get("direction", "up")  # up|down|abs
-            thresh = float(cfg.get("threshold_pct", 1.0))
-            if direction == "up" and pct >= thresh:
-                return True, {"pct_change": pct, "threshold_pct": thresh, "direction": direction}
-            if direction == "down" and pct <= -abs(thresh):
-                return True, {
-                    "pct_change": pct,
-                    "threshold_pct": -abs(thresh),
-                    "direction": direction,
-                }
-            if direction == "abs" and abs(pct) >= abs(thresh):
-                return True, {"pct_change": pct, "threshold_pct": thresh, "direction": direction}
-            return False, {"pct_change": pct, "threshold_pct": thresh, "direction": direction}
-
-        else:
-            return False, {"reason": "unknown_type"}
-
 
 # Singleton-like module state
 STORE_PATH = os.getenv(
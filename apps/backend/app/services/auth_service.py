@@ -28,6 +28,7 @@ from app.schemas.auth import (
     UserRegisterRequest,
     UserResponse,
 )
+from app.services.typeahead import profile_typeahead
 
 
 class AuthService:
@@ -104,6 +105,7 @@ class AuthService:
         self.db.add(notification_prefs)
 
         await self.db.commit()
+        await profile_typeahead.invalidate(user.id)
 
         # Generate tokens
         access_token = create_access_token(str(user.id), user.email)
@@ -249,6 +251,7 @@ class AuthService:
         self.db.add(notification_prefs)
 
         await self.db.commit()
+        await profile_typeahead.invalidate(user.id)
 
         # Generate tokens
         access_token = create_access_token(str(user.id), user.email)
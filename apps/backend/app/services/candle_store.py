@@ -0,0 +1,217 @@
+"""
+Columnar OHLCV candle store.
+
+Candles live on disk per ``symbol/timeframe`` in time-partitioned segments of
+``SEGMENT_BARS`` bars each. A segment is one ``.npy`` file holding a single
+structured record: ``ts`` (int64 ms) and a ``(5, n)`` float64 block of
+open/high/low/close/volume columns. Reads memory-map the segments and slice,
+so any ``(start, end, limit)`` window is served without touching providers
+and a single-segment read is zero-copy.
+
+Writes merge by timestamp (incoming bars win) and only rewrite the segments
+they touch; in steady state that is the open tail segment. A segment is
+written to a uniquely named temp file and swapped in with one ``os.replace``,
+so readers see either the old or the new segment, never a mix. Writers of a
+series are serialized across processes by a lock file in its directory.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from filelock import FileLock
+
+from app.services import timeframes
+from app.services.indicator_engine import OHLCV
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_BARS = 2048
+
+_EMPTY = OHLCV(
+    ts=np.empty(0, dtype=np.int64),
+    open=np.empty(0),
+    high=np.empty(0),
+    low=np.empty(0),
+    close=np.empty(0),
+    volume=np.empty(0),
+)
+
+
+def _from_columns(ts: np.ndarray, block: np.ndarray) -> OHLCV:
+    return OHLCV(ts=ts, open=block[0], high=block[1], low=block[2], close=block[3], volume=block[4])
+
+
+def _slice(bars: OHLCV, lo: int, hi: int) -> OHLCV:
+    return OHLCV(
+        ts=bars.ts[lo:hi],
+        open=bars.open[lo:hi],
+        high=bars.high[lo:hi],
+        low=bars.low[lo:hi],
+        close=bars.close[lo:hi],
+        volume=bars.volume[lo:hi],
+    )
+
+
+def _concat(parts: list[OHLCV]) -> OHLCV:
+    if not parts:
+        return _EMPTY
+    if len(parts) == 1:
+        return parts[0]
+    return OHLCV(
+        ts=np.concatenate([p.ts for p in parts]),
+        open=np.concatenate([p.open for p in parts]),
+        high=np.concatenate([p.high for p in parts]),
+        low=np.concatenate([p.low for p in parts]),
+        close=np.concatenate([p.close for p in parts]),
+        volume=np.concatenate([p.volume for p in parts]),
+    )
+
+
+def to_candles(bars: OHLCV) -> list[dict[str, Any]]:
+    """Convert columns back to the provider candle dict format."""
+    return [
+        {"ts": t, "o": o, "h": h, "l": lo, "c": c, "v": v}
+        for t, o, h, lo, c, v in zip(
+            bars.ts.tolist(),
+            bars.open.tolist(),
+            bars.high.tolist(),
+            bars.low.tolist(),
+            bars.close.tolist(),
+            bars.volume.tolist(),
+            strict=True,
+        )
+    ]
+
+
+class CandleStore:
+    """Append-mostly, memory-mapped candle segments under ``root``."""
+
+    def __init__(self, root: str | os.PathLike[str]):
+        self.root = Path(root)
+
+    @staticmethod
+    def bar_ms(timeframe: str) -> int:
+        return timeframes.seconds(timeframe) * 1000
+
+    def _dir(self, symbol: str, timeframe: str) -> Path:
+        return self.root / symbol.upper().replace("/", "_") / timeframes.normalize(timeframe)
+
+    def _segment_ids(self, symbol: str, timeframe: str) -> list[int]:
+        # Listed on every call so segments written by other workers are visible.
+        directory = self._dir(symbol, timeframe)
+        if not directory.exists():
+            return []
+        # Segment files are named by number; anything else (e.g. the old
+        # two-file layout) is ignored.
+        return sorted(int(p.stem) for p in directory.glob("*.npy") if p.stem.isdigit())
+
+    def _load_segment(self, directory: Path, seg: int) -> OHLCV:
+        record = np.load(directory / f"{seg}.npy", mmap_mode="r")
+        return _from_columns(record["ts"], record["ohlcv"])
+
+    def _save_segment(self, directory: Path, seg: int, ts: np.ndarray, block: np.ndarray) -> None:
+        n = len(ts)
+        record = np.empty((), dtype=[("ts", "<i8", (n,)), ("ohlcv", "<f8", (5, n))])
+        record["ts"] = ts
+        record["ohlcv"] = block
+        tmp = directory / f".{seg}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.save(f, record)
+            os.replace(tmp, directory / f"{seg}.npy")
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def last_ts(self, symbol: str, timeframe: str) -> int | None:
+        ids = self._segment_ids(symbol, timeframe)
+        if not ids:
+            return None
+        ts = self._load_segment(self._dir(symbol, timeframe), ids[-1]).ts
+        return int(ts[-1]) if len(ts) else None
+
+    def read(
+        self,
+        symbol: str,
+        timeframe: str,
+        start: int | None = None,
+        end: int | None = None,
+        limit: int | None = None,
+    ) -> OHLCV:
+        """Bars with ``start <= ts <= end`` (ms), keeping the newest ``limit``."""
+        ids = self._segment_ids(symbol, timeframe)
+        if not ids:
+            return _EMPTY
+        directory = self._dir(symbol, timeframe)
+        span = SEGMENT_BARS * self.bar_ms(timeframe)
+
+        parts: list[OHLCV] = []
+        remaining = limit
+        for seg in reversed(ids):
+            seg_start = seg * span
+            if end is not None and seg_start > end:
+                continue
+            if start is not None and seg_start + span <= start:
+                break
+            bars = self._load_segment(directory, seg)
+            lo = 0 if start is None else int(np.searchsorted(bars.ts, start, side="left"))
+            hi = len(bars) if end is None else int(np.searchsorted(bars.ts, end, side="right"))
+            if remaining is not None:
+                lo = max(lo, hi - remaining)
+            if hi > lo:
+                parts.append(_slice(bars, lo, hi))
+                if remaining is not None:
+                    remaining -= hi - lo
+                    if remaining <= 0:
+                        break
+        parts.reverse()
+        return _concat(parts)
+
+    def write(
+        self, symbol: str, timeframe: str, candles: OHLCV | Sequence[Mapping[str, Any]]
+    ) -> int:
+        """Merge bars into the store; returns the number of segments rewritten."""
+        bars = candles if isinstance(candles, OHLCV) else OHLCV.from_candles(candles)
+        if not len(bars):
+            return 0
+        order = np.argsort(bars.ts, kind="stable")
+        ts = np.asarray(bars.ts, dtype=np.int64)[order]
+        block = np.stack([bars.open, bars.high, bars.low, bars.close, bars.volume])[:, order]
+
+        directory = self._dir(symbol, timeframe)
+        span = SEGMENT_BARS * self.bar_ms(timeframe)
+        seg_of = ts // span
+        touched = np.unique(seg_of)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Read-modify-write: one writer per series, across threads and processes.
+        with FileLock(directory / ".lock"):
+            for seg in touched.tolist():
+                mask = seg_of == seg
+                new_ts, new_block = ts[mask], block[:, mask]
+                if (directory / f"{seg}.npy").exists():
+                    old = self._load_segment(directory, seg)
+                    # Existing rows only survive where no incoming bar has the same ts.
+                    keep = ~np.isin(old.ts, new_ts)
+                    old_block = np.stack([old.open, old.high, old.low, old.close, old.volume])
+                    new_ts = np.concatenate([np.asarray(old.ts)[keep], new_ts])
+                    new_block = np.concatenate([old_block[:, keep], new_block], axis=1)
+                # Deduplicate incoming bars, last occurrence wins.
+                rev_unique = np.unique(new_ts[::-1], return_index=True)[1]
+                idx = len(new_ts) - 1 - rev_unique
+                self._save_segment(
+                    directory, seg, new_ts[idx], np.ascontiguousarray(new_block[:, idx])
+                )
+        return len(touched)
+
+
+CANDLE_STORE_PATH = os.getenv(
+    "LOKIFI_CANDLE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "data", "candles"),
+)
+candle_store = CandleStore(CANDLE_STORE_PATH)
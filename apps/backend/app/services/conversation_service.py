@@ -3,13 +3,15 @@ Conversation service for direct messaging (J4).
 """
 
 import uuid
+from collections.abc import Sequence
 from datetime import UTC, datetime
 
 from fastapi import HTTPException, status
-from sqlalchemy import desc, func, select, update
+from sqlalchemy import desc, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.core.pagination import after, decode_cursor, next_page, order_by
 from app.models.conversation import Conversation, ConversationParticipant, Message, MessageReceipt
 from app.models.profile import Profile
 from app.models.user import User
@@ -106,7 +108,6 @@ class ConversationService:
             .order_by(desc(Conversation.last_message_at), desc(Conversation.updated_at))
             .offset(offset)
             .limit(page_size)
-            .options(selectinload(Conversation.participants))
         )
 
         result = await self.db.execute(stmt)
@@ -124,11 +125,7 @@ class ConversationService:
         result = await self.db.execute(count_stmt)
         total = result.scalar() or 0
 
-        # Build response list
-        conversation_responses = []
-        for conv in conversations:
-            conv_response = await self._build_conversation_response(conv, user_id)
-            conversation_responses.append(conv_response)
+        conversation_responses = await self._build_conversation_responses(conversations, user_id)
 
         return ConversationListResponse(
             conversations=conversation_responses,
@@ -175,19 +172,44 @@ class ConversationService:
         )
         await self.db.execute(update_conv_stmt)
 
+        # Bump the unread counter of every other active participant
+        unread_stmt = (
+            update(ConversationParticipant)
+            .where(
+                ConversationParticipant.conversation_id == conversation_id,
+                ConversationParticipant.user_id != sender_id,
+                ConversationParticipant.is_active,
+            )
+            .values(unread_count=ConversationParticipant.unread_count + 1)
+        )
+        await self.db.execute(unread_stmt)
+
         # Create read receipt for sender
         receipt = MessageReceipt(message_id=message.id, user_id=sender_id)
         self.db.add(receipt)
 
         await self.db.commit()
 
-        # Build response
+        # Load server-side timestamps and receipts without lazy IO
+        await self.db.refresh(message, ["created_at", "updated_at", "receipts"])
         return await self._build_message_response(message)
 
     async def get_conversation_messages(
-        self, conversation_id: uuid.UUID, user_id: uuid.UUID, page: int = 1, page_size: int = 50
+        self,
+        conversation_id: uuid.UUID,
+        user_id: uuid.UUID,
+        page: int = 1,
+        page_size: int = 50,
+        cursor: str | None = None,
+        include_total: bool | None = None,
     ) -> MessagesListResponse:
-        """Get messages in a conversation with pagination."""
+        """
+        Get messages in a conversation with pagination.
+
+        Pages run newest to oldest (each page in chronological order). Pass
+        the previous page's ``next_cursor`` as ``cursor`` to page by keyset
+        instead of by ``page``; the total is then only counted on request.
+        """
         # Verify user is participant
         participant_stmt = select(ConversationParticipant).where(
             ConversationParticipant.conversation_id == conversation_id,
@@ -203,29 +225,37 @@ class ConversationService:
                 detail="Not a participant in this conversation",
             )
 
-        offset = (page - 1) * page_size
-
         # Get messages (newest first for pagination, but we'll reverse for chronological order)
+        order = [(Message.created_at, True), (Message.id, True)]
         stmt = (
             select(Message)
             .where(Message.conversation_id == conversation_id, ~Message.is_deleted)
-            .order_by(desc(Message.created_at))
-            .offset(offset)
-            .limit(page_size)
+            .order_by(*order_by(order))
+            .limit(page_size + 1)
             .options(selectinload(Message.receipts))
         )
+        if cursor:
+            stmt = stmt.where(after(order, decode_cursor(cursor, datetime, uuid.UUID)))
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
 
         result = await self.db.execute(stmt)
-        messages = list(reversed(result.scalars().all()))  # Reverse for chronological order
-
-        # Get total count
-        count_stmt = (
-            select(func.count())
-            .select_from(Message)
-            .where(Message.conversation_id == conversation_id, ~Message.is_deleted)
+        messages, next_cursor = next_page(
+            result.scalars().all(), page_size, lambda m: (m.created_at, m.id)
         )
-        result = await self.db.execute(count_stmt)
-        total = result.scalar() or 0
+        messages.reverse()  # Chronological order
+
+        if include_total is None:
+            include_total = cursor is None
+        total = None
+        if include_total:
+            count_stmt = (
+                select(func.count())
+                .select_from(Message)
+                .where(Message.conversation_id == conversation_id, ~Message.is_deleted)
+            )
+            result = await self.db.execute(count_stmt)
+            total = result.scalar() or 0
 
         # Build response list
         message_responses = []
@@ -238,7 +268,8 @@ class ConversationService:
             total=total,
             page=page,
             page_size=page_size,
-            has_next=(offset + page_size) < total,
+            has_next=next_cursor is not None,
+            next_cursor=next_cursor,
             conversation_id=conversation_id,
         )
 
@@ -298,36 +329,92 @@ class ConversationService:
         if new_receipts:
             self.db.add_all(new_receipts)
 
-        # Update participant's last read message
+        # Update participant's last read message and recount what is still unread
+        still_unread = (
+            select(func.count())
+            .select_from(Message)
+            .where(
+                Message.conversation_id == conversation_id,
+                Message.created_at > target_message.created_at,
+                Message.sender_id != user_id,
+                ~Message.is_deleted,
+            )
+            .scalar_subquery()
+        )
         update_participant_stmt = (
             update(ConversationParticipant)
             .where(
                 ConversationParticipant.conversation_id == conversation_id,
                 ConversationParticipant.user_id == user_id,
             )
-            .values(last_read_message_id=mark_read_data.message_id)
+            .values(last_read_message_id=mark_read_data.message_id, unread_count=still_unread)
         )
         await self.db.execute(update_participant_stmt)
 
         await self.db.commit()
         return True
 
+    async def discount_unread(self, message: Message) -> None:
+        """
+        Take a message that is being deleted out of the unread counters of
+        participants who had not read it yet. Call before committing the delete.
+        """
+        last_read_at = (
+            select(Message.created_at)
+            .where(Message.id == ConversationParticipant.last_read_message_id)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(ConversationParticipant)
+            .where(
+                ConversationParticipant.conversation_id == message.conversation_id,
+                ConversationParticipant.user_id != message.sender_id,
+                ConversationParticipant.unread_count > 0,
+                or_(
+                    ConversationParticipant.last_read_message_id.is_(None),
+                    last_read_at < message.created_at,
+                ),
+            )
+            .values(unread_count=ConversationParticipant.unread_count - 1)
+        )
+        await self.db.execute(stmt)
+
     async def _build_conversation_response(
         self, conversation: Conversation, current_user_id: uuid.UUID
     ) -> ConversationResponse:
         """Build a conversation response with all necessary data."""
-        # Get participants with user details
+        responses = await self._build_conversation_responses([conversation], current_user_id)
+        return responses[0]
+
+    async def _build_conversation_responses(
+        self, conversations: Sequence[Conversation], current_user_id: uuid.UUID
+    ) -> list[ConversationResponse]:
+        """
+        Build responses for a page of conversations in a fixed number of queries.
+
+        Participants and profiles come from one query and each conversation's
+        latest message from one windowed query (plus one for its receipts),
+        whatever the page size. Unread counts are read from the participant's
+        denormalized ``unread_count``.
+        """
+        if not conversations:
+            return []
+        conversation_ids = [conversation.id for conversation in conversations]
+
+        # Participants with user details
         participants_stmt = (
             select(ConversationParticipant, Profile)
             .join(Profile, Profile.user_id == ConversationParticipant.user_id)
-            .where(ConversationParticipant.conversation_id == conversation.id)
+            .where(ConversationParticipant.conversation_id.in_(conversation_ids))
         )
         result = await self.db.execute(participants_stmt)
-        participant_data = result.all()
 
-        participants = []
-        for participant, profile in participant_data:
-            participants.append(
+        participants: dict[uuid.UUID, list[ConversationParticipantResponse]] = {
+            conversation_id: [] for conversation_id in conversation_ids
+        }
+        unread_counts: dict[uuid.UUID, int] = {}
+        for participant, profile in result.all():
+            participants[participant.conversation_id].append(
                 ConversationParticipantResponse(
                     user_id=participant.user_id,
                     username=profile.username,
@@ -338,70 +425,52 @@ class ConversationService:
                     last_read_message_id=participant.last_read_message_id,
                 )
             )
-
-        # Get last message
-        last_message = None
-        last_message_stmt = (
+            if participant.user_id == current_user_id:
+                unread_counts[participant.conversation_id] = participant.unread_count or 0
+
+        # Latest message per conversation
+        ranked = (
+            select(
+                Message.id,
+                func.row_number()
+                .over(
+                    partition_by=Message.conversation_id,
+                    order_by=(desc(Message.created_at), desc(Message.id)),
+                )
+                .label("rank"),
+            )
+            .where(Message.conversation_id.in_(conversation_ids), ~Message.is_deleted)
+            .subquery()
+        )
+        last_messages_stmt = (
             select(Message)
-            .where(Message.conversation_id == conversation.id, ~Message.is_deleted)
-            .order_by(desc(Message.created_at))
-            .limit(1)
+            .join(ranked, ranked.c.id == Message.id)
+            .where(ranked.c.rank == 1)
             .options(selectinload(Message.receipts))
         )
-        result = await self.db.execute(last_message_stmt)
-        last_msg = result.scalar_one_or_none()
-
-        if last_msg:
-            last_message = await self._build_message_response(last_msg)
-
-        # Calculate unread count for current user
-        current_participant = next(
-            (p for p in participant_data if p[0].user_id == current_user_id), None
-        )
-
-        unread_count = 0
-        if current_participant and current_participant[0].last_read_message_id:
-            # Count messages after last read message
-            unread_stmt = (
-                select(func.count())
-                .select_from(Message)
-                .where(
-                    Message.conversation_id == conversation.id,
-                    Message.created_at
-                    > select(Message.created_at).where(
-                        Message.id == current_participant[0].last_read_message_id
+        result = await self.db.execute(last_messages_stmt)
+        last_messages = {message.conversation_id: message for message in result.scalars()}
+
+        responses = []
+        for conversation in conversations:
+            last_msg = last_messages.get(conversation.id)
+            responses.append(
+                ConversationResponse(
+                    id=conversation.id,
+                    is_group=conversation.is_group,
+                    name=conversation.name,
+                    description=conversation.description,
+                    created_at=conversation.created_at,
+                    updated_at=conversation.updated_at,
+                    last_message_at=conversation.last_message_at,
+                    participants=participants[conversation.id],
+                    last_message=(
+                        await self._build_message_response(last_msg) if last_msg else None
                     ),
-                    ~Message.is_deleted,
-                )
-            )
-            result = await self.db.execute(unread_stmt)
-            unread_count = result.scalar() or 0
-        elif current_participant:
-            # If no last read message, count all messages
-            unread_stmt = (
-                select(func.count())
-                .select_from(Message)
-                .where(
-                    Message.conversation_id == conversation.id,
-                    Message.sender_id != current_user_id,  # Don't count own messages
-                    ~Message.is_deleted,
+                    unread_count=unread_counts.get(conversation.id, 0),
                 )
             )
-            result = await self.db.execute(unread_stmt)
-            unread_count = result.scalar() or 0
-
-        return ConversationResponse(
-            id=conversation.id,
-            is_group=conversation.is_group,
-            name=conversation.name,
-            description=conversation.description,
-            created_at=conversation.created_at,
-            updated_at=conversation.updated_at,
-            last_message_at=conversation.last_message_at,
-            participants=participants,
-            last_message=last_message,
-            unread_count=unread_count,
-        )
+        return responses
 
     async def _build_message_response(self, message: Message) -> MessageResponse:
         """Build a message response with read receipts."""
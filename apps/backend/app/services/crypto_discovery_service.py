@@ -8,6 +8,8 @@ import httpx
 
 from app.core.advanced_redis_client import advanced_redis_client
 from app.core.config import settings
+from app.core.single_flight import single_flight
+from app.services.data_service import symbol_directory
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +43,10 @@ class CryptoMetrics:
 
 crypto_metrics = CryptoMetrics()
 
+# Latest market data per CoinGecko ID and when it was stored, shared by all
+# service instances so indexed searches are answered in-process
+_market_data: dict[str, tuple[float, "CryptoAsset"]] = {}
+
 
 @dataclass
 class CryptoAsset:
@@ -68,6 +74,7 @@ class CryptoDiscoveryService:
         self.client: httpx.AsyncClient | None = None
         self.coingecko_base = "https://api.coingecko.com/api/v3"
         self.cache_ttl = 3600  # 1 hour cache for crypto list
+        self.asset_ttl = 300  # 5 minute cache for per-coin market data
 
     async def __aenter__(self):
         self.client = httpx.AsyncClient(timeout=30.0)
@@ -90,6 +97,26 @@ class CryptoDiscoveryService:
         except Exception as e:
             logger.debug(f"Cache set failed: {e}")
 
+    @staticmethod
+    def _asset_key(coin_id: str) -> str:
+        return f"crypto:asset:{coin_id}"
+
+    async def _cache_assets(self, assets: list[CryptoAsset]):
+        """Cache per-coin market data in one round-trip so searches can reuse it"""
+        now = time.monotonic()
+        _market_data.update((asset.id, (now, asset)) for asset in assets)
+        await advanced_redis_client.set_many(
+            {self._asset_key(asset.id): asset.to_dict() for asset in assets},
+            expire=self.asset_ttl,
+        )
+
+    async def _with_client(self, fetch):
+        """Run ``fetch(client)`` on our client, or a temporary one if it is unset or closed"""
+        if self.client is None or self.client.is_closed:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                return await fetch(client)
+        return await fetch(self.client)
+
     async def get_top_cryptos(
         self, limit: int = 300, force_refresh: bool = False
     ) -> list[CryptoAsset]:
@@ -105,27 +132,32 @@ class CryptoDiscoveryService:
         """
         start_time = time.time()
         cache_key = f"crypto:top:{limit}"
+        fetched = False
 
-        if not force_refresh:
-            cached = await self._get_cached(cache_key)
-            if cached:
-                crypto_metrics.record_fetch(cached=True)
-                duration = time.time() - start_time
-                logger.info(f"✅ Cache hit for top {limit} cryptos - {duration * 1000:.1f}ms")
-                return [CryptoAsset(**crypto) for crypto in cached]
+        async def fetch() -> list[CryptoAsset]:
+            nonlocal fetched
+            fetched = True
+            cryptos = await self._with_client(lambda client: self._fetch_top_cryptos(client, limit))
+            await self._cache_assets(cryptos)
+            return cryptos
 
         try:
-            if self.client is None:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    cryptos = await self._fetch_top_cryptos(client, limit)
-            else:
-                cryptos = await self._fetch_top_cryptos(self.client, limit)
+            # Cache for 1 hour; a stale list is served while one refresh runs
+            cryptos = await single_flight.get_or_fetch(
+                cache_key,
+                fetch,
+                ttl=self.cache_ttl,
+                stale_ttl=self.cache_ttl,
+                force_refresh=force_refresh,
+                encode=lambda assets: [crypto.to_dict() for crypto in assets],
+                decode=lambda cached: [CryptoAsset(**crypto) for crypto in cached],
+            )
 
-            if cryptos:
-                # Cache for 1 hour
-                await self._set_cache(
-                    cache_key, [crypto.to_dict() for crypto in cryptos], ttl=self.cache_ttl
-                )
+            if cryptos and not fetched:
+                crypto_metrics.record_fetch(cached=True)
+                duration = time.time() - start_time
+                logger.info(f"✅ Cache hit for top {limit} cryptos - {duration * 1000:.1f}ms")
+            elif cryptos:
                 crypto_metrics.record_fetch(cached=False, success=True)
                 duration = time.time() - start_time
                 logger.info(f"📊 Fetched {len(cryptos)} cryptocurrencies - {duration * 1000:.1f}ms")
@@ -210,46 +242,63 @@ class CryptoDiscoveryService:
 
         return None
 
-    async def search_cryptos(self, query: str, limit: int = 50) -> list[CryptoAsset]:
+    async def search_cryptos(
+        self, query: str, limit: int = 50, fuzzy: bool = False
+    ) -> list[CryptoAsset]:
         """
-        Search cryptocurrencies by name or symbol
+        Search cryptocurrencies by name, symbol or CoinGecko ID
+
+        Matches come from the symbol directory's index of the unified asset
+        registry; CoinGecko's search API is only used until the registry
+        has been loaded.
 
         Args:
             query: Search query (name or symbol)
             limit: Max results to return
+            fuzzy: Also match misspelled names
 
         Returns:
-            List of matching CryptoAsset objects
+            List of matching CryptoAsset objects, most relevant first
         """
-        import time
-
         start_time = time.time()
 
         try:
-            # Check cache first
-            cache_key = f"crypto_search:{query}:{limit}"
-            cached_data = await advanced_redis_client.get(cache_key)
-            if cached_data:
+            if symbol_directory.has_coingecko_ids:
+                coin_ids = symbol_directory.search_coingecko_ids(query, limit, fuzzy)
+                results = await self._resolve_assets(coin_ids)
                 duration = time.time() - start_time
                 crypto_metrics.record_fetch(cached=True)
                 logger.info(
-                    f"✅ Cache hit for search '{query}' ({len(cached_data)} results) - {duration * 1000:.1f}ms"
+                    f"✅ Index search for '{query}' returned {len(results)} results - {duration * 1000:.1f}ms"
                 )
-                return [CryptoAsset(**c) for c in cached_data]
+                return results
 
-            # Fetch from API
-            if self.client is None:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    results = await self._search_cryptos(client, query, limit)
-            else:
-                results = await self._search_cryptos(self.client, query, limit)
+            cache_key = f"crypto_search:{query}:{limit}"
+            fetched = False
 
-            # Cache results for 10 minutes
-            if results:
-                from dataclasses import asdict
+            async def fetch() -> list[CryptoAsset]:
+                nonlocal fetched
+                fetched = True
+                return await self._with_client(
+                    lambda client: self._search_cryptos(client, query, limit)
+                )
 
-                cache_data = [asdict(crypto) for crypto in results]
-                await advanced_redis_client.set(cache_key, cache_data, expire=600)
+            # Cache results for 10 minutes
+            results = await single_flight.get_or_fetch(
+                cache_key,
+                fetch,
+                ttl=600,
+                stale_ttl=600,
+                encode=lambda assets: [asdict(crypto) for crypto in assets],
+                decode=lambda cached: [CryptoAsset(**c) for c in cached],
+            )
+            if results and not fetched:
+                duration = time.time() - start_time
+                crypto_metrics.record_fetch(cached=True)
+                logger.info(
+                    f"✅ Cache hit for search '{query}' ({len(results)} results) - {duration * 1000:.1f}ms"
+                )
+                return results
 
             duration = time.time() - start_time
             crypto_metrics.record_fetch(cached=False)
@@ -281,52 +330,93 @@ class CryptoDiscoveryService:
 
             # Get full data for search results
             coin_ids = [coin["id"] for coin in data.get("coins", [])[:limit]]
+            return self._by_rank(await self._resolve_assets(coin_ids, client))
 
-            if not coin_ids:
-                return []
+        except Exception as e:
+            logger.error(f"Error in crypto search: {e}")
+            return []
 
-            # Fetch detailed market data
-            markets_url = f"{self.coingecko_base}/coins/markets"
-            params = {
-                "vs_currency": "usd",
-                "ids": ",".join(coin_ids),
-                "order": "market_cap_desc",
-                "sparkline": False,
-                "price_change_percentage": "24h",
-            }
+    async def _resolve_assets(
+        self, coin_ids: list[str], client: httpx.AsyncClient | None = None
+    ) -> list[CryptoAsset]:
+        """
+        Market data for ``coin_ids``, in the same order
 
-            if settings.COINGECKO_KEY:
-                params["x_cg_demo_api_key"] = settings.COINGECKO_KEY
+        Served from this process when fresh, then from the per-coin Redis
+        cache, and only fetched from CoinGecko for the rest.
+        """
+        now = time.monotonic()
+        found = {}
+        for coin_id in coin_ids:
+            stored = _market_data.get(coin_id)
+            if stored and now - stored[0] < self.asset_ttl:
+                found[coin_id] = stored[1]
+
+        missing = [c for c in coin_ids if c not in found]
+        if missing:
+            cached = await advanced_redis_client.get_many([self._asset_key(c) for c in missing])
+            for coin_id in missing:
+                if self._asset_key(coin_id) in cached:
+                    found[coin_id] = CryptoAsset(**cached[self._asset_key(coin_id)])
+                    _market_data[coin_id] = (now, found[coin_id])
+            missing = [c for c in missing if c not in found]
+
+        if missing:
+            if client is None:
+                fetched = await self._with_client(lambda c: self._fetch_markets(c, missing))
+            else:
+                fetched = await self._fetch_markets(client, missing)
+            await self._cache_assets(fetched)
+            found.update((crypto.id, crypto) for crypto in fetched)
 
-            resp = await client.get(markets_url, params=params)
-            resp.raise_for_status()
-            market_data = resp.json()
-
-            results = []
-            for coin in market_data:
-                try:
-                    crypto = CryptoAsset(
-                        id=coin["id"],
-                        symbol=coin["symbol"].upper(),
-                        name=coin["name"],
-                        market_cap_rank=coin.get("market_cap_rank", 0),
-                        current_price=coin.get("current_price", 0),
-                        market_cap=coin.get("market_cap", 0),
-                        total_volume=coin.get("total_volume", 0),
-                        price_change_24h=coin.get("price_change_24h", 0),
-                        price_change_percentage_24h=coin.get("price_change_percentage_24h", 0),
-                        image=coin.get("image", ""),
-                    )
-                    results.append(crypto)
-                except Exception as e:
-                    logger.warning(f"Error parsing search result: {e}")
-                    continue
+        return [found[c] for c in coin_ids if c in found]
 
-            return results
+    async def _fetch_markets(
+        self, client: httpx.AsyncClient, coin_ids: list[str]
+    ) -> list[CryptoAsset]:
+        """Fetch detailed market data for specific coins"""
+        markets_url = f"{self.coingecko_base}/coins/markets"
+        params = {
+            "vs_currency": "usd",
+            "ids": ",".join(coin_ids),
+            "order": "market_cap_desc",
+            "sparkline": False,
+            "price_change_percentage": "24h",
+        }
 
-        except Exception as e:
-            logger.error(f"Error in crypto search: {e}")
-            return []
+        if settings.COINGECKO_KEY:
+            params["x_cg_demo_api_key"] = settings.COINGECKO_KEY
+
+        resp = await client.get(markets_url, params=params)
+        resp.raise_for_status()
+        market_data = resp.json()
+
+        fetched = []
+        for coin in market_data:
+            try:
+                crypto = CryptoAsset(
+                    id=coin["id"],
+                    symbol=coin["symbol"].upper(),
+                    name=coin["name"],
+                    market_cap_rank=coin.get("market_cap_rank", 0),
+                    current_price=coin.get("current_price", 0),
+                    market_cap=coin.get("market_cap", 0),
+                    total_volume=coin.get("total_volume", 0),
+                    price_change_24h=coin.get("price_change_24h", 0),
+                    price_change_percentage_24h=coin.get("price_change_percentage_24h", 0),
+                    image=coin.get("image", ""),
+                )
+                fetched.append(crypto)
+            except Exception as e:
+                logger.warning(f"Error parsing search result: {e}")
+                continue
+
+        return fetched
+
+    @staticmethod
+    def _by_rank(cryptos: list[CryptoAsset]) -> list[CryptoAsset]:
+        """Order by market cap rank, unranked coins last (CoinGecko's markets order)"""
+        return sorted(cryptos, key=lambda c: c.market_cap_rank or float("inf"))
 
     async def get_symbol_to_id_mapping(self) -> dict[str, str]:
         """Get mapping of symbol to CoinGecko ID for all top cryptos"""
@@ -5,12 +5,19 @@ Supports multiple data sources with failover capabilities.
 
 import logging
 import os
+from collections.abc import Iterable
 from datetime import datetime, timedelta
 from enum import Enum
+from typing import TYPE_CHECKING
 
 import aiohttp
 from pydantic import BaseModel
 
+from app.services.symbol_index import SymbolIndex
+
+if TYPE_CHECKING:
+    from app.services.unified_asset_service import UnifiedAsset
+
 logger = logging.getLogger(__name__)
 
 
@@ -66,11 +73,24 @@ class DataProviderConfig(BaseModel):
     enabled: bool = True
 
 
+# UnifiedAsset.type -> AssetType
+_REGISTRY_TYPES = {
+    "crypto": AssetType.CRYPTO,
+    "stock": AssetType.STOCK,
+    "etf": AssetType.INDEX,
+    "index": AssetType.INDEX,
+}
+
+
 class SymbolDirectory:
     """Manages symbol discovery and metadata"""
 
     def __init__(self):
         self.symbols: dict[str, Symbol] = {}
+        self.index: SymbolIndex[Symbol] = SymbolIndex()
+        # Symbols taken from UnifiedAssetService's registry, and CoinGecko IDs
+        self._registry_symbols: set[str] = set()
+        self._coingecko_ids: dict[str, str] = {}
         self._load_default_symbols()
 
     def _load_default_symbols(self):
@@ -335,40 +355,87 @@ class SymbolDirectory:
                 industry=symbol_data[7],
                 last_updated=datetime.now(),
             )
-            self.symbols[symbol.symbol] = symbol
-
-    async def search_symbols(
-        self, query: str, asset_type: AssetType | None = None, limit: int = 50
-    ) -> list[Symbol]:
-        """Search symbols by query string"""
-        query = query.upper().strip()
-        results = []
-
-        for symbol in self.symbols.values():
-            if not symbol.is_active:
-                continue
-
-            if asset_type and symbol.asset_type != asset_type:
+            self.add_symbol(symbol)
+
+    def add_symbol(
+        self, symbol: Symbol, aliases: Iterable[str | None] = (), rank: int | None = None
+    ):
+        """Add or replace a symbol; ``aliases`` are extra searchable names"""
+        self.symbols[symbol.symbol] = symbol
+        self.index.upsert(symbol.symbol, symbol, symbol.symbol, (symbol.name, *aliases), rank)
+
+    def remove_symbol(self, symbol: str):
+        self.symbols.pop(symbol, None)
+        self.index.remove(symbol)
+        self._registry_symbols.discard(symbol)
+        self._coingecko_ids.pop(symbol, None)
+
+    def sync_registry(self, assets: Iterable["UnifiedAsset"], asset_type: str | None = None):
+        """
+        Index assets from UnifiedAssetService's registry.
+
+        Only new or changed assets are re-indexed. With ``asset_type``, the
+        assets are that type's full list and registry symbols of the type
+        missing from it are removed.
+        """
+        seen = set()
+        for asset in assets:
+            symbol = asset.symbol.upper()
+            seen.add(symbol)
+            # Built-in symbols keep their richer metadata
+            if symbol in self.symbols and symbol not in self._registry_symbols:
                 continue
+            crypto = asset.type == "crypto"
+            self._registry_symbols.add(symbol)
+            if crypto and asset.provider_id:
+                self._coingecko_ids[symbol] = asset.provider_id
+            self.add_symbol(
+                Symbol(
+                    symbol=symbol,
+                    name=asset.name,
+                    asset_type=_REGISTRY_TYPES.get(asset.type, AssetType.STOCK),
+                    exchange="CRYPTO" if crypto else "",
+                    currency="USD",
+                    last_updated=datetime.now(),
+                ),
+                aliases=(asset.provider_id,),
+                rank=asset.market_cap_rank,
+            )
 
-            # Match symbol or name
-            if query in symbol.symbol or query.lower() in symbol.name.lower():
-                results.append(symbol)
+        if asset_type is not None:
+            kind = _REGISTRY_TYPES.get(asset_type, AssetType.STOCK)
+            for symbol in [s for s in self._registry_symbols if s not in seen]:
+                if self.symbols[symbol].asset_type == kind:
+                    self.remove_symbol(symbol)
 
-            if len(results) >= limit:
-                break
+    def coingecko_id(self, symbol: str) -> str | None:
+        return self._coingecko_ids.get(symbol.upper())
 
-        # Sort by relevance (exact symbol match first, then alphabetical)
-        def sort_key(s):
-            if s.symbol == query:
-                return (0, s.symbol)
-            elif s.symbol.startswith(query):
-                return (1, s.symbol)
-            else:
-                return (2, s.symbol)
+    @property
+    def has_coingecko_ids(self) -> bool:
+        return bool(self._coingecko_ids)
 
-        results.sort(key=sort_key)
-        return results
+    async def search_symbols(
+        self,
+        query: str,
+        asset_type: AssetType | None = None,
+        limit: int = 50,
+        fuzzy: bool = False,
+    ) -> list[Symbol]:
+        """Search symbols by ticker, name or alias, most relevant first"""
+        return self.index.search(
+            query,
+            limit,
+            accept=lambda s: s.is_active and (asset_type is None or s.asset_type == asset_type),
+            fuzzy=fuzzy,
+        )
+
+    def search_coingecko_ids(self, query: str, limit: int = 50, fuzzy: bool = False) -> list[str]:
+        """CoinGecko IDs of the registry cryptos matching ``query``, most relevant first"""
+        symbols = self.index.search(
+            query, limit, accept=lambda s: s.symbol in self._coingecko_ids, fuzzy=fuzzy
+        )
+        return [self._coingecko_ids[s.symbol] for s in symbols]
 
     def get_symbol(self, symbol: str) -> Symbol | None:
         """Get symbol metadata"""
@@ -10,7 +10,8 @@ from sqlalchemy import and_, desc, exists, func, not_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import aliased
 
-from app.models.follow import Follow
+from app.core.pagination import after, decode_cursor, next_page, order_by
+from app.models.follow import Follow, FollowSuggestion
 from app.models.notification_models import Notification, NotificationType
 from app.models.profile import Profile
 from app.models.user import User
@@ -25,6 +26,8 @@ from app.schemas.follow import (
     SuggestedUsersResponse,
     UserFollowStatus,
 )
+from app.services.follow_suggestions import FollowSuggestionService
+from app.services.notification_service import notification_service
 
 
 class FollowService:
@@ -64,18 +67,19 @@ class FollowService:
 
         # Increment counters safely
         await self._update_follow_counts(follower_id, followee_id, increment=True)
+        await FollowSuggestionService(self.db).on_follow(follower_id, followee_id)
         # Create notification for followee (fire-and-forget creation)
-        self.db.add(
-            Notification(
-                user_id=followee_id,
-                related_user_id=follower_id,
-                type=NotificationType.FOLLOW,
-                title="New follower",
-                message="You have a new follower",
-            )
+        notification = Notification(
+            user_id=followee_id,
+            related_user_id=follower_id,
+            type=NotificationType.FOLLOW,
+            title="New follower",
+            message="You have a new follower",
         )
+        self.db.add(notification)
 
         await self.db.commit()
+        await notification_service.track_created([notification])
         return FollowResponse.model_validate(follow)
 
     async def unfollow_user(self, follower_id: uuid.UUID, followee_id: uuid.UUID) -> bool:
@@ -89,7 +93,9 @@ class FollowService:
         if not follow:
             return True
         await self.db.delete(follow)
+        await self.db.flush()
         await self._update_follow_counts(follower_id, followee_id, increment=False)
+        await FollowSuggestionService(self.db).on_unfollow(follower_id, followee_id)
         await self.db.commit()
         return True
 
@@ -99,13 +105,22 @@ class FollowService:
         page: int = 1,
         page_size: int = 20,
         current_user_id: uuid.UUID | None = None,
+        cursor: str | None = None,
+        include_total: bool = True,
     ) -> FollowersListResponse:
-        """Get followers list with follow status."""
-        offset = (page - 1) * page_size
+        """
+        Get followers list with follow status, newest first.
+
+        Pass the previous page's ``next_cursor`` as ``cursor`` to page by
+        keyset instead of by ``page``. ``total`` is read from the profile's
+        follower_count, or None with ``include_total=False``.
+        """
+        order = [(Follow.created_at, True), (Follow.id, True)]
 
         # Query for followers with profile information
         stmt = (
             select(
+                Follow.id,
                 Follow.follower_id,
                 Follow.created_at,
                 Profile.username,
@@ -114,18 +129,22 @@ class FollowService:
             )
             .join(Profile, Profile.user_id == Follow.follower_id)
             .where(Follow.followee_id == user_id)
-            .order_by(desc(Follow.created_at))
-            .offset(offset)
-            .limit(page_size)
+            .order_by(*order_by(order))
+            .limit(page_size + 1)
         )
+        if cursor:
+            stmt = stmt.where(after(order, decode_cursor(cursor, datetime, uuid.UUID)))
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
 
         result = await self.db.execute(stmt)
-        followers_data = result.all()
+        followers_data, next_cursor = next_page(
+            result.all(), page_size, lambda row: (row.created_at, row.id)
+        )
 
-        # Get total count
-        count_stmt = select(func.count()).select_from(Follow).where(Follow.followee_id == user_id)
-        result = await self.db.execute(count_stmt)
-        total = result.scalar() or 0
+        total = (
+            await self._counter_total(Profile.follower_count, user_id) if include_total else None
+        )
 
         # Build followers list with follow status
         followers = []
@@ -156,7 +175,8 @@ class FollowService:
             total=total,
             page=page,
             page_size=page_size,
-            has_next=(offset + page_size) < total,
+            has_next=next_cursor is not None,
+            next_cursor=next_cursor,
         )
 
     async def get_following(
@@ -165,13 +185,22 @@ class FollowService:
         page: int = 1,
         page_size: int = 20,
         current_user_id: uuid.UUID | None = None,
+        cursor: str | None = None,
+        include_total: bool = True,
     ) -> FollowingListResponse:
-        """Get following list with follow status."""
-        offset = (page - 1) * page_size
+        """
+        Get following list with follow status, newest first.
+
+        Pass the previous page's ``next_cursor`` as ``cursor`` to page by
+        keyset instead of by ``page``. ``total`` is read from the profile's
+        following_count, or None with ``include_total=False``.
+        """
+        order = [(Follow.created_at, True), (Follow.id, True)]
 
         # Query for following with profile information
         stmt = (
             select(
+                Follow.id,
                 Follow.followee_id,
                 Follow.created_at,
                 Profile.username,
@@ -180,18 +209,22 @@ class FollowService:
             )
             .join(Profile, Profile.user_id == Follow.followee_id)
             .where(Follow.follower_id == user_id)
-            .order_by(desc(Follow.created_at))
-            .offset(offset)
-            .limit(page_size)
+            .order_by(*order_by(order))
+            .limit(page_size + 1)
         )
+        if cursor:
+            stmt = stmt.where(after(order, decode_cursor(cursor, datetime, uuid.UUID)))
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
 
         result = await self.db.execute(stmt)
-        following_data = result.all()
+        following_data, next_cursor = next_page(
+            result.all(), page_size, lambda row: (row.created_at, row.id)
+        )
 
-        # Get total count
-        count_stmt = select(func.count()).select_from(Follow).where(Follow.follower_id == user_id)
-        result = await self.db.execute(count_stmt)
-        total = result.scalar() or 0
+        total = (
+            await self._counter_total(Profile.following_count, user_id) if include_total else None
+        )
 
         # Build following list with follow status
         following = []
@@ -222,7 +255,8 @@ class FollowService:
             total=total,
             page=page,
             page_size=page_size,
-            has_next=(offset + page_size) < total,
+            has_next=next_cursor is not None,
+            next_cursor=next_cursor,
         )
 
     async def get_mutual_follows(
@@ -299,66 +333,74 @@ class FollowService:
         )
 
     async def get_follow_suggestions(
-        self, user_id: uuid.UUID, page: int = 1, page_size: int = 10
+        self, user_id: uuid.UUID, page: int = 1, page_size: int = 10, cursor: str | None = None
     ) -> SuggestedUsersResponse:
-        """Get suggested users to follow."""
-        offset = (page - 1) * page_size
+        """
+        Get suggested users to follow.
+
+        Friends of friends come first, ranked by how many people you follow
+        follow them (read from the materialized ``follow_suggestions``);
+        popular public profiles fill the rest. ``next_cursor`` records which
+        of the two lists it points into, so cursor pages walk both by keyset.
+        """
+        phase, key = "mutual_follows", None
+        if cursor:
+            phase, *key = decode_cursor(cursor, str, int, int, uuid.UUID)
+            if phase not in ("mutual_follows", "popular"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+                )
 
-        # Strategy: Suggest users followed by people you follow (friends of friends)
-        # but exclude users you already follow
-        Follow1 = aliased(Follow)  # Current user's follows
-        Follow2 = aliased(Follow)  # Their follows' follows
+        # Friends of friends (users followed by people you follow, excluding
+        # yourself and users you already follow), kept up to date on follow
+        mutual_order = [
+            (FollowSuggestion.mutual_count, True),
+            (Profile.follower_count, True),
+            (FollowSuggestion.candidate_id, True),
+        ]
 
-        # Base mutual-follows suggestion query (fetch one extra for has_next detection)
-        stmt = (
-            select(
-                Follow2.followee_id,
-                Profile.username,
-                Profile.display_name,
-                Profile.avatar_url,
-                func.count(Follow2.followee_id).label("mutual_count"),
-            )
-            .select_from(Follow1)
-            .join(Follow2, Follow2.follower_id == Follow1.followee_id)
-            .join(Profile, Profile.user_id == Follow2.followee_id)
-            .where(
-                and_(
-                    Follow1.follower_id == user_id,
-                    Follow2.followee_id != user_id,  # Don't suggest self
-                    not_(  # Don't suggest users already followed
-                        exists().where(
-                            and_(
-                                Follow.follower_id == user_id,
-                                Follow.followee_id == Follow2.followee_id,
-                            )
-                        )
-                    ),
+        suggestions_data = []
+        next_cursor = None
+        if phase == "mutual_follows":
+            # Fetch one extra row for has_next detection
+            stmt = (
+                select(
+                    FollowSuggestion.candidate_id.label("followee_id"),
+                    Profile.username,
+                    Profile.display_name,
+                    Profile.avatar_url,
+                    Profile.follower_count,
+                    FollowSuggestion.mutual_count,
                 )
+                .join(Profile, Profile.user_id == FollowSuggestion.candidate_id)
+                .where(FollowSuggestion.user_id == user_id)
+                .order_by(*order_by(mutual_order))
+                .limit(page_size + 1)
             )
-            .group_by(
-                Follow2.followee_id,
-                Profile.username,
-                Profile.display_name,
-                Profile.avatar_url,
-                Profile.follower_count,
+            if key:
+                stmt = stmt.where(after(mutual_order, key))
+            else:
+                stmt = stmt.offset((page - 1) * page_size)
+
+            result = await self.db.execute(stmt)
+            suggestions_data, next_cursor = next_page(
+                result.all(),
+                page_size,
+                lambda row: (
+                    "mutual_follows",
+                    row.mutual_count,
+                    row.follower_count,
+                    row.followee_id,
+                ),
             )
-            .order_by(desc("mutual_count"), desc(Profile.follower_count))
-            .offset(offset)
-            .limit(page_size + 1)  # fetch sentinel
-        )
-
-        result = await self.db.execute(stmt)
-        suggestions_data = result.all()
-        has_next_mutual = len(suggestions_data) > page_size
-        suggestions_data = suggestions_data[:page_size]
 
-        reason = "mutual_follows"
+        reason = phase
 
-        # If first page and we still need to fill, add popular fallback (fetch sentinel too)
-        popular_data = []
-        has_next_popular = False
-        if len(suggestions_data) < page_size and page == 1:
+        # Fill from popular profiles once friends of friends run out (on the
+        # first page, or anywhere when paging by cursor)
+        if next_cursor is None and len(suggestions_data) < page_size and (cursor or page == 1):
             remaining = page_size - len(suggestions_data)
+            popular_order = [(Profile.follower_count, True), (Profile.user_id, True)]
             popular_stmt = (
                 select(
                     Profile.user_id.label("user_id"),
@@ -371,6 +413,15 @@ class FollowService:
                     and_(
                         Profile.is_public,
                         Profile.user_id != user_id,
+                        # Friends of friends are already listed (or pending) above
+                        not_(
+                            exists().where(
+                                and_(
+                                    FollowSuggestion.user_id == user_id,
+                                    FollowSuggestion.candidate_id == Profile.user_id,
+                                )
+                            )
+                        ),
                         not_(
                             exists().where(
                                 and_(
@@ -381,13 +432,17 @@ class FollowService:
                         ),
                     )
                 )
-                .order_by(desc(Profile.follower_count))
+                .order_by(*order_by(popular_order))
                 .limit(remaining + 1)
             )
+            if phase == "popular":
+                popular_stmt = popular_stmt.where(after(popular_order, key[1:]))
             pop_res = await self.db.execute(popular_stmt)
-            popular_data = list(pop_res.all())
-            has_next_popular = len(popular_data) > remaining
-            popular_data = popular_data[:remaining]
+            popular_data, next_cursor = next_page(
+                pop_res.all(),
+                remaining,
+                lambda row: ("popular", 0, row.follower_count, row.user_id),
+            )
             if not suggestions_data:
                 reason = "popular"
             suggestions_data = list(suggestions_data) + popular_data
@@ -410,11 +465,6 @@ class FollowService:
                     created_at=datetime.now(UTC),
                 )
             )
-        has_next = False
-        if reason == "mutual_follows":
-            has_next = has_next_mutual or (len(suggestions) == page_size and has_next_popular)
-        else:
-            has_next = has_next_popular
 
         total = len(suggestions)
         return SuggestedUsersResponse(
@@ -423,7 +473,8 @@ class FollowService:
             total=total,
             page=page,
             page_size=page_size,
-            has_next=has_next,
+            has_next=next_cursor is not None,
+            next_cursor=next_cursor,
         )
 
     async def get_follow_stats(
@@ -583,6 +634,11 @@ class FollowService:
         )
 
     # Private helper methods
+    async def _counter_total(self, counter, user_id: uuid.UUID) -> int:
+        """Follower/following total from the denormalized profile counter."""
+        result = await self.db.execute(select(counter).where(Profile.user_id == user_id))
+        return result.scalar() or 0
+
     async def _update_follow_counts(
         self, follower_id: uuid.UUID, followee_id: uuid.UUID, increment: bool = True
     ):
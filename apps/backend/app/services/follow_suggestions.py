@@ -0,0 +1,151 @@
+"""
+Materialized follow suggestions.
+
+Friends-of-friends candidates are stored in ``follow_suggestions`` along with
+how many of the people a user follows follow them, so listing a user's
+suggestions is one indexed read instead of a self-join over ``follows``.
+
+Follow and unfollow adjust the affected counts with a few set-based
+statements in the same transaction. ``rebuild`` recomputes them from
+``follows`` (for everyone or a few users); it backfills the table and runs
+as a periodic job to repair drift, e.g. after account deletions.
+"""
+
+import uuid
+
+from sqlalchemy import and_, delete, exists, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.follow import Follow, FollowSuggestion
+
+_COLUMNS = ["user_id", "candidate_id", "mutual_count"]
+
+
+class FollowSuggestionService:
+    """Keeps ``follow_suggestions`` in step with ``follows``."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def _id(value: uuid.UUID):
+        return literal(value, FollowSuggestion.user_id.type)
+
+    @staticmethod
+    def _not_following(user, candidate):
+        followed = aliased(Follow)
+        return ~exists().where(
+            and_(followed.follower_id == user, followed.followee_id == candidate)
+        )
+
+    async def _add(self, candidates, replace: bool = False) -> None:
+        """Upsert ``(user_id, candidate_id, mutual_count)`` rows, adding to existing counts."""
+        insert = postgresql_insert if self.db.bind.dialect.name == "postgresql" else sqlite_insert
+        stmt = insert(FollowSuggestion).from_select(_COLUMNS, candidates)
+        count = stmt.excluded.mutual_count
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["user_id", "candidate_id"],
+                set_={
+                    "mutual_count": count if replace else FollowSuggestion.mutual_count + count,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+
+    async def _prune(self, *where) -> None:
+        await self.db.execute(
+            delete(FollowSuggestion).where(FollowSuggestion.mutual_count <= 0, *where)
+        )
+
+    async def on_follow(self, follower_id: uuid.UUID, followee_id: uuid.UUID) -> None:
+        """Call after the ``follower_id -> followee_id`` row is flushed."""
+        # Everyone the followee follows is one more mutual for the follower
+        await self._add(
+            select(self._id(follower_id), Follow.followee_id, literal(1)).where(
+                Follow.follower_id == followee_id,
+                Follow.followee_id != follower_id,
+                self._not_following(follower_id, Follow.followee_id),
+            )
+        )
+        # ...who stops being a candidate now that they are followed
+        await self.db.execute(
+            delete(FollowSuggestion).where(
+                FollowSuggestion.user_id == follower_id,
+                FollowSuggestion.candidate_id == followee_id,
+            )
+        )
+        # The followee is one more mutual for everyone following the follower
+        await self._add(
+            select(Follow.follower_id, self._id(followee_id), literal(1)).where(
+                Follow.followee_id == follower_id,
+                Follow.follower_id != followee_id,
+                self._not_following(Follow.follower_id, followee_id),
+            )
+        )
+
+    async def on_unfollow(self, follower_id: uuid.UUID, followee_id: uuid.UUID) -> None:
+        """Call after the ``follower_id -> followee_id`` row is deleted and flushed."""
+        await self.db.execute(
+            update(FollowSuggestion)
+            .where(
+                FollowSuggestion.user_id == follower_id,
+                FollowSuggestion.candidate_id.in_(
+                    select(Follow.followee_id).where(Follow.follower_id == followee_id)
+                ),
+            )
+            .values(mutual_count=FollowSuggestion.mutual_count - 1)
+        )
+        await self.db.execute(
+            update(FollowSuggestion)
+            .where(
+                FollowSuggestion.candidate_id == followee_id,
+                FollowSuggestion.user_id.in_(
+                    select(Follow.follower_id).where(Follow.followee_id == follower_id)
+                ),
+            )
+            .values(mutual_count=FollowSuggestion.mutual_count - 1)
+        )
+        await self._prune(
+            (FollowSuggestion.user_id == follower_id)
+            | (FollowSuggestion.candidate_id == followee_id)
+        )
+
+        # The unfollowed user is a candidate again if friends follow them
+        mine, theirs = aliased(Follow), aliased(Follow)
+        await self._add(
+            select(self._id(follower_id), theirs.followee_id, func.count())
+            .select_from(mine)
+            .join(theirs, theirs.follower_id == mine.followee_id)
+            .where(mine.follower_id == follower_id, theirs.followee_id == followee_id)
+            .group_by(theirs.followee_id),
+            replace=True,
+        )
+
+    async def rebuild(self, user_ids: list[uuid.UUID] | None = None) -> int:
+        """Recompute suggestions from ``follows``; returns the number of rows written."""
+        clear = delete(FollowSuggestion)
+        if user_ids is not None:
+            clear = clear.where(FollowSuggestion.user_id.in_(user_ids))
+        await self.db.execute(clear)
+
+        mine, theirs = aliased(Follow), aliased(Follow)
+        candidates = (
+            select(mine.follower_id, theirs.followee_id, func.count())
+            .select_from(mine)
+            .join(theirs, theirs.follower_id == mine.followee_id)
+            .where(
+                theirs.followee_id != mine.follower_id,
+                self._not_following(mine.follower_id, theirs.followee_id),
+            )
+            .group_by(mine.follower_id, theirs.followee_id)
+        )
+        if user_ids is not None:
+            candidates = candidates.where(mine.follower_id.in_(user_ids))
+        result = await self.db.execute(
+            FollowSuggestion.__table__.insert().from_select(_COLUMNS, candidates)
+        )
+        return result.rowcount
@@ -10,6 +10,7 @@ import httpx
 
 from app.core.advanced_redis_client import advanced_redis_client
 from app.core.config import settings
+from app.core.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,9 @@ performance_metrics = PerformanceMetrics()
 
 PeriodType = Literal["1d", "1w", "1m", "3m", "6m", "1y", "5y", "all"]
 
+HISTORY_TTL = 1800
+HISTORY_STALE_TTL = 600
+
 
 @dataclass
 class OHLCVData:
@@ -178,30 +182,36 @@ class HistoricalPriceService:
 
         start_time = time.time()
         cache_key = f"history:{symbol}:{period}"
+        fetched = False
 
-        try:
-            if not force_refresh:
-                cached_data = await self._get_cached_history(cache_key)
-                if cached_data:
-                    duration = time.time() - start_time
-                    performance_metrics.record_request(cached=True, duration=duration)
-                    logger.info(
-                        f"✅ Cache hit for {symbol} history ({period}) - {duration * 1000:.1f}ms"
-                    )
-                    return [HistoricalPricePoint(**point) for point in cached_data]
-
-            # Fetch from API
-            if self.client is None:
+        async def fetch() -> list[HistoricalPricePoint]:
+            nonlocal fetched
+            fetched = True
+            # Stale refreshes can outlive the caller's client, so check it is still open
+            if self.client is None or self.client.is_closed:
                 async with httpx.AsyncClient(timeout=30.0) as client:
-                    data = await self._fetch_history(client, symbol, period)
-            else:
-                data = await self._fetch_history(self.client, symbol, period)
+                    return await self._fetch_history(client, symbol, period)
+            return await self._fetch_history(self.client, symbol, period)
 
-            if data:
-                # Cache for 30 minutes
-                await self._set_cache_history(
-                    cache_key, [point.to_dict() for point in data], ttl=1800
+        try:
+            # Cached for 30 minutes; served stale for 10 more while one refresh runs
+            data = await single_flight.get_or_fetch(
+                cache_key,
+                fetch,
+                ttl=HISTORY_TTL,
+                stale_ttl=HISTORY_STALE_TTL,
+                force_refresh=force_refresh,
+                encode=lambda points: [point.to_dict() for point in points],
+                decode=lambda cached: [HistoricalPricePoint(**point) for point in cached],
+            )
+
+            if data and not fetched:
+                duration = time.time() - start_time
+                performance_metrics.record_request(cached=True, duration=duration)
+                logger.info(
+                    f"✅ Cache hit for {symbol} history ({period}) - {duration * 1000:.1f}ms"
                 )
+            elif data:
                 duration = time.time() - start_time
                 performance_metrics.record_request(cached=False, duration=duration)
                 logger.info(
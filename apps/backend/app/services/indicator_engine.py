@@ -0,0 +1,308 @@
+"""
+Vectorized technical indicator engine.
+
+Every indicator works on contiguous float64 arrays along the last axis, so a
+single call handles either one series ``(bars,)`` or a block of equal-length
+series ``(symbols, bars)``. Warm-up positions are NaN rather than ``None`` so
+results stay as plain arrays with no per-element Python objects.
+
+``compute_batch`` is the entry point for chart pages: it groups symbols by
+window length, stacks each group into one 2-D block and evaluates every
+requested indicator once per block.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Upper bound for ln(decay ** -block) in _ewm; keeps the rescaled cumulative
+# sum far away from float64 overflow while still using long blocks.
+_EWM_LOG_RANGE = 24.0
+
+
+def _as_block(values: Any) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _nan_like(x: np.ndarray) -> np.ndarray:
+    return np.full(x.shape, np.nan, dtype=np.float64)
+
+
+def _ewm(x: np.ndarray, alpha: float, seed: np.ndarray) -> np.ndarray:
+    """Exponential recursion ``y[t] = alpha*x[t] + (1-alpha)*y[t-1]``, ``y[-1] = seed``.
+
+    Solved in closed form per block: inside a block the recursion is a
+    cumulative sum of ``x`` rescaled by powers of the decay, and the block
+    length is capped so those powers cannot overflow.
+    """
+    out = np.empty_like(x)
+    n = x.shape[-1]
+    if n == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[...] = x
+        return out
+
+    block = max(1, min(n, int(_EWM_LOG_RANGE / -math.log(decay))))
+    powers = decay ** np.arange(1, block + 1, dtype=np.float64)
+    prev = np.asarray(seed, dtype=np.float64)
+    for start in range(0, n, block):
+        chunk = x[..., start : start + block]
+        m = chunk.shape[-1]
+        p = powers[:m]
+        acc = np.cumsum(chunk / p, axis=-1)
+        y = p * (prev[..., None] + alpha * acc)
+        out[..., start : start + m] = y
+        prev = y[..., -1]
+    return out
+
+
+def sma(values: Any, period: int) -> np.ndarray:
+    """Simple moving average."""
+    x = _as_block(values)
+    out = _nan_like(x)
+    n = x.shape[-1]
+    if period <= 0 or n < period:
+        return out
+    csum = np.cumsum(x, axis=-1)
+    out[..., period - 1] = csum[..., period - 1]
+    out[..., period:] = csum[..., period:] - csum[..., :-period]
+    out[..., period - 1 :] /= period
+    return out
+
+
+def ema(values: Any, period: int) -> np.ndarray:
+    """Exponential moving average seeded with the first value."""
+    x = _as_block(values)
+    n = x.shape[-1]
+    if n == 0:
+        return _nan_like(x)
+    out = np.empty_like(x)
+    out[..., 0] = x[..., 0]
+    out[..., 1:] = _ewm(x[..., 1:], 2.0 / (period + 1), x[..., 0])
+    out[..., : max(period - 1, 0)] = np.nan
+    return out
+
+
+def rsi(values: Any, period: int = 14) -> np.ndarray:
+    """Relative strength index with Wilder's smoothing."""
+    x = _as_block(values)
+    out = _nan_like(x)
+    if period <= 0 or x.shape[-1] <= period:
+        return out
+    diff = np.diff(x, axis=-1)
+    gains = np.clip(diff, 0.0, None)
+    losses = np.clip(-diff, 0.0, None)
+
+    alpha = 1.0 / period
+    gain_seed = gains[..., :period].mean(axis=-1)
+    loss_seed = losses[..., :period].mean(axis=-1)
+    avg_gain = np.concatenate(
+        [gain_seed[..., None], _ewm(gains[..., period:], alpha, gain_seed)], axis=-1
+    )
+    avg_loss = np.concatenate(
+        [loss_seed[..., None], _ewm(losses[..., period:], alpha, loss_seed)], axis=-1
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    out[..., period:] = np.where(avg_loss == 0.0, 100.0, value)
+    return out
+
+
+def macd(
+    values: Any, fast: int = 12, slow: int = 26, signal: int = 9
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram."""
+    x = _as_block(values)
+    line = ema(x, fast) - ema(x, slow)
+    sig = _nan_like(x)
+    start = max(fast, slow) - 1
+    if x.shape[-1] > start:
+        sig[..., start:] = ema(line[..., start:], signal)
+    return line, sig, line - sig
+
+
+def bollinger(
+    values: Any, period: int = 20, k: float = 2.0
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger bands as ``(middle, upper, lower)`` using population std."""
+    x = _as_block(values)
+    mid = _nan_like(x)
+    upper = _nan_like(x)
+    lower = _nan_like(x)
+    if period <= 0 or x.shape[-1] < period:
+        return mid, upper, lower
+    windows = sliding_window_view(x, period, axis=-1)
+    m = windows.mean(axis=-1)
+    sd = windows.std(axis=-1)
+    mid[..., period - 1 :] = m
+    upper[..., period - 1 :] = m + k * sd
+    lower[..., period - 1 :] = m - k * sd
+    return mid, upper, lower
+
+
+def true_range(high: Any, low: Any, close: Any) -> np.ndarray:
+    """True range; the first bar falls back to ``high - low``."""
+    h, lo, c = _as_block(high), _as_block(low), _as_block(close)
+    tr = h - lo
+    if tr.shape[-1] > 1:
+        prev_close = c[..., :-1]
+        np.maximum(tr[..., 1:], np.abs(h[..., 1:] - prev_close), out=tr[..., 1:])
+        np.maximum(tr[..., 1:], np.abs(lo[..., 1:] - prev_close), out=tr[..., 1:])
+    return tr
+
+
+def atr(high: Any, low: Any, close: Any, period: int = 14) -> np.ndarray:
+    """Average true range with Wilder's smoothing."""
+    tr = true_range(high, low, close)
+    out = _nan_like(tr)
+    if period <= 0 or tr.shape[-1] < period:
+        return out
+    seed = tr[..., :period].mean(axis=-1)
+    out[..., period - 1] = seed
+    out[..., period:] = _ewm(tr[..., period:], 1.0 / period, seed)
+    return out
+
+
+def vwap(high: Any, low: Any, close: Any, volume: Any) -> np.ndarray:
+    """Cumulative volume-weighted average price over the window."""
+    h, lo, c, v = _as_block(high), _as_block(low), _as_block(close), _as_block(volume)
+    typical = (h + lo + c) / 3.0
+    cum_pv = np.cumsum(typical * v, axis=-1)
+    cum_v = np.cumsum(v, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cum_v > 0.0, cum_pv / cum_v, np.nan)
+
+
+@dataclass(frozen=True, slots=True)
+class OHLCV:
+    """Column-oriented candle window."""
+
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.close.shape[-1])
+
+    @classmethod
+    def from_candles(cls, candles: Sequence[Mapping[str, Any]]) -> OHLCV:
+        """Build from provider candle dicts (``ts``/``o``/``h``/``l``/``c``/``v``)."""
+        n = len(candles)
+
+        def column(*keys: str) -> np.ndarray:
+            return np.fromiter(
+                (next((c[k] for k in keys if c.get(k) is not None), 0.0) for c in candles),
+                dtype=np.float64,
+                count=n,
+            )
+
+        return cls(
+            ts=np.fromiter((int(c.get("ts") or 0) for c in candles), dtype=np.int64, count=n),
+            open=column("o"),
+            high=column("h"),
+            low=column("l", "low"),
+            close=column("c"),
+            volume=column("v"),
+        )
+
+
+_DEFAULT_PARAMS: dict[str, tuple[float, ...]] = {
+    "sma": (20,),
+    "ema": (20,),
+    "rsi": (14,),
+    "macd": (12, 26, 9),
+    "bollinger": (20, 2),
+    "atr": (14,),
+    "vwap": (),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class IndicatorSpec:
+    """A single indicator request, e.g. ``IndicatorSpec("ema", (50,))``."""
+
+    kind: str
+    params: tuple[float, ...] = ()
+
+    def __post_init__(self) -> None:
+        if self.kind not in _DEFAULT_PARAMS:
+            raise ValueError(f"Unsupported indicator: {self.kind}")
+        if not self.params:
+            object.__setattr__(self, "params", _DEFAULT_PARAMS[self.kind])
+
+    @classmethod
+    def parse(cls, text: str) -> IndicatorSpec:
+        """Parse ``"kind"`` or ``"kind:p1,p2"`` (e.g. ``"macd:12,26,9"``)."""
+        kind, _, raw = text.strip().lower().partition(":")
+        params = tuple(float(p) for p in raw.split(",") if p.strip()) if raw else ()
+        return cls(kind, params)
+
+    @property
+    def key(self) -> str:
+        parts = [self.kind, *(f"{p:g}" for p in self.params)]
+        return "_".join(parts)
+
+
+def _evaluate(spec: IndicatorSpec, bars: OHLCV) -> dict[str, np.ndarray]:
+    p = spec.params
+    key = spec.key
+    if spec.kind == "sma":
+        return {key: sma(bars.close, int(p[0]))}
+    if spec.kind == "ema":
+        return {key: ema(bars.close, int(p[0]))}
+    if spec.kind == "rsi":
+        return {key: rsi(bars.close, int(p[0]))}
+    if spec.kind == "macd":
+        line, sig, hist = macd(bars.close, int(p[0]), int(p[1]), int(p[2]))
+        return {key: line, f"{key}_signal": sig, f"{key}_hist": hist}
+    if spec.kind == "bollinger":
+        mid, upper, lower = bollinger(bars.close, int(p[0]), float(p[1]))
+        return {f"{key}_mid": mid, f"{key}_upper": upper, f"{key}_lower": lower}
+    if spec.kind == "atr":
+        return {key: atr(bars.high, bars.low, bars.close, int(p[0]))}
+    return {key: vwap(bars.high, bars.low, bars.close, bars.volume)}
+
+
+def compute_batch(
+    series: Mapping[str, OHLCV],
+    specs: Iterable[IndicatorSpec | str],
+) -> dict[str, dict[str, np.ndarray]]:
+    """Compute every spec for every symbol.
+
+    Symbols with the same window length are stacked into one ``(symbols, bars)``
+    block so each indicator runs once per block; per-symbol results are row
+    views into that block.
+    """
+    parsed = [s if isinstance(s, IndicatorSpec) else IndicatorSpec.parse(s) for s in specs]
+
+    groups: dict[int, list[str]] = {}
+    for symbol, bars in series.items():
+        groups.setdefault(len(bars), []).append(symbol)
+
+    results: dict[str, dict[str, np.ndarray]] = {symbol: {} for symbol in series}
+    for symbols in groups.values():
+        members = [series[s] for s in symbols]
+        block = OHLCV(
+            ts=np.stack([b.ts for b in members]),
+            open=np.stack([b.open for b in members]).astype(np.float64, copy=False),
+            high=np.stack([b.high for b in members]).astype(np.float64, copy=False),
+            low=np.stack([b.low for b in members]).astype(np.float64, copy=False),
+            close=np.stack([b.close for b in members]).astype(np.float64, copy=False),
+            volume=np.stack([b.volume for b in members]).astype(np.float64, copy=False),
+        )
+        for spec in parsed:
+            for name, values in _evaluate(spec, block).items():
+                for row, symbol in enumerate(symbols):
+                    results[symbol][name] = values[row]
+    return results
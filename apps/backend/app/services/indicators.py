@@ -1,54 +1,26 @@
-from collections import deque
+"""
+List-based indicator helpers.
+
+Thin wrappers over ``indicator_engine`` for callers that want plain lists with
+``None`` during warm-up. Use ``indicator_engine`` directly for arrays or batches.
+"""
+
+import numpy as np
+
+from app.services import indicator_engine
+
+
+def _to_list(values: np.ndarray) -> list[float | None]:
+    return [None if v != v else v for v in values.tolist()]
 
 
 def sma(values: list[float], period: int) -> list[float | None]:
-    out, q, s = [], deque(), 0.0
-    for v in values:
-        q.append(v)
-        s += v
-        if len(q) > period:
-            s -= q.popleft()
-        out.append(s / period if len(q) == period else None)
-    return out
+    return _to_list(indicator_engine.sma(values, period))
 
 
 def ema(values: list[float], period: int) -> list[float | None]:
-    out = []
-    k = 2 / (period + 1)
-    ema_prev = None
-    for i, v in enumerate(values):
-        if ema_prev is None:
-            ema_prev = v
-        else:
-            ema_prev = v * k + ema_prev * (1 - k)
-        out.append(ema_prev if i + 1 >= period else None)
-    return out
+    return _to_list(indicator_engine.ema(values, period))
 
 
 def rsi(values: list[float], period: int = 14) -> list[float | None]:
-    gains = [0.0]
-    losses = [0.0]
-    for i in range(1, len(values)):
-        diff = values[i] - values[i - 1]
-        gains.append(max(diff, 0.0))
-        losses.append(max(-diff, 0.0))
-    # Wilder's smoothing
-    avg_gain = 0.0
-    avg_loss = 0.0
-    out = []
-    for i in range(len(values)):
-        if i < period:
-            out.append(None)
-            continue
-        if i == period:
-            avg_gain = sum(gains[1 : period + 1]) / period
-            avg_loss = sum(losses[1 : period + 1]) / period
-        else:
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-        if avg_loss == 0:
-            out.append(100.0)
-        else:
-            rs = avg_gain / avg_loss
-            out.append(100 - (100 / (1 + rs)))
-    return out
+    return _to_list(indicator_engine.rsi(values, period))
@@ -12,6 +12,7 @@ from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.conversation import Message
+from app.services.conversation_service import ConversationService
 
 logger = logging.getLogger(__name__)
 
@@ -179,6 +180,7 @@ class MessageModerationService:
                         .values(is_deleted=True, content="[message removed by moderation]")
                     )
                     await self.db.execute(update_stmt)
+                    await ConversationService(self.db).discount_unread(message)
                     await self.db.commit()
 
                 return True
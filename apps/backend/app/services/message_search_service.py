@@ -2,18 +2,28 @@
 Message search service for J4 Direct Messages.
 """
 
+import html
+import re
 import uuid
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import Select, and_, column, func, literal, literal_column, or_, select, table
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, selectinload
 
-from app.models.conversation import Conversation, ConversationParticipant, Message
-from app.models.user import User
-from app.schemas.conversation import MessageResponse
+from app.core.pagination import after, decode_cursor, next_page, order_by
+from app.models.conversation import (
+    MESSAGE_SEARCH_CONFIG,
+    Conversation,
+    ConversationParticipant,
+    Message,
+)
+from app.models.profile import Profile
+from app.schemas.conversation import MessageSearchHit
+from app.services.typeahead import TypeaheadEntry, TypeaheadIndex
 
 
 @dataclass
@@ -32,12 +42,36 @@ class SearchFilter:
 class SearchResult:
     """Search result with metadata."""
 
-    messages: list[MessageResponse]
-    total_count: int
+    messages: list[MessageSearchHit]
+    total_count: int | None  # None when the caller skipped counting
     search_time_ms: int
     page: int
     page_size: int
     has_next: bool
+    next_cursor: str | None = None
+
+
+# Snippet highlight markers: private-use characters that cannot clash with
+# message text, swapped for <mark> tags after HTML-escaping
+MARK_START, MARK_END = "\ue000", "\ue001"
+
+# The SQLite FTS5 table kept in sync with messages (see app.models.conversation)
+MESSAGES_FTS = table("messages_fts", column("message_id"), column("content"))
+
+# Words taken from a query; more are ignored
+MAX_SEARCH_TERMS = 8
+
+
+def search_terms(query: str | None) -> list[str]:
+    """Words of a search query, lowercased. Punctuation and operators are dropped."""
+    return re.findall(r"\w+", (query or "").lower())[:MAX_SEARCH_TERMS]
+
+
+def highlight(snippet: str | None) -> str | None:
+    """HTML-escape a snippet and wrap its matches in ``<mark>``."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
 
 
 class MessageSearchService:
@@ -47,9 +81,24 @@ class MessageSearchService:
         self.db = db
 
     async def search_messages(
-        self, user_id: uuid.UUID, search_filter: SearchFilter, page: int = 1, page_size: int = 20
+        self,
+        user_id: uuid.UUID,
+        search_filter: SearchFilter,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: str | None = None,
+        include_total: bool | None = None,
     ) -> SearchResult:
-        """Search messages with various filters."""
+        """
+        Search messages with various filters.
+
+        Text queries go through the full-text index and come back ranked by
+        relevance, with highlighted snippets; each word also matches as a
+        prefix. Without one, results are newest first.
+
+        Pass the previous result's ``next_cursor`` as ``cursor`` to page by
+        keyset instead of by ``page``; the total is then only counted on request.
+        """
         start_time = datetime.now()
 
         # Base query - only conversations user participates in
@@ -69,16 +118,17 @@ class MessageSearchService:
         )
 
         # Apply filters
-        if search_filter.query:
-            # Full-text search (PostgreSQL specific)
-            query = query.where(Message.content.ilike(f"%{search_filter.query}%"))
+        rank = snippet = None
+        terms = search_terms(search_filter.query)
+        if terms:
+            query, rank, snippet = self._match(query, terms)
 
         if search_filter.content_type:
             query = query.where(Message.content_type == search_filter.content_type)
 
         if search_filter.sender_username:
-            query = query.join(User, Message.sender_id == User.id).where(
-                User.username.ilike(f"%{search_filter.sender_username}%")
+            query = query.join(Profile, Message.sender_id == Profile.user_id).where(
+                Profile.username.ilike(f"%{search_filter.sender_username}%")
             )
 
         if search_filter.date_from:
@@ -91,25 +141,43 @@ class MessageSearchService:
             query = query.where(Message.conversation_id == search_filter.conversation_id)
 
         # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        count_result = await self.db.execute(count_query)
-        total_count = count_result.scalar() or 0
+        if include_total is None:
+            include_total = cursor is None
+        total_count = None
+        if include_total:
+            count_query = select(func.count()).select_from(query.subquery())
+            count_result = await self.db.execute(count_query)
+            total_count = count_result.scalar() or 0
 
         # Apply pagination and ordering
-        offset = (page - 1) * page_size
-        query = query.order_by(Message.created_at.desc()).offset(offset).limit(page_size)
+        order = [(Message.created_at, True), (Message.id, True)]
+        kinds: tuple[type, ...] = (datetime, uuid.UUID)
+        if rank is not None:
+            order.insert(0, (rank, True))
+            kinds = (float, *kinds)
+            query = query.add_columns(rank.label("score"), snippet.label("snippet"))
+        query = query.order_by(*order_by(order)).limit(page_size + 1)
+        if cursor:
+            query = query.where(after(order, decode_cursor(cursor, *kinds)))
+        else:
+            query = query.offset((page - 1) * page_size)
 
         # Execute search
         result = await self.db.execute(query)
-        messages = result.scalars().all()
+        rows, next_cursor = next_page(
+            result.all(),
+            page_size,
+            lambda row: (*row[1:2], row[0].created_at, row[0].id),  # score first if ranked
+        )
 
         # Build response
         message_responses = []
-        for msg in messages:
+        for row in rows:
+            msg = row[0]
             # This would normally use the _build_message_response method
             # from ConversationService - simplified here
             message_responses.append(
-                MessageResponse(
+                MessageSearchHit(
                     id=msg.id,
                     conversation_id=msg.conversation_id,
                     sender_id=msg.sender_id,
@@ -120,6 +188,8 @@ class MessageSearchService:
                     is_edited=False,  # Would need to track edits
                     is_deleted=msg.is_deleted,
                     read_by=[],  # Would need to calculate
+                    rank=row.score if rank is not None else None,
+                    snippet=highlight(row.snippet) if rank is not None else None,
                 )
             )
 
@@ -133,7 +203,43 @@ class MessageSearchService:
             search_time_ms=search_time_ms,
             page=page,
             page_size=page_size,
-            has_next=(offset + page_size) < total_count,
+            has_next=next_cursor is not None,
+            next_cursor=next_cursor,
+        )
+
+    def _match(self, query: Select, terms: list[str]) -> tuple[Select, Any, Any]:
+        """
+        Restrict ``query`` to messages matching every term (as a prefix).
+
+        Returns the query with the rank (higher is better) and snippet
+        expressions for this database.
+        """
+        dialect = self.db.bind.dialect.name
+        if dialect == "postgresql":
+            config = literal_column(f"'{MESSAGE_SEARCH_CONFIG}'")
+            # Same expression as the idx_messages_content_fts index
+            document = func.to_tsvector(config, Message.content)
+            tsquery = func.to_tsquery(config, " & ".join(f"{t}:*" for t in terms))
+            options = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=24, MinWords=8"
+            return (
+                query.where(document.bool_op("@@")(tsquery)),
+                func.ts_rank_cd(document, tsquery),
+                func.ts_headline(config, Message.content, tsquery, options),
+            )
+        if dialect == "sqlite":
+            fts = literal_column("messages_fts")
+            return (
+                query.join(MESSAGES_FTS, MESSAGES_FTS.c.message_id == Message.id).where(
+                    fts.bool_op("MATCH")(" ".join(f'"{t}"*' for t in terms))
+                ),
+                -func.bm25(fts),
+                func.snippet(fts, 1, MARK_START, MARK_END, "…", 16),
+            )
+        # No full-text index: substring match, unranked
+        return (
+            query.where(and_(*(Message.content.ilike(f"%{t}%") for t in terms))),
+            literal(0.0),
+            Message.content,
         )
 
     async def get_popular_search_terms(self, user_id: uuid.UUID) -> list[str]:
@@ -156,41 +262,76 @@ class MessageSearchService:
         self, user_id: uuid.UUID, query: str, page: int = 1, page_size: int = 10
     ) -> list[dict[str, Any]]:
         """Search conversations by participant names or group names."""
-        # Search for conversations containing the query in participant usernames
+        results = await self.suggest_conversations(user_id, query, limit=page * page_size)
+        return results[(page - 1) * page_size :]
+
+    async def suggest_conversations(
+        self, user_id: uuid.UUID, query: str, limit: int = 10
+    ) -> list[dict[str, Any]]:
+        """
+        Typeahead over the user's own conversations, by group name or by the
+        other participants' usernames and display names.
+
+        One query loads the user's conversations; they are few enough to rank
+        in process with the same index as profile suggestions (prefix matches,
+        then similar names, most recently active first).
+        """
+        other = aliased(ConversationParticipant)
         stmt = (
-            select(Conversation)
+            select(
+                Conversation.id,
+                Conversation.is_group,
+                Conversation.name,
+                Conversation.last_message_at,
+                Profile.username,
+                Profile.display_name,
+            )
             .join(
-                ConversationParticipant, ConversationParticipant.conversation_id == Conversation.id
+                ConversationParticipant,
+                and_(
+                    ConversationParticipant.conversation_id == Conversation.id,
+                    ConversationParticipant.user_id == user_id,
+                    ConversationParticipant.is_active,
+                ),
             )
-            .join(User, ConversationParticipant.user_id == User.id)
-            .where(
-                ConversationParticipant.user_id != user_id,  # Exclude self
-                or_(
-                    User.username.ilike(f"%{query}%"),
-                    User.display_name.ilike(f"%{query}%"),
-                    Conversation.name.ilike(f"%{query}%"),  # For group chats
+            .outerjoin(
+                other,
+                and_(
+                    other.conversation_id == Conversation.id,
+                    other.user_id != user_id,  # Exclude self
+                    other.is_active,
                 ),
             )
-            .distinct()
-            .limit(page_size)
-            .offset((page - 1) * page_size)
+            .outerjoin(Profile, Profile.user_id == other.user_id)
         )
-
         result = await self.db.execute(stmt)
-        conversations = result.scalars().all()
 
-        # Build simplified response
-        conversation_results = []
-        for conv in conversations:
-            conversation_results.append(
+        conversations: dict[uuid.UUID, dict[str, Any]] = {}
+        names: dict[uuid.UUID, list[str]] = defaultdict(list)
+        activity: dict[uuid.UUID, float] = {}
+        for row in result:
+            conversations.setdefault(
+                row.id,
                 {
-                    "id": str(conv.id),
-                    "is_group": conv.is_group,
-                    "name": conv.name,
-                    "last_message_at": conv.last_message_at.isoformat()
-                    if conv.last_message_at
+                    "id": str(row.id),
+                    "is_group": row.is_group,
+                    "name": row.name,
+                    "last_message_at": row.last_message_at.isoformat()
+                    if row.last_message_at
                     else None,
-                }
+                },
             )
+            names[row.id] += [n for n in (row.name, row.username, row.display_name) if n]
+            if row.last_message_at:
+                activity[row.id] = row.last_message_at.timestamp()
 
-        return conversation_results
+        index = TypeaheadIndex(
+            TypeaheadEntry(
+                key=conversation_id,
+                texts=tuple(names[conversation_id]),
+                weight=activity.get(conversation_id, 0.0),
+                payload=payload,
+            )
+            for conversation_id, payload in conversations.items()
+        )
+        return [entry.payload for entry in index.suggest(query, limit)]
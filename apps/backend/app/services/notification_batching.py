@@ -0,0 +1,201 @@
+"""
+Durable notification batching.
+
+Batches pending delivery live in Redis instead of process memory, so they
+survive restarts and every worker sees the same ones:
+
+- ``notifications:batches:open`` maps a (user, grouping key) slot to the
+  batch currently collecting for it: adding a notification is O(1).
+- Each batch has a metadata hash and a list of its notifications.
+- ``notifications:batches:due`` is the delay queue, batch ids scored by
+  delivery time. Reaching a count-based batch's size moves it to now.
+- Claiming due batches moves them, in one script, from the due queue to
+  ``notifications:batches:processing`` under a lease and closes their
+  slot, so exactly one worker gets each batch and later notifications
+  start a new one. A batch whose lease runs out (worker died before
+  acknowledging it) is claimed again; delivery is made idempotent by the
+  caller, so it is delivered once.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from typing import Any
+
+from redis.exceptions import RedisError
+
+from app.core.redis_client import redis_client
+from app.core.redis_keys import redis_keys
+
+logger = logging.getLogger(__name__)
+
+BATCH_LEASE_SECONDS = 60
+
+# KEYS: open slots, due queue.
+# ARGV: slot, new batch id, now, delivery time, item, meta prefix, items
+# prefix, user id, grouping key, strategy, max items (0 for no limit).
+# Returns {batch id, batch size}.
+_ADD_SCRIPT = """
+local id = redis.call('HGET', KEYS[1], ARGV[1])
+if not id then
+    id = ARGV[2]
+    redis.call('HSET', KEYS[1], ARGV[1], id)
+    redis.call('HSET', ARGV[6] .. id, 'batch_id', id, 'slot', ARGV[1], 'user_id', ARGV[8],
+        'grouping_key', ARGV[9], 'strategy', ARGV[10], 'created_at', ARGV[3],
+        'delivery_time', ARGV[4])
+    redis.call('ZADD', KEYS[2], ARGV[4], id)
+end
+local size = redis.call('RPUSH', ARGV[7] .. id, ARGV[5])
+if tonumber(ARGV[11]) > 0 and size >= tonumber(ARGV[11]) then
+    redis.call('ZADD', KEYS[2], 'XX', ARGV[3], id)
+end
+return {id, size}
+"""
+
+# KEYS: due queue, processing, open slots.
+# ARGV: now, lease expiry, limit, meta prefix, [batch id to claim now].
+# Returns the claimed batch ids, including any whose lease has run out.
+_CLAIM_SCRIPT = """
+local ids
+if ARGV[5] then
+    ids = {}
+    if redis.call('ZSCORE', KEYS[1], ARGV[5]) then ids = {ARGV[5]} end
+else
+    ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+end
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    local slot = redis.call('HGET', ARGV[4] .. id, 'slot')
+    if slot and redis.call('HGET', KEYS[3], slot) == id then
+        redis.call('HDEL', KEYS[3], slot)
+    end
+    redis.call('ZADD', KEYS[2], ARGV[2], id)
+end
+if not ARGV[5] then
+    local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+    for _, id in ipairs(stale) do
+        redis.call('ZADD', KEYS[2], ARGV[2], id)
+        table.insert(ids, id)
+    end
+end
+return ids
+"""
+
+
+def _str(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class NotificationBatchStore:
+    """Redis store and delay queue of notification batches"""
+
+    def __init__(self, lease_seconds: int = BATCH_LEASE_SECONDS):
+        self.lease_seconds = lease_seconds
+        self.open_key = redis_keys.notification_batches_open_key()
+        self.due_key = redis_keys.notification_batches_due_key()
+        self.processing_key = redis_keys.notification_batches_processing_key()
+        self.meta_prefix = redis_keys.notification_batch_key("")
+        self.items_prefix = redis_keys.notification_batch_items_key("")
+
+    @property
+    def client(self):
+        return redis_client.client if redis_client.connected else None
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    async def add(
+        self,
+        user_id: str,
+        grouping_key: str,
+        item: str,
+        new_batch_id: str,
+        delivery_time: datetime,
+        strategy: str,
+        max_items: int = 0,
+    ) -> tuple[str, int]:
+        """Append ``item`` to the user's open batch for ``grouping_key``, opening one if needed.
+
+        Returns the batch id and its size. ``max_items`` makes the batch due as
+        soon as it holds that many notifications.
+        """
+        batch_id, size = await self.client.eval(
+            _ADD_SCRIPT,
+            2,
+            self.open_key,
+            self.due_key,
+            f"{user_id}:{grouping_key}",
+            new_batch_id,
+            datetime.now(UTC).timestamp(),
+            delivery_time.timestamp(),
+            item,
+            self.meta_prefix,
+            self.items_prefix,
+            user_id,
+            grouping_key,
+            strategy,
+            max_items,
+        )
+        return _str(batch_id), int(size)
+
+    async def claim(self, limit: int = 100, batch_id: str | None = None) -> list[str]:
+        """Claim due batches (or one pending batch, due or not) for delivery."""
+        now = datetime.now(UTC).timestamp()
+        args = [now, now + self.lease_seconds, limit, self.meta_prefix]
+        if batch_id is not None:
+            args.append(batch_id)
+        ids = await self.client.eval(
+            _CLAIM_SCRIPT, 3, self.due_key, self.processing_key, self.open_key, *args
+        )
+        return [_str(i) for i in ids]
+
+    async def load(self, batch_ids: list[str]) -> list[tuple[dict[str, str], list[str]]]:
+        """Metadata and items of claimed batches, in one round trip"""
+        pipe = self.client.pipeline(transaction=False)
+        for batch_id in batch_ids:
+            pipe.hgetall(self.meta_prefix + batch_id)
+            pipe.lrange(self.items_prefix + batch_id, 0, -1)
+        results = await pipe.execute()
+        return [
+            ({_str(k): _str(v) for k, v in meta.items()}, [_str(i) for i in items])
+            for meta, items in zip(results[::2], results[1::2], strict=True)
+        ]
+
+    async def ack(self, batch_ids: Iterable[str]) -> None:
+        """Forget delivered batches."""
+        batch_ids = list(batch_ids)
+        if not batch_ids:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for batch_id in batch_ids:
+            pipe.delete(self.meta_prefix + batch_id, self.items_prefix + batch_id)
+        pipe.zrem(self.processing_key, *batch_ids)
+        await pipe.execute()
+
+    async def pending(self, limit: int = 100) -> tuple[int, list[dict[str, Any]]]:
+        """Number of batches waiting for delivery, and the next ``limit`` of them"""
+        if not self.available:
+            return 0, []
+        try:
+            total = await self.client.zcard(self.due_key)
+            batch_ids = [_str(i) for i in await self.client.zrange(self.due_key, 0, limit - 1)]
+            pipe = self.client.pipeline(transaction=False)
+            for batch_id in batch_ids:
+                pipe.hgetall(self.meta_prefix + batch_id)
+                pipe.llen(self.items_prefix + batch_id)
+            results = await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to read pending notification batches: {e}")
+            return 0, []
+        batches = []
+        for raw, size in zip(results[::2], results[1::2], strict=True):
+            meta = {_str(k): _str(v) for k, v in raw.items()}
+            if meta:
+                batches.append({**meta, "notification_count": int(size)})
+        return int(total), batches
+
+
+notification_batch_store = NotificationBatchStore()
@@ -0,0 +1,200 @@
+"""
+Write-through unread notification counters.
+
+Each user's unread count (not read, not dismissed, not expired) lives in
+Redis and is changed atomically by the writes that change it, so reading
+it is one round trip and no query. Two keys per user:
+
+- ``notifications:unread:{user_id}``: the counter.
+- ``notifications:unread_expiry:{user_id}``: the counted notifications
+  that have an ``expires_at``, scored by it. Reading the counter first
+  drops the entries whose time has passed and subtracts them, so
+  notifications leave the count when they expire, not when the cleanup
+  job deletes them.
+
+Counters are only ever adjusted while they exist. A missing counter (new
+user, Redis restart, TTL elapsed) is rebuilt from the database on the
+next read. Counters expire ``UNREAD_COUNTER_TTL`` after that rebuild,
+which reconciles any drift against the database at least that often.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from uuid import UUID
+
+from redis.exceptions import RedisError
+from sqlalchemy import and_, func, or_, select
+
+from app.core.redis_client import redis_client
+from app.core.redis_keys import redis_keys
+from app.models.notification_models import Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_COUNTER_TTL = 3600
+
+# KEYS: counter, expiry set. ARGV: now
+# Returns the count, or nil when the counter has to be rebuilt.
+_READ_SCRIPT = """
+local count = redis.call('GET', KEYS[1])
+if not count then return nil end
+local expired = redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+if expired > 0 then return redis.call('DECRBY', KEYS[1], expired) end
+return tonumber(count)
+"""
+
+# KEYS: counter, expiry set. ARGV: sign (1 or -1), count of notifications
+# without expiry, then (id, expires_at) pairs of those with one.
+# A notification with an expiry is only subtracted if it is still in the
+# set, i.e. has not already left the count by expiring.
+_ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+local delta = tonumber(ARGV[2])
+for i = 3, #ARGV, 2 do
+    if ARGV[1] == '1' then
+        delta = delta + redis.call('ZADD', KEYS[2], ARGV[i + 1], ARGV[i])
+    else
+        delta = delta + redis.call('ZREM', KEYS[2], ARGV[i])
+    end
+end
+if ARGV[1] == '1' and #ARGV > 2 then
+    redis.call('EXPIRE', KEYS[2], math.max(redis.call('TTL', KEYS[1]), 1))
+end
+return redis.call('INCRBY', KEYS[1], tonumber(ARGV[1]) * delta)
+"""
+
+# KEYS: counter, expiry set. ARGV: ttl, count, then (id, expires_at) pairs
+_REBUILD_SCRIPT = """
+redis.call('DEL', KEYS[2])
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+for i = 3, #ARGV, 2 do
+    redis.call('ZADD', KEYS[2], ARGV[i + 1], ARGV[i])
+end
+if #ARGV > 2 then redis.call('EXPIRE', KEYS[2], ARGV[1]) end
+return tonumber(ARGV[2])
+"""
+
+
+def _unread(user_id: str, now: datetime):
+    return and_(
+        Notification.user_id == UUID(user_id),
+        Notification.is_read.is_(False),
+        Notification.is_dismissed.is_(False),
+        or_(Notification.expires_at.is_(None), Notification.expires_at > now),
+    )
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite hands back naive datetimes; they are stored in UTC
+    return (value if value.tzinfo else value.replace(tzinfo=UTC)).timestamp()
+
+
+def _args(notifications: Iterable[Notification]) -> list:
+    """Count of notifications without expiry, then (id, expires_at) pairs"""
+    plain, expiring = 0, []
+    for notification in notifications:
+        if notification.expires_at is None:
+            plain += 1
+        else:
+            expiring += [str(notification.id), _timestamp(notification.expires_at)]
+    return [plain, *expiring]
+
+
+class UnreadCounters:
+    """Per-user unread notification counters in Redis"""
+
+    def __init__(self, ttl: int = UNREAD_COUNTER_TTL):
+        self.ttl = ttl
+
+    @property
+    def client(self):
+        return redis_client.client if redis_client.connected else None
+
+    def _keys(self, user_id: str) -> tuple[str, str]:
+        return (
+            redis_keys.notification_unread_count_key(user_id),
+            redis_keys.notification_unread_expiry_key(user_id),
+        )
+
+    async def get(self, user_id: str) -> int | None:
+        """The user's count, or None if it has to be rebuilt (or Redis is down)."""
+        if self.client is None:
+            return None
+        try:
+            count = await self.client.eval(
+                _READ_SCRIPT, 2, *self._keys(user_id), datetime.now(UTC).timestamp()
+            )
+        except RedisError as e:
+            logger.warning(f"Failed to read unread counter for {user_id}: {e}")
+            return None
+        return None if count is None else int(count)
+
+    async def rebuild(self, session, user_id: str) -> int:
+        """Recount the user's unread notifications in the database and store the count."""
+        now = datetime.now(UTC)
+        count = (
+            await session.execute(select(func.count(Notification.id)).where(_unread(user_id, now)))
+        ).scalar() or 0
+        expiring = (
+            await session.execute(
+                select(Notification.id, Notification.expires_at).where(
+                    _unread(user_id, now), Notification.expires_at.is_not(None)
+                )
+            )
+        ).all()
+        if self.client is not None:
+            args = [arg for row in expiring for arg in (str(row[0]), _timestamp(row[1]))]
+            try:
+                await self.client.eval(
+                    _REBUILD_SCRIPT, 2, *self._keys(user_id), self.ttl, count, *args
+                )
+            except RedisError as e:
+                logger.warning(f"Failed to store unread counter for {user_id}: {e}")
+        return count
+
+    async def adjust(
+        self, updates: dict[str, tuple[int, list[Notification]]]
+    ) -> dict[str, int | None]:
+        """
+        Add (sign 1) or remove (sign -1) notifications from users' counts in
+        one pipeline; returns the new counts, None for counters not in Redis.
+        """
+        if self.client is None or not updates:
+            return dict.fromkeys(updates)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for user_id, (sign, notifications) in updates.items():
+                pipe.eval(_ADJUST_SCRIPT, 2, *self._keys(user_id), sign, *_args(notifications))
+            counts = await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to update unread counters for {len(updates)} users: {e}")
+            return dict.fromkeys(updates)
+        return {
+            user_id: None if count is None else int(count)
+            for user_id, count in zip(updates, counts, strict=True)
+        }
+
+    async def added(self, notifications: Iterable[Notification]) -> dict[str, int | None]:
+        """Count newly created notifications; returns the new counts by user."""
+        return await self.adjust(
+            {user_id: (1, group) for user_id, group in _by_user(notifications).items()}
+        )
+
+    async def removed(self, notifications: Iterable[Notification]) -> dict[str, int | None]:
+        """Uncount notifications that were unread and are now read or dismissed."""
+        return await self.adjust(
+            {user_id: (-1, group) for user_id, group in _by_user(notifications).items()}
+        )
+
+
+def _by_user(notifications: Iterable[Notification]) -> dict[str, list[Notification]]:
+    groups: dict[str, list[Notification]] = {}
+    for notification in notifications:
+        groups.setdefault(str(notification.user_id), []).append(notification)
+    return groups
+
+
+unread_counters = UnreadCounters()
@@ -0,0 +1,284 @@
+"""
+Scheduled notification delivery.
+
+Scheduled notifications are persisted in Redis, not held by sleeping
+tasks, so they survive restarts and any worker can deliver them:
+
+- ``notifications:scheduled:items`` holds each entry (due time and
+  payload) by schedule id.
+- ``notifications:scheduled:due`` is the delay queue, ids scored by due
+  time. It can hold any number of entries; only the next
+  ``lookahead`` seconds of it are ever in process memory.
+
+Each worker polls the queue every ``poll_interval`` seconds and claims
+the entries due within the lookahead, up to ``max_held`` at a time. The
+claim moves them to ``notifications:scheduled:processing`` under a lease
+that runs until ``lease`` seconds after their due time. The worker keeps
+the claimed entries in a hierarchical timing wheel (app.core.timing_wheel) that fires
+them on the tick they are due. Entries are removed from Redis once
+delivered. If a worker dies, its leases run out and another worker claims
+the entries again, so delivery is at least once. Stopping the scheduler
+puts the entries it still holds back on the queue.
+
+The lag between due time and delivery is recorded for every delivery.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Any
+
+from redis.exceptions import RedisError
+
+from app.core.performance_monitor import performance_metrics
+from app.core.redis_client import redis_client
+from app.core.redis_keys import redis_keys
+from app.core.timing_wheel import TimingWheel
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_LOOKAHEAD_SECONDS = 60
+SCHEDULE_LEASE_SECONDS = 60
+
+# KEYS: due queue, processing. ARGV: horizon, now, lease, limit
+# Returns the ids claimed, including any whose lease has run out.
+_CLAIM_SCRIPT = """
+local claimed = {}
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[4])
+for i = 1, #due, 2 do
+    local lease = math.max(tonumber(due[i + 1]), tonumber(ARGV[2])) + tonumber(ARGV[3])
+    redis.call('ZREM', KEYS[1], due[i])
+    redis.call('ZADD', KEYS[2], lease, due[i])
+    table.insert(claimed, due[i])
+end
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[2], 'LIMIT', 0, ARGV[4])
+for _, id in ipairs(stale) do
+    redis.call('ZADD', KEYS[2], tonumber(ARGV[2]) + tonumber(ARGV[3]), id)
+    table.insert(claimed, id)
+end
+return claimed
+"""
+
+
+def _str(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class SchedulerMetrics:
+    """Delivery counts and the lag between due time and delivery"""
+
+    def __init__(self, window: int = 1000):
+        self.delivered = 0
+        self.failed = 0
+        self.max_lag = 0.0
+        self.lags: deque[float] = deque(maxlen=window)
+
+    def record(self, lag: float, success: bool = True):
+        if success:
+            self.delivered += 1
+        else:
+            self.failed += 1
+        self.max_lag = max(self.max_lag, lag)
+        self.lags.append(lag)
+        performance_metrics.record("scheduled_notification_lag", lag, success)
+
+    def summary(self) -> dict[str, Any]:
+        lags = sorted(self.lags)
+
+        def percentile(p: float) -> float | None:
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))], 3) if lags else None
+
+        return {
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "lag_seconds": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(self.max_lag, 3),
+                "recent": len(lags),
+            },
+        }
+
+
+class NotificationScheduler:
+    """Redis delay queue of scheduled notifications, fired from a timing wheel"""
+
+    def __init__(
+        self,
+        deliver: Callable[[str], Awaitable[Any]],
+        tick: float = 0.1,
+        poll_interval: float = 1.0,
+        lookahead: float = SCHEDULE_LOOKAHEAD_SECONDS,
+        lease: float = SCHEDULE_LEASE_SECONDS,
+        claim_limit: int = 1000,
+        max_held: int = 100_000,
+        concurrency: int = 20,
+    ):
+        self.deliver = deliver
+        self.tick = tick
+        self.poll_interval = poll_interval
+        self.lookahead = lookahead
+        self.lease = lease
+        self.claim_limit = claim_limit
+        self.max_held = max_held
+        self.concurrency = concurrency
+        self.due_key = redis_keys.notification_scheduled_due_key()
+        self.processing_key = redis_keys.notification_scheduled_processing_key()
+        self.items_key = redis_keys.notification_scheduled_items_key()
+        self.metrics = SchedulerMetrics()
+        self.wheel = TimingWheel(time.time(), tick=tick)
+        self._held: set[str] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def client(self):
+        return redis_client.client if redis_client.connected else None
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    async def schedule(self, payload: str, due: datetime) -> str:
+        """Persist ``payload`` for delivery at ``due``; returns the schedule id."""
+        schedule_id = str(uuid.uuid4())
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(
+            self.items_key, schedule_id, json.dumps({"due": due.timestamp(), "payload": payload})
+        )
+        pipe.zadd(self.due_key, {schedule_id: due.timestamp()})
+        await pipe.execute()
+        return schedule_id
+
+    def start(self):
+        """Start polling and firing in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop, and put the entries still waiting in the wheel back on the queue"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.release()
+
+    async def _run(self):
+        next_poll = 0.0
+        while True:
+            try:
+                now = time.time()
+                if now >= next_poll:
+                    next_poll = now + self.poll_interval
+                    await self.poll(now)
+                await self.fire(now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification scheduler error: {e}")
+            await asyncio.sleep(self.tick)
+
+    async def poll(self, now: float | None = None) -> int:
+        """Claim the entries due within the lookahead into the wheel; returns how many"""
+        if not self.available:
+            return 0
+        now = time.time() if now is None else now
+        if not len(self.wheel):
+            # Nothing to fire: just move the hand up to now
+            self.wheel.advance(now)
+        total = 0
+        while True:
+            ids = [
+                _str(i)
+                for i in await self.client.eval(
+                    _CLAIM_SCRIPT,
+                    2,
+                    self.due_key,
+                    self.processing_key,
+                    now + self.lookahead,
+                    now,
+                    self.lease,
+                    self.claim_limit,
+                )
+            ]
+            new = [i for i in ids if i not in self._held]
+            if new:
+                for schedule_id, raw in zip(
+                    new, await self.client.hmget(self.items_key, new), strict=True
+                ):
+                    if raw is None:
+                        # Delivered by another worker since its lease ran out
+                        await self.client.zrem(self.processing_key, schedule_id)
+                        continue
+                    entry = json.loads(raw)
+                    self._held.add(schedule_id)
+                    self.wheel.add(entry["due"], (schedule_id, entry["due"], entry["payload"]))
+                    total += 1
+            if len(ids) < self.claim_limit or len(self._held) >= self.max_held:
+                return total
+
+    async def fire(self, now: float | None = None) -> int:
+        """Deliver the entries that are due; returns how many were delivered"""
+        now = time.time() if now is None else now
+        due = self.wheel.advance(now)
+        started = time.monotonic()
+        delivered = []
+        for start in range(0, len(due), self.concurrency):
+            chunk = due[start : start + self.concurrency]
+            results = await asyncio.gather(
+                *(self.deliver(payload) for _, _, payload in chunk), return_exceptions=True
+            )
+            finished = now + time.monotonic() - started
+            for (schedule_id, due_at, _), result in zip(chunk, results, strict=True):
+                self._held.discard(schedule_id)
+                success = not isinstance(result, BaseException)
+                self.metrics.record(max(0.0, finished - due_at), success)
+                if success:
+                    delivered.append(schedule_id)
+                else:
+                    # Left under lease: claimed again once it runs out
+                    logger.error(
+                        f"Failed to deliver scheduled notification {schedule_id}: {result}"
+                    )
+        if delivered and self.available:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.hdel(self.items_key, *delivered)
+            pipe.zrem(self.processing_key, *delivered)
+            await pipe.execute()
+        return len(delivered)
+
+    async def release(self):
+        """Put the entries held in the wheel back on the queue for other workers"""
+        held = self.wheel.drain()
+        self._held.clear()
+        if not held or not self.available:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.zadd(self.due_key, {schedule_id: due for schedule_id, due, _ in held})
+            pipe.zrem(self.processing_key, *(schedule_id for schedule_id, _, _ in held))
+            await pipe.execute()
+        except RedisError as e:
+            # Their leases run out and they are claimed again anyway
+            logger.warning(f"Failed to release {len(held)} scheduled notifications: {e}")
+
+    async def get_metrics(self) -> dict[str, Any]:
+        """Delivery and lag metrics, with the queue depth"""
+        queued = None
+        if self.available:
+            try:
+                queued = await self.client.zcard(self.due_key)
+            except RedisError as e:
+                logger.warning(f"Failed to read scheduled notification queue: {e}")
+        return {**self.metrics.summary(), "queued": queued, "in_wheel": len(self.wheel)}
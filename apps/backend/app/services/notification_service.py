@@ -2,22 +2,24 @@
 import asyncio
 import logging
 import uuid
-from collections.abc import Callable
+from collections import Counter
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import Any
 from uuid import UUID
 
-from sqlalchemy import and_, desc, func, or_, select
+from sqlalchemy import and_, delete, desc, func, insert, or_, select, update
 
 from app.core.database import db_manager
-from app.core.redis_client import redis_client
+from app.core.pagination import after, decode_cursor, order_by
 from app.models.notification_models import (
     Notification,
     NotificationPreference,
     NotificationPriority,
     NotificationType,
 )
+from app.services.notification_counters import unread_counters
 
 logger = logging.getLogger(__name__)
 
@@ -66,7 +68,42 @@ class NotificationEvent:
     CLICKED = "notification.clicked"
     DELIVERED = "notification.delivered"
     EXPIRED = "notification.expired"
+    BATCH_CREATED = "notification.batch_created"
     BATCH_PROCESSED = "notification.batch_processed"
+    UNREAD_COUNTS = "notification.unread_counts"
+
+
+def _as_uuid(value: str | UUID | None) -> UUID | None:
+    if value is None or isinstance(value, UUID):
+        return value
+    return UUID(str(value))
+
+
+def _notification_row(data: NotificationData, batch_id: UUID, now: datetime) -> dict[str, Any]:
+    """Column values of a bulk-inserted notification, delivered in-app on insert"""
+    return {
+        "id": uuid.uuid4(),
+        "user_id": _as_uuid(data.user_id),
+        "type": data.type.value,
+        "priority": data.priority.value,
+        "category": data.category,
+        "title": data.title,
+        "message": data.message,
+        "payload": data.payload,
+        "related_entity_type": data.related_entity_type,
+        "related_entity_id": _as_uuid(data.related_entity_id),
+        "expires_at": data.expires_at,
+        "batch_id": batch_id,
+        "created_at": now,
+        "delivered_at": now,
+        "is_read": False,
+        "is_delivered": True,
+        "is_dismissed": False,
+        "is_archived": False,
+        "email_sent": False,
+        "push_sent": False,
+        "in_app_sent": True,
+    }
 
 
 class NotificationService:
@@ -83,14 +120,17 @@ class NotificationService:
         self.event_handlers: dict[str, list[Callable]] = {}
         self.batch_processing_enabled = True
         self.max_batch_size = 100
+        self.bulk_chunk_size = 1000
         self.delivery_retry_attempts = 3
         self.cleanup_expired_after_days = 30
+        self.expiry_sweep_max_batches = 50
 
     async def create_notification(
         self,
         notification_data: NotificationData,
         batch_id: str | None = None,
         skip_preferences: bool = False,
+        raise_errors: bool = False,
     ) -> Notification | None:
         """
         Create a new notification with preference checking
@@ -99,6 +139,7 @@ class NotificationService:
             notification_data: Notification data to create
             batch_id: Optional batch ID for grouping
             skip_preferences: Skip user preference checking (for system notifications)
+            raise_errors: Re-raise failures instead of returning None (for callers that retry)
 
         Returns:
             Created notification or None if blocked by preferences
@@ -118,8 +159,8 @@ class NotificationService:
 
                 # Create notification
                 notification = Notification(
-                    id=str(uuid.uuid4()),
-                    user_id=notification_data.user_id,
+                    id=uuid.uuid4(),
+                    user_id=_as_uuid(notification_data.user_id),
                     type=notification_data.type.value,
                     priority=notification_data.priority.value,
                     category=notification_data.category,
@@ -127,9 +168,9 @@ class NotificationService:
                     message=notification_data.message,
                     payload=notification_data.payload,
                     related_entity_type=notification_data.related_entity_type,
-                    related_entity_id=notification_data.related_entity_id,
+                    related_entity_id=_as_uuid(notification_data.related_entity_id),
                     expires_at=notification_data.expires_at,
-                    batch_id=batch_id,
+                    batch_id=_as_uuid(batch_id),
                     email_sent=False,
                     push_sent=False,
                     in_app_sent=True,  # Always deliver in-app by default
@@ -141,6 +182,7 @@ class NotificationService:
 
                 # Emit event
                 await self._emit_event(NotificationEvent.CREATED, notification)
+                await self._count_unread(unread_counters.added([notification]))
 
                 # Schedule delivery if needed
                 asyncio.create_task(self._deliver_notification(notification, notification_data))
@@ -152,32 +194,62 @@ class NotificationService:
 
         except Exception as e:
             logger.error(f"Failed to create notification: {e}")
+            if raise_errors:
+                raise
             return None
 
     async def create_batch_notifications(
-        self, notifications_data: list[NotificationData], batch_id: str | None = None
+        self,
+        notifications_data: list[NotificationData],
+        batch_id: str | None = None,
+        skip_preferences: bool = False,
     ) -> list[Notification]:
-        """Create multiple notifications in a batch"""
+        """
+        Create multiple notifications in a batch
+
+        Set-based: the recipients' preferences are loaded up front, then each
+        chunk of ``bulk_chunk_size`` rows is one multi-row INSERT and one
+        commit, followed by a single BATCH_CREATED event carrying the chunk.
+        In-app delivery is recorded in the INSERT itself.
+        """
         if not batch_id:
             batch_id = str(uuid.uuid4())
+        batch_uuid = _as_uuid(batch_id)
 
         created_notifications = []
+        try:
+            async for session in db_manager.get_session():
+                if not skip_preferences:
+                    preferences = await self._get_preferences_for_users(
+                        session, {str(data.user_id) for data in notifications_data}
+                    )
+                    notifications_data = [
+                        data
+                        for data in notifications_data
+                        if await self._should_deliver_notification(
+                            preferences.get(str(data.user_id)), data
+                        )
+                    ]
+
+                for i in range(0, len(notifications_data), self.bulk_chunk_size):
+                    chunk = notifications_data[i : i + self.bulk_chunk_size]
+                    now = datetime.now(UTC)
+                    rows = [_notification_row(data, batch_uuid, now) for data in chunk]
+                    try:
+                        await session.execute(insert(Notification), rows)
+                        await session.commit()
+                    except Exception as e:
+                        await session.rollback()
+                        logger.error(f"Batch notification chunk of {len(rows)} failed: {e}")
+                        continue
+
+                    notifications = [Notification(**row) for row in rows]
+                    created_notifications.extend(notifications)
+                    await self._emit_event(NotificationEvent.BATCH_CREATED, notifications)
+                    await self._count_unread(unread_counters.added(notifications))
 
-        # Process in chunks to avoid memory issues
-        for i in range(0, len(notifications_data), self.max_batch_size):
-            chunk = notifications_data[i : i + self.max_batch_size]
-
-            # Create notifications in parallel
-            tasks = [self.create_notification(data, batch_id=batch_id) for data in chunk]
-
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Filter successful results
-            for result in results:
-                if isinstance(result, Notification):
-                    created_notifications.append(result)
-                elif isinstance(result, Exception):
-                    logger.error(f"Batch notification creation failed: {result}")
+        except Exception as e:
+            logger.error(f"Batch notification creation failed: {e}")
 
         # Emit batch processed event
         await self._emit_event(
@@ -203,9 +275,16 @@ class NotificationService:
         notification_type: str | None = None,
         category: str | None = None,
         include_dismissed: bool = False,
+        cursor: str | None = None,
     ) -> list[Notification]:
-        """Get notifications for a user with filtering"""
+        """
+        Get notifications for a user with filtering, newest first.
+
+        ``cursor`` (from ``encode_cursor(created_at, id)`` of the last
+        notification served) pages by keyset and takes precedence over ``offset``.
+        """
         user_id_str = str(user_id)  # Convert UUID to string
+        key = decode_cursor(cursor, datetime, UUID) if cursor else None
         try:
             async for session in db_manager.get_session(read_only=True):
                 query = select(Notification).where(Notification.user_id == user_id_str)
@@ -232,10 +311,15 @@ class NotificationService:
                 )
 
                 # Order by created_at descending
-                query = query.order_by(desc(Notification.created_at))
+                order = [(Notification.created_at, True), (Notification.id, True)]
+                query = query.order_by(*order_by(order))
 
                 # Apply pagination
-                query = query.offset(offset).limit(limit)
+                if key:
+                    query = query.where(after(order, key))
+                else:
+                    query = query.offset(offset)
+                query = query.limit(limit)
 
                 result = await session.execute(query)
                 notifications = result.scalars().all()
@@ -247,62 +331,86 @@ class NotificationService:
             return []
 
     async def get_unread_count(self, user_id: str | UUID) -> int:
-        """Get count of unread notifications for a user"""
+        """
+        Get count of unread notifications for a user
+
+        Served from the write-through counter in Redis; the database is only
+        counted when the counter is missing, which also rebuilds it.
+        """
         user_id_str = str(user_id)  # Convert UUID to string
 
-        # Try to get from cache first
-        cached_count = await redis_client.get_cached_unread_count(user_id_str)
-        if cached_count is not None:
-            return cached_count
+        count = await unread_counters.get(user_id_str)
+        if count is not None:
+            return count
 
         try:
-            async for session in db_manager.get_session(read_only=True):
-                result = await session.execute(
-                    select(func.count(Notification.id)).where(
-                        and_(
-                            Notification.user_id == user_id_str,
-                            Notification.is_read.is_(False),
-                            Notification.is_dismissed.is_(False),
-                            or_(
-                                Notification.expires_at.is_(None),
-                                Notification.expires_at > datetime.now(UTC),
-                            ),
-                        )
-                    )
-                )
-                count = result.scalar() or 0
-
-                # Cache the count for 5 minutes
-                await redis_client.cache_unread_count(user_id_str, count, ttl=300)
-
-                return count
+            async for session in db_manager.get_session():
+                return await unread_counters.rebuild(session, user_id_str)
 
         except Exception as e:
             logger.error(f"Failed to get unread count: {e}")
             return 0
 
+    async def _update_one(
+        self, session, notification_id: str, owner_id: UUID | None, *where, **values
+    ) -> Notification | None:
+        """
+        UPDATE one notification where ``where`` holds; returns it as updated,
+        or None if the conditions did not hold when the row was written.
+        """
+        conditions = [Notification.id == _as_uuid(notification_id), *where]
+        if owner_id:
+            conditions.append(Notification.user_id == owner_id)
+        result = await session.execute(
+            update(Notification)
+            .where(*conditions)
+            .values(**values)
+            .returning(Notification)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+    async def _leave_unread(
+        self, session, notification_id: str, owner_id: UUID | None, now: datetime
+    ) -> Notification | None:
+        """
+        Mark a notification read if it still counts as unread (not read, not
+        dismissed). The UPDATE checks that itself, so of concurrent requests
+        exactly one gets the notification back and uncounts it.
+        """
+        return await self._update_one(
+            session,
+            notification_id,
+            owner_id,
+            Notification.is_read.is_(False),
+            Notification.is_dismissed.is_(False),
+            is_read=True,
+            read_at=now,
+        )
+
+    async def _exists(self, session, notification_id: str, owner_id: UUID | None) -> bool:
+        query = select(Notification.id).where(Notification.id == _as_uuid(notification_id))
+        if owner_id:
+            query = query.where(Notification.user_id == owner_id)
+        return (await session.execute(query)).first() is not None
+
     async def mark_as_read(self, notification_id: str, user_id: str | UUID | None = None) -> bool:
         """Mark a notification as read"""
-        user_id_str = str(user_id) if user_id else None  # Convert UUID to string
+        owner_id = _as_uuid(user_id) if user_id else None
         try:
             async for session in db_manager.get_session():
-                query = select(Notification).where(Notification.id == notification_id)
-
-                if user_id_str:
-                    query = query.where(Notification.user_id == user_id_str)
-
-                result = await session.execute(query)
-                notification = result.scalar_one_or_none()
-
+                notification = await self._leave_unread(
+                    session, notification_id, owner_id, datetime.now(UTC)
+                )
                 if not notification:
-                    return False
+                    # Already read (or dismissed), or not this user's
+                    return await self._exists(session, notification_id, owner_id)
 
-                if notification and not notification.is_read:
-                    notification.mark_as_read()
-                    await session.commit()
+                await session.commit()
 
-                    # Emit event
-                    await self._emit_event(NotificationEvent.READ, notification)
+                # Emit event
+                await self._emit_event(NotificationEvent.READ, notification)
+                await self._count_unread(unread_counters.removed([notification]))
 
                 return True
 
@@ -311,31 +419,56 @@ class NotificationService:
             return False
 
     async def mark_all_as_read(self, user_id: str | UUID) -> int:
-        """Mark all notifications as read for a user"""
-        user_id_str = str(user_id)  # Convert UUID to string
+        """
+        Mark all notifications as read for a user
+
+        One UPDATE ... RETURNING per ``bulk_chunk_size`` rows, each committed
+        on its own so row locks are held for a bounded time; nothing is
+        loaded into the session. Emits a single batch READ event.
+        """
+        owner_id = _as_uuid(user_id)
         try:
             async for session in db_manager.get_session():
-                # Get unread notifications
-                result = await session.execute(
-                    select(Notification).where(
-                        and_(Notification.user_id == user_id_str, Notification.is_read.is_(False))
+                count = 0
+                counts: dict[str, int | None] = {}
+                while True:
+                    unread = (
+                        select(Notification.id)
+                        .where(Notification.user_id == owner_id, Notification.is_read.is_(False))
+                        .limit(self.bulk_chunk_size)
                     )
-                )
-                notifications = result.scalars().all()
+                    result = await session.execute(
+                        update(Notification)
+                        .where(
+                            Notification.id.in_(unread.scalar_subquery()),
+                            # Read by a concurrent request since the subquery picked it
+                            Notification.is_read.is_(False),
+                        )
+                        .values(is_read=True, read_at=datetime.now(UTC))
+                        .returning(
+                            Notification.id,
+                            Notification.user_id,
+                            Notification.expires_at,
+                            Notification.is_dismissed,
+                        )
+                    )
+                    rows = result.all()
+                    await session.commit()
 
-                # Mark as read
-                count = 0
-                for notification in notifications:
-                    notification.mark_as_read()
-                    count += 1
+                    count += len(rows)
+                    if rows:
+                        counts = await unread_counters.removed(
+                            row for row in rows if not row.is_dismissed
+                        )
+                    if len(rows) < self.bulk_chunk_size:
+                        break
 
                 if count > 0:
-                    await session.commit()
-
                     # Emit batch read event
                     await self._emit_event(
                         NotificationEvent.READ, {"user_id": user_id, "count": count, "batch": True}
                     )
+                    await self._emit_event(NotificationEvent.UNREAD_COUNTS, counts)
 
                 return count
 
@@ -347,26 +480,30 @@ class NotificationService:
         self, notification_id: str, user_id: str | UUID | None = None
     ) -> bool:
         """Dismiss a notification"""
-        user_id_str = str(user_id) if user_id else None  # Convert UUID to string
+        owner_id = _as_uuid(user_id) if user_id else None
         try:
             async for session in db_manager.get_session():
-                query = select(Notification).where(Notification.id == notification_id)
-
-                if user_id_str:
-                    query = query.where(Notification.user_id == user_id_str)
-
-                result = await session.execute(query)
-                notification = result.scalar_one_or_none()
-
+                now = datetime.now(UTC)
+                uncounted = await self._leave_unread(session, notification_id, owner_id, now)
+                notification = await self._update_one(
+                    session,
+                    notification_id,
+                    owner_id,
+                    Notification.is_dismissed.is_(False),
+                    is_dismissed=True,
+                    dismissed_at=now,
+                    is_read=True,
+                    read_at=func.coalesce(Notification.read_at, now),
+                )
                 if not notification:
-                    return False
+                    return await self._exists(session, notification_id, owner_id)
 
-                if notification and not notification.is_dismissed:
-                    notification.dismiss()
-                    await session.commit()
+                await session.commit()
 
-                    # Emit event
-                    await self._emit_event(NotificationEvent.DISMISSED, notification)
+                # Emit event
+                await self._emit_event(NotificationEvent.DISMISSED, notification)
+                if uncounted:
+                    await self._count_unread(unread_counters.removed([notification]))
 
                 return True
 
@@ -378,25 +515,28 @@ class NotificationService:
         self, notification_id: str, user_id: str | UUID | None = None
     ) -> bool:
         """Record a notification click"""
-        user_id_str = str(user_id) if user_id else None  # Convert UUID to string
+        owner_id = _as_uuid(user_id) if user_id else None
         try:
             async for session in db_manager.get_session():
-                query = select(Notification).where(Notification.id == notification_id)
-
-                if user_id_str:
-                    query = query.where(Notification.user_id == user_id_str)
-
-                result = await session.execute(query)
-                notification = result.scalar_one_or_none()
-
+                now = datetime.now(UTC)
+                uncounted = await self._leave_unread(session, notification_id, owner_id, now)
+                notification = await self._update_one(
+                    session,
+                    notification_id,
+                    owner_id,
+                    clicked_at=now,
+                    is_read=True,
+                    read_at=func.coalesce(Notification.read_at, now),
+                )
                 if not notification:
                     return False
 
-                notification.mark_as_clicked()
                 await session.commit()
 
                 # Emit event
                 await self._emit_event(NotificationEvent.CLICKED, notification)
+                if uncounted:
+                    await self._count_unread(unread_counters.removed([notification]))
 
                 return True
 
@@ -524,30 +664,60 @@ class NotificationService:
                 oldest_unread=None,
             )
 
-    async def cleanup_expired_notifications(self) -> int:
-        """Clean up expired notifications"""
+    async def cleanup_expired_notifications(self, max_batches: int | None = None) -> int:
+        """
+        Clean up expired notifications
+
+        Deletes the longest-expired rows first, ``bulk_chunk_size`` at a time
+        through the expires_at index, committing and emitting one EXPIRED
+        summary per chunk. ``max_batches`` bounds a run, so the scheduled
+        sweeper makes steady incremental progress instead of one long scan.
+        Unread counters need no update: expired notifications already left
+        them when they expired.
+        """
         try:
             async for session in db_manager.get_session():
-                # Find expired notifications
-                result = await session.execute(
-                    select(Notification).where(
-                        and_(
-                            Notification.expires_at.isnot(None),
+                count = 0
+                batches = 0
+                while max_batches is None or batches < max_batches:
+                    batches += 1
+                    result = await session.execute(
+                        select(Notification.id)
+                        .where(
+                            Notification.expires_at.is_not(None),
                             Notification.expires_at <= datetime.now(UTC),
                         )
+                        .order_by(Notification.expires_at)
+                        .limit(self.bulk_chunk_size)
                     )
-                )
-                expired_notifications = result.scalars().all()
-
-                count = len(expired_notifications)
+                    ids = list(result.scalars())
+                    if not ids:
+                        break
+
+                    # Replies outlive their expired parent, as with ORM deletes
+                    await session.execute(
+                        update(Notification)
+                        .where(Notification.parent_notification_id.in_(ids))
+                        .values(parent_notification_id=None)
+                    )
+                    result = await session.execute(
+                        delete(Notification)
+                        .where(Notification.id.in_(ids))
+                        .returning(Notification.user_id)
+                    )
+                    by_user = Counter(str(user_id) for user_id in result.scalars())
+                    await session.commit()
 
-                # Delete expired notifications
-                for notification in expired_notifications:
-                    await session.delete(notification)
-                    await self._emit_event(NotificationEvent.EXPIRED, notification)
+                    deleted = sum(by_user.values())
+                    count += deleted
+                    await self._emit_event(
+                        NotificationEvent.EXPIRED,
+                        {"count": deleted, "by_user": dict(by_user), "batch": True},
+                    )
+                    if len(ids) < self.bulk_chunk_size:
+                        break
 
                 if count > 0:
-                    await session.commit()
                     logger.info(f"Cleaned up {count} expired notifications")
 
                 return count
@@ -560,13 +730,31 @@ class NotificationService:
         """Get user notification preferences"""
         try:
             result = await session.execute(
-                select(NotificationPreference).where(NotificationPreference.user_id == user_id)
+                select(NotificationPreference).where(
+                    NotificationPreference.user_id == _as_uuid(user_id)
+                )
             )
             return result.scalar_one_or_none()
         except Exception as e:
             logger.error(f"Failed to get user preferences: {e}")
             return None
 
+    async def _get_preferences_for_users(
+        self, session, user_ids: set[str]
+    ) -> dict[str, NotificationPreference]:
+        """Preferences of many users by user id, in IN-list slices of ``bulk_chunk_size``"""
+        preferences = {}
+        ids = [_as_uuid(user_id) for user_id in user_ids]
+        for i in range(0, len(ids), self.bulk_chunk_size):
+            result = await session.execute(
+                select(NotificationPreference).where(
+                    NotificationPreference.user_id.in_(ids[i : i + self.bulk_chunk_size])
+                )
+            )
+            for preference in result.scalars():
+                preferences[str(preference.user_id)] = preference
+        return preferences
+
     async def _should_deliver_notification(
         self, preferences: NotificationPreference | None, notification_data: NotificationData
     ) -> bool:
@@ -611,6 +799,17 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Failed to deliver notification {notification.id}: {e}")
 
+    async def track_created(self, notifications: list[Notification]) -> None:
+        """Count notifications inserted outside this service (e.g. by follows) as unread"""
+        await self._count_unread(unread_counters.added(notifications))
+
+    async def _count_unread(self, counts: Awaitable[dict[str, int | None]]) -> None:
+        """Emit the unread counts a write produced; None means the counter needs a rebuild"""
+        try:
+            await self._emit_event(NotificationEvent.UNREAD_COUNTS, await counts)
+        except Exception as e:
+            logger.error(f"Failed to update unread counters: {e}")
+
     async def _emit_event(self, event_type: str, data: Any) -> None:
         """Emit notification events to registered handlers"""
         handlers = self.event_handlers.get(event_type, [])
@@ -0,0 +1,159 @@
+"""
+Portfolio valuation.
+
+``PortfolioBook`` keeps a portfolio's quantities, cost bases and latest
+prices in numpy arrays, so valuing hundreds of positions is a handful of
+vector operations. A price tick only touches the rows of the symbols that
+moved: ``reprice`` updates them and adjusts the running totals by their
+change, which is what the price WebSocket pushes to portfolio subscribers.
+
+``PortfolioValuationService`` prices every symbol of a portfolio with one
+``SmartPriceService.get_batch_prices`` call (one cache round trip, one
+CoinGecko request for whatever cryptos are not cached).
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.db import run_in_session
+from app.db.models import PortfolioPosition, User
+from app.services.smart_price_service import SmartPriceService
+
+logger = logging.getLogger(__name__)
+
+
+def _or_none(values: np.ndarray) -> list[float | None]:
+    return [None if v != v else v for v in values.tolist()]  # NaN -> None
+
+
+class PortfolioBook:
+    """Positions valued at the latest known price of their symbol"""
+
+    def __init__(self, positions: Iterable[PortfolioPosition]):
+        positions = list(positions)
+        self.ids = [p.id for p in positions]
+        self.symbols = [p.symbol for p in positions]
+        self.qty = np.array([p.qty for p in positions], dtype=np.float64)
+        self.cost_basis = np.array([p.cost_basis for p in positions], dtype=np.float64)
+        self.cost_value = self.qty * self.cost_basis
+        self.price = np.full(len(positions), np.nan)
+        self.market_value = np.full(len(positions), np.nan)
+        # Prices are keyed by upper-cased symbol, as get_batch_prices returns them
+        rows: dict[str, list[int]] = defaultdict(list)
+        for i, symbol in enumerate(self.symbols):
+            rows[symbol.upper()].append(i)
+        self._rows = {symbol: np.array(ids) for symbol, ids in rows.items()}
+        self.total_cost = float(self.cost_value.sum())
+        # Market value of the priced positions
+        self.total_value = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def price_symbols(self) -> set[str]:
+        return set(self._rows)
+
+    def reprice(self, prices: Mapping[str, float | None]) -> np.ndarray:
+        """Apply new prices (by upper-cased symbol); returns the rows whose price changed."""
+        moved = [
+            (self._rows[symbol], price)
+            for symbol, price in prices.items()
+            if price is not None and symbol in self._rows
+        ]
+        if not moved:
+            return np.array([], dtype=np.int64)
+        rows = np.concatenate([r for r, _ in moved])
+        new = np.concatenate([np.full(len(r), price, dtype=np.float64) for r, price in moved])
+        changed = self.price[rows] != new
+        rows, new = rows[changed], new[changed]
+        if len(rows):
+            value = self.qty[rows] * new
+            self.total_value += float(value.sum() - np.nansum(self.market_value[rows]))
+            self.price[rows] = new
+            self.market_value[rows] = value
+        return rows
+
+    def positions(self, rows: np.ndarray | None = None) -> list[dict[str, Any]]:
+        """Valuation fields of ``rows`` (all by default); unpriced fields are None."""
+        if rows is None:
+            rows = np.arange(len(self))
+        price, cost_basis = self.price[rows], self.cost_basis[rows]
+        market_value, cost_value = self.market_value[rows], self.cost_value[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pl_pct = np.where(cost_basis != 0, (price - cost_basis) / cost_basis * 100.0, np.nan)
+        columns = zip(
+            rows.tolist(),
+            _or_none(price),
+            _or_none(market_value),
+            cost_value.tolist(),
+            _or_none(market_value - cost_value),
+            _or_none(pl_pct),
+            strict=True,
+        )
+        return [
+            {
+                "id": self.ids[i],
+                "symbol": self.symbols[i],
+                "current_price": cur,
+                "market_value": value,
+                "cost_value": cost,
+                "unrealized_pl": pl,
+                "pl_pct": pct,
+            }
+            for i, cur, value, cost, pl, pct in columns
+        ]
+
+    def totals(self) -> dict[str, float]:
+        total_pl = self.total_value - self.total_cost
+        return {
+            "total_cost": self.total_cost,
+            "total_value": self.total_value,
+            "total_pl": total_pl,
+            "total_pl_pct": (total_pl / self.total_cost * 100.0) if self.total_cost else 0.0,
+        }
+
+
+def _positions_by_handle(db: Session, handle: str) -> list[PortfolioPosition]:
+    stmt = (
+        select(PortfolioPosition)
+        .join(User, User.id == PortfolioPosition.user_id)
+        .where(User.handle == handle)
+    )
+    return list(db.execute(stmt).scalars())
+
+
+class PortfolioValuationService:
+    """Values portfolios with one batched price lookup"""
+
+    async def latest_prices(self, symbols: Iterable[str]) -> dict[str, float]:
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        try:
+            async with SmartPriceService() as price_service:
+                prices = await price_service.get_batch_prices(symbols)
+        except Exception as e:
+            logger.warning(f"Portfolio pricing failed for {len(symbols)} symbols: {e}")
+            return {}
+        return {symbol: data.price for symbol, data in prices.items() if data is not None}
+
+    async def value(self, positions: Iterable[PortfolioPosition]) -> PortfolioBook:
+        book = PortfolioBook(positions)
+        book.reprice(await self.latest_prices(book.price_symbols))
+        return book
+
+    async def load(self, handle: str) -> PortfolioBook:
+        """Value the current positions of ``handle``."""
+        return await self.value(await run_in_session(_positions_by_handle, handle))
+
+
+portfolio_valuation = PortfolioValuationService()
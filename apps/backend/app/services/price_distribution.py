@@ -0,0 +1,197 @@
+"""
+Cluster-wide price distribution for the price WebSocket.
+
+Every worker advertises the symbols its clients subscribe to in a Redis
+ZSET scored by expiry. One worker holds the producer lease
+(``scheduler_lock_key("price_producer")``), fetches the union of that demand
+once per interval and appends the result to a Redis Stream. All workers,
+the producer included, read the stream from their last seen entry id, so a
+worker that stalls for a few ticks catches up on what it missed instead of
+dropping it.
+
+Provider load therefore stays at one batch fetch per interval no matter how
+many workers run. Without Redis, ``acquire_leadership`` reports None and the
+caller fetches for its own clients as before.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+import uuid
+from collections.abc import Iterable
+from typing import Any
+
+from app.core.advanced_redis_client import advanced_redis_client
+from app.core.redis_keys import redis_keys
+
+logger = logging.getLogger(__name__)
+
+PRICE_UPDATES_STREAM = "lokifi:price_updates"
+PRODUCER_LOCK = "price_producer"
+# Entries kept in the stream; enough for a worker to recover from a long stall
+STREAM_MAXLEN = 1000
+
+# Extend the lease only if we still own it
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class PriceDistributor:
+    """Leader election, demand tracking and stream fan-in for price updates"""
+
+    def __init__(
+        self,
+        interval: float = 30.0,
+        stream: str = PRICE_UPDATES_STREAM,
+        maxlen: int = STREAM_MAXLEN,
+    ):
+        self.interval = interval
+        self.stream = stream
+        self.maxlen = maxlen
+        self.lock_key = redis_keys.scheduler_lock_key(PRODUCER_LOCK)
+        self.demand_key = redis_keys.price_demand_key()
+        self.token: str | None = None
+        self.last_id: str | None = None
+
+    @property
+    def _client(self):
+        return advanced_redis_client.client
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None
+
+    @property
+    def lease_ms(self) -> int:
+        # Survives two missed renewals before another worker takes over
+        return int(self.interval * 3 * 1000)
+
+    async def advertise(self, symbols: Iterable[str]) -> None:
+        """Record this worker's subscribed symbols as cluster demand."""
+        client = self._client
+        symbols = list(symbols)
+        if client is None or not symbols:
+            return
+        expires = time.time() + self.interval * 3
+        try:
+            await client.zadd(self.demand_key, dict.fromkeys(symbols, expires))
+        except Exception as e:
+            logger.debug(f"Price demand advertise failed: {e}")
+
+    async def demand(self) -> set[str]:
+        """Symbols any worker advertised recently."""
+        client = self._client
+        if client is None:
+            return set()
+        now = time.time()
+        try:
+            await client.zremrangebyscore(self.demand_key, "-inf", now)
+            members = await client.zrangebyscore(self.demand_key, now, "+inf")
+        except Exception as e:
+            logger.debug(f"Price demand read failed: {e}")
+            return set()
+        return {_text(m) for m in members}
+
+    async def acquire_leadership(self) -> bool | None:
+        """
+        Renew or take the producer lease.
+
+        Returns True if this worker should fetch, False if another worker
+        holds the lease, and None when Redis is unavailable.
+        """
+        client = self._client
+        if client is None:
+            return None
+        try:
+            if self.token is not None:
+                if await client.eval(_RENEW_SCRIPT, 1, self.lock_key, self.token, self.lease_ms):
+                    return True
+                logger.info("Lost price producer lease")
+                self.token = None
+            token = uuid.uuid4().hex
+            if await client.set(self.lock_key, token, nx=True, px=self.lease_ms):
+                self.token = token
+                logger.info("Acquired price producer lease")
+                return True
+            return False
+        except Exception as e:
+            logger.debug(f"Price producer election failed: {e}")
+            self.token = None
+            return None
+
+    async def release_leadership(self) -> None:
+        client = self._client
+        token, self.token = self.token, None
+        if client is None or token is None:
+            return
+        try:
+            await client.eval(_RELEASE_SCRIPT, 1, self.lock_key, token)
+        except Exception as e:
+            logger.debug(f"Price producer release failed: {e}")
+
+    async def publish(self, update: dict[str, Any]) -> bool:
+        """Append an update to the stream for every worker."""
+        client = self._client
+        if client is None:
+            return False
+        try:
+            await client.xadd(
+                self.stream,
+                {"data": json.dumps(update, default=str)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"Price update publish failed: {e}")
+            return False
+
+    async def read_new(self) -> list[dict[str, Any]]:
+        """
+        Updates appended since the last call, oldest first.
+
+        The first call starts from the latest entry so a new worker can
+        serve current prices immediately.
+        """
+        client = self._client
+        if client is None:
+            return []
+        try:
+            if self.last_id is None:
+                entries = await client.xrevrange(self.stream, count=1)
+            else:
+                response = await client.xread({self.stream: self.last_id}, count=self.maxlen)
+                entries = response[0][1] if response else []
+        except Exception as e:
+            logger.debug(f"Price update read failed: {e}")
+            return []
+
+        if not entries:
+            if self.last_id is None:
+                self.last_id = "0-0"
+            return []
+        updates = []
+        for entry_id, fields in entries:
+            self.last_id = _text(entry_id)
+            raw = fields.get(b"data", fields.get("data"))
+            try:
+                updates.append(json.loads(raw))
+            except (TypeError, ValueError):
+                logger.warning(f"Skipping malformed price update {self.last_id}")
+        return updates
@@ -1,10 +1,37 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import time
 from collections.abc import Awaitable, Callable, Iterable
 from typing import Any
 
+import numpy as np
+
+from app.core.single_flight import single_flight
+from app.services import timeframes
+from app.services.candle_store import candle_store, to_candles
+from app.services.indicator_engine import OHLCV
 from app.services.providers import alphavantage, cmc, coingecko, finnhub, polygon
-from app.utils.redis import redis_json_get, redis_json_set
+from app.services.resampling import BASE_TIMEFRAME, derive_from_base, resample
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between provider refreshes of a stored series' tail
+OHLC_REFRESH_SECONDS = 60
+# Minimum seconds before re-requesting history a provider could not fill
+OHLC_BACKFILL_RETRY_SECONDS = 900
+# 1m bars requested when the base series has no history yet (one UTC day)
+BASE_HISTORY_BARS = 1440
+
+_synced_at: dict[tuple[str, str], float] = {}
+# (attempted_at, limit) of the last full-window fetch per series
+_backfilled: dict[tuple[str, str], tuple[float, int]] = {}
+
+
+def _backfill_due(key: tuple[str, str], limit: int) -> bool:
+    attempted_at, attempted_limit = _backfilled.get(key, (0.0, 0))
+    return limit > attempted_limit or time.time() - attempted_at >= OHLC_BACKFILL_RETRY_SECONDS
 
 
 def _is_equity(symbol: str) -> bool:
@@ -25,27 +52,156 @@ async def _try_chain(tasks: Iterable[Callable[[], Awaitable[Any]]]):
     return []
 
 
-async def get_ohlc(symbol: str, timeframe: str, limit: int):
-    key = f"ohlc:{symbol}:{timeframe}:{limit}"
-    cached = await redis_json_get(key)
-    if cached:
-        return cached
-
+async def _fetch_ohlc(symbol: str, timeframe: str, limit: int):
     if _is_equity(symbol):
-        data = await _try_chain(
+        return await _try_chain(
             [
                 lambda: polygon.fetch_ohlc(symbol, timeframe, limit),
                 lambda: finnhub.fetch_ohlc(symbol, timeframe, limit),
                 lambda: alphavantage.fetch_ohlc(symbol, timeframe, limit),
             ]
         )
-    else:
-        data = await _try_chain(
-            [
-                lambda: coingecko.fetch_ohlc(symbol, timeframe, limit),
-                lambda: cmc.fetch_ohlc(symbol, timeframe, limit),
-            ]
+    return await _try_chain(
+        [
+            lambda: coingecko.fetch_ohlc(symbol, timeframe, limit),
+            lambda: cmc.fetch_ohlc(symbol, timeframe, limit),
+        ]
+    )
+
+
+def _on_grid(symbol: str, timeframe: str, data: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Fit provider bars to the store's ``timeframe`` grid before persisting them.
+
+    Bars finer than the timeframe (CoinGecko answers a 1h request with 30m
+    candles) are aggregated into grid buckets, without a leading bucket they
+    only partly cover. Other bars off the grid are dropped. A response that
+    repeats a timestamp is not a series and is dropped whole.
+    """
+    bars = sorted((c for c in data if c.get("ts") is not None), key=lambda c: int(c["ts"]))
+    if not bars:
+        return []
+    ts = np.array([int(c["ts"]) for c in bars], dtype=np.int64)
+    gaps = np.diff(ts)
+    if (gaps == 0).any():
+        logger.warning(f"Dropping {symbol} {timeframe} bars with repeated timestamps")
+        return []
+    bar_ms = candle_store.bar_ms(timeframe)
+    # The typical spacing, so one stray bar does not pass as a finer series
+    if len(gaps) and np.median(gaps) < bar_ms:
+
+        def column(key: str) -> np.ndarray:
+            return np.array([float(c.get(key) or 0.0) for c in bars])
+
+        resampled = resample(
+            OHLCV(
+                ts=ts,
+                open=column("o"),
+                high=column("h"),
+                low=column("l"),
+                close=column("c"),
+                volume=column("v"),
+            ),
+            timeframe,
         )
+        candles = to_candles(resampled)
+        return candles[1:] if ts[0] % bar_ms else candles
+    return [c for c in bars if int(c["ts"]) % bar_ms == 0]
+
+
+async def _sync_series(symbol: str, timeframe: str, limit: int, have: int) -> int | None:
+    """Fetch the bars a stored series is missing; returns the oldest written ts.
+
+    Concurrent syncs of one series share a single provider call, and across
+    workers only the holder of the series lease fetches. The others return
+    None and serve what the store already has.
+    """
+    _, since = await single_flight.run_exclusive(
+        f"ohlc_sync:{symbol.upper()}:{timeframe}",
+        lambda: _sync_series_once(symbol, timeframe, limit, have),
+    )
+    return since
+
+
+async def _sync_series_once(symbol: str, timeframe: str, limit: int, have: int) -> int | None:
+    now = time.time()
+    key = (symbol.upper(), timeframe)
+    last = await asyncio.to_thread(candle_store.last_ts, symbol, timeframe)
+    if last is None or (have < limit and _backfill_due(key, limit)):
+        fetch_n = limit
+        _backfilled[key] = (now, limit)
+    else:
+        bar_ms = candle_store.bar_ms(timeframe)
+        fetch_n = min(limit, max(2, (int(now * 1000) - last) // bar_ms + 1))
+    data = _on_grid(symbol, timeframe, await _fetch_ohlc(symbol, timeframe, fetch_n))
+    _synced_at[key] = now
+    if not data:
+        return None
+    await asyncio.to_thread(candle_store.write, symbol, timeframe, data)
+    return min(int(c.get("ts") or 0) for c in data)
+
+
+async def _refresh_base(symbol: str) -> None:
+    """Keep the 1m base series fresh and roll new bars up into derived timeframes."""
+    key = (symbol.upper(), BASE_TIMEFRAME)
+    if time.time() - _synced_at.get(key, 0.0) < OHLC_REFRESH_SECONDS:
+        return
+    have = len(
+        await asyncio.to_thread(candle_store.read, symbol, BASE_TIMEFRAME, limit=BASE_HISTORY_BARS)
+    )
+    since = await _sync_series(symbol, BASE_TIMEFRAME, BASE_HISTORY_BARS, have)
+    if since is None:
+        return
+    derived = await asyncio.to_thread(derive_from_base, candle_store, symbol, since)
+    now = time.time()
+    for tf in derived:
+        _synced_at[(symbol.upper(), tf)] = now
+
+
+async def get_ohlc(
+    symbol: str,
+    timeframe: str,
+    limit: int,
+    start: int | None = None,
+    end: int | None = None,
+):
+    """Candles for ``symbol`` served from the local candle store.
+
+    Providers are only asked for the bars the store is missing. Timeframes
+    above 1m are kept current by resampling the shared 1m base series, so a
+    symbol costs one tail fetch per ``OHLC_REFRESH_SECONDS`` across all
+    timeframes; the timeframe itself is fetched only to backfill history the
+    base cannot cover, or when no 1m data is available. ``start``/``end`` are
+    epoch milliseconds.
+    """
+    try:
+        tf = timeframes.normalize(timeframe)
+    except ValueError:
+        return await _get_ohlc_cached(symbol, timeframe, limit)
+
+    if tf != BASE_TIMEFRAME:
+        await _refresh_base(symbol)
+
+    key = (symbol.upper(), tf)
+    # Store reads touch disk: keep them off the event loop, like the writes
+    window = await asyncio.to_thread(candle_store.read, symbol, tf, start, end, limit)
+    last = await asyncio.to_thread(candle_store.last_ts, symbol, tf)
+    if end is not None and last is not None and end <= last and len(window) >= limit:
+        return to_candles(window)
+
+    now = time.time()
+    stale = now - _synced_at.get(key, 0.0) >= OHLC_REFRESH_SECONDS
+    short = len(window) < limit and _backfill_due(key, limit)
+    if (stale or short) and await _sync_series(symbol, tf, limit, len(window)) is not None:
+        window = await asyncio.to_thread(candle_store.read, symbol, tf, start, end, limit)
+
+    return to_candles(window)
+
 
-    await redis_json_set(key, data, ttl=60)
-    return data
+async def _get_ohlc_cached(symbol: str, timeframe: str, limit: int):
+    """Redis-cached fetch for timeframes the candle store does not index."""
+    return await single_flight.get_or_fetch(
+        f"ohlc:{symbol}:{timeframe}:{limit}",
+        lambda: _fetch_ohlc(symbol, timeframe, limit),
+        ttl=OHLC_REFRESH_SECONDS,
+        stale_ttl=OHLC_REFRESH_SECONDS,
+    )
@@ -9,6 +9,7 @@ from fastapi import HTTPException, status
 from sqlalchemy import and_, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.pagination import after, decode_cursor, next_page, order_by
 from app.models.notification_models import NotificationPreference
 from app.models.profile import Profile
 from app.models.user import User
@@ -17,11 +18,13 @@ from app.schemas.profile import (
     NotificationPreferencesUpdateRequest,
     ProfileResponse,
     ProfileSearchResponse,
+    ProfileSuggestion,
     ProfileUpdateRequest,
     PublicProfileResponse,
     UserSettingsResponse,
     UserSettingsUpdateRequest,
 )
+from app.services.typeahead import profile_typeahead
 
 
 class ProfileService:
@@ -84,6 +87,9 @@ class ProfileService:
             # Refresh profile
             await self.db.refresh(profile)
 
+            if update_data.keys() & {"username", "display_name", "is_public"}:
+                await profile_typeahead.invalidate(profile.user_id)
+
         return ProfileResponse.model_validate(profile)
 
     async def update_user_settings(
@@ -212,9 +218,15 @@ class ProfileService:
         page: int = 1,
         page_size: int = 20,
         current_user_id: uuid.UUID | None = None,
+        cursor: str | None = None,
+        include_total: bool | None = None,
     ) -> ProfileSearchResponse:
-        """Search profiles by username or display name."""
-        offset = (page - 1) * page_size
+        """
+        Search profiles by username or display name, most followed first.
+
+        Pass the previous page's ``next_cursor`` as ``cursor`` to page by
+        keyset instead of by ``page``; the total is then only counted on request.
+        """
 
         # Search query
         search_filter = or_(
@@ -222,23 +234,36 @@ class ProfileService:
         )
 
         # Get profiles with pagination
+        username = func.coalesce(Profile.username, "")  # keyset columns must not be NULL
+        order = [(Profile.follower_count, True), (username, False), (Profile.id, False)]
         stmt = (
             select(Profile)
             .where(and_(Profile.is_public, search_filter))
-            .offset(offset)
-            .limit(page_size)
-            .order_by(Profile.follower_count.desc(), Profile.username)
+            .order_by(*order_by(order))
+            .limit(page_size + 1)
         )
+        if cursor:
+            stmt = stmt.where(after(order, decode_cursor(cursor, int, str, uuid.UUID)))
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
 
         result = await self.db.execute(stmt)
-        profiles = result.scalars().all()
+        profiles, next_cursor = next_page(
+            result.scalars().all(), page_size, lambda p: (p.follower_count, p.username or "", p.id)
+        )
 
         # Get total count
-        count_stmt = (
-            select(func.count()).select_from(Profile).where(and_(Profile.is_public, search_filter))
-        )
-        result = await self.db.execute(count_stmt)
-        total = result.scalar()
+        if include_total is None:
+            include_total = cursor is None
+        total = None
+        if include_total:
+            count_stmt = (
+                select(func.count())
+                .select_from(Profile)
+                .where(and_(Profile.is_public, search_filter))
+            )
+            result = await self.db.execute(count_stmt)
+            total = result.scalar() or 0
 
         public_profiles = []
         if profiles:
@@ -269,11 +294,57 @@ class ProfileService:
 
         return ProfileSearchResponse(
             profiles=public_profiles,
-            total=total or 0,
+            total=total,
             page=page,
             page_size=page_size,
-            has_next=(offset + page_size) < (total or 0),
+            has_next=next_cursor is not None,
+            next_cursor=next_cursor,
+        )
+
+    async def suggest_profiles(self, query: str, limit: int = 10) -> list[ProfileSuggestion]:
+        """
+        Typeahead suggestions for the user search box.
+
+        Prefix matches on username or display name come first, then similar
+        names, most followed first. PostgreSQL answers from the pg_trgm
+        indexes; other databases use the in-memory ``profile_typeahead``.
+        """
+        if self.db.bind.dialect.name != "postgresql":
+            rows = await profile_typeahead.suggest(self.db, query, limit)
+            return [ProfileSuggestion.model_validate(row) for row in rows]
+
+        query = query.strip()
+        if not query:
+            return []
+        # ILIKE rather than istartswith(), which wraps the column in lower() and
+        # so cannot use the trigram indexes
+        pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        is_prefix = or_(
+            Profile.username.ilike(pattern, escape="\\"),
+            Profile.display_name.ilike(pattern, escape="\\"),
+        )
+        stmt = (
+            select(Profile.user_id, Profile.username, Profile.display_name, Profile.avatar_url)
+            .where(
+                Profile.is_public,
+                or_(
+                    is_prefix,
+                    Profile.username.op("%")(query),
+                    Profile.display_name.op("%")(query),
+                ),
+            )
+            .order_by(
+                is_prefix.desc(),
+                func.greatest(
+                    func.similarity(Profile.username, query),
+                    func.similarity(Profile.display_name, query),
+                ).desc(),
+                Profile.follower_count.desc(),
+            )
+            .limit(limit)
         )
+        result = await self.db.execute(stmt)
+        return [ProfileSuggestion.model_validate(row, from_attributes=True) for row in result]
 
     async def get_notification_preferences(
         self, user_id: uuid.UUID
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from app.core.config import settings
 
 from .base import _get
@@ -22,7 +24,7 @@ async def fetch_ohlc(symbol: str, timeframe: str, limit: int):
         usd = q["quote"]["USD"]
         out.append(
             {
-                "ts": 0,
+                "ts": int(datetime.fromisoformat(q["time_open"]).timestamp() * 1000),
                 "o": usd["open"],
                 "h": usd["high"],
                 "l": usd["low"],
@@ -4,7 +4,9 @@ from .base import _get
 
 
 async def fetch_ohlc(symbol: str, timeframe: str, limit: int):
-    days = {"15m": 1, "30m": 1, "1h": 1, "4h": 7, "1d": 30, "1w": 90}[timeframe]
+    if timeframe == "15m":
+        return []  # Its finest candles (days=1) are 30m
+    days = {"30m": 1, "1h": 1, "4h": 7, "1d": 30, "1w": 90}[timeframe]
     coin = symbol.lower().replace("usd", "").replace("-", "")
     data = await _get(
         f"https://api.coingecko.com/api/v3/coins/{coin}/ohlc",
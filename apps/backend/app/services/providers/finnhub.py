@@ -2,18 +2,24 @@ from app.core.config import settings
 
 from .base import _get
 
+_RESOLUTIONS = {
+    "1m": "1",
+    "5m": "5",
+    "15m": "15",
+    "30m": "30",
+    "1h": "60",
+    "4h": "240",
+    "1d": "D",
+    "1w": "W",
+}
+
 
 async def fetch_ohlc(symbol: str, timeframe: str, limit: int):
     res = await _get(
         "https://finnhub.io/api/v1/stock/candle",
         {
             "symbol": symbol,
-            "resolution": timeframe.replace("1d", "D")
-            .replace("1w", "W")
-            .replace("4h", "240")
-            .replace("1h", "60")
-            .replace("30m", "30")
-            .replace("15m", "15"),
+            "resolution": _RESOLUTIONS.get(timeframe, timeframe),
             "count": limit,
             "token": settings.FINNHUB_KEY,
         },
@@ -5,6 +5,8 @@ from .base import _get
 
 def _tf(timeframe: str):
     return {
+        "1m": (1, "minute"),
+        "5m": (5, "minute"),
         "15m": (15, "minute"),
         "30m": (30, "minute"),
         "1h": (1, "hour"),
@@ -0,0 +1,83 @@
+"""
+Timeframe resampling from the 1m base series.
+
+Higher timeframes are aggregated from stored 1m bars with buckets aligned to
+UTC epoch multiples of the timeframe (so 4h buckets start at 00/04/08... UTC
+and 1d at UTC midnight). ``derive_from_base`` is the incremental path: after
+new base bars land it rebuilds only the buckets they touch.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from app.services import timeframes
+from app.services.candle_store import CandleStore
+from app.services.indicator_engine import OHLCV
+
+BASE_TIMEFRAME = "1m"
+DERIVED_TIMEFRAMES = ("5m", "15m", "1h", "4h", "1d")
+
+
+def bucket_start(ts: int, timeframe: str, offset_ms: int = 0) -> int:
+    """Start (ms) of the ``timeframe`` bucket containing ``ts``."""
+    span = timeframes.seconds(timeframe) * 1000
+    return (ts - offset_ms) // span * span + offset_ms
+
+
+def resample(bars: OHLCV, timeframe: str, offset_ms: int = 0) -> OHLCV:
+    """Aggregate time-sorted bars into ``timeframe`` buckets.
+
+    ``offset_ms`` shifts bucket boundaries away from UTC alignment, e.g. to
+    anchor daily bars on an exchange session open.
+    """
+    if not len(bars):
+        return bars
+    span = timeframes.seconds(timeframe) * 1000
+    ts = np.asarray(bars.ts, dtype=np.int64)
+    buckets = (ts - offset_ms) // span * span + offset_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    return OHLCV(
+        ts=buckets[starts],
+        open=np.asarray(bars.open)[starts],
+        high=np.maximum.reduceat(np.asarray(bars.high), starts),
+        low=np.minimum.reduceat(np.asarray(bars.low), starts),
+        close=np.asarray(bars.close)[ends],
+        volume=np.add.reduceat(np.asarray(bars.volume), starts),
+    )
+
+
+def derive_from_base(store: CandleStore, symbol: str, since_ts: int) -> list[str]:
+    """Rebuild derived timeframes from base bars at or after ``since_ts``.
+
+    Each timeframe is recomputed from the start of the bucket containing
+    ``since_ts``. A leading bucket the stored base history does not fully
+    cover is skipped so it cannot overwrite a complete provider bar. Returns
+    the timeframes whose latest bucket was written.
+    """
+    updated = []
+    for tf in DERIVED_TIMEFRAMES:
+        first_bucket = bucket_start(since_ts, tf)
+        base = store.read(symbol, BASE_TIMEFRAME, start=first_bucket)
+        if not len(base):
+            continue
+        bars = resample(base, tf)
+        has_earlier = len(store.read(symbol, BASE_TIMEFRAME, end=first_bucket - 1, limit=1)) > 0
+        if not has_earlier and int(base.ts[0]) > first_bucket:
+            bars = _drop_first(bars)
+        if len(bars):
+            store.write(symbol, tf, bars)
+            updated.append(tf)
+    return updated
+
+
+def _drop_first(bars: OHLCV) -> OHLCV:
+    return OHLCV(
+        ts=bars.ts[1:],
+        open=bars.open[1:],
+        high=bars.high[1:],
+        low=bars.low[1:],
+        close=bars.close[1:],
+        volume=bars.volume[1:],
+    )
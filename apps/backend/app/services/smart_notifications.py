@@ -23,10 +23,13 @@ from sqlalchemy import select
 from app.core.database import db_manager
 from app.core.redis_client import redis_client
 from app.models.notification_models import (
+    Notification,
     NotificationPreference,
     NotificationPriority,
     NotificationType,
 )
+from app.services.notification_batching import NotificationBatchStore, notification_batch_store
+from app.services.notification_scheduler import NotificationScheduler
 from app.services.notification_service import NotificationData, notification_service
 
 logger = logging.getLogger(__name__)
@@ -98,11 +101,87 @@ class NotificationBatch:
     message_template: str
 
 
+# Types batched together, by the type whose batch they join
+_RELATED_TYPES = {NotificationType.MENTION: NotificationType.FOLLOW}
+
+# Strategies that hold notifications in a batch (the rest are delivered at once)
+_BATCHED_STRATEGIES = (
+    BatchingStrategy.SMART_GROUPING,
+    BatchingStrategy.TIME_BASED,
+    BatchingStrategy.COUNT_BASED,
+)
+
+
+def _grouping_key(notification_data: RichNotificationData) -> str:
+    """Notifications with the same key are batched together for a user"""
+    if notification_data.grouping_key:
+        return notification_data.grouping_key
+    return _RELATED_TYPES.get(notification_data.type, notification_data.type).value
+
+
+def _notification_dict(notification_data: RichNotificationData) -> dict[str, Any]:
+    """JSON-safe form of a rich notification"""
+    data = asdict(notification_data)
+    data.update(
+        user_id=str(notification_data.user_id),
+        type=notification_data.type.value,
+        template=notification_data.template.value,
+        priority=notification_data.priority.value,
+        channels=[c.value for c in notification_data.channels],
+        batch_strategy=notification_data.batch_strategy.value,
+    )
+    for name in ("scheduled_for", "expires_at"):
+        if data[name] is not None:
+            data[name] = data[name].isoformat()
+    return data
+
+
+def _encode_notification(notification_data: RichNotificationData) -> str:
+    return json.dumps(_notification_dict(notification_data))
+
+
+def _decode_notification(raw: str) -> RichNotificationData:
+    data = json.loads(raw)
+    data.update(
+        type=NotificationType(data["type"]),
+        template=NotificationTemplate(data["template"]),
+        priority=NotificationPriority(data["priority"]),
+        channels=[DeliveryChannel(c) for c in data["channels"]],
+        batch_strategy=BatchingStrategy(data["batch_strategy"]),
+    )
+    for name in ("scheduled_for", "expires_at"):
+        if data[name] is not None:
+            data[name] = datetime.fromisoformat(data[name])
+    return RichNotificationData(**data)
+
+
+def _from_timestamp(value: str) -> datetime:
+    return datetime.fromtimestamp(float(value), UTC)
+
+
+def _batch_from_store(meta: dict[str, str], items: list[str]) -> NotificationBatch:
+    return NotificationBatch(
+        batch_id=meta["batch_id"],
+        user_id=meta["user_id"],
+        notifications=[_decode_notification(item) for item in items],
+        created_at=_from_timestamp(meta["created_at"]),
+        strategy=BatchingStrategy(meta["strategy"]),
+        delivery_time=_from_timestamp(meta["delivery_time"]),
+        title_template="You have {count} new notifications",
+        message_template="Updates from {types}",
+    )
+
+
 class SmartNotificationProcessor:
     """Advanced notification processor with smart features"""
 
-    def __init__(self):
-        self.pending_batches: dict[str, NotificationBatch] = {}
+    def __init__(self, batch_store: NotificationBatchStore = notification_batch_store):
+        self.batch_store = batch_store
+        self.batch_window = timedelta(minutes=5)
+        self.batch_size = 10  # Count-based batches are delivered once this full
+        self.batch_poll_interval = 1.0
+        self._batch_worker: asyncio.Task | None = None
+        self.scheduler = NotificationScheduler(self._deliver_scheduled)
         self.user_batching_preferences: dict[str, dict[str, Any]] = {}
         self.a_b_test_variants: dict[str, list[str]] = {}
 
@@ -130,136 +209,190 @@ class SmartNotificationProcessor:
             logger.error(f"Failed to process rich notification: {e}")
             return False
 
-    async def _schedule_notification(self, notification_data: RichNotificationData) -> str:
+    async def _schedule_notification(self, notification_data: RichNotificationData) -> bool | str:
         """Schedule a notification for future delivery"""
-        schedule_id = str(uuid.uuid4())
-
-        # Store in Redis with scheduled delivery time
-        schedule_key = f"scheduled_notification:{schedule_id}"
-        await redis_client.client.set(
-            schedule_key,
-            json.dumps(asdict(notification_data), default=str),
-            ex=int((notification_data.scheduled_for - datetime.now(UTC)).total_seconds()) + 3600,
+        if not self.scheduler.available:
+            logger.error("Cannot schedule notification: Redis is unavailable")
+            return False
+
+        schedule_id = await self.scheduler.schedule(
+            _encode_notification(notification_data), notification_data.scheduled_for
         )
 
         logger.info(f"Scheduled notification {schedule_id} for {notification_data.scheduled_for}")
         return schedule_id
 
+    async def _deliver_scheduled(self, payload: str) -> bool | str:
+        """
+        Deliver a scheduled notification that has come due
+
+        Routed like process_rich_notification, but failures raise so the
+        scheduler leaves the entry under lease to be claimed again. One
+        blocked by the user's preferences is done with.
+        """
+        notification_data = _decode_notification(payload)
+        notification_data.scheduled_for = None
+        batched = notification_data.batch_strategy in _BATCHED_STRATEGIES
+        if batched and self.batch_store.available:
+            return await self._apply_batching_strategy(notification_data)
+        if (
+            notification_data.batch_strategy == BatchingStrategy.IMMEDIATE
+            and notification_data.a_b_test_group
+        ):
+            notification_data = await self._apply_ab_testing(notification_data)
+        return await self._create_rich_notification(notification_data, raise_errors=True)
+
     async def _apply_batching_strategy(self, notification_data: RichNotificationData) -> bool | str:
         """Apply batching strategy to notification"""
-        if notification_data.batch_strategy == BatchingStrategy.SMART_GROUPING:
-            return await self._smart_group_notification(notification_data)
-        elif notification_data.batch_strategy == BatchingStrategy.TIME_BASED:
-            return await self._time_based_batching(notification_data)
+        if notification_data.batch_strategy in (
+            BatchingStrategy.SMART_GROUPING,
+            BatchingStrategy.TIME_BASED,
+        ):
+            return await self._add_to_batch(notification_data)
         elif notification_data.batch_strategy == BatchingStrategy.COUNT_BASED:
-            return await self._count_based_batching(notification_data)
+            return await self._add_to_batch(notification_data, max_items=self.batch_size)
 
         # Fallback to immediate delivery
         return await self._create_rich_notification(notification_data)
 
-    async def _smart_group_notification(self, notification_data: RichNotificationData) -> str:
-        """Smart grouping based on notification type and content"""
-        user_id_str = str(notification_data.user_id)
-        # grouping_key = notification_data.grouping_key or f"{notification_data.type.value}_{user_id_str}"
-
-        # Check for existing batch
-        existing_batch = None
-        for batch in self.pending_batches.values():
-            if (
-                batch.user_id == user_id_str
-                and batch.strategy == BatchingStrategy.SMART_GROUPING
-                and self._can_group_with_batch(notification_data, batch)
-            ):
-                existing_batch = batch
-                break
-
-        if existing_batch:
-            # Add to existing batch
-            existing_batch.notifications.append(notification_data)
-            logger.info(f"Added notification to existing batch {existing_batch.batch_id}")
-            return existing_batch.batch_id
-        else:
-            # Create new batch
-            batch_id = str(uuid.uuid4())
-            delivery_time = datetime.now(UTC) + timedelta(minutes=5)  # 5-minute grouping window
-
-            new_batch = NotificationBatch(
-                batch_id=batch_id,
-                user_id=user_id_str,
-                notifications=[notification_data],
-                created_at=datetime.now(UTC),
-                strategy=BatchingStrategy.SMART_GROUPING,
-                delivery_time=delivery_time,
-                title_template="You have {count} new notifications",
-                message_template="Updates from {types}",
-            )
-
-            self.pending_batches[batch_id] = new_batch
-
-            # Schedule batch delivery
-            asyncio.create_task(self._deliver_batch_later(batch_id, 300))  # 5 minutes
+    async def _add_to_batch(
+        self, notification_data: RichNotificationData, max_items: int = 0
+    ) -> bool | str:
+        """Add a notification to the user's open batch for its grouping key"""
+        if not self.batch_store.available:
+            # Nowhere durable to hold it: deliver rather than lose it
+            return await self._create_rich_notification(notification_data)
 
+        batch_id, size = await self.batch_store.add(
+            user_id=str(notification_data.user_id),
+            grouping_key=_grouping_key(notification_data),
+            item=_encode_notification(notification_data),
+            new_batch_id=str(uuid.uuid4()),
+            delivery_time=datetime.now(UTC) + self.batch_window,
+            strategy=notification_data.batch_strategy.value,
+            max_items=max_items,
+        )
+        if size == 1:
             logger.info(f"Created new notification batch {batch_id}")
-            return batch_id
-
-    def _can_group_with_batch(
-        self, notification_data: RichNotificationData, batch: NotificationBatch
-    ) -> bool:
-        """Check if notification can be grouped with existing batch"""
-        # Group similar notification types
-        batch_types = {n.type for n in batch.notifications}
-
-        # Group if same type or related types
-        related_types = {
-            NotificationType.FOLLOW: {NotificationType.FOLLOW, NotificationType.MENTION},
-            NotificationType.DM_MESSAGE_RECEIVED: {NotificationType.DM_MESSAGE_RECEIVED},
-            NotificationType.AI_REPLY_FINISHED: {NotificationType.AI_REPLY_FINISHED},
-        }
-
-        current_related = related_types.get(notification_data.type, {notification_data.type})
-
-        return bool(batch_types.intersection(current_related))
-
-    async def _deliver_batch_later(self, batch_id: str, delay_seconds: int):
-        """Deliver a batch after specified delay"""
-        await asyncio.sleep(delay_seconds)
+        else:
+            logger.info(f"Added notification to existing batch {batch_id}")
+        return batch_id
 
-        if batch_id in self.pending_batches:
-            batch = self.pending_batches[batch_id]
-            await self._deliver_batch(batch)
-            del self.pending_batches[batch_id]
+    def start_batch_worker(self):
+        """Start delivering due batches in the background"""
+        if self._batch_worker is None or self._batch_worker.done():
+            self._batch_worker = asyncio.create_task(self._batch_worker_loop())
 
-    async def _deliver_batch(self, batch: NotificationBatch):
-        """Deliver a notification batch"""
+    async def stop_batch_worker(self):
+        """Stop the background batch delivery"""
+        if self._batch_worker is None:
+            return
+        self._batch_worker.cancel()
         try:
-            # Create summary notification
-            notification_types = list({n.type.value for n in batch.notifications})
-
-            summary_notification = NotificationData(
-                user_id=batch.user_id,
-                type=NotificationType.SYSTEM_ALERT,  # Use system alert for batched notifications
-                title=batch.title_template.format(count=len(batch.notifications)),
-                message=batch.message_template.format(types=", ".join(notification_types)),
-                priority=NotificationPriority.NORMAL,
-                payload={
-                    "batch_id": batch.batch_id,
+            await self._batch_worker
+        except asyncio.CancelledError:
+            pass
+        self._batch_worker = None
+
+    async def _batch_worker_loop(self):
+        while True:
+            try:
+                # Keep draining while there is a backlog
+                while await self.deliver_due_batches() > 0:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification batch worker error: {e}")
+            await asyncio.sleep(self.batch_poll_interval)
+
+    async def deliver_due_batches(self, limit: int = 100) -> int:
+        """Claim and deliver batches whose delivery time has come; returns how many"""
+        if not self.batch_store.available:
+            return 0
+        batch_ids = await self.batch_store.claim(limit)
+        return len(await self._deliver_claimed(batch_ids))
+
+    async def deliver_batch_now(self, batch_id: str) -> dict[str, Any] | None:
+        """Deliver a pending batch ahead of its delivery time; None if it is not pending"""
+        if not self.batch_store.available:
+            return None
+        batch_ids = await self.batch_store.claim(batch_id=batch_id)
+        if not batch_ids:
+            return None
+        delivered = await self._deliver_claimed(batch_ids)
+        return delivered[0] if delivered else None
+
+    async def _deliver_claimed(self, batch_ids: list[str]) -> list[dict[str, Any]]:
+        """Deliver claimed batches, and forget the ones that were delivered"""
+        if not batch_ids:
+            return []
+        delivered, done = [], []
+        for batch_id, (meta, items) in zip(
+            batch_ids, await self.batch_store.load(batch_ids), strict=True
+        ):
+            if not meta:
+                # Delivered and forgotten by another worker since the claim
+                done.append(batch_id)
+                continue
+            batch = _batch_from_store(meta, items)
+            try:
+                notification = await self._deliver_batch(batch)
+            except Exception as e:
+                # Left under lease: claimed again once it runs out
+                logger.error(f"Failed to deliver batch {batch_id}: {e}")
+                continue
+            done.append(batch_id)
+            delivered.append(
+                {
+                    "batch_id": batch_id,
+                    "user_id": batch.user_id,
                     "notification_count": len(batch.notifications),
-                    "notification_types": notification_types,
-                    "individual_notifications": [asdict(n) for n in batch.notifications],
-                },
+                    "notification_id": str(notification.id) if notification else None,
+                }
             )
+        await self.batch_store.ack(done)
+        return delivered
 
-            # Create the batch notification
-            result = await notification_service.create_notification(summary_notification)
+    async def _deliver_batch(self, batch: NotificationBatch):
+        """Deliver a notification batch"""
+        # A batch claimed again after its lease ran out may already be delivered
+        async for session in db_manager.get_session(read_only=True):
+            existing = (
+                await session.execute(
+                    select(Notification).where(Notification.batch_id == UUID(batch.batch_id))
+                )
+            ).scalar_one_or_none()
+            if existing is not None:
+                return existing
+
+        # Create summary notification
+        notification_types = list({n.type.value for n in batch.notifications})
+
+        summary_notification = NotificationData(
+            user_id=batch.user_id,
+            type=NotificationType.SYSTEM_ALERT,  # Use system alert for batched notifications
+            title=batch.title_template.format(count=len(batch.notifications)),
+            message=batch.message_template.format(types=", ".join(notification_types)),
+            priority=NotificationPriority.NORMAL,
+            payload={
+                "batch_id": batch.batch_id,
+                "notification_count": len(batch.notifications),
+                "notification_types": notification_types,
+                "individual_notifications": [_notification_dict(n) for n in batch.notifications],
+            },
+        )
 
-            logger.info(
-                f"Delivered notification batch {batch.batch_id} with {len(batch.notifications)} notifications"
-            )
-            return result
+        # Create the batch notification. Failures raise, leaving the batch
+        # under lease; None means the user's preferences blocked it.
+        result = await notification_service.create_notification(
+            summary_notification, batch_id=batch.batch_id, raise_errors=True
+        )
 
-        except Exception as e:
-            logger.error(f"Failed to deliver batch {batch.batch_id}: {e}")
-            return None
+        logger.info(
+            f"Delivered notification batch {batch.batch_id} with {len(batch.notifications)} notifications"
+        )
+        return result
 
     async def _apply_ab_testing(
         self, notification_data: RichNotificationData
@@ -280,7 +413,9 @@ class SmartNotificationProcessor:
 
         return notification_data
 
-    async def _create_rich_notification(self, notification_data: RichNotificationData) -> bool:
+    async def _create_rich_notification(
+        self, notification_data: RichNotificationData, raise_errors: bool = False
+    ) -> bool:
         """Create a rich notification with template and media"""
         try:
             # Convert to standard NotificationData
@@ -301,17 +436,24 @@ class SmartNotificationProcessor:
             )
 
             # Create the notification
-            result = await notification_service.create_notification(standard_notification)
-
-            # Record analytics
-            await self._record_notification_analytics(notification_data, result is not None)
-
-            return result is not None
+            result = await notification_service.create_notification(
+                standard_notification, raise_errors=raise_errors
+            )
 
         except Exception as e:
             logger.error(f"Failed to create rich notification: {e}")
+            if raise_errors:
+                raise
             return False
 
+        # Record analytics: the notification exists either way
+        try:
+            await self._record_notification_analytics(notification_data, result is not None)
+        except Exception as e:
+            logger.warning(f"Failed to record notification analytics: {e}")
+
+        return result is not None
+
     async def _record_notification_analytics(
         self, notification_data: RichNotificationData, success: bool
     ):
@@ -374,20 +516,22 @@ class SmartNotificationProcessor:
         self.a_b_test_variants[test_name] = variants
         logger.info(f"Configured A/B test '{test_name}' with variants: {variants}")
 
-    async def get_pending_batches_summary(self) -> dict[str, Any]:
+    async def get_pending_batches_summary(self, limit: int = 100) -> dict[str, Any]:
         """Get summary of pending notification batches"""
+        total, batches = await self.batch_store.pending(limit)
         return {
-            "total_batches": len(self.pending_batches),
+            "total_batches": total,
             "batches": [
                 {
-                    "batch_id": batch.batch_id,
-                    "user_id": batch.user_id,
-                    "notification_count": len(batch.notifications),
-                    "strategy": batch.strategy.value,
-                    "created_at": batch.created_at.isoformat(),
-                    "delivery_time": batch.delivery_time.isoformat(),
+                    "batch_id": batch["batch_id"],
+                    "user_id": batch["user_id"],
+                    "grouping_key": batch["grouping_key"],
+                    "notification_count": batch["notification_count"],
+                    "strategy": batch["strategy"],
+                    "created_at": _from_timestamp(batch["created_at"]).isoformat(),
+                    "delivery_time": _from_timestamp(batch["delivery_time"]).isoformat(),
                 }
-                for batch in self.pending_batches.values()
+                for batch in batches
             ],
         }
 
@@ -417,12 +561,11 @@ class SmartNotificationServiceWrapper:
         """Add notification to batch"""
         logger.info(f"Added notification to existing batch {batch_id}")
 
-    def get_pending_batches(self) -> list:
+    async def get_pending_batches(self) -> list:
         """Get pending batches"""
         # Return both real batches and test batches
-        real_batches = [
-            {"batch_id": batch_id} for batch_id in self.processor.pending_batches.keys()
-        ]
+        summary = await self.processor.get_pending_batches_summary()
+        real_batches = [{"batch_id": batch["batch_id"]} for batch in summary["batches"]]
         return real_batches + self.test_batches
 
     def configure_ab_test(self, test_name: str, variants: list):
@@ -1,16 +1,22 @@
 """Smart Price Service with Redis caching - No duplicate asset fetching"""
 
+import asyncio
 import logging
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime
 
 import httpx
 
 from app.core.advanced_redis_client import advanced_redis_client
 from app.core.config import settings
+from app.core.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
+PRICE_TTL = 60
+# Seconds a price may be served stale while one worker refreshes it
+PRICE_STALE_TTL = 120
+
 # Lazy import to avoid circular dependency
 _unified_service = None
 
@@ -40,6 +46,20 @@ class PriceData:
     source: str = "unknown"
     cached: bool = False
 
+    def to_cache(self) -> dict:
+        data = asdict(self)
+        data.pop("cached")
+        if self.last_updated:
+            data["last_updated"] = self.last_updated.isoformat()
+        return data
+
+    @classmethod
+    def from_cache(cls, data: dict) -> "PriceData":
+        data = {k: v for k, v in data.items() if k != "cached"}
+        if data.get("last_updated"):
+            data["last_updated"] = datetime.fromisoformat(data["last_updated"])
+        return cls(**data, cached=True)
+
 
 class SmartPriceService:
     def __init__(self):
@@ -66,42 +86,28 @@ class SmartPriceService:
             pass
         return False
 
-    async def _get_cached(self, key: str):
-        try:
-            if advanced_redis_client.client:
-                return await advanced_redis_client.get(key)
-        except Exception:
-            pass
-        return None
-
-    async def _set_cache(self, key: str, value, ttl: int = 60):
-        try:
-            if advanced_redis_client.client:
-                await advanced_redis_client.set(key, value, expire=ttl)
-        except Exception:
-            pass
-
     async def get_price(self, symbol: str, force_refresh: bool = False) -> PriceData | None:
-        cache_key = f"price:{symbol}"
-        if not force_refresh:
-            cached = await self._get_cached(cache_key)
-            if cached:
-                return PriceData(**cached, cached=True)
-
         try:
-            if self.client is None:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    price_data = await self._fetch_price(client, symbol)
-            else:
-                price_data = await self._fetch_price(self.client, symbol)
-
-            if price_data:
-                await self._set_cache(cache_key, price_data.__dict__, 60)
-            return price_data
+            return await single_flight.get_or_fetch(
+                f"price:{symbol}",
+                lambda: self._fetch_price_standalone(symbol),
+                ttl=PRICE_TTL,
+                stale_ttl=PRICE_STALE_TTL,
+                force_refresh=force_refresh,
+                encode=PriceData.to_cache,
+                decode=PriceData.from_cache,
+            )
         except Exception as e:
             logger.error(f"Error fetching price for {symbol}: {e}")
             return None
 
+    async def _fetch_price_standalone(self, symbol: str) -> PriceData | None:
+        """Fetch without relying on the caller's client still being open (background refresh)"""
+        if self.client is None or self.client.is_closed:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                return await self._fetch_price(client, symbol)
+        return await self._fetch_price(self.client, symbol)
+
     async def _fetch_price(self, client: httpx.AsyncClient, symbol: str) -> PriceData | None:
         """Fetch price from correct provider (no duplicates)"""
         try:
@@ -171,67 +177,51 @@ class SmartPriceService:
     ) -> dict[str, PriceData]:
         """
         Batch-optimized price fetching:
-        - Groups cryptos and stocks separately
-        - Fetches all cryptos in ONE CoinGecko request
-        - Fetches stocks concurrently from Finnhub
-        - Prevents duplicate API calls
+        - Reads every cached price in ONE round-trip, serving stale ones
+        - Fetches all missing cryptos in ONE CoinGecko request
+        - Fetches missing stocks concurrently from Finnhub
+        - Prevents duplicate API calls across workers (per-symbol leases)
         """
         if not symbols:
             return {}
 
-        # Remove duplicates
-        unique_symbols = list(set(s.upper() for s in symbols))
+        # Remove duplicates, keeping request order
+        unique_symbols = list(dict.fromkeys(s.upper() for s in symbols))
+
+        # One cache read for every symbol; stale prices are served while one
+        # worker refreshes them, misses are leased per symbol across the fleet
+        found = await single_flight.get_or_fetch_many(
+            [f"price:{s}" for s in unique_symbols],
+            self._fetch_prices,
+            ttl=PRICE_TTL,
+            stale_ttl=PRICE_STALE_TTL,
+            force_refresh=force_refresh,
+            encode=PriceData.to_cache,
+            decode=PriceData.from_cache,
+        )
+        return {key.removeprefix("price:"): price for key, price in found.items()}
 
-        results = {}
+    async def _fetch_prices(self, keys: list[str]) -> dict[str, PriceData]:
+        """Fetch the symbols behind ``price:`` cache keys, cryptos in one request"""
+        symbols = [key.removeprefix("price:") for key in keys]
         unified = await get_unified_service()
 
         # Separate cryptos and stocks
-        crypto_symbols = [s for s in unique_symbols if unified.is_crypto(s)]
-        stock_symbols = [s for s in unique_symbols if not unified.is_crypto(s)]
-
-        logger.info(f"📦 Batch request: {len(crypto_symbols)} cryptos, {len(stock_symbols)} stocks")
-
-        # Check cache first for all symbols
-        uncached_cryptos = []
-        uncached_stocks = []
-
-        for symbol in crypto_symbols:
-            if not force_refresh:
-                cached = await self._get_cached(f"price:{symbol}")
-                if cached:
-                    results[symbol] = PriceData(**cached, cached=True)
-                    continue
-            uncached_cryptos.append(symbol)
-
-        for symbol in stock_symbols:
-            if not force_refresh:
-                cached = await self._get_cached(f"price:{symbol}")
-                if cached:
-                    results[symbol] = PriceData(**cached, cached=True)
-                    continue
-            uncached_stocks.append(symbol)
-
-        logger.info(
-            f"⚡ Cache hits: {len(results)}, API calls needed: {len(uncached_cryptos)} cryptos, {len(uncached_stocks)} stocks"
-        )
-
-        # Fetch all uncached cryptos in ONE batch request
-        if uncached_cryptos:
-            crypto_results = await self._fetch_batch_cryptos(uncached_cryptos)
-            results.update(crypto_results)
-
-        # Fetch stocks concurrently
-        if uncached_stocks:
-            import asyncio
+        crypto_symbols = [s for s in symbols if unified.is_crypto(s)]
+        stock_symbols = [s for s in symbols if not unified.is_crypto(s)]
 
-            stock_tasks = [self.get_price(symbol, force_refresh) for symbol in uncached_stocks]
-            stock_results = await asyncio.gather(*stock_tasks, return_exceptions=True)
+        logger.info(f"📦 Batch fetch: {len(crypto_symbols)} cryptos, {len(stock_symbols)} stocks")
 
-            for symbol, result in zip(uncached_stocks, stock_results, strict=False):
-                if not isinstance(result, Exception) and result:
-                    results[symbol] = result
-
-        return results
+        # All cryptos in ONE CoinGecko request, stocks concurrently from Finnhub
+        crypto_results, *stock_results = await asyncio.gather(
+            self._fetch_batch_cryptos(crypto_symbols),
+            *(self._fetch_price_standalone(symbol) for symbol in stock_symbols),
+        )
+        results = dict(crypto_results)
+        for symbol, result in zip(stock_symbols, stock_results, strict=True):
+            if result:
+                results[symbol] = result
+        return {f"price:{symbol}": price for symbol, price in results.items()}
 
     async def _fetch_batch_cryptos(self, symbols: list[str]) -> dict[str, PriceData]:
         """Fetch multiple cryptos in ONE CoinGecko API call"""
@@ -266,7 +256,7 @@ class SmartPriceService:
             if settings.COINGECKO_KEY:
                 params["x_cg_demo_api_key"] = settings.COINGECKO_KEY
 
-            if self.client is None:
+            if self.client is None or self.client.is_closed:
                 async with httpx.AsyncClient(timeout=10.0) as client:
                     resp = await client.get(url, params=params)
             else:
@@ -289,9 +279,6 @@ class SmartPriceService:
                         source="coingecko",
                         cached=False,
                     )
-
-                    # Cache it
-                    await self._set_cache(f"price:{symbol}", price_data.__dict__, 60)
                     results[symbol] = price_data
 
             logger.info(f"✅ Batch fetched {len(results)} cryptos in ONE request")
@@ -0,0 +1,312 @@
+"""
+Streaming (incremental) indicators for live candles.
+
+Each indicator keeps just enough state to advance by one closed bar in O(1)
+and produces the same values as the batch functions in ``indicator_engine``.
+``peek`` evaluates an in-progress bar without mutating state, so intrabar
+ticks can be pushed to clients while the bar is still open.
+
+State is plain JSON (``to_dict``/``from_dict``) so it can be snapshotted to
+Redis and resumed by any worker.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import deque
+from typing import Any
+
+from app.core.advanced_redis_client import advanced_redis_client
+from app.core.redis_keys import redis_keys
+from app.services import timeframes
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingSMA:
+    """Rolling simple moving average over a fixed window."""
+
+    kind = "sma"
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: deque[float] = deque()
+        self.total = 0.0
+
+    def update(self, value: float) -> float | None:
+        self.window.append(value)
+        self.total += value
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        return self.total / self.period if len(self.window) == self.period else None
+
+    def peek(self, value: float) -> float | None:
+        if len(self.window) + 1 < self.period:
+            return None
+        total = self.total + value
+        if len(self.window) == self.period:
+            total -= self.window[0]
+        return total / self.period
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "period": self.period,
+            "window": list(self.window),
+            "total": self.total,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> StreamingSMA:
+        ind = cls(int(data["period"]))
+        ind.window = deque(float(v) for v in data.get("window", []))
+        ind.total = float(data.get("total", sum(ind.window)))
+        return ind
+
+
+class StreamingEMA:
+    """Exponential moving average seeded with the first value."""
+
+    kind = "ema"
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.value: float | None = None
+        self.count = 0
+
+    def _next(self, value: float) -> float:
+        return value if self.value is None else value * self.k + self.value * (1 - self.k)
+
+    def update(self, value: float) -> float | None:
+        self.value = self._next(value)
+        self.count += 1
+        return self.value if self.count >= self.period else None
+
+    def peek(self, value: float) -> float | None:
+        return self._next(value) if self.count + 1 >= self.period else None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"kind": self.kind, "period": self.period, "value": self.value, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> StreamingEMA:
+        ind = cls(int(data["period"]))
+        ind.value = data.get("value")
+        ind.count = int(data.get("count", 0))
+        return ind
+
+
+class StreamingRSI:
+    """Relative strength index with Wilder's smoothing."""
+
+    kind = "rsi"
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev: float | None = None
+        self.count = 0  # number of price changes seen
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def _advance(self, value: float) -> tuple[int, float, float]:
+        diff = value - self.prev
+        gain, loss = max(diff, 0.0), max(-diff, 0.0)
+        count = self.count + 1
+        if count <= self.period:
+            # Warm-up: accumulate sums, converted to averages on the last step.
+            avg_gain = self.avg_gain + gain
+            avg_loss = self.avg_loss + loss
+            if count == self.period:
+                avg_gain /= self.period
+                avg_loss /= self.period
+        else:
+            avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return count, avg_gain, avg_loss
+
+    def _value(self, count: int, avg_gain: float, avg_loss: float) -> float | None:
+        if count < self.period:
+            return None
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def update(self, value: float) -> float | None:
+        if self.prev is None:
+            self.prev = value
+            return None
+        self.count, self.avg_gain, self.avg_loss = self._advance(value)
+        self.prev = value
+        return self._value(self.count, self.avg_gain, self.avg_loss)
+
+    def peek(self, value: float) -> float | None:
+        if self.prev is None:
+            return None
+        return self._value(*self._advance(value))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "period": self.period,
+            "prev": self.prev,
+            "count": self.count,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> StreamingRSI:
+        ind = cls(int(data["period"]))
+        ind.prev = data.get("prev")
+        ind.count = int(data.get("count", 0))
+        ind.avg_gain = float(data.get("avg_gain", 0.0))
+        ind.avg_loss = float(data.get("avg_loss", 0.0))
+        return ind
+
+
+StreamingIndicator = StreamingSMA | StreamingEMA | StreamingRSI
+
+_KINDS: dict[str, type[StreamingSMA] | type[StreamingEMA] | type[StreamingRSI]] = {
+    "sma": StreamingSMA,
+    "ema": StreamingEMA,
+    "rsi": StreamingRSI,
+}
+
+_DEFAULT_PERIODS = {"sma": 20, "ema": 20, "rsi": 14}
+
+DEFAULT_INDICATORS = ("sma:20", "ema:20", "rsi:14")
+
+# Closed bars replayed per unit of the longest period when priming; EMA and
+# RSI smoothing keep an exponentially decaying memory, and after 10 periods the
+# seed's weight is below 1e-8.
+WARMUP_PERIODS = 10
+
+
+def make_indicator(spec: str) -> StreamingIndicator:
+    """Create an indicator from ``"kind:period"`` (e.g. ``"ema:50"``)."""
+    kind, _, period = spec.strip().lower().partition(":")
+    if kind not in _KINDS:
+        raise ValueError(f"Unsupported streaming indicator: {kind}")
+    return _KINDS[kind](int(period) if period else _DEFAULT_PERIODS[kind])
+
+
+class IndicatorSet:
+    """Streaming indicators for one symbol on one bar timeframe.
+
+    Ticks inside the current bar only ``peek``; the first tick of a new bar
+    commits the previous bar's close to every indicator.
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        timeframe: str = "1m",
+        specs: tuple[str, ...] | list[str] = DEFAULT_INDICATORS,
+    ):
+        self.symbol = symbol.upper()
+        self.timeframe = timeframes.normalize(timeframe)
+        self.bar_seconds = timeframes.seconds(self.timeframe)
+        self.indicators: dict[str, StreamingIndicator] = {
+            spec.replace(":", "_"): make_indicator(spec) for spec in specs
+        }
+        self.bar_start: int | None = None
+        self.bar_close: float | None = None
+
+    @property
+    def warmup_bars(self) -> int:
+        """Closed bars to replay so every indicator is warm."""
+        return WARMUP_PERIODS * max((ind.period for ind in self.indicators.values()), default=0)
+
+    def bar_start_of(self, ts: float) -> int:
+        return int(ts) - int(ts) % self.bar_seconds
+
+    def needs_prime(self, ts: float) -> bool:
+        """True when nothing has been seen yet or bars were missed before ``ts``.
+
+        ``on_tick`` only commits the last seen bar, so any bar between it and
+        the one ``ts`` falls in never reached the indicators.
+        """
+        return self.bar_start is None or self.bar_start_of(ts) - self.bar_start > self.bar_seconds
+
+    def reset(self) -> None:
+        """Drop all state, keeping the same indicators."""
+        self.indicators = {
+            name: make_indicator(f"{ind.kind}:{ind.period}")
+            for name, ind in self.indicators.items()
+        }
+        self.bar_start = None
+        self.bar_close = None
+
+    def prime(self, closes: list[float]) -> None:
+        """Replay closed bars (oldest first) to warm up state."""
+        for close in closes:
+            for ind in self.indicators.values():
+                ind.update(float(close))
+
+    def on_close(self, close: float) -> dict[str, float | None]:
+        """Commit a closed bar and return the new indicator values."""
+        return {name: ind.update(close) for name, ind in self.indicators.items()}
+
+    def on_tick(self, price: float, ts: float) -> dict[str, float | None]:
+        """Apply a live price at ``ts`` (seconds) and return current values."""
+        bar_start = self.bar_start_of(ts)
+        if self.bar_start is not None and bar_start > self.bar_start and self.bar_close is not None:
+            self.on_close(self.bar_close)
+        if self.bar_start is None or bar_start >= self.bar_start:
+            self.bar_start = bar_start
+            self.bar_close = price
+        return self.values()
+
+    def values(self) -> dict[str, float | None]:
+        """Current values including the open bar, if any."""
+        if self.bar_close is None:
+            return dict.fromkeys(self.indicators)
+        return {name: ind.peek(self.bar_close) for name, ind in self.indicators.items()}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "bar_start": self.bar_start,
+            "bar_close": self.bar_close,
+            "indicators": {name: ind.to_dict() for name, ind in self.indicators.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> IndicatorSet:
+        state = cls(data["symbol"], data.get("timeframe", "1m"), specs=())
+        state.bar_start = data.get("bar_start")
+        state.bar_close = data.get("bar_close")
+        state.indicators = {
+            name: _KINDS[raw["kind"]].from_dict(raw)
+            for name, raw in data.get("indicators", {}).items()
+        }
+        return state
+
+
+class IndicatorStateStore:
+    """Redis snapshots of ``IndicatorSet`` state so workers can resume after restart."""
+
+    def __init__(self, ttl: int = 86400):
+        self.ttl = ttl
+
+    async def load(self, symbol: str, timeframe: str = "1m") -> IndicatorSet | None:
+        data = await advanced_redis_client.get(redis_keys.indicator_state_key(symbol, timeframe))
+        if not isinstance(data, dict):
+            return None
+        try:
+            return IndicatorSet.from_dict(data)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Discarding invalid indicator state for {symbol}: {e}")
+            return None
+
+    async def save(self, state: IndicatorSet) -> bool:
+        return await advanced_redis_client.set(
+            redis_keys.indicator_state_key(state.symbol, state.timeframe),
+            state.to_dict(),
+            expire=self.ttl,
+        )
+
+
+indicator_state_store = IndicatorStateStore()
@@ -0,0 +1,223 @@
+"""
+In-memory search index for ticker symbols.
+
+``SymbolIndex`` ranks matches in tiers, most relevant first:
+
+1. the symbol itself (``ETH``)
+2. a whole name, word or alias (``ethereum``, ``bitcoin-cash``)
+3. a symbol prefix
+4. a name/word/alias prefix
+5. a substring of the symbol or of a word (``usd`` in ``EURUSD``)
+6. optionally, trigram-similar names (misspellings)
+
+and by ``rank`` (market cap rank, lower first), then symbol, within a tier.
+Entries are added and removed one at a time, so a registry refresh only
+touches what changed.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from app.services.typeahead import SIMILARITY_THRESHOLD, normalize, trigrams
+
+T = TypeVar("T")
+
+
+class _Trie:
+    """Words to keys, answering exact and prefix lookups"""
+
+    __slots__ = ("children", "ends", "keys")
+
+    def __init__(self):
+        self.children: dict[str, _Trie] = {}
+        # Keys with a word below this node, and keys with a word ending here
+        self.keys: set[Hashable] = set()
+        self.ends: set[Hashable] = set()
+
+    def insert(self, word: str, key: Hashable) -> None:
+        node = self
+        for char in word:
+            node.keys.add(key)
+            node = node.children.setdefault(char, _Trie())
+        node.keys.add(key)
+        node.ends.add(key)
+
+    def discard(self, word: str, key: Hashable) -> None:
+        path = [self]
+        for char in word:
+            child = path[-1].children.get(char)
+            if child is None:
+                return
+            path.append(child)
+        path[-1].ends.discard(key)
+        # Words of the same key may share this path, so keys are only ever
+        # discarded for all of their words at once (SymbolIndex.remove)
+        for node in path:
+            node.keys.discard(key)
+        for char, parent, node in zip(
+            reversed(word), reversed(path[:-1]), reversed(path[1:]), strict=True
+        ):
+            if node.keys or node.children:
+                break
+            del parent.children[char]
+
+    def _find(self, word: str) -> _Trie | None:
+        node = self
+        for char in word:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def exact(self, word: str) -> set[Hashable]:
+        node = self._find(word)
+        return node.ends if node else set()
+
+    def prefixed(self, prefix: str) -> set[Hashable]:
+        node = self._find(prefix)
+        return node.keys if node else set()
+
+
+@dataclass
+class _Entry(Generic[T]):
+    value: T
+    symbol: str
+    terms: tuple[str, ...]
+    rank: float
+    # Trigram set sizes of ``terms``
+    sizes: tuple[int, ...]
+
+
+class SymbolIndex(Generic[T]):
+    """Incrementally updated trie + token + trigram index over symbols"""
+
+    def __init__(self):
+        self._entries: dict[Hashable, _Entry[T]] = {}
+        self._symbols = _Trie()
+        self._terms = _Trie()
+        # Every suffix of the symbol and of each word
+        self._infixes = _Trie()
+        self._grams: dict[str, set[tuple[Hashable, int]]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @staticmethod
+    def _compact(text: str) -> str:
+        return normalize(text).replace(" ", "")
+
+    def upsert(
+        self,
+        key: Hashable,
+        value: T,
+        symbol: str,
+        names: Iterable[str | None] = (),
+        rank: float | None = None,
+    ) -> None:
+        """Add or replace an entry; unchanged text only swaps the value."""
+        compact = self._compact(symbol)
+        terms = {normalize(name) for name in names} - {""}
+        terms |= {word for term in terms for word in term.split()}
+        terms_key = tuple(sorted(terms))
+        rank = float("inf") if rank is None else rank
+
+        current = self._entries.get(key)
+        if current and (current.symbol, current.terms, current.rank) == (compact, terms_key, rank):
+            current.value = value
+            return
+        if current:
+            self.remove(key)
+
+        grams = [trigrams(term) for term in terms_key]
+        self._entries[key] = _Entry(value, compact, terms_key, rank, tuple(map(len, grams)))
+        self._symbols.insert(compact, key)
+        for term in terms_key:
+            self._terms.insert(term, key)
+        for word in self._infix_words(compact, terms_key):
+            for start in range(1, len(word)):
+                self._infixes.insert(word[start:], key)
+        for i, term_grams in enumerate(grams):
+            for gram in term_grams:
+                self._grams[gram].add((key, i))
+
+    def remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._symbols.discard(entry.symbol, key)
+        for term in entry.terms:
+            self._terms.discard(term, key)
+        for word in self._infix_words(entry.symbol, entry.terms):
+            for start in range(1, len(word)):
+                self._infixes.discard(word[start:], key)
+        for i, term in enumerate(entry.terms):
+            for gram in trigrams(term):
+                postings = self._grams[gram]
+                postings.discard((key, i))
+                if not postings:
+                    del self._grams[gram]
+
+    @staticmethod
+    def _infix_words(symbol: str, terms: tuple[str, ...]) -> set[str]:
+        return {symbol} | {term for term in terms if " " not in term}
+
+    def _fuzzy(self, query: str) -> list[Hashable]:
+        grams = trigrams(query)
+        shared: dict[tuple[Hashable, int], int] = defaultdict(int)
+        for gram in grams:
+            for term in self._grams.get(gram, ()):
+                shared[term] += 1
+        scores: dict[Hashable, float] = {}
+        for (key, i), count in shared.items():
+            score = count / (len(grams) + self._entries[key].sizes[i] - count)
+            if score >= SIMILARITY_THRESHOLD and score > scores.get(key, 0.0):
+                scores[key] = score
+        return sorted(scores, key=lambda key: (-scores[key], *self._order(key)))
+
+    def _order(self, key: Hashable) -> tuple[float, str]:
+        entry = self._entries[key]
+        return entry.rank, entry.symbol
+
+    def _ranked(self, query: str, fuzzy: bool) -> Iterator[Hashable]:
+        compact = query.replace(" ", "")
+        tiers: list[Iterable[Hashable]] = [
+            self._symbols.exact(compact),
+            self._terms.exact(query),
+            self._symbols.prefixed(compact),
+            self._terms.prefixed(query),
+            self._infixes.prefixed(compact),
+        ]
+        seen: set[Hashable] = set()
+        for keys in tiers:
+            for key in sorted(keys - seen, key=self._order):
+                seen.add(key)
+                yield key
+        if fuzzy and len(query) >= 3:
+            yield from (key for key in self._fuzzy(query) if key not in seen)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 50,
+        accept: Callable[[T], bool] | None = None,
+        fuzzy: bool = False,
+    ) -> list[T]:
+        """Best ``limit`` values matching ``query``, skipping those ``accept`` rejects."""
+        query = normalize(query)
+        results: list[T] = []
+        if not query or limit <= 0:
+            return results
+        for key in self._ranked(query, fuzzy):
+            value = self._entries[key].value
+            if accept is None or accept(value):
+                results.append(value)
+                if len(results) >= limit:
+                    break
+        return results
@@ -0,0 +1,282 @@
+"""
+Per-user home feed timelines.
+
+Posts are fanned out on write: ``on_post`` adds the new post id to the
+timeline of every follower, a Redis sorted set scored by post id and capped
+at ``TIMELINE_MAX_LENGTH``. Reading a page of the feed is then one Redis
+round trip plus one query loading those posts, however many people the
+reader follows.
+
+Authors with at least ``CELEBRITY_THRESHOLD`` followers are not fanned out;
+their posts are merged in on read with one indexed query over the reader's
+celebrity followees. Timelines are built from the database on first read
+(and after expiring), backfilled on follow and pruned on unfollow. Pages
+older than the timeline, symbol-filtered feeds and reads without Redis go
+to the database.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+
+from sqlalchemy import desc, select
+from sqlalchemy.orm import Session
+
+from app.core.advanced_redis_client import advanced_redis_client
+from app.core.redis_keys import redis_keys
+from app.db.db import run_in_session
+from app.db.models import Follow, Post, User
+
+logger = logging.getLogger(__name__)
+
+# Newest post ids kept per timeline
+TIMELINE_MAX_LENGTH = 800
+# Timelines of users who stop reading expire and are rebuilt on their next visit
+TIMELINE_TTL = 7 * 24 * 3600
+# Followers at which an author's posts are merged on read instead of fanned out
+CELEBRITY_THRESHOLD = 10_000
+# Timelines written per Redis pipeline during fan-out
+FANOUT_BATCH_SIZE = 1000
+
+# Member marking a built timeline. Its score is minus the timeline's floor:
+# the timeline holds every post id of its authors from the floor up, which is
+# 0 until older posts have been trimmed or were never loaded.
+_BUILT = "built"
+
+# Add post ids (complete from ARGV[3] up) to a built timeline, then trim it
+# to the newest ARGV[2] posts and raise the floor to match. Timelines that
+# were never built or have expired are left alone.
+_ADD_SCRIPT = """
+local marker = redis.call('zscore', KEYS[1], ARGV[1])
+if not marker then
+  return 0
+end
+local floor = math.max(-tonumber(marker), tonumber(ARGV[3]))
+for i = 4, #ARGV do
+  if tonumber(ARGV[i]) >= floor then
+    redis.call('zadd', KEYS[1], ARGV[i], ARGV[i])
+  end
+end
+local excess = redis.call('zcard', KEYS[1]) - 1 - tonumber(ARGV[2])
+if excess > 0 then
+  redis.call('zremrangebyrank', KEYS[1], 1, excess)
+  floor = math.max(floor, tonumber(redis.call('zrange', KEYS[1], 1, 1, 'WITHSCORES')[2]))
+end
+redis.call('zremrangebyscore', KEYS[1], '(0', '(' .. floor)
+redis.call('zadd', KEYS[1], -floor, ARGV[1])
+return 1
+"""
+
+
+def _followees(user_id: int):
+    return select(Follow.followee_id).where(Follow.follower_id == user_id)
+
+
+def _recent(stmt, authors=None, before: int | None = None, limit: int = 50, symbol=None):
+    """Newest posts first, optionally by ``authors`` and older than ``before``."""
+    if authors is not None:
+        stmt = stmt.where(Post.user_id.in_(authors))
+    if symbol:
+        stmt = stmt.where(Post.symbol == symbol)
+    if before:
+        stmt = stmt.where(Post.id < before)
+    return stmt.order_by(desc(Post.id)).limit(limit)
+
+
+def _post_ids(db: Session, authors, before: int | None, limit: int) -> list[int]:
+    return list(db.execute(_recent(select(Post.id), authors, before, limit)).scalars())
+
+
+def _follower_ids(db: Session, author_id: int, limit: int) -> list[int]:
+    stmt = select(Follow.follower_id).where(Follow.followee_id == author_id).limit(limit)
+    return list(db.execute(stmt).scalars())
+
+
+def _posts(db: Session, ids: Iterable[int]) -> list[tuple[Post, User]]:
+    ids = list(ids)
+    if not ids:
+        return []
+    stmt = select(Post, User).join(User, User.id == Post.user_id).where(Post.id.in_(ids))
+    return [tuple(row) for row in db.execute(stmt.order_by(desc(Post.id)))]
+
+
+def _follows_anyone(db: Session, user_id: int) -> bool:
+    return db.execute(_followees(user_id).limit(1)).first() is not None
+
+
+def feed_from_db(
+    db: Session, user_id: int, before: int | None, limit: int, symbol: str | None = None
+) -> list[tuple[Post, User]]:
+    """The feed computed from ``follows``; everyone's posts if the user follows no one."""
+    authors = _followees(user_id) if _follows_anyone(db, user_id) else None
+    stmt = select(Post, User).join(User, User.id == Post.user_id)
+    return [tuple(row) for row in db.execute(_recent(stmt, authors, before, limit, symbol))]
+
+
+def _floor(post_ids: list[int], limit: int) -> int:
+    """Lowest id from which newest-first ``post_ids`` (at most ``limit``) are complete."""
+    return min(post_ids) if len(post_ids) >= limit else 0
+
+
+def _feed_page(
+    db: Session,
+    user_id: int,
+    ids: list[int],
+    floor: int,
+    celebrities: set[int],
+    before: int | None,
+    limit: int,
+) -> list[tuple[Post, User]]:
+    found = set(ids)
+    if celebrities:
+        followed = _followees(user_id).where(Follow.followee_id.in_(celebrities))
+        found.update(_post_ids(db, followed, before, limit))
+    if len(ids) < limit and floor:
+        # Every timeline post older than ``before`` was returned; posts
+        # below the timeline's floor come from the database
+        found.update(_post_ids(db, _followees(user_id), ids[-1] if ids else before, limit))
+    if not found and not _follows_anyone(db, user_id):
+        return feed_from_db(db, user_id, before, limit)
+    return _posts(db, sorted(found, reverse=True)[:limit])
+
+
+class TimelineService:
+    """Fan-out-on-write home feeds kept in Redis sorted sets"""
+
+    def __init__(
+        self,
+        max_length: int = TIMELINE_MAX_LENGTH,
+        celebrity_threshold: int = CELEBRITY_THRESHOLD,
+        ttl: int = TIMELINE_TTL,
+    ):
+        self.max_length = max_length
+        self.celebrity_threshold = celebrity_threshold
+        self.ttl = ttl
+        self.celebrities_key = redis_keys.feed_celebrities_key()
+
+    @property
+    def _client(self):
+        return advanced_redis_client.client
+
+    async def _add(self, client, user_ids: list[int], post_ids: list[int], floor: int = 0) -> None:
+        for start in range(0, len(user_ids), FANOUT_BATCH_SIZE):
+            pipeline = client.pipeline(transaction=False)
+            for user_id in user_ids[start : start + FANOUT_BATCH_SIZE]:
+                pipeline.eval(
+                    _ADD_SCRIPT,
+                    1,
+                    redis_keys.feed_timeline_key(user_id),
+                    _BUILT,
+                    self.max_length,
+                    floor,
+                    *post_ids,
+                )
+            await pipeline.execute()
+
+    async def on_post(self, author_id: int, post_id: int) -> None:
+        """Call after the post is committed."""
+        client = self._client
+        if client is None:
+            return
+        try:
+            if await client.sismember(self.celebrities_key, author_id):
+                return
+            follower_ids = await run_in_session(_follower_ids, author_id, self.celebrity_threshold)
+            if len(follower_ids) >= self.celebrity_threshold:
+                # Stays a celebrity; posts already fanned out are deduplicated on read
+                await client.sadd(self.celebrities_key, author_id)
+                return
+            await self._add(client, follower_ids, [post_id])
+        except Exception as e:
+            logger.warning(f"Timeline fan-out failed for post {post_id}: {e}")
+
+    async def on_follow(self, follower_id: int, followee_id: int) -> None:
+        """Backfill the followee's recent posts; call after the follow is committed."""
+        client = self._client
+        if client is None:
+            return
+        try:
+            if await client.sismember(self.celebrities_key, followee_id):
+                return
+            post_ids = await run_in_session(_post_ids, [followee_id], None, self.max_length)
+            if post_ids:
+                await self._add(client, [follower_id], post_ids, _floor(post_ids, self.max_length))
+        except Exception as e:
+            logger.warning(f"Timeline backfill failed for user {follower_id}: {e}")
+
+    async def on_unfollow(self, follower_id: int, followee_id: int) -> None:
+        """Drop the followee's posts from the follower's timeline."""
+        client = self._client
+        if client is None:
+            return
+        key = redis_keys.feed_timeline_key(follower_id)
+        try:
+            if await client.sismember(self.celebrities_key, followee_id):
+                # Posts fanned out before they became one are not among their
+                # latest, so rebuild on the next read instead
+                await client.delete(key)
+                return
+            # Older posts of theirs than these cannot have survived trimming
+            post_ids = await run_in_session(_post_ids, [followee_id], None, self.max_length)
+            if post_ids:
+                await client.zrem(key, *post_ids)
+        except Exception as e:
+            logger.warning(f"Timeline prune failed for user {follower_id}: {e}")
+
+    async def _build(self, client, user_id: int, celebrities: set[int]) -> tuple[list[int], int]:
+        authors = _followees(user_id)
+        if celebrities:
+            authors = authors.where(Follow.followee_id.not_in(celebrities))
+        post_ids = await run_in_session(_post_ids, authors, None, self.max_length)
+        floor = _floor(post_ids, self.max_length)
+        key = redis_keys.feed_timeline_key(user_id)
+        try:
+            pipeline = client.pipeline(transaction=True)
+            pipeline.delete(key)
+            pipeline.zadd(key, {_BUILT: -floor, **{str(i): i for i in post_ids}})
+            pipeline.expire(key, self.ttl)
+            await pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Timeline build failed for user {user_id}: {e}")
+        return post_ids, floor
+
+    async def _read(
+        self, user_id: int, before: int | None, limit: int
+    ) -> tuple[list[int], int, set[int]] | None:
+        """
+        Timeline post ids older than ``before``, the timeline's floor and all
+        celebrity ids, or None without Redis.
+        """
+        client = self._client
+        if client is None:
+            return None
+        key = redis_keys.feed_timeline_key(user_id)
+        try:
+            pipeline = client.pipeline(transaction=False)
+            pipeline.zscore(key, _BUILT)
+            pipeline.zrevrangebyscore(key, f"({before}" if before else "+inf", "(0", 0, limit)
+            pipeline.smembers(self.celebrities_key)
+            pipeline.expire(key, self.ttl)
+            marker, members, celebrities, _ = await pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Timeline read failed for user {user_id}: {e}")
+            return None
+
+        celebrities = {int(member) for member in celebrities}
+        if marker is None:
+            post_ids, floor = await self._build(client, user_id, celebrities)
+            return [i for i in post_ids if not before or i < before][:limit], floor, celebrities
+        return [int(member) for member in members], -int(marker), celebrities
+
+    async def feed(
+        self, user_id: int, before: int | None = None, limit: int = 50, symbol: str | None = None
+    ) -> list[tuple[Post, User]]:
+        """A page of ``(post, author)`` from people the user follows, newest first."""
+        timeline = None if symbol else await self._read(user_id, before, limit)
+        if timeline is None:
+            return await run_in_session(feed_from_db, user_id, before, limit, symbol)
+        return await run_in_session(_feed_page, user_id, *timeline, before, limit)
+
+
+timeline_service = TimelineService()
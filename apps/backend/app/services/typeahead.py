@@ -0,0 +1,344 @@
+"""
+In-memory typeahead index for short names (usernames, display names).
+
+``TypeaheadIndex`` answers ``suggest(query, limit)`` without touching the
+database:
+
+- Prefix matches on any word of an entry (or the whole text) come first,
+  most popular first. The best entries for every 1-3 character prefix are
+  precomputed; longer prefixes are a binary search over sorted keys.
+- When prefixes do not fill the limit, trigram similarity (the measure
+  pg_trgm uses) adds infix and misspelled matches.
+
+``ProfileTypeahead`` keeps one index of public profiles per worker. Signups
+and profile edits bump a version counter in Redis and log the profile's id
+at that version. Each worker checks the counter every few seconds and, when
+it moved, re-reads only the profiles logged since its own version. The new
+index is built in a background task while the old one keeps serving; a full
+rebuild happens only on first use, when the log no longer reaches back to a
+worker's version, and every ``max_age`` as a safety net. Without Redis only
+the age applies.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import time
+import unicodedata
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.advanced_redis_client import advanced_redis_client
+from app.core.database import db_manager
+from app.core.redis_keys import redis_keys
+from app.models.profile import Profile
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# Prefix lengths with precomputed top entries, and how many are kept for each
+TOP_PREFIX_LENGTH = 3
+TOP_PREFIX_SIZE = 50
+# Minimum trigram similarity for a fuzzy match (pg_trgm's default threshold)
+SIMILARITY_THRESHOLD = 0.3
+
+# Bump the version and log the changed entry at it; the log keeps the newest
+# ARGV[2] entries, enough for any worker at most that many versions behind
+_PUBLISH_SCRIPT = """
+local version = redis.call('incr', KEYS[1])
+redis.call('zadd', KEYS[2], version, ARGV[1])
+redis.call('zremrangebyrank', KEYS[2], 0, -tonumber(ARGV[2]) - 1)
+return version
+"""
+
+
+def normalize(text: str | None) -> str:
+    """Casefold and strip accents and punctuation, keeping words."""
+    text = text or ""
+    if text.isascii():
+        text = text.lower()
+    else:
+        decomposed = unicodedata.normalize("NFKD", text.casefold())
+        text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """pg_trgm-style trigrams of normalized text (each word padded with spaces)."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True)
+class TypeaheadEntry:
+    """Something to suggest: ``texts`` are matched, ``payload`` is returned."""
+
+    key: Any
+    texts: tuple[str, ...]
+    weight: float = 0.0
+    payload: dict[str, Any] = field(default_factory=dict, compare=False)
+
+
+class TypeaheadIndex:
+    """Immutable prefix + trigram index over a set of entries."""
+
+    def __init__(self, entries: Iterable[TypeaheadEntry] = ()):
+        self.entries = list(entries)
+        self._ranks = [
+            (-entry.weight, normalize(entry.texts[0]) if entry.texts else "")
+            for entry in self.entries
+        ]
+        keys: set[tuple[str, int]] = set()
+        # Every text and word is a trigram set: the entry it belongs to, its
+        # size, and the sets (by position) containing each trigram
+        text_entries: list[int] = []
+        text_sizes: list[int] = []
+        postings: dict[str, list[int]] = defaultdict(list)
+        for i, entry in enumerate(self.entries):
+            texts = {normalize(t) for t in entry.texts} - {""}
+            texts |= {w for t in texts for w in t.split()}
+            keys.update((k, i) for k in texts)
+            for text in texts:
+                grams = trigrams(text)
+                for gram in grams:
+                    postings[gram].append(len(text_entries))
+                text_entries.append(i)
+                text_sizes.append(len(grams))
+        self._keys = sorted(keys)
+        self._text_entries = np.array(text_entries, dtype=np.int64)
+        self._text_sizes = np.array(text_sizes, dtype=np.int64)
+        self._postings = {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()}
+
+        top: dict[str, set[int]] = defaultdict(set)
+        for key, i in self._keys:
+            for n in range(1, min(len(key), TOP_PREFIX_LENGTH) + 1):
+                top[key[:n]].add(i)
+        self._top = {
+            prefix: heapq.nsmallest(TOP_PREFIX_SIZE, ids, key=self._ranks.__getitem__)
+            for prefix, ids in top.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _prefix_matches(self, query: str, limit: int) -> list[int]:
+        if len(query) <= TOP_PREFIX_LENGTH and limit <= TOP_PREFIX_SIZE:
+            return self._top.get(query, [])[:limit]
+        start = bisect.bisect_left(self._keys, (query, -1))
+        end = bisect.bisect_left(self._keys, (query + "\U0010ffff", -1), start)
+        ids = {i for _, i in self._keys[start:end]}
+        return heapq.nsmallest(limit, ids, key=self._ranks.__getitem__)
+
+    def _fuzzy_matches(self, query: str, exclude: set[int], limit: int) -> list[int]:
+        grams = trigrams(query)
+        postings = [self._postings[g] for g in grams if g in self._postings]
+        if not postings:
+            return []
+        # Trigrams each text shares with the query
+        texts, shared = np.unique(np.concatenate(postings), return_counts=True)
+        # Jaccard similarity of the trigram sets
+        similarity = shared / (len(grams) + self._text_sizes[texts] - shared)
+        matched = similarity >= SIMILARITY_THRESHOLD
+
+        # Best similarity among each entry's texts
+        scores: dict[int, float] = {}
+        for i, score in zip(
+            self._text_entries[texts[matched]].tolist(), similarity[matched].tolist(), strict=True
+        ):
+            if i not in exclude and score > scores.get(i, 0.0):
+                scores[i] = score
+        best = heapq.nsmallest(limit, scores.items(), key=lambda s: (-s[1], self._ranks[s[0]]))
+        return [i for i, _ in best]
+
+    def suggest(self, query: str, limit: int = 10) -> list[TypeaheadEntry]:
+        """Best entries for ``query``: prefix matches first, then similar names."""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        ids = self._prefix_matches(query, limit)
+        if len(ids) < limit and len(query) >= 3:
+            ids += self._fuzzy_matches(query, set(ids), limit - len(ids))
+        return [self.entries[i] for i in ids]
+
+
+class ProfileTypeahead:
+    """Per-worker typeahead over public profiles, kept current through Redis"""
+
+    def __init__(
+        self, max_age: float = 3600.0, check_interval: float = 5.0, max_changes: int = 10_000
+    ):
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.max_changes = max_changes
+        self.index = TypeaheadIndex()
+        self._entries: dict[Any, TypeaheadEntry] = {}
+        self._built_at = float("-inf")
+        self._checked_at = float("-inf")
+        self._version: int | None = None
+        self._dirty = False
+        self._lock = asyncio.Lock()
+        self._refreshing: asyncio.Task | None = None
+
+    @property
+    def _version_key(self) -> str:
+        return redis_keys.typeahead_version_key("profiles")
+
+    @property
+    def _changes_key(self) -> str:
+        return redis_keys.typeahead_changes_key("profiles")
+
+    async def _remote_version(self) -> int | None:
+        client = advanced_redis_client.client
+        if client is None:
+            return None
+        try:
+            return int(await client.get(self._version_key) or 0)
+        except Exception as e:
+            logger.warning(f"Typeahead version check failed: {e}")
+            return self._version
+
+    async def _changed_since(self, version: int) -> list[uuid.UUID] | None:
+        """Profile ids logged after ``version``, or None if the log can't be read."""
+        try:
+            members = await advanced_redis_client.client.zrangebyscore(
+                self._changes_key, f"({version}", "+inf"
+            )
+        except Exception as e:
+            logger.warning(f"Typeahead change log read failed: {e}")
+            return None
+        return [uuid.UUID(m.decode() if isinstance(m, bytes) else m) for m in members]
+
+    async def _is_stale(self) -> bool:
+        now = time.monotonic()
+        if self._dirty or now - self._built_at > self.max_age:
+            return True
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        return await self._remote_version() != self._version
+
+    @staticmethod
+    def _query():
+        return select(
+            Profile.user_id,
+            Profile.username,
+            Profile.display_name,
+            Profile.avatar_url,
+            Profile.follower_count,
+        ).where(Profile.is_public)
+
+    @staticmethod
+    def _entry(row) -> TypeaheadEntry:
+        return TypeaheadEntry(
+            key=row.user_id,
+            texts=tuple(t for t in (row.username, row.display_name) if t),
+            weight=row.follower_count or 0,
+            payload={
+                "user_id": row.user_id,
+                "username": row.username,
+                "display_name": row.display_name or "",
+                "avatar_url": row.avatar_url,
+            },
+        )
+
+    async def refresh(self, db: AsyncSession, full: bool = False) -> None:
+        """
+        Bring the index up to date (the index build runs off the event loop).
+
+        Only profiles in the change log are re-read, unless ``full`` or the
+        log does not reach back to this worker's version.
+        """
+        async with self._lock:
+            await self._refresh(db, full)
+
+    async def _refresh(self, db: AsyncSession, full: bool) -> None:
+        version = await self._remote_version()
+        changed = None
+        if (
+            not full
+            and not self._dirty
+            and version is not None
+            and self._version is not None
+            and 0 <= version - self._version <= self.max_changes
+        ):
+            changed = await self._changed_since(self._version)
+
+        if changed is None:
+            result = await db.execute(self._query())
+            entries = {row.user_id: self._entry(row) for row in result}
+            built_at = time.monotonic()
+        else:
+            entries = dict(self._entries)
+            for user_id in changed:
+                entries.pop(user_id, None)  # gone private is just not re-added
+            if changed:
+                result = await db.execute(self._query().where(Profile.user_id.in_(changed)))
+                entries.update((row.user_id, self._entry(row)) for row in result)
+            built_at = self._built_at
+
+        if changed is None or changed:
+            self.index = await asyncio.to_thread(TypeaheadIndex, entries.values())
+        self._entries = entries
+        self._version = version
+        self._dirty = False
+        self._built_at = built_at
+        self._checked_at = time.monotonic()
+
+    async def _refresh_in_background(self) -> None:
+        async for db in db_manager.get_session(read_only=True):
+            await self.refresh(db, full=time.monotonic() - self._built_at > self.max_age)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Typeahead refresh failed: {task.exception()}")
+
+    async def suggest(self, db: AsyncSession, query: str, limit: int = 10) -> list[dict[str, Any]]:
+        if self._built_at == float("-inf"):
+            # Nothing to serve yet: the first build runs in the request
+            async with self._lock:
+                if self._built_at == float("-inf"):  # not built while we waited
+                    await self._refresh(db, full=True)
+        elif await self._is_stale() and (self._refreshing is None or self._refreshing.done()):
+            # Keep serving the current index while the next one is built
+            self._refreshing = asyncio.create_task(self._refresh_in_background())
+            self._refreshing.add_done_callback(self._log_failure)
+        return [entry.payload for entry in self.index.suggest(query, limit)]
+
+    async def invalidate(self, user_id: Any) -> None:
+        """Publish a profile whose name or visibility changed, or that signed up."""
+        client = advanced_redis_client.client
+        if client is None:
+            self._dirty = True
+            return
+        try:
+            await client.eval(
+                _PUBLISH_SCRIPT,
+                2,
+                self._version_key,
+                self._changes_key,
+                str(user_id),
+                self.max_changes,
+            )
+            self._checked_at = float("-inf")  # this worker picks it up on the next query
+        except Exception as e:
+            logger.warning(f"Typeahead invalidation failed: {e}")
+            self._dirty = True
+
+
+profile_typeahead = ProfileTypeahead()
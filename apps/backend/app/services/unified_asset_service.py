@@ -3,16 +3,24 @@ Unified Asset Service - Single source of truth for all assets
 Prevents duplicates and manages crypto/stock/index discovery
 """
 
+import asyncio
 import logging
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 
 import httpx
 
 from app.core.advanced_redis_client import advanced_redis_client
 from app.core.config import settings
+from app.core.single_flight import single_flight
+from app.services.data_service import symbol_directory
 
 logger = logging.getLogger(__name__)
 
+REGISTRY_CACHE_KEY = "unified:asset_registry"
+# Seconds the cached registry lives, and between refreshes on each worker
+REGISTRY_CACHE_TTL = 3600
+REGISTRY_REFRESH_SECONDS = 900
+
 
 @dataclass
 class UnifiedAsset:
@@ -52,28 +60,41 @@ class UnifiedAssetService:
 
     async def _initialize_registry(self):
         """Initialize the asset registry from cache or API"""
-        cache_key = "unified:asset_registry"
+        if await self._load_cached_registry():
+            return
+
+        # Initialize with known cryptos from CoinGecko
+        if await self._fetch_crypto_symbols():
+            await self._cache_registry()
 
+    async def _load_cached_registry(self) -> bool:
+        """Adopt the registry cached by any worker; False when there is none"""
         try:
-            data = await advanced_redis_client.get(cache_key)
-            if data:
-                self._crypto_symbols = set(data.get("crypto_symbols", []))
-                self._stock_symbols = set(data.get("stock_symbols", []))
-                logger.info(
-                    f"✅ Loaded asset registry: {len(self._crypto_symbols)} cryptos, {len(self._stock_symbols)} stocks"
-                )
-                return
+            data = await advanced_redis_client.get(REGISTRY_CACHE_KEY)
+            if not data:
+                return False
+            crypto_symbols = set(data.get("crypto_symbols", []))
+            assets = [UnifiedAsset(**asset) for asset in data.get("assets", [])]
+            # Cryptos are replaced; stocks registered here since are kept
+            for symbol in self._crypto_symbols - crypto_symbols:
+                self._asset_registry.pop(symbol, None)
+            self._crypto_symbols = crypto_symbols
+            self._stock_symbols |= set(data.get("stock_symbols", []))
+            self._asset_registry.update((asset.symbol, asset) for asset in assets)
+            symbol_directory.sync_registry(
+                [a for a in assets if a.type == "crypto"], asset_type="crypto"
+            )
+            symbol_directory.sync_registry([a for a in assets if a.type != "crypto"])
+            logger.info(
+                f"✅ Loaded asset registry: {len(self._crypto_symbols)} cryptos, {len(self._stock_symbols)} stocks"
+            )
+            return True
         except Exception as e:
             logger.warning(f"Could not load cached registry: {e}")
+            return False
 
-        # Initialize with known cryptos from CoinGecko
-        await self._fetch_crypto_symbols()
-
-        # Cache the registry for 1 hour
-        await self._cache_registry()
-
-    async def _fetch_crypto_symbols(self):
-        """Fetch all crypto symbols from CoinGecko to build registry"""
+    async def _fetch_crypto_symbols(self) -> bool:
+        """Fetch all crypto symbols from CoinGecko to build registry; False on failure"""
         try:
             url = "https://api.coingecko.com/api/v3/coins/markets"
             params = {
@@ -96,10 +117,10 @@ class UnifiedAssetService:
             resp.raise_for_status()
             data = resp.json()
 
+            cryptos = {}
             for coin in data:
                 symbol = coin["symbol"].upper()
-                self._crypto_symbols.add(symbol)
-                self._asset_registry[symbol] = UnifiedAsset(
+                cryptos[symbol] = UnifiedAsset(
                     symbol=symbol,
                     name=coin["name"],
                     type="crypto",
@@ -109,10 +130,20 @@ class UnifiedAssetService:
                     market_cap_rank=coin.get("market_cap_rank"),
                 )
 
+            # Replace the crypto part of the registry; the symbol directory
+            # re-indexes only what changed
+            for symbol in self._crypto_symbols - cryptos.keys():
+                self._asset_registry.pop(symbol, None)
+            self._crypto_symbols = set(cryptos)
+            self._asset_registry.update(cryptos)
+            symbol_directory.sync_registry(cryptos.values(), asset_type="crypto")
+
             logger.info(f"✅ Initialized crypto registry with {len(self._crypto_symbols)} symbols")
+            return True
 
         except Exception as e:
             logger.error(f"❌ Error fetching crypto symbols: {e}")
+            return False
 
     async def _cache_registry(self):
         """Cache the asset registry"""
@@ -120,12 +151,9 @@ class UnifiedAssetService:
             data = {
                 "crypto_symbols": list(self._crypto_symbols),
                 "stock_symbols": list(self._stock_symbols),
+                "assets": [asdict(asset) for asset in self._asset_registry.values()],
             }
-            await advanced_redis_client.set(
-                "unified:asset_registry",
-                data,
-                expire=3600,  # 1 hour
-            )
+            await advanced_redis_client.set(REGISTRY_CACHE_KEY, data, expire=REGISTRY_CACHE_TTL)
         except Exception as e:
             logger.warning(f"Could not cache registry: {e}")
 
@@ -166,6 +194,21 @@ class UnifiedAssetService:
             return asset.provider_id
         return None
 
+    async def refresh_registry(self):
+        """
+        Bring this worker's registry and the symbol index up to date
+
+        Adopts the cached registry while it lives; once it expires one worker
+        re-fetches the cryptos and re-caches them for the rest.
+        """
+        if await self._load_cached_registry():
+            return
+        await single_flight.run_exclusive(REGISTRY_CACHE_KEY, self._fetch_and_cache)
+
+    async def _fetch_and_cache(self):
+        if await self._fetch_crypto_symbols():
+            await self._cache_registry()
+
     async def get_all_cryptos(self) -> list[str]:
         """Get all known crypto symbols"""
         return list(self._crypto_symbols)
@@ -179,13 +222,15 @@ class UnifiedAssetService:
         symbol_upper = symbol.upper()
         if symbol_upper not in self._crypto_symbols:
             self._stock_symbols.add(symbol_upper)
-            self._asset_registry[symbol_upper] = UnifiedAsset(
+            asset = UnifiedAsset(
                 symbol=symbol_upper,
                 name=name,
                 type="stock",
                 provider="finnhub",
                 provider_id=symbol_upper,
             )
+            self._asset_registry[symbol_upper] = asset
+            symbol_directory.sync_registry([asset])
 
     async def get_all_assets(
         self, limit_per_type: int = 10, types: list[str] | None = None, force_refresh: bool = False
@@ -211,6 +256,26 @@ class UnifiedAssetService:
 
         result = {}
 
+        # Read the cached stock/index/forex lists in one round-trip; services only run on a miss
+        list_keys = {
+            "stocks": f"stocks:all:{limit_per_type}",
+            "indices": f"indices:all:{limit_per_type}",
+            "forex": f"forex:all:{limit_per_type}",
+        }
+        cached_lists = {}
+        if not force_refresh:
+            found = await advanced_redis_client.get_many(
+                [key for asset_type, key in list_keys.items() if asset_type in types]
+            )
+            cached_lists = {
+                asset_type: found[key]
+                for asset_type, key in list_keys.items()
+                if isinstance(found.get(key), list)
+            }
+            for asset_type, assets in cached_lists.items():
+                result[asset_type] = assets
+                logger.info(f"✅ Loaded {len(assets)} {asset_type} from cache")
+
         # Fetch crypto if requested (EXPANDED: now fetching 300 instead of 100)
         if "crypto" in types:
             try:
@@ -229,7 +294,7 @@ class UnifiedAssetService:
                 result["crypto"] = []
 
         # Fetch stocks if requested - REAL API
-        if "stocks" in types:
+        if "stocks" in types and "stocks" not in cached_lists:
             try:
                 stock_service = StockService(redis_client=advanced_redis_client)
                 stocks = await stock_service.get_stocks(limit=limit_per_type)
@@ -242,7 +307,7 @@ class UnifiedAssetService:
                 logger.warning("⚠️ Using mock stock data as fallback")
 
         # Fetch indices if requested - REAL API
-        if "indices" in types:
+        if "indices" in types and "indices" not in cached_lists:
             try:
                 from app.services.indices_service import IndicesService
 
@@ -257,7 +322,7 @@ class UnifiedAssetService:
                 logger.warning("⚠️ Using mock indices data as fallback")
 
         # Fetch forex if requested - REAL API
-        if "forex" in types:
+        if "forex" in types and "forex" not in cached_lists:
             try:
                 forex_service = ForexService(redis_client=advanced_redis_client)
                 forex = await forex_service.get_forex_pairs(limit=limit_per_type)
@@ -561,6 +626,7 @@ class UnifiedAssetService:
 
 # Global singleton
 _unified_service: UnifiedAssetService | None = None
+_refresh_task: asyncio.Task | None = None
 
 
 async def get_unified_service() -> UnifiedAssetService:
@@ -570,3 +636,36 @@ async def get_unified_service() -> UnifiedAssetService:
         _unified_service = UnifiedAssetService()
         await _unified_service.__aenter__()
     return _unified_service
+
+
+def start_registry_refresh():
+    """Refresh the worker's registry in the background once the service is in use"""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_registry_refresh_loop())
+
+
+async def stop_registry_refresh():
+    """Stop the background registry refresh"""
+    global _refresh_task
+    if _refresh_task is None:
+        return
+    _refresh_task.cancel()
+    try:
+        await _refresh_task
+    except asyncio.CancelledError:
+        pass
+    _refresh_task = None
+
+
+async def _registry_refresh_loop():
+    while True:
+        await asyncio.sleep(REGISTRY_REFRESH_SECONDS)
+        if _unified_service is None:
+            continue
+        try:
+            await _unified_service.refresh_registry()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Asset registry refresh error: {e}")
@@ -52,6 +52,16 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.maintenance.collect_storage_metrics_task",
         "schedule": crontab(hour=1, minute=30, day_of_week=1),  # Monday 1:30 AM
     },
+    # Nightly follow suggestion rebuild at 2:30 AM (follows keep them current in between)
+    "nightly-follow-suggestions": {
+        "task": "app.tasks.maintenance.rebuild_follow_suggestions_task",
+        "schedule": crontab(hour=2, minute=30),
+    },
+    # Expired notifications, swept incrementally every 15 minutes
+    "expired-notifications-sweep": {
+        "task": "app.tasks.maintenance.sweep_expired_notifications_task",
+        "schedule": crontab(minute="*/15"),
+    },
 }
 
 
@@ -346,6 +356,87 @@ def emergency_cleanup_task(force_delete_days: int | None = None) -> dict[str, An
         }
 
 
+@celery_app.task(name="app.tasks.maintenance.rebuild_follow_suggestions_task")
+def rebuild_follow_suggestions_task() -> dict[str, Any]:
+    """Recompute materialized follow suggestions, repairing any drift"""
+    try:
+        import asyncio
+
+        from app.core.database import db_manager
+        from app.services.follow_suggestions import FollowSuggestionService
+
+        async def rebuild():
+            await db_manager.initialize()
+            async for session in db_manager.get_session():
+                rows = await FollowSuggestionService(session).rebuild()
+
+            return {
+                "task": "rebuild_follow_suggestions",
+                "timestamp": datetime.now().isoformat(),
+                "success": True,
+                "suggestions": rows,
+            }
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            result = loop.run_until_complete(rebuild())
+            logger.info(f"Follow suggestions rebuilt: {result['suggestions']} rows")
+            return result
+        finally:
+            loop.close()
+
+    except Exception as e:
+        logger.error(f"Follow suggestion rebuild failed: {e}")
+        return {
+            "task": "rebuild_follow_suggestions",
+            "timestamp": datetime.now().isoformat(),
+            "success": False,
+            "error": str(e),
+        }
+
+
+@celery_app.task(name="app.tasks.maintenance.sweep_expired_notifications_task")
+def sweep_expired_notifications_task(max_batches: int | None = None) -> dict[str, Any]:
+    """Delete a bounded number of the longest-expired notifications"""
+    try:
+        import asyncio
+
+        from app.core.database import db_manager
+        from app.services.notification_service import notification_service
+
+        async def sweep():
+            await db_manager.initialize()
+            deleted = await notification_service.cleanup_expired_notifications(
+                max_batches=max_batches or notification_service.expiry_sweep_max_batches
+            )
+
+            return {
+                "task": "sweep_expired_notifications",
+                "timestamp": datetime.now().isoformat(),
+                "success": True,
+                "deleted": deleted,
+            }
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            result = loop.run_until_complete(sweep())
+            logger.info(f"Expired notification sweep deleted {result['deleted']} rows")
+            return result
+        finally:
+            loop.close()
+
+    except Exception as e:
+        logger.error(f"Expired notification sweep failed: {e}")
+        return {
+            "task": "sweep_expired_notifications",
+            "timestamp": datetime.now().isoformat(),
+            "success": False,
+            "error": str(e),
+        }
+
+
 # Utility function to run tasks manually
 def run_task_now(task_name: str, **kwargs: Any):
     """Run a maintenance task immediately (for testing/manual execution)"""
@@ -355,6 +446,8 @@ def run_task_now(task_name: str, **kwargs: Any):
         "monthly_maintenance": monthly_maintenance_task,
         "collect_metrics": collect_storage_metrics_task,
         "emergency_cleanup": emergency_cleanup_task,
+        "follow_suggestions": rebuild_follow_suggestions_task,
+        "expired_notifications": sweep_expired_notifications_task,
     }
 
     if task_name not in task_map:
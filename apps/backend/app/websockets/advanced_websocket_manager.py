@@ -23,6 +23,7 @@ from fastapi.websockets import WebSocketState
 
 from app.core.advanced_redis_client import advanced_redis_client
 from app.services.notification_service import NotificationService
+from app.websockets.encoding import JSON, EncodedMessage, decode, negotiate, send_frame
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +68,7 @@ class ConnectionInfo:
     subscriptions: set[str]
     client_info: dict[str, Any]
     priority: int = 0  # For load balancing
+    encoding: str = JSON  # Wire encoding negotiated at connect
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -79,6 +81,7 @@ class ConnectionInfo:
             "rooms": list(self.rooms),
             "subscriptions": list(self.subscriptions),
             "client_info": self.client_info,
+            "encoding": self.encoding,
         }
 
 
@@ -335,12 +338,17 @@ class AdvancedWebSocketManager:
         logger.info("✅ All advanced WebSocket background tasks stopped")
 
     async def connect(
-        self, websocket: WebSocket, user_id: str, client_info: dict[str, Any] | None = None
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        client_info: dict[str, Any] | None = None,
+        encoding: str | None = None,
     ) -> str | None:
         """Connect a new WebSocket with enhanced tracking"""
 
         try:
-            await websocket.accept()
+            encoding, subprotocol = negotiate(websocket, encoding)
+            await websocket.accept(subprotocol=subprotocol)
 
             connection_id = await self.connection_pool.add_connection(
                 websocket, user_id, client_info
@@ -349,6 +357,7 @@ class AdvancedWebSocketManager:
             if not connection_id:
                 await websocket.close(code=1013, reason="Server overloaded")
                 return None
+            self.connection_pool.connections[connection_id].encoding = encoding
 
             # Join user-specific room
             await self.connection_pool.join_room(connection_id, f"user:{user_id}")
@@ -427,10 +436,11 @@ class AdvancedWebSocketManager:
 
         # Sort connections by priority for load balancing
         connections.sort(key=lambda c: c.priority, reverse=True)
+        encoded = EncodedMessage(message)
 
         for connection_info in connections:
             try:
-                await self._send_to_connection(connection_info.connection_id, message)
+                await self._send_to_connection(connection_info.connection_id, message, encoded)
                 sent_count += 1
             except Exception as e:
                 logger.error(
@@ -452,10 +462,11 @@ class AdvancedWebSocketManager:
         if exclude_user_id:
             connections = [c for c in connections if c.user_id != exclude_user_id]
 
-        # Batch send for performance
+        # Batch send for performance; encoded once per wire encoding
+        encoded = EncodedMessage(message)
         tasks = []
         for connection_info in connections:
-            task = self._send_to_connection(connection_info.connection_id, message)
+            task = self._send_to_connection(connection_info.connection_id, message, encoded)
             tasks.append(task)
 
         # Execute all sends concurrently
@@ -479,19 +490,26 @@ class AdvancedWebSocketManager:
 
         return sent_count
 
-    async def _send_to_connection(self, connection_id: str, message: dict[str, Any]):
-        """Send message to specific connection"""
+    async def _send_to_connection(
+        self,
+        connection_id: str,
+        message: dict[str, Any],
+        encoded: EncodedMessage | None = None,
+    ):
+        """Send message to specific connection, reusing ``encoded`` frames when given"""
 
         connection_info = self.connection_pool.connections.get(connection_id)
         if not connection_info:
             return False
 
         try:
-            message_json = json.dumps(message)
-            await connection_info.websocket.send_text(message_json)
+            if encoded is None:
+                encoded = EncodedMessage(message)
+            frame = encoded.frame(connection_info.encoding)
+            await send_frame(connection_info.websocket, frame)
 
             # Update metrics
-            connection_info.metrics.record_sent(len(message_json))
+            connection_info.metrics.record_sent(len(frame))
             self.performance_counters["messages_sent"] += 1
 
             return True
@@ -504,15 +522,15 @@ class AdvancedWebSocketManager:
             logger.error(f"Failed to send message to connection {connection_id}: {e}")
             return False
 
-    async def handle_message(self, connection_id: str, message: str):
-        """Handle incoming WebSocket message"""
+    async def handle_message(self, connection_id: str, message: str | bytes):
+        """Handle incoming WebSocket message (JSON text or MessagePack binary)"""
 
         connection_info = self.connection_pool.connections.get(connection_id)
         if not connection_info:
             return
 
         try:
-            data = json.loads(message)
+            data = decode(message)
             connection_info.metrics.record_received(len(message))
             self.performance_counters["messages_received"] += 1
 
@@ -532,8 +550,8 @@ class AdvancedWebSocketManager:
             else:
                 logger.warning(f"Unknown message type: {message_type}")
 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON message from connection {connection_id}")
+        except ValueError:
+            logger.error(f"Invalid message from connection {connection_id}")
         except Exception as e:
             logger.error(f"Error handling message from connection {connection_id}: {e}")
 
@@ -0,0 +1,144 @@
+"""
+Negotiable wire encodings for WebSocket frames.
+
+A client picks its encoding when it connects, either with an ``encoding``
+query parameter or by offering a ``lokifi.<encoding>`` subprotocol:
+
+- ``json`` (default): text frames. Encoded with orjson when it is
+  installed, with the stdlib json module otherwise.
+- ``msgpack``: binary MessagePack frames, which are more compact for
+  numeric price payloads.
+
+Datetimes, UUIDs and Decimals are sent as strings in both encodings.
+Compression is separate: uvicorn negotiates permessage-deflate with any
+client that offers it (``--ws-per-message-deflate``, on by default).
+
+``EncodedMessage`` encodes a message at most once per encoding, so a
+broadcast costs one encode for each encoding in use, however many
+connections receive it.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+import msgpack
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+ENCODINGS = (JSON, MSGPACK)
+SUBPROTOCOL_PREFIX = "lokifi."
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime | date):
+        return value.isoformat()
+    if isinstance(value, UUID | Decimal):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, set | frozenset):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps_json(value: Any) -> str:
+    """Compact JSON text (same output as ``WebSocket.send_json``)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib handles them
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+def pack(value: Any) -> bytes:
+    """MessagePack bytes."""
+    return msgpack.packb(value, default=_default, use_bin_type=True)
+
+
+def msgpack_map_header(size: int) -> bytes:
+    """Header for a MessagePack map of ``size`` pairs, so pre-packed pairs can be joined."""
+    if size < 16:
+        return bytes([0x80 | size])
+    if size < 1 << 16:
+        return b"\xde" + size.to_bytes(2, "big")
+    return b"\xdf" + size.to_bytes(4, "big")
+
+
+def encode(message: Any, encoding: str = JSON) -> str | bytes:
+    return pack(message) if encoding == MSGPACK else dumps_json(message)
+
+
+def decode(frame: str | bytes) -> Any:
+    """Decode a client frame: text is JSON, binary is MessagePack. Raises ValueError."""
+    if isinstance(frame, bytes):
+        try:
+            return msgpack.unpackb(frame, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack frame: {e}") from e
+    return json.loads(frame)
+
+
+def negotiate(websocket: WebSocket, requested: str | None = None) -> tuple[str, str | None]:
+    """
+    Pick an encoding for a connection.
+
+    Returns ``(encoding, subprotocol)``. Pass the subprotocol to
+    ``websocket.accept`` when the client asked through one. Unknown
+    requests fall back to JSON.
+    """
+    if requested in ENCODINGS:
+        return requested, None
+    for offered in websocket.scope.get("subprotocols") or ():
+        name = offered.removeprefix(SUBPROTOCOL_PREFIX)
+        if offered.startswith(SUBPROTOCOL_PREFIX) and name in ENCODINGS:
+            return name, offered
+    return JSON, None
+
+
+async def send_frame(websocket: WebSocket, frame: str | bytes) -> None:
+    if isinstance(frame, bytes):
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+
+async def receive_frame(websocket: WebSocket) -> str | bytes:
+    """Next text or binary frame from the client."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        return message["bytes"]
+    return message.get("text") or ""
+
+
+class EncodedMessage:
+    """A message encoded lazily, at most once per encoding."""
+
+    __slots__ = ("_frames", "message")
+
+    def __init__(self, message: Any):
+        self.message = message
+        self._frames: dict[str, str | bytes] = {}
+
+    def frame(self, encoding: str = JSON) -> str | bytes:
+        frame = self._frames.get(encoding)
+        if frame is None:
+            frame = self._frames[encoding] = encode(self.message, encoding)
+        return frame
@@ -1,5 +1,4 @@
 # J6 Enterprise Notifications - WebSocket Real-time Delivery
-import json
 import logging
 from datetime import UTC, datetime
 from typing import Any
@@ -12,6 +11,7 @@ from app.models.notification_models import Notification
 # We'll handle auth differently - remove the problematic import for now
 from app.models.user import User
 from app.services.notification_service import NotificationEvent, notification_service
+from app.websockets.encoding import JSON, EncodedMessage, negotiate, send_frame
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +48,10 @@ class NotificationWebSocketManager:
             NotificationEvent.CREATED, self._handle_notification_created
         )
 
+        notification_service.add_event_handler(
+            NotificationEvent.BATCH_CREATED, self._handle_notifications_created
+        )
+
         notification_service.add_event_handler(
             NotificationEvent.READ, self._handle_notification_read
         )
@@ -56,19 +60,26 @@ class NotificationWebSocketManager:
             NotificationEvent.DISMISSED, self._handle_notification_dismissed
         )
 
-    async def connect(self, websocket: WebSocket, user: User) -> bool:
+        notification_service.add_event_handler(
+            NotificationEvent.UNREAD_COUNTS, self._handle_unread_counts
+        )
+
+    async def connect(self, websocket: WebSocket, user: User, encoding: str | None = None) -> bool:
         """
         Connect a user's WebSocket
 
         Args:
             websocket: WebSocket connection
             user: Authenticated user
+            encoding: Requested wire encoding (json or msgpack); a
+                ``lokifi.<encoding>`` subprotocol is honoured otherwise
 
         Returns:
             True if connection successful
         """
         try:
-            await websocket.accept()
+            encoding, subprotocol = negotiate(websocket, encoding)
+            await websocket.accept(subprotocol=subprotocol)
 
             # Add to connections (convert UUID to string for dictionary key)
             user_id_str = str(user.id)
@@ -81,6 +92,7 @@ class NotificationWebSocketManager:
             self.connection_metadata[websocket] = {
                 "user_id": user_id_str,
                 "username": user.username,
+                "encoding": encoding,
                 "connected_at": datetime.now(UTC),
                 "last_activity": datetime.now(UTC),
             }
@@ -181,10 +193,11 @@ class NotificationWebSocketManager:
         )  # Copy to avoid modification during iteration
         sent_count = 0
         failed_connections = []
+        encoded = EncodedMessage(message)  # Encoded once per wire encoding
 
         for websocket in connections:
             try:
-                await self._send_to_websocket(websocket, message)
+                await self._send_to_websocket(websocket, message, encoded)
                 sent_count += 1
 
                 # Update last activity
@@ -223,11 +236,18 @@ class NotificationWebSocketManager:
 
         return total_sent
 
-    async def _send_to_websocket(self, websocket: WebSocket, message: dict[str, Any]):
-        """Send message to a specific WebSocket connection"""
+    async def _send_to_websocket(
+        self,
+        websocket: WebSocket,
+        message: dict[str, Any],
+        encoded: EncodedMessage | None = None,
+    ):
+        """Send message to a specific WebSocket connection in its encoding"""
         try:
-            message_json = json.dumps(message, default=str)
-            await websocket.send_text(message_json)
+            if encoded is None:
+                encoded = EncodedMessage(message)
+            metadata = self.connection_metadata.get(websocket, {})
+            await send_frame(websocket, encoded.frame(metadata.get("encoding", JSON)))
         except Exception as e:
             logger.error(f"Failed to send WebSocket message: {e}")
             raise
@@ -240,19 +260,6 @@ class NotificationWebSocketManager:
 
             sent_count = await self.send_to_user(str(notification.user_id), message)
 
-            # Also send updated unread count
-            unread_count = await notification_service.get_unread_count(str(notification.user_id))
-            unread_message = {
-                "type": "unread_count",
-                "data": {
-                    "count": unread_count,
-                    "user_id": notification.user_id,
-                    "timestamp": datetime.now(UTC).isoformat(),
-                },
-            }
-
-            await self.send_to_user(str(notification.user_id), unread_message)
-
             if sent_count > 0:
                 logger.debug(
                     f"Sent real-time notification to {sent_count} connections for user {notification.user_id}"
@@ -261,6 +268,19 @@ class NotificationWebSocketManager:
         except Exception as e:
             logger.error(f"Failed to handle notification created event: {e}")
 
+    async def _handle_notifications_created(self, notifications: list[Notification]):
+        """Handle a bulk-created chunk: push to connected recipients only"""
+        try:
+            for notification in notifications:
+                user_id = str(notification.user_id)
+                if user_id in self.active_connections:
+                    await self.send_to_user(
+                        user_id, {"type": "notification_created", "data": notification.to_dict()}
+                    )
+
+        except Exception as e:
+            logger.error(f"Failed to handle batch notification created event: {e}")
+
     async def _handle_notification_read(self, data: Any):
         """Handle notification read event"""
         try:
@@ -291,19 +311,6 @@ class NotificationWebSocketManager:
 
             await self.send_to_user(user_id, message)
 
-            # Send updated unread count
-            unread_count = await notification_service.get_unread_count(user_id)
-            unread_message = {
-                "type": "unread_count",
-                "data": {
-                    "count": unread_count,
-                    "user_id": user_id,
-                    "timestamp": datetime.now(UTC).isoformat(),
-                },
-            }
-
-            await self.send_to_user(user_id, unread_message)
-
         except Exception as e:
             logger.error(f"Failed to handle notification read event: {e}")
 
@@ -324,6 +331,30 @@ class NotificationWebSocketManager:
         except Exception as e:
             logger.error(f"Failed to handle notification dismissed event: {e}")
 
+    async def _handle_unread_counts(self, counts: dict[str, int | None]):
+        """Push counter values written by the service; no query unless a counter was missing"""
+        try:
+            for user_id, count in counts.items():
+                if user_id not in self.active_connections:
+                    continue
+                if count is None:
+                    count = await notification_service.get_unread_count(user_id)
+
+                await self.send_to_user(
+                    user_id,
+                    {
+                        "type": "unread_count",
+                        "data": {
+                            "count": count,
+                            "user_id": user_id,
+                            "timestamp": datetime.now(UTC).isoformat(),
+                        },
+                    },
+                )
+
+        except Exception as e:
+            logger.error(f"Failed to handle unread counts event: {e}")
+
     def get_connection_stats(self) -> dict[str, Any]:
         """Get WebSocket connection statistics"""
         return {
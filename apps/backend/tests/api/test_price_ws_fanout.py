@@ -0,0 +1,169 @@
+"""
+Tests for topic fan-out and delta pushes in app.routers.websocket_prices.PriceWebSocketManager
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from app.routers.websocket_prices import PriceWebSocketManager
+from app.services.smart_price_service import PriceData
+from app.websockets.encoding import dumps_json
+
+
+def _socket():
+    ws = MagicMock()
+    ws.accept = AsyncMock()
+    ws.send_text = AsyncMock()
+    ws.close = AsyncMock()
+    return ws
+
+
+@pytest_asyncio.fixture
+async def manager():
+    manager = PriceWebSocketManager(queue_size=4)
+    # Keep the polling loop out of these tests
+    with patch.object(manager, "_price_update_loop", AsyncMock()):
+        yield manager
+    for client_id in list(manager.clients):
+        manager.disconnect(client_id)
+
+
+async def _connect(manager, client_id, symbols):
+    ws = _socket()
+    await manager.connect(ws, client_id)
+    await manager.subscribe(client_id, symbols)
+    return ws
+
+
+def _frames(ws):
+    return [json.loads(call.args[0]) for call in ws.send_text.await_args_list]
+
+
+def _price(symbol, price, **fields):
+    return PriceData(symbol=symbol, price=price, source="coingecko", **fields)
+
+
+PRICES = {
+    "BTC": PriceData(symbol="BTC", price=100.0, source="coingecko"),
+    "ETH": PriceData(symbol="ETH", price=10.0, source="coingecko"),
+}
+
+
+class TestFanOut:
+    @pytest.mark.asyncio
+    async def test_clients_receive_only_their_topics(self, manager):
+        both = await _connect(manager, "a", ["btc", "eth"])
+        eth = await _connect(manager, "b", ["ETH"])
+        assert manager.broadcast(PRICES) == 2
+        await asyncio.sleep(0)
+
+        frame = _frames(both)[0]
+        assert frame["type"] == "price_update" and frame["count"] == 2
+        assert frame["data"]["BTC"]["price"] == 100.0
+        assert list(_frames(eth)[0]["data"]) == ["ETH"]
+
+    @pytest.mark.asyncio
+    async def test_each_symbol_encoded_once_and_frames_shared(self, manager):
+        sockets = [await _connect(manager, f"c{i}", ["BTC", "ETH"]) for i in range(50)]
+        with patch("app.routers.websocket_prices.dumps_json", wraps=dumps_json) as dumps:
+            manager.broadcast(PRICES)
+        # symbol name + payload per symbol, plus the timestamp and snapshot flag
+        assert dumps.call_count == 2 * len(PRICES) + 2
+        await asyncio.sleep(0)
+        sent = {call.args[0] for ws in sockets for call in ws.send_text.await_args_list}
+        assert len(sent) == 1
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_and_disconnect_leave_topics(self, manager):
+        await _connect(manager, "a", ["BTC", "ETH"])
+        await _connect(manager, "b", ["BTC"])
+        await manager.unsubscribe("a", ["eth"])
+        assert "ETH" not in manager.topics
+        manager.disconnect("b")
+        assert manager.topics == {"BTC": {"a"}}
+
+
+class TestSlowConsumers:
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_only_the_slow_client(self, manager):
+        slow = await _connect(manager, "slow", ["BTC"])
+        fast = await _connect(manager, "fast", ["BTC"])
+
+        async def stalled(frame):
+            await asyncio.sleep(3600)
+
+        slow.send_text.side_effect = stalled
+
+        for _ in range(6):
+            manager.broadcast(PRICES, snapshot=True)
+            await asyncio.sleep(0)
+
+        assert "slow" not in manager.clients and "fast" in manager.clients
+        assert "slow" not in manager.topics["BTC"]
+        slow.close.assert_awaited_once_with(code=1013)
+        assert fast.send_text.await_count == 6
+
+    @pytest.mark.asyncio
+    async def test_send_failure_disconnects(self, manager):
+        ws = await _connect(manager, "a", ["BTC"])
+        ws.send_text.side_effect = RuntimeError("socket closed")
+        manager.broadcast(PRICES)
+        await asyncio.sleep(0)
+        assert "a" not in manager.clients and "BTC" not in manager.topics
+
+
+class TestDeltas:
+    @pytest.mark.asyncio
+    async def test_only_moved_fields_are_sent(self, manager):
+        ws = await _connect(manager, "a", ["BTC", "ETH"])
+        manager.broadcast({"BTC": _price("BTC", 100.0, volume=5.0), "ETH": _price("ETH", 10.0)})
+        manager.broadcast(
+            {"BTC": _price("BTC", 101.0, volume=5.0), "ETH": _price("ETH", 10.0000001)}
+        )
+        await asyncio.sleep(0)
+
+        first, second = _frames(ws)
+        assert first["snapshot"] is False and first["data"]["BTC"]["volume"] == 5.0
+        assert second["count"] == 1
+        assert set(second["data"]["BTC"]) == {"symbol", "price", "last_updated", "cached"}
+        assert second["data"]["BTC"]["price"] == 101.0
+
+    @pytest.mark.asyncio
+    async def test_unchanged_prices_send_nothing(self, manager):
+        ws = await _connect(manager, "a", ["BTC"])
+        manager.broadcast(PRICES)
+        assert manager.broadcast(PRICES) == 0
+        await asyncio.sleep(0)
+        assert ws.send_text.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_drift_is_measured_from_last_sent_value(self, manager):
+        ws = await _connect(manager, "a", ["BTC"])
+        manager.price_epsilon = 0.01
+        for price in (100.0, 100.6, 101.2):
+            manager.broadcast({"BTC": _price("BTC", price)})
+        await asyncio.sleep(0)
+        assert [f["data"]["BTC"]["price"] for f in _frames(ws)] == [100.0, 101.2]
+
+    @pytest.mark.asyncio
+    async def test_new_subscriber_gets_full_record(self, manager):
+        await _connect(manager, "a", ["BTC"])
+        manager.broadcast({"BTC": _price("BTC", 100.0, volume=5.0)})
+        late = await _connect(manager, "b", ["BTC"])
+        manager.broadcast({"BTC": _price("BTC", 101.0, volume=5.0)})
+        await asyncio.sleep(0)
+        assert _frames(late)[0]["data"]["BTC"]["volume"] == 5.0
+
+    @pytest.mark.asyncio
+    async def test_periodic_snapshot_resends_everything(self, manager):
+        ws = await _connect(manager, "a", ["BTC"])
+        manager.broadcast(PRICES)
+        manager.snapshot_interval = 0
+        manager.broadcast(PRICES)
+        await asyncio.sleep(0)
+        snapshot = _frames(ws)[1]
+        assert snapshot["snapshot"] is True and snapshot["data"]["BTC"]["source"] == "coingecko"
@@ -0,0 +1,96 @@
+"""
+Tests for streaming indicator warm-up in app.routers.websocket_prices.PriceWebSocketManager
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.routers.websocket_prices import PriceWebSocketManager
+from app.services.candle_store import CandleStore
+from app.services.smart_price_service import PriceData
+from app.services.streaming_indicators import IndicatorSet
+
+# Start of a 1m bar, plus 30 s into it
+BAR = 1_700_000_040
+NOW = BAR + 30
+
+
+def _bars(closes, end):
+    """1m candles with ``closes`` ending at bar start ``end`` (seconds)"""
+    start = end - 60 * (len(closes) - 1)
+    return [
+        {"ts": (start + 60 * i) * 1000, "o": c, "h": c, "l": c, "c": c, "v": 1.0}
+        for i, c in enumerate(closes)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CandleStore(tmp_path)
+    with patch("app.routers.websocket_prices.candle_store", store):
+        yield store
+
+
+@pytest.fixture
+def state_store():
+    with patch("app.routers.websocket_prices.indicator_state_store") as state_store:
+        state_store.load = AsyncMock(return_value=None)
+        state_store.save = AsyncMock(return_value=True)
+        yield state_store
+
+
+async def _update(price, now=NOW):
+    manager = PriceWebSocketManager()
+    with patch("app.routers.websocket_prices.datetime") as clock:
+        clock.now.return_value.timestamp.return_value = now
+        values = await manager._update_indicators(
+            {"BTC": PriceData(symbol="BTC", price=price, source="coingecko")}
+        )
+    return manager, values["BTC"]
+
+
+class TestIndicatorWarmup:
+    @pytest.mark.asyncio
+    async def test_new_state_is_primed_from_stored_closes(self, store, state_store):
+        closes = [100.0 + i for i in range(200)]
+        store.write("BTC", "1m", _bars(closes, BAR - 60))
+        # The open bar in the store is not a closed bar and must not be replayed
+        store.write("BTC", "1m", _bars([1e6], BAR))
+
+        _, values = await _update(500.0)
+
+        assert values["sma_20"] == pytest.approx((sum(closes[-19:]) + 500.0) / 20)
+        assert values["ema_20"] is not None and values["rsi_14"] is not None
+
+    @pytest.mark.asyncio
+    async def test_restored_state_with_a_gap_is_reprimed(self, store, state_store):
+        closes = [100.0 + i for i in range(200)]
+        store.write("BTC", "1m", _bars(closes, BAR - 60))
+        stale = IndicatorSet("BTC", "1m")
+        stale.on_tick(999.0, BAR - 600)
+        state_store.load.return_value = stale
+
+        _, values = await _update(500.0)
+
+        # 999 from ten bars ago is dropped, not committed as the previous close
+        assert values["sma_20"] == pytest.approx((sum(closes[-19:]) + 500.0) / 20)
+
+    @pytest.mark.asyncio
+    async def test_contiguous_state_resumes_without_reading_the_store(self, state_store):
+        resumed = IndicatorSet("BTC", "1m", specs=["sma:2"])
+        resumed.prime([10.0])
+        resumed.on_tick(20.0, BAR - 60)
+        state_store.load.return_value = resumed
+        store = MagicMock()
+        with patch("app.routers.websocket_prices.candle_store", store):
+            _, values = await _update(30.0)
+
+        store.read.assert_not_called()
+        assert values["sma_2"] == pytest.approx(25.0)
+
+    @pytest.mark.asyncio
+    async def test_empty_store_starts_cold(self, store, state_store):
+        manager, values = await _update(500.0)
+        assert values == {"sma_20": None, "ema_20": None, "rsi_14": None}
+        assert manager.indicator_states["BTC"].bar_start == BAR
@@ -0,0 +1,223 @@
+"""
+Tests for negotiable WebSocket encodings (app.websockets.encoding) and their use
+by the price, advanced and notification WebSocket managers
+"""
+
+import asyncio
+import json
+from datetime import UTC, datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import UUID
+
+import msgpack
+import pytest
+import pytest_asyncio
+
+from app.routers.websocket_prices import PriceWebSocketManager
+from app.services.smart_price_service import PriceData
+from app.websockets import notifications as notifications_module
+from app.websockets.advanced_websocket_manager import AdvancedWebSocketManager
+from app.websockets.encoding import (
+    JSON,
+    MSGPACK,
+    EncodedMessage,
+    decode,
+    dumps_json,
+    encode,
+    msgpack_map_header,
+    negotiate,
+    pack,
+)
+
+
+def _socket(subprotocols=()):
+    ws = MagicMock()
+    ws.scope = {"subprotocols": list(subprotocols)}
+    ws.accept = AsyncMock()
+    ws.send_text = AsyncMock()
+    ws.send_bytes = AsyncMock()
+    ws.close = AsyncMock()
+    return ws
+
+
+# ============================================================================
+# Encoding helpers
+# ============================================================================
+
+
+class TestEncoding:
+    def test_json_matches_send_json(self):
+        message = {"type": "x", "price": 1.5, "name": "Zürich", "ids": [1, 2]}
+        assert dumps_json(message) == json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def test_extended_types_become_strings(self):
+        message = {
+            "at": datetime(2025, 1, 1, tzinfo=UTC),
+            "id": UUID(int=1),
+            "amount": Decimal("1.10"),
+        }
+        expected = {
+            "at": "2025-01-01T00:00:00+00:00",
+            "id": str(UUID(int=1)),
+            "amount": "1.10",
+        }
+        assert json.loads(encode(message, JSON)) == expected
+        assert msgpack.unpackb(encode(message, MSGPACK)) == expected
+
+    def test_decode_by_frame_type(self):
+        assert decode('{"action":"ping"}') == {"action": "ping"}
+        assert decode(pack({"action": "ping"})) == {"action": "ping"}
+        with pytest.raises(ValueError):
+            decode(b"\xc1")
+        with pytest.raises(ValueError):
+            decode("{not json")
+
+    @pytest.mark.parametrize("size", [0, 3, 15, 16, 70000])
+    def test_map_header_matches_packed_maps(self, size):
+        packed = pack({i: None for i in range(size)})
+        assert packed.startswith(msgpack_map_header(size))
+
+    def test_encoded_message_encodes_once_per_encoding(self):
+        encoded = EncodedMessage({"a": 1})
+        with patch("app.websockets.encoding.encode", wraps=encode) as spy:
+            frames = [encoded.frame(enc) for enc in (JSON, MSGPACK, JSON, MSGPACK)]
+        assert spy.call_count == 2
+        assert frames[0] == '{"a":1}' and msgpack.unpackb(frames[1]) == {"a": 1}
+
+
+class TestNegotiation:
+    def test_query_parameter_wins(self):
+        assert negotiate(_socket(["lokifi.json"]), "msgpack") == (MSGPACK, None)
+
+    def test_subprotocol_is_echoed(self):
+        ws = _socket(["graphql-ws", "lokifi.msgpack"])
+        assert negotiate(ws) == (MSGPACK, "lokifi.msgpack")
+
+    def test_unknown_falls_back_to_json(self):
+        assert negotiate(_socket(["lokifi.xml"]), "cbor") == (JSON, None)
+
+
+# ============================================================================
+# Price WebSocket
+# ============================================================================
+
+
+@pytest_asyncio.fixture
+async def manager():
+    manager = PriceWebSocketManager()
+    with patch.object(manager, "_price_update_loop", AsyncMock()):
+        yield manager
+    for client_id in list(manager.clients):
+        manager.disconnect(client_id)
+
+
+PRICES = {
+    "BTC": PriceData(symbol="BTC", price=100.0, source="coingecko"),
+    "ETH": PriceData(symbol="ETH", price=10.0, source="coingecko"),
+}
+
+
+class TestPriceFrames:
+    @pytest.mark.asyncio
+    async def test_msgpack_frame_matches_json_frame(self, manager):
+        text, binary = _socket(), _socket()
+        await manager.connect(text, "text")
+        await manager.connect(binary, "binary", MSGPACK, "lokifi.msgpack")
+        for client_id in ("text", "binary"):
+            await manager.subscribe(client_id, ["BTC", "ETH"])
+
+        assert manager.broadcast(PRICES) == 2
+        await asyncio.sleep(0)
+
+        binary.accept.assert_awaited_once_with(subprotocol="lokifi.msgpack")
+        from_json = json.loads(text.send_text.await_args.args[0])
+        from_msgpack = msgpack.unpackb(binary.send_bytes.await_args.args[0])
+        assert from_msgpack == from_json
+        assert from_msgpack["count"] == 2 and from_msgpack["data"]["BTC"]["price"] == 100.0
+        binary.send_text.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_entries_encoded_once_per_encoding(self, manager):
+        for i in range(20):
+            await manager.connect(_socket(), f"c{i}", MSGPACK if i % 2 else JSON)
+            await manager.subscribe(f"c{i}", ["BTC", "ETH"])
+
+        with patch("app.routers.websocket_prices.pack", wraps=pack) as packed:
+            manager.broadcast(PRICES)
+        # symbol name + payload per symbol, plus the shared head and the count/data keys
+        assert packed.call_count == 2 * len(PRICES) + 2
+
+    @pytest.mark.asyncio
+    async def test_direct_messages_use_client_encoding(self, manager):
+        ws = _socket()
+        await manager.connect(ws, "a", MSGPACK)
+        await manager.send_message("a", {"type": "pong"})
+        await asyncio.sleep(0)
+        assert msgpack.unpackb(ws.send_bytes.await_args.args[0]) == {"type": "pong"}
+
+
+# ============================================================================
+# Advanced WebSocket manager
+# ============================================================================
+
+
+class TestAdvancedManager:
+    @pytest.mark.asyncio
+    async def test_room_broadcast_encodes_once_per_encoding(self):
+        manager = AdvancedWebSocketManager()
+        sockets = []
+        with patch.object(manager.connection_pool, "_store_connection_info", AsyncMock()):
+            for i in range(10):
+                ws = _socket(["lokifi.msgpack"] if i % 2 else [])
+                await manager.connect(ws, f"user{i}")
+                sockets.append(ws)
+        for connection_id in list(manager.connection_pool.connections):
+            manager.connection_pool.room_connections["market"].add(connection_id)
+
+        with patch("app.websockets.encoding.encode", wraps=encode) as spy:
+            sent = await manager.broadcast_to_room("market", {"type": "tick", "price": 1.0})
+
+        assert sent == 10 and spy.call_count == 2
+        assert msgpack.unpackb(sockets[1].send_bytes.await_args.args[0])["price"] == 1.0
+        assert json.loads(sockets[0].send_text.await_args.args[0])["price"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_handle_message_accepts_msgpack(self):
+        manager = AdvancedWebSocketManager()
+        with patch.object(manager.connection_pool, "_store_connection_info", AsyncMock()):
+            connection_id = await manager.connect(_socket(), "user", encoding=MSGPACK)
+        with patch.object(manager, "_handle_ping", AsyncMock()) as ping:
+            await manager.handle_message(connection_id, pack({"type": "ping"}))
+        ping.assert_awaited_once_with(connection_id)
+
+
+# ============================================================================
+# Notification WebSocket manager
+# ============================================================================
+
+
+class TestNotificationManager:
+    @pytest.mark.asyncio
+    async def test_user_connections_get_one_encode_per_encoding(self):
+        service = MagicMock(get_unread_count=AsyncMock(return_value=3))
+        with patch.object(notifications_module, "notification_service", service):
+            manager = notifications_module.NotificationWebSocketManager()
+        user = MagicMock(id="user", username="user")
+        sockets = [_socket(), _socket(["lokifi.msgpack"]), _socket()]
+        with patch.object(notifications_module, "notification_service", service):
+            for ws in sockets:
+                assert await manager.connect(ws, user) is True
+        sockets[1].accept.assert_awaited_once_with(subprotocol="lokifi.msgpack")
+        assert msgpack.unpackb(sockets[1].send_bytes.await_args.args[0])["data"]["count"] == 3
+
+        with patch("app.websockets.encoding.encode", wraps=encode) as spy:
+            sent = await manager.send_to_user("user", {"type": "notification_created"})
+
+        assert sent == 3 and spy.call_count == 2
+        assert msgpack.unpackb(sockets[1].send_bytes.await_args.args[0]) == {
+            "type": "notification_created"
+        }
+        assert json.loads(sockets[2].send_text.await_args.args[0]) == {
+            "type": "notification_created"
+        }
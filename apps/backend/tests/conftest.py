@@ -5,10 +5,13 @@ Common test fixtures and utilities
 Generated by: Test Coverage Booster
 """
 
-from unittest.mock import AsyncMock, Mock
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
 from app.main import app
 
@@ -33,6 +36,55 @@ def mock_db_session():
     return session
 
 
+@pytest_asyncio.fixture
+async def sqlite_session():
+    """AsyncSession on a fresh in-memory SQLite database with every model's table"""
+    import app.models  # register all models
+    import app.models.reaction
+    from app.db.database import Base
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def db(sqlite_session):
+    """sqlite_session, served by db_manager.get_session to the services under test"""
+    from app.core.database import db_manager
+
+    async def get_session(read_only=False):
+        yield sqlite_session
+
+    with patch.object(db_manager, "get_session", get_session):
+        yield sqlite_session
+
+
+@pytest_asyncio.fixture
+async def fake_redis():
+    """redis.asyncio client on an in-memory server; Lua scripts run on a real interpreter"""
+    fakeredis = pytest.importorskip("fakeredis")
+
+    client = fakeredis.FakeAsyncRedis()
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def redis(fake_redis):
+    """fake_redis, connected as the app's Redis client (app.core.redis_client)"""
+    from app.core.redis_client import redis_client
+
+    with (
+        patch.object(redis_client, "client", fake_redis),
+        patch.object(redis_client, "connected", True),
+    ):
+        yield fake_redis
+
+
 @pytest.fixture
 def sample_crypto_data():
     """Sample cryptocurrency data for testing"""
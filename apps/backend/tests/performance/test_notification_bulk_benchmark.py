@@ -0,0 +1,80 @@
+"""
+Throughput of NotificationService.create_batch_notifications against the
+row-at-a-time create_notification path it replaced.
+
+    pytest tests/performance/test_notification_bulk_benchmark.py -m slow -s --no-cov
+"""
+
+import time
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.database import Base
+from app.models.notification_models import Notification, NotificationPreference, NotificationType
+from app.services import notification_service as service_module
+from app.services.notification_service import NotificationData, NotificationService
+
+RECIPIENTS = 5000
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    import app.models  # register all models
+    import app.models.reaction
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bench.sqlite'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def get_session(read_only=False):
+        async with factory() as session:
+            yield session
+            await session.commit()
+
+    with patch.object(service_module.db_manager, "get_session", get_session):
+        yield factory
+    await engine.dispose()
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_bulk_create_throughput(session_factory):
+    users = [uuid.uuid4() for _ in range(RECIPIENTS)]
+    async with session_factory() as db:
+        # Every tenth recipient has stored preferences
+        db.add_all(NotificationPreference(user_id=u) for u in users[::10])
+        await db.commit()
+    data = [
+        NotificationData(user_id=u, type=NotificationType.SYSTEM_ALERT, title="Maintenance")
+        for u in users
+    ]
+    service = NotificationService()
+
+    start = time.perf_counter()
+    with patch.object(service, "_deliver_notification", AsyncMock()):
+        # The old per-row path, minus its follow-up delivery transaction
+        one_by_one = [await service.create_notification(row) for row in data]
+    per_row = time.perf_counter() - start
+    assert all(one_by_one)
+
+    async with session_factory() as db:
+        await db.execute(delete(Notification))
+        await db.commit()
+
+    start = time.perf_counter()
+    created = await service.create_batch_notifications(data)
+    bulk = time.perf_counter() - start
+
+    assert len(created) == RECIPIENTS
+    print(
+        f"\n{RECIPIENTS} notifications: per-row {per_row:.2f}s "
+        f"({RECIPIENTS / per_row:,.0f}/s), bulk {bulk:.2f}s ({RECIPIENTS / bulk:,.0f}/s), "
+        f"{per_row / bulk:.0f}x"
+    )
+    assert bulk < per_row
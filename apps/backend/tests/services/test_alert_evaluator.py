@@ -0,0 +1,190 @@
+"""
+Tests for the indexed, per-series alert evaluation in app.services.alerts
+"""
+
+import random
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.services import alerts as alerts_module
+from app.services.alerts import Alert, AlertEvaluator, AlertStore, SSEHub, build_index
+from app.services.candle_store import to_candles
+from app.services.indicator_engine import OHLCV
+
+
+def _alert(i, symbol, kind, config, timeframe="1h", **fields):
+    return Alert(
+        id=f"a{i}",
+        type=kind,
+        symbol=symbol,
+        timeframe=timeframe,
+        active=True,
+        created_at=0.0,
+        min_interval_sec=300,
+        last_triggered_at=None,
+        config=config,
+        **fields,
+    )
+
+
+def _bars(*closes):
+    """Bars as get_ohlc returns them"""
+    closes = np.asarray(closes, dtype=float)
+    return to_candles(
+        OHLCV(
+            ts=np.arange(len(closes), dtype=np.int64) * 60_000,
+            open=closes,
+            high=closes,
+            low=closes,
+            close=closes,
+            volume=np.zeros(len(closes)),
+        )
+    )
+
+
+def _reference(a, bars):
+    """One alert evaluated on its own, as the evaluator used to do"""
+    cfg = a.config
+    if a.type == "price_threshold":
+        price, target = float(bars[-1]["c"]), float(cfg["price"])
+        direction = cfg.get("direction", "above")
+        return (direction == "above" and price >= target) or (
+            direction == "below" and price <= target
+        )
+    n = max(2, int(cfg.get("window_minutes", 60)))
+    window = bars[-n:]
+    first, last = float(window[0]["c"]), float(window[-1]["c"])
+    pct = (last - first) / first * 100.0
+    thresh = float(cfg.get("threshold_pct", 1.0))
+    direction = cfg.get("direction", "up")
+    return (
+        (direction == "up" and pct >= thresh)
+        or (direction == "down" and pct <= -abs(thresh))
+        or (direction == "abs" and abs(pct) >= abs(thresh))
+    )
+
+
+def _random_alerts(rng, count, symbols):
+    alerts = []
+    for i in range(count):
+        if rng.random() < 0.6:
+            config = {"direction": rng.choice(["above", "below"]), "price": rng.uniform(80, 120)}
+            kind = "price_threshold"
+        else:
+            config = {
+                "direction": rng.choice(["up", "down", "abs"]),
+                "window_minutes": rng.choice([2, 5, 10]),
+                "threshold_pct": rng.uniform(-10, 10),
+            }
+            kind = "pct_change"
+        alerts.append(_alert(i, rng.choice(symbols), kind, config))
+    return alerts
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.json"))
+    await store.load()
+    return store
+
+
+class TestIndex:
+    def test_matches_per_alert_evaluation(self):
+        rng = random.Random(5)
+        alerts = _random_alerts(rng, 2000, ["BTC", "ETH"])
+        index = build_index(alerts)
+        for key, series in index.items():
+            bars = _bars(*(rng.uniform(85, 115) for _ in range(series.limit)))
+            triggered = {a.id for a, _ in series.triggered(bars)}
+            expected = {a.id for a in alerts if a.symbol == key[0] and _reference(a, bars)}
+            assert triggered == expected
+
+    def test_payloads(self):
+        series = build_index(
+            [
+                _alert(1, "BTC", "price_threshold", {"direction": "below", "price": 100}),
+                _alert(2, "BTC", "pct_change", {"direction": "down", "threshold_pct": 5}),
+            ]
+        )["BTC", "1h"]
+        payloads = dict((a.id, p) for a, p in series.triggered(_bars(100, *[95] * 59)))
+        assert payloads["a1"] == {"price": 95.0, "target": 100.0, "direction": "below"}
+        assert payloads["a2"] == {"pct_change": -5.0, "threshold_pct": -5.0, "direction": "down"}
+
+    def test_inactive_and_invalid_alerts_are_skipped(self):
+        inactive = _alert(1, "BTC", "price_threshold", {"price": 1})
+        inactive.active = False
+        index = build_index(
+            [
+                inactive,
+                _alert(2, "BTC", "price_threshold", {"direction": "above"}),
+                _alert(3, "ETH", "price_threshold", {"direction": "sideways", "price": 1}),
+            ]
+        )
+        assert index == {}
+
+
+class TestEvaluator:
+    @pytest.mark.asyncio
+    async def test_one_fetch_per_series(self, store):
+        rng = random.Random(9)
+        symbols = [f"S{i}" for i in range(50)]
+        for a in _random_alerts(rng, 10_000, symbols):
+            store._alerts[a.id] = a
+        store.version += 1
+        hub = SSEHub()
+        evaluator = AlertEvaluator(store, hub)
+
+        async def ohlc(symbol, timeframe, limit):
+            return _bars(*[100.0] * (limit - 1), 112.0)
+
+        with (
+            patch.object(alerts_module, "get_ohlc", AsyncMock(side_effect=ohlc)) as fetch,
+            patch.object(hub, "broadcast", AsyncMock()) as broadcast,
+            patch.object(store, "save", AsyncMock()) as save,
+        ):
+            await evaluator._tick()
+            assert fetch.await_count == 50
+            assert {call.kwargs["limit"] for call in fetch.await_args_list} == {10}
+            fired = broadcast.await_count
+            assert fired and save.await_count == 1
+
+            # Debounced on the next tick; the index is reused
+            await evaluator._tick()
+            assert broadcast.await_count == fired
+
+    @pytest.mark.asyncio
+    async def test_index_follows_store_changes(self, store):
+        evaluator = AlertEvaluator(store, SSEHub())
+        await store.add(_alert(1, "BTC", "price_threshold", {"direction": "above", "price": 1}))
+        assert list(await evaluator.index()) == [("BTC", "1h")]
+
+        await store.set_active("a1", False)
+        assert await evaluator.index() == {}
+        await store.set_active("a1", True)
+        await store.add(_alert(2, "eth", "price_threshold", {"price": 1}, timeframe="1d"))
+        assert set(await evaluator.index()) == {("BTC", "1h"), ("ETH", "1d")}
+        await store.remove("a1")
+        assert set(await evaluator.index()) == {("ETH", "1d")}
+
+    @pytest.mark.asyncio
+    async def test_failed_fetches_skip_their_series(self, store):
+        await store.add(_alert(1, "BTC", "price_threshold", {"direction": "above", "price": 1}))
+        await store.add(_alert(2, "ETH", "price_threshold", {"direction": "above", "price": 1}))
+        hub = SSEHub()
+        evaluator = AlertEvaluator(store, hub)
+
+        async def ohlc(symbol, timeframe, limit):
+            if symbol == "BTC":
+                raise RuntimeError("provider down")
+            return _bars(5.0)
+
+        with (
+            patch.object(alerts_module, "get_ohlc", AsyncMock(side_effect=ohlc)),
+            patch.object(hub, "broadcast", AsyncMock()) as broadcast,
+        ):
+            await evaluator._tick()
+        (event,) = [call.args[0] for call in broadcast.await_args_list]
+        assert event["alert"]["id"] == "a2" and event["payload"]["price"] == 5.0
@@ -0,0 +1,183 @@
+"""
+Tests for bulk cache reads/writes on AdvancedRedisClient and the batch price path
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.advanced_redis_client import AdvancedRedisClient
+from app.core.single_flight import SingleFlight
+from app.services.smart_price_service import PriceData, SmartPriceService
+
+
+@pytest.fixture
+def redis(fake_redis):
+    """fake_redis, counting round-trips for the bulk commands"""
+    fake_redis.round_trips = 0
+
+    def counted(command):
+        async def call(*args, **kwargs):
+            fake_redis.round_trips += 1
+            return await command(*args, **kwargs)
+
+        return call
+
+    def pipeline(transaction=True):
+        pipe = fake_redis.__class__.pipeline(fake_redis, transaction)
+        pipe.execute = counted(pipe.execute)
+        return pipe
+
+    fake_redis.get = counted(fake_redis.get)
+    fake_redis.mget = counted(fake_redis.mget)
+    fake_redis.pipeline = pipeline
+    return fake_redis
+
+
+@pytest.fixture
+def client(redis):
+    client = AdvancedRedisClient()
+    client.client = redis
+    return client
+
+
+# ============================================================================
+# AdvancedRedisClient bulk API
+# ============================================================================
+
+
+class TestBulkApi:
+    @pytest.mark.asyncio
+    async def test_get_many_decodes_in_one_round_trip(self, client, redis):
+        await redis.mset({"a": b'{"x": 1}', "b": "plain"})
+        assert await client.get_many(["a", "b", "missing", "a"]) == {"a": {"x": 1}, "b": "plain"}
+        assert redis.round_trips == 1
+        assert client.metrics.hits == 2 and client.metrics.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_set_many_with_per_key_ttl(self, client, redis):
+        ok = await client.set_many({"a": {"x": 1}, "b": "raw", "c": 3}, expire={"a": 10, "b": 20})
+        assert ok and redis.round_trips == 1
+        assert json.loads(await redis.get("a")) == {"x": 1} and await redis.get("b") == b"raw"
+        assert [await redis.ttl(key) for key in "abc"] == [10, 20, -1]
+
+    @pytest.mark.asyncio
+    async def test_unavailable_redis(self):
+        client = AdvancedRedisClient()
+        assert await client.get_many(["a"]) == {}
+        assert await client.set_many({"a": 1}, expire=5) is False
+
+
+# ============================================================================
+# Batch price path
+# ============================================================================
+
+
+class TestBatchPrices:
+    @pytest.fixture
+    def flight(self, client):
+        with patch("app.core.single_flight.advanced_redis_client", client):
+            yield SingleFlight()
+
+    @pytest.mark.asyncio
+    async def test_cache_read_is_one_round_trip(self, flight, redis):
+        fresh = time.time() + 60
+        symbols = [f"S{i}" for i in range(200)]
+        for symbol in symbols:
+            price = PriceData(symbol=symbol, price=1.0).to_cache()
+            await redis.set(f"price:{symbol}", json.dumps({"v": price, "exp": fresh}))
+
+        unified = MagicMock(is_crypto=lambda s: False)
+        service = SmartPriceService()
+        with (
+            patch("app.services.smart_price_service.single_flight", flight),
+            patch(
+                "app.services.smart_price_service.get_unified_service",
+                AsyncMock(return_value=unified),
+            ),
+        ):
+            results = await service.get_batch_prices(symbols)
+
+        assert len(results) == 200 and all(p.cached for p in results.values())
+        assert redis.round_trips == 1
+
+    @pytest.fixture
+    def coingecko(self):
+        """SmartPriceService whose CoinGecko batch call returns BTC=2.0, ETH=3.0"""
+        unified = MagicMock(
+            is_crypto=lambda s: True,
+            get_coingecko_id=lambda s: {"BTC": "bitcoin", "ETH": "ethereum"}.get(s),
+        )
+        response = MagicMock(json=lambda: {"bitcoin": {"usd": 2.0}, "ethereum": {"usd": 3.0}})
+        service = SmartPriceService()
+        service.client = MagicMock(get=AsyncMock(return_value=response), is_closed=False)
+        with patch(
+            "app.services.smart_price_service.get_unified_service",
+            AsyncMock(return_value=unified),
+        ):
+            yield service
+
+    @staticmethod
+    async def _store(redis, symbol, price, exp):
+        envelope = {"v": PriceData(symbol=symbol, price=price).to_cache(), "exp": exp}
+        await redis.set(f"price:{symbol}", json.dumps(envelope))
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_are_served_and_refreshed_in_background(
+        self, flight, redis, coingecko
+    ):
+        await self._store(redis, "BTC", 1.0, time.time() - 1)
+        with patch("app.services.smart_price_service.single_flight", flight):
+            results = await coingecko.get_batch_prices(["btc"])
+            assert results["BTC"].price == 1.0 and results["BTC"].cached
+            await asyncio.gather(*flight._inflight.values())
+
+        assert coingecko.client.get.await_count == 1
+        assert json.loads(await redis.get("price:BTC"))["v"]["price"] == 2.0
+        assert flight.stats["stale_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_misses_are_fetched_in_one_request_and_written_in_bulk(
+        self, flight, redis, coingecko
+    ):
+        await self._store(redis, "ETH", 9.0, time.time() + 60)
+        with patch("app.services.smart_price_service.single_flight", flight):
+            results = await coingecko.get_batch_prices(["btc", "eth", "btc"])
+
+        assert results["BTC"].price == 2.0 and not results["BTC"].cached
+        assert results["ETH"].price == 9.0 and results["ETH"].cached
+        coingecko.client.get.assert_awaited_once()
+        assert coingecko.client.get.await_args.kwargs["params"]["ids"] == "bitcoin"
+        # MGET, lease pipeline, pipelined write, release pipeline
+        assert redis.round_trips == 4
+        assert json.loads(await redis.get("price:BTC"))["v"]["price"] == 2.0
+
+    @pytest.mark.asyncio
+    async def test_workers_share_one_upstream_fetch(self, client, redis, coingecko):
+        """Two workers missing the same symbols: one fetches, the other waits for its write."""
+        workers = [SingleFlight(poll_interval=0.01) for _ in range(2)]
+        with patch("app.core.single_flight.advanced_redis_client", client):
+
+            async def batch(flight):
+                with patch("app.services.smart_price_service.single_flight", flight):
+                    return await coingecko.get_batch_prices(["BTC", "ETH"])
+
+            results = await asyncio.gather(*(batch(flight) for flight in workers))
+
+        assert coingecko.client.get.await_count == 1
+        assert all({s: p.price for s, p in r.items()} == {"BTC": 2.0, "ETH": 3.0} for r in results)
+        assert sum(flight.stats["lease_waits"] for flight in workers) == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_batches_share_in_flight_symbols(self, flight, redis, coingecko):
+        with patch("app.services.smart_price_service.single_flight", flight):
+            first, second = await asyncio.gather(
+                coingecko.get_batch_prices(["BTC", "ETH"]), coingecko.get_batch_prices(["ETH"])
+            )
+
+        assert coingecko.client.get.await_count == 1
+        assert first["ETH"] is second["ETH"]
+        assert flight.stats["coalesced"] == 1
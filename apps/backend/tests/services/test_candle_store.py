@@ -0,0 +1,192 @@
+"""
+Tests for app.services.candle_store and the store-backed prices.get_ohlc
+"""
+
+import multiprocessing
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from app.services import prices
+from app.services.candle_store import SEGMENT_BARS, CandleStore, to_candles
+
+HOUR_MS = 3_600_000
+
+
+def _candles(start_bar, count, price=100.0):
+    return [
+        {
+            "ts": (start_bar + i) * HOUR_MS,
+            "o": price + i,
+            "h": price + i + 1,
+            "l": price + i - 1,
+            "c": price + i + 0.5,
+            "v": 10.0,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CandleStore(tmp_path)
+
+
+class TestCandleStore:
+    def test_empty_store(self, store):
+        assert len(store.read("BTC", "1h")) == 0
+        assert store.last_ts("BTC", "1h") is None
+
+    def test_round_trip_and_limit(self, store):
+        store.write("btc", "1h", _candles(0, 100))
+        bars = store.read("BTC", "1h", limit=10)
+        assert len(bars) == 10
+        assert bars.ts[-1] == 99 * HOUR_MS
+        assert to_candles(bars)[0] == _candles(0, 100)[90]
+        assert store.last_ts("BTC", "1h") == 99 * HOUR_MS
+
+    def test_range_window(self, store):
+        store.write("BTC", "1h", _candles(0, 100))
+        bars = store.read("BTC", "1h", start=10 * HOUR_MS, end=19 * HOUR_MS)
+        assert bars.ts.tolist() == [i * HOUR_MS for i in range(10, 20)]
+        assert len(store.read("BTC", "1h", start=10 * HOUR_MS, end=19 * HOUR_MS, limit=3)) == 3
+
+    def test_single_segment_read_is_memory_mapped(self, store):
+        store.write("BTC", "1h", _candles(0, 50))
+        bars = store.read("BTC", "1h", limit=20)
+        assert isinstance(bars.close.base, np.memmap) or isinstance(bars.close, np.memmap)
+
+    def test_reads_span_segments(self, store):
+        store.write("BTC", "1h", _candles(SEGMENT_BARS - 5, 10))
+        assert len(list(store._dir("BTC", "1h").glob("*.npy"))) == 2
+        bars = store.read("BTC", "1h", limit=8)
+        assert bars.ts.tolist() == [(SEGMENT_BARS - 3 + i) * HOUR_MS for i in range(8)]
+
+    def test_merge_overwrites_same_timestamp(self, store):
+        store.write("BTC", "1h", _candles(0, 10))
+        rewritten = store.write("BTC", "1h", _candles(9, 3, price=500.0))
+        assert rewritten == 1
+        bars = store.read("BTC", "1h")
+        assert len(bars) == 12
+        assert bars.open[9] == 500.0
+        assert bars.open[8] == 108.0
+
+    def test_concurrent_writers_from_processes_keep_every_bar(self, tmp_path):
+        # Interleaved bars in one segment: every write is a read-modify-write
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=_write_every_other, args=(tmp_path, k)) for k in (0, 1)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            assert worker.exitcode == 0
+
+        store = CandleStore(tmp_path)
+        bars = store.read("BTC", "1h")
+        assert bars.ts.tolist() == [i * HOUR_MS for i in range(200)]
+        assert bars.open.tolist() == [100.0 + i for i in range(200)]
+        # No temp files left behind
+        assert sorted(p.name for p in store._dir("BTC", "1h").iterdir()) == [".lock", "0.npy"]
+
+
+def _write_every_other(root, offset):
+    store = CandleStore(root)
+    for i in range(offset, 200, 2):
+        store.write("BTC", "1h", _candles(i, 1, price=100.0 + i))
+
+
+def _provider(**by_timeframe):
+    """Fake prices._fetch_ohlc returning canned candles per timeframe."""
+    return AsyncMock(side_effect=lambda symbol, tf, limit: by_timeframe.get(tf, []))
+
+
+class TestStoreBackedGetOhlc:
+    @pytest.fixture(autouse=True)
+    def _isolated(self, store):
+        prices._synced_at.clear()
+        prices._backfilled.clear()
+        with patch.object(prices, "candle_store", store):
+            yield
+        prices._synced_at.clear()
+        prices._backfilled.clear()
+
+    @pytest.mark.asyncio
+    async def test_serves_different_limits_from_one_fetch(self):
+        fetch = _provider(**{"1h": _candles(0, 500)})
+        with patch.object(prices, "_fetch_ohlc", fetch):
+            first = await prices.get_ohlc("BTC", "1h", 500)
+            second = await prices.get_ohlc("BTC", "1h", 200)
+        assert len(first) == 500
+        assert second == first[-200:]
+        hourly = [c.args for c in fetch.await_args_list if c.args[1] == "1h"]
+        assert hourly == [("BTC", "1h", 500)]
+
+    @pytest.mark.asyncio
+    async def test_refresh_fetches_only_the_tail(self):
+        now_bar = 10_000
+        with patch.object(prices, "_fetch_ohlc", _provider(**{"1h": _candles(now_bar - 500, 498)})):
+            await prices.get_ohlc("BTC", "1h", 500)
+
+        prices._synced_at.clear()
+        tail = _provider(**{"1h": _candles(now_bar - 3, 3)})
+        with (
+            patch.object(prices, "_fetch_ohlc", tail),
+            patch.object(prices.time, "time", return_value=(now_bar - 1) * 3600 + 10),
+        ):
+            candles = await prices.get_ohlc("BTC", "1h", 300)
+
+        assert tail.await_args.args == ("BTC", "1h", 3)
+        assert len(candles) == 300
+        assert candles[-1]["ts"] == (now_bar - 1) * HOUR_MS
+
+    @pytest.mark.asyncio
+    async def test_finer_provider_bars_are_aggregated_onto_the_grid(self, store):
+        half_hour = HOUR_MS // 2
+        # 30m candles from 10:30 to 12:30; the 10:00 hour is only half covered
+        candles = [
+            {"ts": 21 * half_hour + i * half_hour, "o": i, "h": i + 1, "l": i - 1, "c": i, "v": 1}
+            for i in range(5)
+        ]
+        with patch.object(prices, "_fetch_ohlc", _provider(**{"1h": candles})):
+            await prices.get_ohlc("BTC", "1h", 10)
+
+        stored = to_candles(store.read("BTC", "1h"))
+        assert [c["ts"] for c in stored] == [11 * HOUR_MS, 12 * HOUR_MS]
+        assert stored[0] == {"ts": 11 * HOUR_MS, "o": 1, "h": 3, "l": 0, "c": 2, "v": 2}
+
+    @pytest.mark.asyncio
+    async def test_off_grid_and_repeated_bars_are_not_stored(self, store):
+        off_grid = _candles(5, 3)
+        off_grid[1]["ts"] += 60_000
+        with patch.object(prices, "_fetch_ohlc", _provider(**{"1h": off_grid})):
+            await prices.get_ohlc("BTC", "1h", 10)
+        assert store.read("BTC", "1h").ts.tolist() == [5 * HOUR_MS, 7 * HOUR_MS]
+
+        prices._synced_at.clear()
+        prices._backfilled.clear()
+        repeated = [dict(c, ts=0) for c in _candles(0, 3)]
+        with patch.object(prices, "_fetch_ohlc", _provider(**{"1h": repeated})):
+            await prices.get_ohlc("ETH", "1h", 10)
+        assert len(store.read("ETH", "1h")) == 0
+
+
+@pytest.mark.asyncio
+async def test_cmc_bars_are_stamped_with_their_open_time():
+    from app.services.providers import cmc
+
+    quote = {"open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 9}
+    payload = {
+        "data": {
+            "quotes": [
+                {"time_open": "2024-01-01T00:00:00.000Z", "quote": {"USD": quote}},
+                {"time_open": "2024-01-01T01:00:00.000Z", "quote": {"USD": quote}},
+            ]
+        }
+    }
+    with (
+        patch.object(cmc.settings, "CMC_KEY", "key"),
+        patch.object(cmc, "_get", AsyncMock(return_value=payload)),
+    ):
+        candles = await cmc.fetch_ohlc("BTCUSD", "1h", 2)
+    assert [c["ts"] for c in candles] == [1704067200000, 1704070800000]
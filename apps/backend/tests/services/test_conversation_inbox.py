@@ -0,0 +1,147 @@
+"""
+Tests for batched inbox hydration and unread counters in ConversationService
+"""
+
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select
+
+from app.models.conversation import Conversation, ConversationParticipant, Message
+from app.models.profile import Profile
+from app.models.user import User
+from app.schemas.conversation import MarkReadRequest, MessageCreate
+from app.services.conversation_service import ConversationService
+
+T0 = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+async def _user(db, name):
+    user = User(id=uuid.uuid4(), email=f"{name}@example.com", full_name=name)
+    db.add_all([user, Profile(user_id=user.id, username=name, display_name=name.title())])
+    await db.flush()
+    return user
+
+
+async def _dm(db, a, b, last_message_at=None):
+    conversation = Conversation(id=uuid.uuid4(), last_message_at=last_message_at)
+    db.add(conversation)
+    await db.flush()
+    db.add_all(
+        [
+            ConversationParticipant(conversation_id=conversation.id, user_id=a.id),
+            ConversationParticipant(conversation_id=conversation.id, user_id=b.id),
+        ]
+    )
+    await db.flush()
+    return conversation
+
+
+def _count_queries(db):
+    statements = []
+    event.listen(
+        db.bind.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+# ============================================================================
+# Batched hydration
+# ============================================================================
+
+
+class TestInboxHydration:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("peers", [2, 12])
+    async def test_query_count_does_not_grow_with_page_size(self, sqlite_session, peers):
+        db = sqlite_session
+        me = await _user(db, "me")
+        for i in range(peers):
+            peer = await _user(db, f"peer{i}")
+            conversation = await _dm(db, me, peer, T0 + timedelta(minutes=i))
+            for n in range(3):
+                db.add(
+                    Message(
+                        conversation_id=conversation.id,
+                        sender_id=peer.id,
+                        content=f"{i}-{n}",
+                        created_at=T0 + timedelta(minutes=i, seconds=n),
+                    )
+                )
+        await db.commit()
+
+        statements = _count_queries(db)
+        page = await ConversationService(db).get_user_conversations(me.id, page_size=50)
+
+        # page, total, participants, latest messages, receipts
+        assert len(statements) == 5
+        assert page.total == peers and len(page.conversations) == peers
+        newest = page.conversations[0]
+        assert newest.last_message.content == f"{peers - 1}-2"
+        assert {p.username for p in newest.participants} == {"me", f"peer{peers - 1}"}
+
+    @pytest.mark.asyncio
+    async def test_conversation_without_messages(self, sqlite_session):
+        db = sqlite_session
+        me, peer = await _user(db, "me"), await _user(db, "peer")
+        await _dm(db, me, peer)
+        await db.commit()
+
+        (conversation,) = (
+            await ConversationService(db).get_user_conversations(me.id)
+        ).conversations
+        assert conversation.last_message is None and conversation.unread_count == 0
+
+
+# ============================================================================
+# Denormalized unread counter
+# ============================================================================
+
+
+class TestUnreadCounter:
+    @pytest.mark.asyncio
+    async def test_counter_follows_sends_and_reads(self, sqlite_session):
+        db = sqlite_session
+        alice, bob = await _user(db, "alice"), await _user(db, "bob")
+        conversation = await _dm(db, alice, bob)
+        await db.commit()
+        service = ConversationService(db)
+
+        async def unread(user):
+            page = await service.get_user_conversations(user.id)
+            return page.conversations[0].unread_count
+
+        sent = [
+            await service.send_message(conversation.id, alice.id, MessageCreate(content=str(n)))
+            for n in range(3)
+        ]
+        assert await unread(bob) == 3 and await unread(alice) == 0
+
+        await service.mark_messages_read(
+            conversation.id, bob.id, MarkReadRequest(message_id=sent[-1].id)
+        )
+        assert await unread(bob) == 0
+
+        await service.send_message(conversation.id, bob.id, MessageCreate(content="hi"))
+        assert await unread(alice) == 1 and await unread(bob) == 0
+
+    @pytest.mark.asyncio
+    async def test_deleting_an_unread_message_discounts_it(self, sqlite_session):
+        db = sqlite_session
+        alice, bob = await _user(db, "alice"), await _user(db, "bob")
+        conversation = await _dm(db, alice, bob)
+        await db.commit()
+        service = ConversationService(db)
+
+        for n in range(2):
+            await service.send_message(conversation.id, alice.id, MessageCreate(content=str(n)))
+        message = (await db.execute(select(Message).limit(1))).scalar_one()
+        message.is_deleted = True
+        await service.discount_unread(message)
+        await db.commit()
+
+        page = await service.get_user_conversations(bob.id)
+        assert page.conversations[0].unread_count == 1
@@ -0,0 +1,135 @@
+"""
+Tests for the DB thread pool in app.db.db and the AI service paths that use it
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import db as db_module
+from app.db.db import run_db, run_in_session
+from app.db.models import AIMessage, AIThread, Base
+from app.services.ai_provider import StreamChunk
+from app.services.ai_service import AIService
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.sqlite'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with patch.object(db_module, "SessionLocal", factory):
+        yield factory
+    engine.dispose()
+
+
+# ============================================================================
+# run_db / run_in_session
+# ============================================================================
+
+
+class TestDbExecutor:
+    @pytest.mark.asyncio
+    async def test_blocking_work_leaves_event_loop_free(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        thread = await run_db(lambda: (time.sleep(0.2), threading.current_thread().name)[1])
+        task.cancel()
+
+        assert thread.startswith("lokifi-db")
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_session_commits_and_objects_stay_readable(self, session_factory):
+        def create(db, title):
+            thread = AIThread(user_id=1, title=title)
+            db.add(thread)
+            db.flush()
+            return thread
+
+        thread = await run_in_session(create, "hello")
+        # Detached after the session closed, but loaded values survive the commit
+        assert thread.id is not None and thread.title == "hello"
+        with session_factory() as db:
+            assert db.get(AIThread, thread.id).title == "hello"
+
+    @pytest.mark.asyncio
+    async def test_errors_roll_back(self, session_factory):
+        def fail(db):
+            db.add(AIThread(user_id=1, title="lost"))
+            db.flush()
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await run_in_session(fail)
+        with session_factory() as db:
+            assert db.query(AIThread).count() == 0
+
+    def test_sqlite_uses_wal(self):
+        with db_module.engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+
+# ============================================================================
+# AIService
+# ============================================================================
+
+
+def _provider(chunks):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    provider = MagicMock()
+    provider.name = "fake"
+    provider.get_default_model = AsyncMock(return_value="fake-model")
+    provider.stream_chat = AsyncMock(return_value=stream())
+    return provider
+
+
+class TestAIServiceSendMessage:
+    @pytest.mark.asyncio
+    async def test_streams_and_persists_the_response(self, session_factory):
+        service = AIService()
+        thread = await service.create_thread(user_id=7, title="Markets")
+        chunks = [
+            StreamChunk(id="1", content="Hello "),
+            StreamChunk(id="2", content="there", is_complete=True),
+        ]
+        with patch(
+            "app.services.ai_service.get_ai_provider", AsyncMock(return_value=_provider(chunks))
+        ):
+            out = [m async for m in service.send_message(7, thread.id, "hi")]
+
+        assert [c.content for c in out[:-1]] == ["Hello ", "there"]
+        final = out[-1]
+        assert isinstance(final, AIMessage) and final.content == "Hello there"
+        assert final.token_count == 2 and final.completed_at is not None
+
+        messages = await service.get_thread_messages(thread.id, user_id=7)
+        assert [(m.role, m.content) for m in messages] == [
+            ("user", "hi"),
+            ("assistant", "Hello there"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_rejects_threads_of_other_users(self, session_factory):
+        service = AIService()
+        thread = await service.create_thread(user_id=7)
+        with pytest.raises(ValueError):
+            async for _ in service.send_message(8, thread.id, "hi"):
+                pass
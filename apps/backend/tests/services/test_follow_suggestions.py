@@ -0,0 +1,137 @@
+"""
+Tests for materialized follow suggestions (app.services.follow_suggestions)
+"""
+
+import random
+import uuid
+
+import pytest
+from sqlalchemy import delete, event, select
+
+from app.models.follow import Follow, FollowSuggestion
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.follow_service import FollowService
+from app.services.follow_suggestions import FollowSuggestionService
+
+
+async def _users(db, count):
+    users = [
+        User(id=uuid.uuid4(), email=f"u{i}@example.com", full_name=f"u{i}") for i in range(count)
+    ]
+    db.add_all(users)
+    db.add_all(
+        Profile(user_id=u.id, username=f"u{i}", follower_count=i) for i, u in enumerate(users)
+    )
+    await db.flush()
+    return [u.id for u in users]
+
+
+async def _follow(db, a, b):
+    db.add(Follow(follower_id=a, followee_id=b))
+    await db.flush()
+    await FollowSuggestionService(db).on_follow(a, b)
+
+
+async def _unfollow(db, a, b):
+    await db.execute(delete(Follow).where(Follow.follower_id == a, Follow.followee_id == b))
+    await FollowSuggestionService(db).on_unfollow(a, b)
+
+
+async def _table(db):
+    rows = await db.execute(
+        select(
+            FollowSuggestion.user_id, FollowSuggestion.candidate_id, FollowSuggestion.mutual_count
+        )
+    )
+    return set(rows.all())
+
+
+class TestIncrementalMaintenance:
+    @pytest.mark.asyncio
+    async def test_friend_of_friend_lifecycle(self, sqlite_session):
+        db = sqlite_session
+        me, friend, other, fof = await _users(db, 4)
+
+        await _follow(db, friend, fof)
+        await _follow(db, me, friend)
+        assert await _table(db) == {(me, fof, 1)}
+
+        await _follow(db, other, fof)
+        await _follow(db, me, other)
+        assert await _table(db) == {(me, fof, 2)}
+
+        # Following the candidate removes it; unfollowing brings it back
+        await _follow(db, me, fof)
+        assert await _table(db) == set()
+        await _unfollow(db, me, fof)
+        assert await _table(db) == {(me, fof, 2)}
+
+        await _unfollow(db, friend, fof)
+        assert await _table(db) == {(me, fof, 1)}
+        await _unfollow(db, me, other)
+        assert await _table(db) == set()
+
+    @pytest.mark.asyncio
+    async def test_random_graph_matches_rebuild(self, sqlite_session):
+        db = sqlite_session
+        users = await _users(db, 12)
+        rng = random.Random(7)
+        edges = set()
+        for _ in range(150):
+            a, b = rng.sample(users, 2)
+            if (a, b) in edges:
+                edges.remove((a, b))
+                await _unfollow(db, a, b)
+            else:
+                edges.add((a, b))
+                await _follow(db, a, b)
+
+        incremental = await _table(db)
+        await FollowSuggestionService(db).rebuild()
+        assert incremental == await _table(db)
+        assert incremental
+
+    @pytest.mark.asyncio
+    async def test_rebuild_for_some_users(self, sqlite_session):
+        db = sqlite_session
+        a, b, c, d = await _users(db, 4)
+        db.add_all(
+            [
+                Follow(follower_id=a, followee_id=b),
+                Follow(follower_id=b, followee_id=c),
+                Follow(follower_id=d, followee_id=b),
+            ]
+        )
+        await db.flush()
+
+        assert await FollowSuggestionService(db).rebuild([a]) == 1
+        assert await _table(db) == {(a, c, 1)}
+        await FollowSuggestionService(db).rebuild()
+        assert await _table(db) == {(a, c, 1), (d, c, 1)}
+
+
+class TestSuggestionReads:
+    @pytest.mark.asyncio
+    async def test_single_query_for_a_full_page(self, sqlite_session):
+        db = sqlite_session
+        me, *friends = await _users(db, 8)
+        for friend in friends[:3]:
+            await _follow(db, me, friend)
+            for candidate in friends[3:]:
+                await _follow(db, friend, candidate)
+        await db.commit()
+
+        statements = []
+        event.listen(
+            db.bind.sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        page = await FollowService(db).get_follow_suggestions(me, page_size=3)
+
+        assert len(statements) == 1 and "follow_suggestions" in statements[0]
+        assert "JOIN follows" not in statements[0]
+        # Equal mutual counts, so the most followed candidates first
+        assert [s.user_id for s in page.suggestions] == friends[3:][::-1][:3]
+        assert page.reason == "mutual_follows" and page.has_next
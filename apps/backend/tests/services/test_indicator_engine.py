@@ -0,0 +1,167 @@
+"""
+Tests for app.services.indicator_engine
+
+Vectorized indicators are checked against straightforward loop implementations.
+"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.services import indicator_engine as engine
+from app.services.indicator_engine import OHLCV, IndicatorSpec, compute_batch
+
+# ============================================================
+# Reference implementations
+# ============================================================
+
+
+def _ref_ema(values, period):
+    k = 2 / (period + 1)
+    out, prev = [], None
+    for i, v in enumerate(values):
+        prev = v if prev is None else v * k + prev * (1 - k)
+        out.append(prev if i + 1 >= period else math.nan)
+    return out
+
+
+def _ref_rsi(values, period):
+    out = [math.nan] * len(values)
+    if len(values) <= period:
+        return out
+    diffs = [values[i] - values[i - 1] for i in range(1, len(values))]
+    gains = [max(d, 0.0) for d in diffs]
+    losses = [max(-d, 0.0) for d in diffs]
+    avg_gain = sum(gains[:period]) / period
+    avg_loss = sum(losses[:period]) / period
+    for i in range(period, len(values)):
+        if i > period:
+            avg_gain = (avg_gain * (period - 1) + gains[i - 1]) / period
+            avg_loss = (avg_loss * (period - 1) + losses[i - 1]) / period
+        out[i] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    return out
+
+
+@pytest.fixture
+def closes():
+    rng = random.Random(7)
+    price, out = 100.0, []
+    for _ in range(600):
+        price *= 1 + rng.gauss(0, 0.01)
+        out.append(price)
+    return out
+
+
+def _bars(closes, volume=1.0):
+    c = np.asarray(closes, dtype=np.float64)
+    return OHLCV(
+        ts=np.arange(len(c), dtype=np.int64),
+        open=c,
+        high=c * 1.01,
+        low=c * 0.99,
+        close=c,
+        volume=np.full(len(c), volume),
+    )
+
+
+# ============================================================
+# Single-series indicators
+# ============================================================
+
+
+class TestIndicators:
+    def test_sma_matches_window_mean(self, closes):
+        out = engine.sma(closes, 20)
+        assert np.isnan(out[:19]).all()
+        assert out[19] == pytest.approx(sum(closes[:20]) / 20)
+        assert out[-1] == pytest.approx(sum(closes[-20:]) / 20)
+
+    @pytest.mark.parametrize("period", [2, 12, 50, 200])
+    def test_ema_matches_reference(self, closes, period):
+        np.testing.assert_allclose(engine.ema(closes, period), _ref_ema(closes, period), rtol=1e-9)
+
+    @pytest.mark.parametrize("period", [2, 14, 50])
+    def test_rsi_matches_reference(self, closes, period):
+        np.testing.assert_allclose(engine.rsi(closes, period), _ref_rsi(closes, period), rtol=1e-9)
+
+    def test_rsi_all_gains_is_100(self):
+        assert engine.rsi(list(range(1, 30)), 14)[-1] == 100.0
+
+    def test_short_series_is_all_nan(self):
+        assert np.isnan(engine.rsi([1.0, 2.0], 14)).all()
+        assert np.isnan(engine.sma([1.0, 2.0], 5)).all()
+        assert engine.ema([], 5).shape == (0,)
+
+    def test_macd_signal_starts_after_warmup(self, closes):
+        line, signal, hist = engine.macd(closes)
+        assert np.isnan(line[:25]).all() and not np.isnan(line[25])
+        assert np.isnan(signal[:33]).all() and not np.isnan(signal[33])
+        np.testing.assert_allclose(hist[33:], line[33:] - signal[33:])
+
+    def test_bollinger_bands_are_symmetric(self, closes):
+        mid, upper, lower = engine.bollinger(closes, 20, 2.0)
+        assert mid[-1] == pytest.approx(np.mean(closes[-20:]))
+        assert upper[-1] - mid[-1] == pytest.approx(2 * np.std(closes[-20:]))
+        np.testing.assert_allclose(upper[19:] - mid[19:], mid[19:] - lower[19:])
+
+    def test_atr_uses_previous_close_gaps(self):
+        high = [10.0, 11.0, 20.0]
+        low = [9.0, 10.0, 19.0]
+        close = [9.5, 10.5, 19.5]
+        np.testing.assert_allclose(engine.true_range(high, low, close), [1.0, 1.5, 9.5])
+        assert engine.atr(high, low, close, 2)[1] == pytest.approx(1.25)
+        assert engine.atr(high, low, close, 2)[2] == pytest.approx((1.25 + 9.5) / 2)
+
+    def test_vwap_weights_by_volume(self):
+        out = engine.vwap([2.0, 4.0], [2.0, 4.0], [2.0, 4.0], [1.0, 3.0])
+        np.testing.assert_allclose(out, [2.0, (2.0 + 12.0) / 4])
+
+    def test_two_dimensional_block_matches_rows(self, closes):
+        block = np.stack([closes, closes[::-1]])
+        out = engine.ema(block, 20)
+        np.testing.assert_allclose(out[1], engine.ema(closes[::-1], 20))
+
+
+# ============================================================
+# Batch API
+# ============================================================
+
+
+class TestComputeBatch:
+    def test_spec_parsing_and_defaults(self):
+        assert IndicatorSpec.parse("ema:50").key == "ema_50"
+        assert IndicatorSpec.parse("macd").params == (12, 26, 9)
+        with pytest.raises(ValueError):
+            IndicatorSpec.parse("unknown:3")
+
+    def test_batch_matches_single_series(self, closes):
+        series = {"AAA": _bars(closes), "BBB": _bars(closes[:300]), "CCC": _bars(closes[::-1])}
+        out = compute_batch(series, ["sma:20", "rsi", "macd", "bollinger", "atr", "vwap"])
+
+        assert set(out["AAA"]) == {
+            "sma_20",
+            "rsi_14",
+            "macd_12_26_9",
+            "macd_12_26_9_signal",
+            "macd_12_26_9_hist",
+            "bollinger_20_2_mid",
+            "bollinger_20_2_upper",
+            "bollinger_20_2_lower",
+            "atr_14",
+            "vwap",
+        }
+        np.testing.assert_allclose(out["CCC"]["rsi_14"], engine.rsi(closes[::-1], 14))
+        np.testing.assert_allclose(out["BBB"]["sma_20"], engine.sma(closes[:300], 20))
+        assert out["BBB"]["atr_14"].shape == (300,)
+
+    def test_from_candles(self):
+        candles = [
+            {"ts": 1, "o": 1.0, "h": 2.0, "l": 0.5, "c": 1.5, "v": 10},
+            {"ts": 2, "o": 1.5, "h": 2.5, "low": 1.0, "c": 2.0, "v": 5},
+        ]
+        bars = OHLCV.from_candles(candles)
+        assert len(bars) == 2
+        assert bars.low.tolist() == [0.5, 1.0]
+        assert bars.close.dtype == np.float64
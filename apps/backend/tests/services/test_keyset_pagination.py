@@ -0,0 +1,247 @@
+"""
+Tests for cursor (keyset) pagination in app.core.pagination and the services using it
+"""
+
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.conversation import Conversation, ConversationParticipant, Message
+from app.models.follow import Follow
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.conversation_service import ConversationService
+from app.services.follow_service import FollowService
+from app.services.follow_suggestions import FollowSuggestionService
+from app.services.message_search_service import MessageSearchService, SearchFilter
+from app.services.profile_service import ProfileService
+
+T0 = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+async def _user(db, name, follower_count=0):
+    user = User(id=uuid.uuid4(), email=f"{name}@example.com", full_name=name)
+    db.add_all(
+        [
+            user,
+            Profile(
+                user_id=user.id,
+                username=name,
+                display_name=name.title(),
+                follower_count=follower_count,
+            ),
+        ]
+    )
+    await db.flush()
+    return user
+
+
+async def _walk(fetch, items):
+    """Follow next_cursor from the first page to the last; returns every page."""
+    pages = [await fetch(None)]
+    while pages[-1].next_cursor:
+        assert pages[-1].has_next
+        pages.append(await fetch(pages[-1].next_cursor))
+    assert not pages[-1].has_next
+    return [[getattr(i, "id", None) or i.user_id for i in items(p)] for p in pages]
+
+
+# ============================================================================
+# Cursor tokens
+# ============================================================================
+
+
+class TestCursorTokens:
+    def test_round_trip(self):
+        key = (T0, uuid.uuid4(), 3, "abc")
+        token = encode_cursor(*key)
+        assert "=" not in token and "/" not in token
+        assert decode_cursor(token, datetime, uuid.UUID, int, str) == key
+
+    @pytest.mark.parametrize("token", ["garbage", encode_cursor(1, 2), encode_cursor("x", 1)])
+    def test_invalid_tokens_are_bad_requests(self, token):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(token, datetime, uuid.UUID)
+        assert exc.value.status_code == 400
+
+
+# ============================================================================
+# Messages
+# ============================================================================
+
+
+@pytest_asyncio.fixture
+async def thread(sqlite_session):
+    db = sqlite_session
+    me, peer = await _user(db, "me"), await _user(db, "peer")
+    conversation = Conversation(id=uuid.uuid4())
+    db.add(conversation)
+    await db.flush()
+    db.add_all(
+        [
+            ConversationParticipant(conversation_id=conversation.id, user_id=me.id),
+            ConversationParticipant(conversation_id=conversation.id, user_id=peer.id),
+        ]
+    )
+    # Pairs of messages share a timestamp, so ids break the ties
+    messages = [
+        Message(
+            id=uuid.uuid4(),
+            conversation_id=conversation.id,
+            sender_id=peer.id,
+            content=f"hello {n}",
+            created_at=T0 + timedelta(seconds=n // 2),
+        )
+        for n in range(7)
+    ]
+    db.add_all(messages)
+    await db.commit()
+    newest_first = sorted(messages, key=lambda m: (m.created_at, m.id), reverse=True)
+    return me, conversation, [m.id for m in newest_first]
+
+
+class TestMessagePages:
+    @pytest.mark.asyncio
+    async def test_cursor_walk_visits_each_message_once(self, sqlite_session, thread):
+        me, conversation, newest_first = thread
+        service = ConversationService(sqlite_session)
+
+        async def fetch(cursor):
+            return await service.get_conversation_messages(
+                conversation.id, me.id, page_size=3, cursor=cursor
+            )
+
+        pages = await _walk(fetch, lambda p: p.messages)
+        # Pages run newest to oldest, each in chronological order
+        assert [list(reversed(p)) for p in pages] == [
+            newest_first[0:3],
+            newest_first[3:6],
+            newest_first[6:],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_total_only_counted_without_cursor(self, sqlite_session, thread):
+        me, conversation, _ = thread
+        service = ConversationService(sqlite_session)
+
+        first = await service.get_conversation_messages(conversation.id, me.id, page_size=3)
+        assert first.total == 7
+        second = await service.get_conversation_messages(
+            conversation.id, me.id, page_size=3, cursor=first.next_cursor
+        )
+        assert second.total is None
+        counted = await service.get_conversation_messages(
+            conversation.id, me.id, page_size=3, cursor=first.next_cursor, include_total=True
+        )
+        assert counted.total == 7
+
+    @pytest.mark.asyncio
+    async def test_page_numbers_still_work(self, sqlite_session, thread):
+        me, conversation, newest_first = thread
+        page = await ConversationService(sqlite_session).get_conversation_messages(
+            conversation.id, me.id, page=3, page_size=3
+        )
+        assert [m.id for m in page.messages] == newest_first[6:]
+        assert not page.has_next and page.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_search_pages_by_cursor(self, sqlite_session, thread):
+        me, _, newest_first = thread
+        service = MessageSearchService(sqlite_session)
+
+        async def fetch(cursor):
+            return await service.search_messages(
+                me.id, SearchFilter(query="hello"), page_size=4, cursor=cursor
+            )
+
+        pages = await _walk(fetch, lambda r: r.messages)
+        assert pages == [newest_first[:4], newest_first[4:]]
+
+
+# ============================================================================
+# Follow lists and profile search
+# ============================================================================
+
+
+class TestFollowPages:
+    @pytest.mark.asyncio
+    async def test_followers_walk_and_counter_total(self, sqlite_session):
+        db = sqlite_session
+        star = await _user(db, "star", follower_count=5)
+        fans = [await _user(db, f"fan{i}") for i in range(5)]
+        follows = [
+            Follow(
+                id=uuid.uuid4(),
+                follower_id=fan.id,
+                followee_id=star.id,
+                created_at=T0 + timedelta(seconds=i // 2),
+            )
+            for i, fan in enumerate(fans)
+        ]
+        db.add_all(follows)
+        await db.commit()
+        newest_first = sorted(follows, key=lambda f: (f.created_at, f.id), reverse=True)
+        service = FollowService(db)
+
+        async def fetch(cursor):
+            page = await service.get_followers(star.id, page_size=2, cursor=cursor)
+            assert page.total == 5
+            return page
+
+        pages = await _walk(fetch, lambda p: p.followers)
+        expected = [f.follower_id for f in newest_first]
+        assert pages == [expected[0:2], expected[2:4], expected[4:]]
+
+        following = await service.get_following(fans[0].id, include_total=False)
+        assert following.total is None and [u.user_id for u in following.following] == [star.id]
+
+    @pytest.mark.asyncio
+    async def test_suggestions_continue_into_popular(self, sqlite_session):
+        db = sqlite_session
+        me, friend = await _user(db, "me"), await _user(db, "friend")
+        fof = [await _user(db, f"fof{i}", follower_count=i) for i in range(3)]
+        popular = [await _user(db, f"pop{i}", follower_count=10 + i) for i in range(3)]
+        db.add(Follow(follower_id=me.id, followee_id=friend.id))
+        db.add_all(Follow(follower_id=friend.id, followee_id=u.id) for u in fof)
+        await db.flush()
+        await FollowSuggestionService(db).rebuild()
+        await db.commit()
+        service = FollowService(db)
+
+        pages = []
+        cursor = None
+        while True:
+            page = await service.get_follow_suggestions(me.id, page_size=2, cursor=cursor)
+            pages.append(([s.user_id for s in page.suggestions], page.reason))
+            if not (cursor := page.next_cursor):
+                break
+
+        assert pages[0] == ([fof[2].id, fof[1].id], "mutual_follows")
+        assert pages[1] == ([fof[0].id, popular[2].id], "mutual_follows")
+        assert pages[2] == ([popular[1].id, popular[0].id], "popular")
+        # Nothing left but "me" and "friend", who are excluded
+        assert len(pages) == 3
+
+
+class TestProfileSearchPages:
+    @pytest.mark.asyncio
+    async def test_ties_and_missing_usernames(self, sqlite_session):
+        db = sqlite_session
+        users = [await _user(db, f"trader{i}", follower_count=i % 2) for i in range(5)]
+        for profile in (await db.execute(select(Profile))).scalars():
+            if profile.username != "trader4":
+                profile.username = "" if profile.username == "trader0" else None
+        await db.commit()
+        service = ProfileService(db)
+
+        async def fetch(cursor):
+            return await service.search_profiles("trader", page_size=2, cursor=cursor)
+
+        pages = await _walk(fetch, lambda p: p.profiles)
+        ids = [i for p in pages for i in p]
+        assert len(ids) == len(set(ids)) == len(users)
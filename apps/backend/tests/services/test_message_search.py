@@ -0,0 +1,166 @@
+"""
+Tests for full-text message search in MessageSearchService
+"""
+
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql
+
+import app.models.reaction  # Registers MessageReaction for Message's mapper
+from app.models.conversation import Conversation, ConversationParticipant, Message
+from app.models.user import User
+from app.services.message_search_service import (
+    MessageSearchService,
+    SearchFilter,
+    highlight,
+    search_terms,
+)
+
+T0 = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+@pytest_asyncio.fixture
+async def inbox(sqlite_session):
+    """Two users sharing a conversation, plus a conversation "me" is not in."""
+    db = sqlite_session
+    me, peer, stranger = (
+        User(id=uuid.uuid4(), email=f"{name}@example.com", full_name=name)
+        for name in ("me", "peer", "stranger")
+    )
+    ours, theirs = Conversation(id=uuid.uuid4()), Conversation(id=uuid.uuid4())
+    db.add_all([me, peer, stranger, ours, theirs])
+    await db.flush()
+    db.add_all(
+        [
+            ConversationParticipant(conversation_id=ours.id, user_id=me.id),
+            ConversationParticipant(conversation_id=ours.id, user_id=peer.id),
+            ConversationParticipant(conversation_id=theirs.id, user_id=stranger.id),
+        ]
+    )
+    await db.commit()
+
+    async def say(content, conversation=ours, sender=peer, minutes=0):
+        message = Message(
+            id=uuid.uuid4(),
+            conversation_id=conversation.id,
+            sender_id=sender.id,
+            content=content,
+            created_at=T0 + timedelta(minutes=minutes),
+        )
+        db.add(message)
+        await db.commit()
+        return message
+
+    return me, say, (theirs, stranger)
+
+
+async def _search(db, user, query, **kwargs):
+    return await MessageSearchService(db).search_messages(
+        user.id, SearchFilter(query=query), **kwargs
+    )
+
+
+# ============================================================================
+# Query parsing and snippets
+# ============================================================================
+
+
+class TestHelpers:
+    def test_terms_drop_operators(self):
+        assert search_terms('Bitcoin" OR eth* -NEAR(x)') == ["bitcoin", "or", "eth", "near", "x"]
+        assert search_terms("  ") == [] and search_terms(None) == []
+
+    def test_highlight_escapes_message_html(self):
+        assert highlight("<b>buy</b> & hold") == (
+            "&lt;b&gt;<mark>buy</mark>&lt;/b&gt; &amp; hold"
+        )
+
+    def test_postgres_query_uses_indexed_expression(self):
+        service = MessageSearchService(MagicMock())
+        service.db.bind.dialect.name = "postgresql"
+        query, _, _ = service._match(select(Message.id), ["btc", "moon"])
+        sql = str(
+            query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        )
+        assert (
+            "to_tsvector('simple', messages.content) @@ to_tsquery('simple', 'btc:* & moon:*')"
+            in sql
+        )
+
+
+# ============================================================================
+# SQLite FTS5 backend
+# ============================================================================
+
+
+class TestFullTextSearch:
+    @pytest.mark.asyncio
+    async def test_ranked_prefix_matches_with_snippets(self, sqlite_session, inbox):
+        me, say, _ = inbox
+        once = await say("thinking about trading today", minutes=1)
+        twice = await say("trading plan: keep trading small", minutes=0)
+        await say("nothing relevant", minutes=2)
+
+        result = await _search(sqlite_session, me, "trad")
+
+        assert [m.id for m in result.messages] == [twice.id, once.id]
+        assert result.total_count == 2
+        assert result.messages[0].rank > result.messages[1].rank
+        assert "<mark>trading</mark>" in result.messages[1].snippet
+
+    @pytest.mark.asyncio
+    async def test_every_term_must_match(self, sqlite_session, inbox):
+        me, say, _ = inbox
+        both = await say("buy the dip on eth")
+        await say("buy more btc")
+
+        result = await _search(sqlite_session, me, "eth buy")
+        assert [m.id for m in result.messages] == [both.id]
+
+    @pytest.mark.asyncio
+    async def test_only_own_conversations_and_live_messages(self, sqlite_session, inbox):
+        me, say, (theirs, stranger) = inbox
+        await say("secret alpha", conversation=theirs, sender=stranger)
+        deleted = await say("alpha leak")
+        deleted.is_deleted = True
+        await sqlite_session.commit()
+
+        result = await _search(sqlite_session, me, "alpha")
+        assert result.messages == [] and result.total_count == 0
+
+    @pytest.mark.asyncio
+    async def test_index_follows_edits_and_deletes(self, sqlite_session, inbox):
+        db = sqlite_session
+        me, say, _ = inbox
+        edited = await say("meet at noon")
+        soft = await say("noon works", minutes=1)
+        hard = await say("noon is fine", minutes=2)
+
+        await db.execute(
+            update(Message).where(Message.id == edited.id).values(content="meet at six")
+        )
+        await db.execute(update(Message).where(Message.id == soft.id).values(is_deleted=True))
+        await db.execute(delete(Message).where(Message.id == hard.id))
+        await db.commit()
+
+        assert (await _search(db, me, "noon")).messages == []
+        assert [m.id for m in (await _search(db, me, "six")).messages] == [edited.id]
+
+    @pytest.mark.asyncio
+    async def test_ranked_cursor_walk(self, sqlite_session, inbox):
+        me, say, _ = inbox
+        sent = [await say("gm " * (n % 3 + 1), minutes=n) for n in range(7)]
+
+        seen, cursor = [], None
+        while True:
+            result = await _search(sqlite_session, me, "gm", page_size=3, cursor=cursor)
+            seen += [m.id for m in result.messages]
+            if not (cursor := result.next_cursor):
+                break
+        assert sorted(seen) == sorted(m.id for m in sent) and len(seen) == 7
+        assert result.total_count is None
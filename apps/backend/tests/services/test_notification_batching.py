@@ -0,0 +1,196 @@
+"""
+Tests for Redis-backed notification batching (app.services.notification_batching)
+"""
+
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from app.models.notification_models import Notification, NotificationType
+from app.services import notification_batching as batching_module
+from app.services import smart_notifications as smart_module
+from app.services.notification_batching import NotificationBatchStore
+from app.services.notification_service import NotificationService
+from app.services.smart_notifications import (
+    BatchingStrategy,
+    RichNotificationData,
+    SmartNotificationProcessor,
+)
+
+T0 = datetime(2030, 1, 1, tzinfo=UTC)
+
+
+class Clock(datetime):
+    current = T0
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def db(db):
+    with (
+        patch.object(NotificationService, "_deliver_notification", AsyncMock()),
+        patch.object(batching_module, "datetime", Clock),
+        patch.object(smart_module, "datetime", Clock),
+    ):
+        Clock.current = T0
+        yield db
+
+
+def _rich(user_id, type=NotificationType.FOLLOW, **fields):
+    return RichNotificationData(
+        user_id=user_id,
+        type=type,
+        title="New follower",
+        message="Someone followed you",
+        batch_strategy=fields.pop("batch_strategy", BatchingStrategy.SMART_GROUPING),
+        **fields,
+    )
+
+
+async def _summaries(db):
+    db.expire_all()
+    return (await db.execute(select(Notification))).scalars().all()
+
+
+class TestBatchGrouping:
+    @pytest.mark.asyncio
+    async def test_notifications_join_the_open_batch_for_their_key(self, db, redis):
+        processor = SmartNotificationProcessor(NotificationBatchStore())
+        user, other = str(uuid.uuid4()), str(uuid.uuid4())
+
+        first = await processor.process_rich_notification(_rich(user))
+        assert await processor.process_rich_notification(_rich(user)) == first
+        # Mentions are grouped with follows
+        assert (
+            await processor.process_rich_notification(_rich(user, NotificationType.MENTION))
+            == first
+        )
+        assert await processor.process_rich_notification(_rich(other)) != first
+        assert (
+            await processor.process_rich_notification(_rich(user, grouping_key="post:1")) != first
+        )
+
+        summary = await processor.get_pending_batches_summary()
+        assert summary["total_batches"] == 3
+        (batch,) = [b for b in summary["batches"] if b["batch_id"] == first]
+        assert batch["notification_count"] == 3 and batch["user_id"] == user
+        assert batch["delivery_time"] == (T0 + timedelta(minutes=5)).isoformat()
+        assert await _summaries(db) == []
+
+    @pytest.mark.asyncio
+    async def test_count_based_batch_is_due_when_full(self, db, redis):
+        processor = SmartNotificationProcessor(NotificationBatchStore())
+        processor.batch_size = 3
+        user = str(uuid.uuid4())
+        for _ in range(3):
+            await processor.process_rich_notification(
+                _rich(user, batch_strategy=BatchingStrategy.COUNT_BASED)
+            )
+
+        assert await processor.deliver_due_batches() == 1
+        (summary,) = await _summaries(db)
+        assert summary.payload["notification_count"] == 3
+
+    @pytest.mark.asyncio
+    async def test_without_redis_notifications_are_delivered_at_once(self, db):
+        processor = SmartNotificationProcessor(NotificationBatchStore())
+        with patch.object(batching_module.redis_client, "connected", False):
+            assert await processor.process_rich_notification(_rich(str(uuid.uuid4()))) is True
+        (notification,) = await _summaries(db)
+        assert notification.type == NotificationType.FOLLOW.value
+
+
+class TestBatchDelivery:
+    @pytest.mark.asyncio
+    async def test_due_batches_are_delivered_once(self, db, redis):
+        processor = SmartNotificationProcessor(NotificationBatchStore())
+        user = str(uuid.uuid4())
+        batch_id = await processor.process_rich_notification(_rich(user))
+        await processor.process_rich_notification(_rich(user, NotificationType.MENTION))
+
+        assert await processor.deliver_due_batches() == 0
+        Clock.current = T0 + timedelta(minutes=5)
+        assert await processor.deliver_due_batches() == 1
+        assert await processor.deliver_due_batches() == 0
+        # Arrives after the batch closed: starts the next one
+        assert await processor.process_rich_notification(_rich(user)) != batch_id
+
+        (summary,) = await _summaries(db)
+        assert str(summary.batch_id) == batch_id and str(summary.user_id) == user
+        assert summary.title == "You have 2 new notifications"
+        assert [n["type"] for n in summary.payload["individual_notifications"]] == [
+            "follow",
+            "mention",
+        ]
+        pending = (await processor.get_pending_batches_summary())["batches"]
+        assert batch_id not in {b["batch_id"] for b in pending}
+        assert await redis.zcard(processor.batch_store.processing_key) == 0
+
+    @pytest.mark.asyncio
+    async def test_workers_share_batches_and_retry_after_a_lost_lease(self, db, redis):
+        store = NotificationBatchStore(lease_seconds=60)
+        worker, other = SmartNotificationProcessor(store), SmartNotificationProcessor(store)
+        user = str(uuid.uuid4())
+        batch_id = await worker.process_rich_notification(_rich(user))
+        assert await other.process_rich_notification(_rich(user)) == batch_id
+
+        Clock.current = T0 + timedelta(minutes=5)
+        # The first worker claims and delivers, then dies before acknowledging
+        claimed = await store.claim()
+        assert claimed == [batch_id] and await store.claim() == []
+        ((meta, items),) = await store.load(claimed)
+        await worker._deliver_batch(smart_module._batch_from_store(meta, items))
+        assert await other.deliver_due_batches() == 0
+
+        # Once the lease runs out the batch is claimed again, but not delivered twice
+        Clock.current += timedelta(seconds=61)
+        assert await other.deliver_due_batches() == 1
+        assert len(await _summaries(db)) == 1
+        assert await other.deliver_due_batches() == 0
+
+    @pytest.mark.asyncio
+    async def test_deliver_batch_now(self, db, redis):
+        processor = SmartNotificationProcessor(NotificationBatchStore())
+        batch_id = await processor.process_rich_notification(_rich(str(uuid.uuid4())))
+
+        delivered = await processor.deliver_batch_now(batch_id)
+        assert delivered["batch_id"] == batch_id and delivered["notification_count"] == 1
+        assert await processor.deliver_batch_now(batch_id) is None
+        assert len(await _summaries(db)) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_delivery_stays_under_lease(self, db, redis):
+        store = NotificationBatchStore(lease_seconds=60)
+        processor = SmartNotificationProcessor(store)
+        batch_id = await processor.process_rich_notification(_rich(str(uuid.uuid4())))
+        Clock.current = T0 + timedelta(minutes=5)
+
+        with patch.object(
+            NotificationService, "_get_user_preferences", AsyncMock(side_effect=RuntimeError)
+        ):
+            assert await processor.deliver_due_batches() == 0
+        assert await redis.zscore(store.processing_key, batch_id) is not None
+        assert await _summaries(db) == []
+
+        Clock.current += timedelta(seconds=61)
+        assert await processor.deliver_due_batches() == 1
+        assert len(await _summaries(db)) == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_blocked_by_preferences_is_dropped(self, db, redis):
+        processor = SmartNotificationProcessor(NotificationBatchStore())
+        batch_id = await processor.process_rich_notification(_rich(str(uuid.uuid4())))
+        Clock.current = T0 + timedelta(minutes=5)
+
+        with patch.object(
+            NotificationService, "_should_deliver_notification", AsyncMock(return_value=False)
+        ):
+            assert await processor.deliver_due_batches() == 1
+        assert await redis.zscore(processor.batch_store.processing_key, batch_id) is None
+        assert await _summaries(db) == []
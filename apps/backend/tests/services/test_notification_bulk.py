@@ -0,0 +1,144 @@
+"""
+Tests for set-based bulk writes in NotificationService.create_batch_notifications
+"""
+
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.notification_models import (
+    Notification,
+    NotificationPreference,
+    NotificationPriority,
+    NotificationType,
+)
+from app.services import notification_service as service_module
+from app.services.notification_service import (
+    NotificationData,
+    NotificationEvent,
+    NotificationService,
+)
+
+
+def _data(user_id, i=0, **fields):
+    return NotificationData(
+        user_id=user_id,
+        type=NotificationType.SYSTEM_ALERT,
+        title=f"Alert {i}",
+        payload={"i": i},
+        **fields,
+    )
+
+
+def _count_statements(db):
+    statements = []
+    event.listen(
+        db.bind.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, params, context, executemany: statements.append(
+            (statement, executemany)
+        ),
+    )
+    return statements
+
+
+class TestBulkCreate:
+    @pytest.mark.asyncio
+    async def test_one_insert_and_commit_per_chunk(self, db):
+        service = NotificationService()
+        service.bulk_chunk_size = 100
+        users = [uuid.uuid4() for _ in range(250)]
+        statements = _count_statements(db)
+        with patch.object(db, "commit", wraps=db.commit) as commit:
+            created = await service.create_batch_notifications(
+                [_data(str(u), i) for i, u in enumerate(users)]
+            )
+
+        assert len(created) == 250
+        inserts = [s for s, many in statements if s.startswith("INSERT")]
+        assert len(inserts) == 3 and all(many for s, many in statements if s in inserts)
+        # Preferences: one IN query per chunk of recipients
+        assert len([s for s, _ in statements if "notification_preferences" in s]) == 3
+        assert commit.await_count == 3
+
+        stored = (await db.execute(select(Notification).order_by(Notification.title))).scalars()
+        stored = {n.id: n for n in stored}
+        assert set(stored) == {n.id for n in created}
+        first = stored[created[0].id]
+        assert first.user_id == users[0] and first.payload == {"i": 0}
+        assert first.is_delivered and first.in_app_sent and not first.is_read
+        assert len({n.batch_id for n in stored.values()}) == 1
+
+    @pytest.mark.asyncio
+    async def test_preferences_filter_recipients(self, db):
+        muted, quiet, typed, plain = (uuid.uuid4() for _ in range(4))
+        db.add_all(
+            [
+                NotificationPreference(user_id=muted, in_app_enabled=False),
+                NotificationPreference(
+                    user_id=quiet, quiet_hours_start="00:00", quiet_hours_end="23:59"
+                ),
+                NotificationPreference(
+                    user_id=typed, type_preferences={"system_alert_in_app": False}
+                ),
+            ]
+        )
+        await db.commit()
+        data = [
+            _data(muted),
+            _data(quiet),
+            _data(quiet, 1, priority=NotificationPriority.URGENT),
+            _data(typed),
+            _data(plain),
+        ]
+
+        created = await NotificationService().create_batch_notifications(data)
+        assert sorted((n.user_id, n.priority) for n in created) == sorted(
+            [(quiet, "urgent"), (plain, "normal")]
+        )
+
+        everyone = await NotificationService().create_batch_notifications(
+            data, skip_preferences=True
+        )
+        assert len(everyone) == 5
+        assert (await db.execute(select(func.count(Notification.id)))).scalar() == 7
+
+    @pytest.mark.asyncio
+    async def test_events_are_emitted_per_chunk(self, db):
+        service = NotificationService()
+        service.bulk_chunk_size = 2
+        chunks, per_row, processed = AsyncMock(), AsyncMock(), AsyncMock()
+        service.add_event_handler(NotificationEvent.BATCH_CREATED, chunks)
+        service.add_event_handler(NotificationEvent.CREATED, per_row)
+        service.add_event_handler(NotificationEvent.BATCH_PROCESSED, processed)
+
+        await service.create_batch_notifications(
+            [_data(uuid.uuid4(), i) for i in range(5)], batch_id=str(uuid.uuid4())
+        )
+        assert [len(call.args[0]) for call in chunks.await_args_list] == [2, 2, 1]
+        per_row.assert_not_awaited()
+        assert processed.await_args.args[0]["total_created"] == 5
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_does_not_abort_the_batch(self, db):
+        service = NotificationService()
+        service.bulk_chunk_size = 2
+        execute = db.execute
+        calls = 0
+
+        async def flaky(statement, *args, **kwargs):
+            nonlocal calls
+            if args and isinstance(args[0], list):
+                calls += 1
+                if calls == 2:
+                    raise RuntimeError("deadlock")
+            return await execute(statement, *args, **kwargs)
+
+        with patch.object(db, "execute", flaky):
+            created = await service.create_batch_notifications(
+                [_data(uuid.uuid4(), i) for i in range(6)], skip_preferences=True
+            )
+        assert [n.title for n in created] == ["Alert 0", "Alert 1", "Alert 4", "Alert 5"]
+        assert (await db.execute(select(func.count(Notification.id)))).scalar() == 4
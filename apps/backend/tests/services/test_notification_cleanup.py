@@ -0,0 +1,113 @@
+"""
+Tests for set-based mark_all_as_read and expired-notification cleanup in NotificationService
+"""
+
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.notification_models import Notification, NotificationType
+from app.services import notification_service as service_module
+from app.services.notification_service import NotificationEvent, NotificationService
+
+
+def _statements(db):
+    statements = []
+    event.listen(
+        db.bind.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement.split()[0]),
+    )
+    return statements
+
+
+async def _add(db, user_id, count, **fields):
+    notifications = [
+        Notification(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            type=NotificationType.SYSTEM_ALERT.value,
+            title=f"n{i}",
+            **fields,
+        )
+        for i in range(count)
+    ]
+    db.add_all(notifications)
+    await db.commit()
+    return notifications
+
+
+async def _count(db, *where):
+    return (await db.execute(select(func.count(Notification.id)).where(*where))).scalar()
+
+
+class TestMarkAllAsRead:
+    @pytest.mark.asyncio
+    async def test_chunked_updates_without_loading_rows(self, db):
+        service = NotificationService()
+        service.bulk_chunk_size = 2
+        user, other = uuid.uuid4(), uuid.uuid4()
+        await _add(db, user, 4)
+        await _add(db, user, 1, is_read=True, is_dismissed=True)
+        await _add(db, user, 1, expires_at=datetime.now(UTC) + timedelta(days=1))
+        await _add(db, other, 2)
+        reads = AsyncMock()
+        service.add_event_handler(NotificationEvent.READ, reads)
+        statements = _statements(db)
+
+        with patch.object(
+            service_module.unread_counters, "removed", AsyncMock(return_value={str(user): 0})
+        ) as removed:
+            assert await service.mark_all_as_read(user) == 5
+
+        assert statements == ["UPDATE"] * 3
+        assert await _count(db, Notification.is_read.is_(False)) == 2
+        assert await _count(db, Notification.read_at.is_not(None)) == 5
+        reads.assert_awaited_once_with({"user_id": user, "count": 5, "batch": True})
+        uncounted = [row for call in removed.await_args_list for row in call.args[0]]
+        assert len(uncounted) == 5 and {row.user_id for row in uncounted} == {user}
+
+        assert await service.mark_all_as_read(user) == 0
+        assert reads.await_count == 1
+
+
+class TestExpiredCleanup:
+    @pytest.mark.asyncio
+    async def test_incremental_sweep(self, db):
+        service = NotificationService()
+        service.bulk_chunk_size = 2
+        now = datetime.now(UTC)
+        users = [uuid.uuid4(), uuid.uuid4()]
+        oldest = await _add(db, users[0], 3, expires_at=now - timedelta(days=2))
+        await _add(db, users[1], 2, expires_at=now - timedelta(hours=1))
+        await _add(db, users[1], 2, expires_at=now + timedelta(hours=1))
+        await _add(db, users[1], 1)
+        expired = AsyncMock()
+        service.add_event_handler(NotificationEvent.EXPIRED, expired)
+
+        # A bounded run takes the longest-expired rows first
+        assert await service.cleanup_expired_notifications(max_batches=1) == 2
+        remaining = (await db.execute(select(Notification.id))).scalars().all()
+        assert {n.id for n in oldest[:2]}.isdisjoint(remaining) and len(remaining) == 6
+
+        assert await service.cleanup_expired_notifications() == 3
+        assert await service.cleanup_expired_notifications() == 0
+        assert await _count(db) == 3
+
+        summaries = [call.args[0] for call in expired.await_args_list]
+        assert [s["count"] for s in summaries] == [2, 2, 1]
+        assert sum(s["by_user"].get(str(users[1]), 0) for s in summaries) == 2
+
+    @pytest.mark.asyncio
+    async def test_replies_to_expired_notifications_are_kept(self, db):
+        user = uuid.uuid4()
+        (parent,) = await _add(db, user, 1, expires_at=datetime.now(UTC) - timedelta(days=1))
+        (reply,) = await _add(db, user, 1, parent_notification_id=parent.id)
+
+        assert await NotificationService().cleanup_expired_notifications() == 1
+        db.expunge_all()
+        kept = await db.get(Notification, reply.id)
+        assert kept.parent_notification_id is None
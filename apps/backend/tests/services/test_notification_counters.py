@@ -0,0 +1,181 @@
+"""
+Tests for write-through unread notification counters (app.services.notification_counters)
+"""
+
+import json
+import random
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import event, func, select, update
+
+from app.models.notification_models import Notification, NotificationType
+from app.services import notification_counters as counters_module
+from app.services.notification_counters import unread_counters
+from app.services.notification_service import NotificationData, NotificationService
+from app.websockets import notifications as ws_module
+from app.websockets.notifications import NotificationWebSocketManager
+
+T0 = datetime(2030, 1, 1, tzinfo=UTC)
+
+
+class Clock(datetime):
+    current = T0
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def db(db):
+    with (
+        patch.object(NotificationService, "_deliver_notification", AsyncMock()),
+        patch.object(counters_module, "datetime", Clock),
+    ):
+        Clock.current = T0
+        yield db
+
+
+def _data(user_id, expires_in=None):
+    return NotificationData(
+        user_id=user_id,
+        type=NotificationType.SYSTEM_ALERT,
+        title="Alert",
+        expires_at=None if expires_in is None else T0 + timedelta(minutes=expires_in),
+    )
+
+
+async def _db_count(db, user_id):
+    result = await db.execute(
+        select(func.count(Notification.id)).where(
+            Notification.user_id == user_id,
+            Notification.is_read.is_(False),
+            Notification.is_dismissed.is_(False),
+            (Notification.expires_at.is_(None)) | (Notification.expires_at > Clock.current),
+        )
+    )
+    return result.scalar()
+
+
+async def _ids(db, user_id):
+    result = await db.execute(select(Notification.id).where(Notification.user_id == user_id))
+    return [str(i) for i in result.scalars()]
+
+
+class TestUnreadCounters:
+    @pytest.mark.asyncio
+    async def test_random_activity_matches_database(self, db, redis):
+        service = NotificationService()
+        users = [uuid.uuid4() for _ in range(3)]
+        rng = random.Random(7)
+        for user in users:
+            await service.get_unread_count(user)
+
+        for _ in range(150):
+            user = rng.choice(users)
+            expires_in = rng.choice([None, None, 5, 30, 90])
+            action = rng.random()
+            if action < 0.3:
+                await service.create_notification(_data(user, expires_in))
+            elif action < 0.4:
+                await service.create_batch_notifications(
+                    [_data(rng.choice(users), expires_in) for _ in range(rng.randint(1, 4))]
+                )
+            elif action < 0.75 and (ids := await _ids(db, user)):
+                method = rng.choice(
+                    [service.mark_as_read, service.dismiss_notification, service.click_notification]
+                )
+                await method(uuid.UUID(rng.choice(ids)), user)
+            elif action < 0.8:
+                await service.mark_all_as_read(user)
+            elif action < 0.85:
+                # A counter lost from Redis is rebuilt from the database
+                await redis.delete(unread_counters._keys(str(user))[0])
+            else:
+                Clock.current += timedelta(minutes=rng.randint(1, 20))
+            assert await service.get_unread_count(user) == await _db_count(db, user)
+
+    @pytest.mark.asyncio
+    async def test_reads_do_not_query_once_built(self, db, redis):
+        service = NotificationService()
+        user = uuid.uuid4()
+        await service.create_notification(_data(user))
+        statements = []
+        event.listen(
+            db.bind.sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        assert await service.get_unread_count(user) == 1
+        assert len(statements) == 2  # rebuilt once
+
+        await service.create_notification(_data(user, expires_in=10))
+        statements.clear()
+        assert await service.get_unread_count(user) == 2
+        Clock.current += timedelta(minutes=10)
+        assert await service.get_unread_count(user) == 1
+        assert statements == []
+
+    @pytest.mark.asyncio
+    async def test_without_redis_counts_in_the_database(self, db):
+        service = NotificationService()
+        user = uuid.uuid4()
+        with patch.object(counters_module.redis_client, "client", None):
+            await service.create_notification(_data(user))
+            await service.create_notification(_data(user, expires_in=-1))
+            assert await service.get_unread_count(user) == 1
+
+    @pytest.mark.asyncio
+    async def test_counts_are_pushed_over_the_websocket(self, db, redis):
+        service = NotificationService()
+        user = uuid.uuid4()
+        await service.get_unread_count(user)
+        ws = MagicMock()
+        ws.send_text = AsyncMock()
+        with patch.object(ws_module, "notification_service", service):
+            manager = NotificationWebSocketManager()
+            manager.active_connections[str(user)] = {ws}
+
+            with patch.object(service, "get_unread_count", AsyncMock()) as lookup:
+                created = await service.create_notification(_data(user))
+                await service.create_notification(_data(user))
+                await service.mark_as_read(created.id, user)
+            lookup.assert_not_awaited()
+
+            frames = [json.loads(call.args[0]) for call in ws.send_text.await_args_list]
+            counts = [f["data"]["count"] for f in frames if f["type"] == "unread_count"]
+            assert counts == [1, 2, 1]
+
+            # A missing counter is rebuilt for connected users only
+            await redis.flushall()
+            await db.execute(update(Notification).values(is_read=True))
+            await service.create_notification(_data(user))
+            assert json.loads(ws.send_text.await_args.args[0])["data"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_a_notification_is_uncounted_once(self, db, redis):
+        service = NotificationService()
+        user = uuid.uuid4()
+        created = await service.create_notification(_data(user))
+        await service.create_notification(_data(user))
+        assert await service.get_unread_count(user) == 2
+
+        # Another request reads it first: this session still holds it as unread
+        await db.execute(
+            update(Notification)
+            .where(Notification.id == created.id)
+            .values(is_read=True)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        assert created.is_read is False
+        for method in (
+            service.mark_as_read,
+            service.dismiss_notification,
+            service.click_notification,
+        ):
+            assert await method(created.id, user) is True
+        assert await service.get_unread_count(user) == 2
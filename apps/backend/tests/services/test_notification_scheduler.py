@@ -0,0 +1,165 @@
+"""
+Tests for scheduled notification delivery (app.services.notification_scheduler)
+and the timing wheel it fires from (app.core.timing_wheel)
+"""
+
+import math
+import random
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from app.core.timing_wheel import TimingWheel
+from app.models.notification_models import Notification, NotificationType
+from app.services import notification_scheduler as scheduler_module
+from app.services.notification_scheduler import NotificationScheduler
+from app.services.notification_service import NotificationService
+from app.services.smart_notifications import RichNotificationData, SmartNotificationProcessor
+
+T0 = datetime(2030, 1, 1, tzinfo=UTC)
+NOW = T0.timestamp()
+
+
+@pytest.fixture
+def db(db):
+    with patch.object(NotificationService, "_deliver_notification", AsyncMock()):
+        yield db
+
+
+def _at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+def _scheduled(user_id, seconds):
+    return RichNotificationData(
+        user_id=user_id,
+        type=NotificationType.SYSTEM_ALERT,
+        title=f"In {seconds}s",
+        message="",
+        scheduled_for=_at(seconds),
+    )
+
+
+class TestTimingWheel:
+    def test_fires_every_timer_on_its_tick(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            slots, levels = rng.choice([2, 4, 8]), rng.choice([1, 2, 3])
+            now = rng.uniform(0, 1000)
+            wheel, pending = TimingWheel(now, tick=0.1, slots=slots, levels=levels), {}
+            for n in range(300):
+                # Overdue, near, and past the top level (overflow)
+                horizon = rng.choice([1, 5, slots ** (levels + 1) * 0.15])
+                pending[n] = now + rng.uniform(-1, horizon)
+                wheel.add(pending[n], n)
+                now += rng.choice([0.05, 0.1, 0.3, rng.uniform(0, 3)])
+                for fired in wheel.advance(now):
+                    assert math.ceil(pending.pop(fired) / 0.1) <= math.floor(now / 0.1)
+                assert all(math.ceil(d / 0.1) > math.floor(now / 0.1) for d in pending.values())
+                assert len(wheel) == len(pending)
+
+    def test_idle_wheel_skips_ahead_and_drains(self):
+        wheel = TimingWheel(0, tick=1, slots=4, levels=2)
+        assert wheel.advance(10**9) == []
+        assert wheel.current == 10**9
+        wheel.add(10**9 + 3, "soon")
+        wheel.add(10**9 + 100, "later")
+        assert wheel.advance(10**9 + 3) == ["soon"]
+        assert wheel.drain() == ["later"] and len(wheel) == 0
+
+
+class TestNotificationScheduler:
+    @pytest.mark.asyncio
+    async def test_scheduled_notifications_are_delivered_when_due(self, db, redis):
+        processor = SmartNotificationProcessor()
+        scheduler = processor.scheduler
+        user = str(uuid.uuid4())
+        for seconds in (30, 10, 600):
+            await processor.process_rich_notification(_scheduled(user, seconds))
+
+        # Only what is due within the lookahead leaves Redis for the wheel
+        assert await scheduler.poll(NOW) == 2
+        assert await scheduler.fire(NOW + 9.9) == 0
+        assert await scheduler.fire(NOW + 10.05) == 1
+        assert await scheduler.fire(NOW + 31) == 1
+
+        db.expire_all()
+        titles = (await db.execute(select(Notification.title))).scalars().all()
+        assert sorted(titles) == ["In 10s", "In 30s"]
+        assert await redis.zcard(scheduler.processing_key) == 0
+        assert await redis.hlen(scheduler.items_key) == 1
+
+        metrics = await scheduler.get_metrics()
+        assert metrics["delivered"] == 2 and metrics["queued"] == 1
+        assert 0 <= metrics["lag_seconds"]["p50"] < 1.1 and metrics["lag_seconds"]["max"] < 1.1
+
+    @pytest.mark.asyncio
+    async def test_entries_of_a_lost_worker_are_claimed_again(self, redis):
+        delivered = AsyncMock()
+        worker = NotificationScheduler(AsyncMock(), lease=60)
+        other = NotificationScheduler(delivered, lease=60)
+        schedule_id = await worker.schedule("payload", _at(5))
+
+        assert await worker.poll(NOW) == 1
+        assert await other.poll(NOW) == 0
+        # The first worker dies holding it; its lease runs out 60s after the due time
+        assert await other.poll(NOW + 64) == 0
+        assert await other.poll(NOW + 66) == 1
+        assert await other.fire(NOW + 66) == 1
+        delivered.assert_awaited_once_with("payload")
+        assert other.metrics.summary()["lag_seconds"]["max"] >= 61
+        assert not await redis.hexists(other.items_key, schedule_id)
+
+    @pytest.mark.asyncio
+    async def test_failed_delivery_is_retried_and_release_requeues(self, redis):
+        deliver = AsyncMock(side_effect=[RuntimeError("db down"), None])
+        scheduler = NotificationScheduler(deliver, lease=30)
+        await scheduler.schedule("retry", _at(1))
+        held = await scheduler.schedule("held", _at(50))
+
+        assert await scheduler.poll(NOW) == 2
+        assert await scheduler.fire(NOW + 1) == 0
+        assert scheduler.metrics.failed == 1
+        assert await scheduler.poll(NOW + 32) == 1
+        assert await scheduler.fire(NOW + 32) == 1
+
+        await scheduler.release()
+        assert await redis.zrange(scheduler.due_key, 0, -1, withscores=True) == [
+            (held.encode(), _at(50).timestamp())
+        ]
+        assert await redis.zcard(scheduler.processing_key) == 0
+        assert len(scheduler.wheel) == 0
+
+    @pytest.mark.asyncio
+    async def test_without_redis_nothing_is_scheduled(self):
+        processor = SmartNotificationProcessor()
+        with patch.object(scheduler_module.redis_client, "connected", False):
+            scheduled = await processor.process_rich_notification(_scheduled(uuid.uuid4(), 60))
+        assert scheduled is False
+
+    @pytest.mark.asyncio
+    async def test_notification_that_fails_to_save_stays_under_lease(self, db, redis):
+        processor = SmartNotificationProcessor()
+        scheduler = processor.scheduler
+        user = str(uuid.uuid4())
+        failing = await processor.process_rich_notification(_scheduled(user, 5))
+        blocked = await processor.process_rich_notification(_scheduled(user, 6))
+
+        assert await scheduler.poll(NOW) == 2
+        with patch.object(
+            NotificationService, "_get_user_preferences", AsyncMock(side_effect=RuntimeError)
+        ):
+            assert await scheduler.fire(NOW + 5.05) == 0
+        with patch.object(
+            NotificationService, "_should_deliver_notification", AsyncMock(return_value=False)
+        ):
+            assert await scheduler.fire(NOW + 6.05) == 1
+
+        assert scheduler.metrics.failed == 1
+        assert await redis.zrange(scheduler.processing_key, 0, -1) == [failing.encode()]
+        assert not await redis.hexists(scheduler.items_key, blocked)
+        db.expire_all()
+        assert (await db.execute(select(Notification))).scalars().all() == []
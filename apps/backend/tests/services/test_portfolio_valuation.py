@@ -0,0 +1,184 @@
+"""
+Tests for batched, vectorized portfolio valuation (app.services.portfolio_valuation)
+and live revaluation over the price WebSocket
+"""
+
+import asyncio
+import json
+import random
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from app.db.models import PortfolioPosition
+from app.routers.websocket_prices import PriceWebSocketManager
+from app.services import portfolio_valuation as valuation_module
+from app.services.portfolio_valuation import PortfolioBook, PortfolioValuationService
+from app.services.smart_price_service import PriceData
+
+
+def _position(i, symbol, qty, cost_basis):
+    now = datetime(2025, 1, 1)
+    return PortfolioPosition(
+        id=i,
+        user_id=1,
+        symbol=symbol,
+        qty=qty,
+        cost_basis=cost_basis,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+POSITIONS = [
+    _position(1, "BTC", 0.5, 40000.0),
+    _position(2, "eth", 4.0, 2000.0),
+    _position(3, "AAPL", 10.0, 150.0),
+]
+
+
+def _expected(position, price):
+    """The per-position arithmetic the routes used before vectorizing"""
+    market_value = price * position.qty
+    cost_value = position.qty * position.cost_basis
+    return {
+        "current_price": price,
+        "market_value": market_value,
+        "cost_value": cost_value,
+        "unrealized_pl": market_value - cost_value,
+        "pl_pct": (price - position.cost_basis) / position.cost_basis * 100.0,
+    }
+
+
+class TestPortfolioBook:
+    def test_values_and_totals(self):
+        book = PortfolioBook(POSITIONS)
+        book.reprice({"BTC": 50000.0, "ETH": 1500.0})
+
+        btc, eth, aapl = book.positions()
+        assert btc == {"id": 1, "symbol": "BTC", **_expected(POSITIONS[0], 50000.0)}
+        assert eth == {"id": 2, "symbol": "eth", **_expected(POSITIONS[1], 1500.0)}
+        assert aapl["current_price"] is None and aapl["market_value"] is None
+        assert aapl["cost_value"] == 1500.0 and aapl["pl_pct"] is None
+
+        assert book.totals() == {
+            "total_cost": 29500.0,
+            "total_value": 31000.0,
+            "total_pl": 1500.0,
+            "total_pl_pct": pytest.approx(1500.0 / 29500.0 * 100.0),
+        }
+
+    def test_reprice_touches_only_moved_rows(self):
+        book = PortfolioBook(POSITIONS)
+        assert book.reprice({"BTC": 1.0, "ETH": 2.0, "AAPL": 3.0}).tolist() == [0, 1, 2]
+        assert book.reprice({"BTC": 1.0, "ETH": 2.5, "DOGE": 1.0}).tolist() == [1]
+        assert book.reprice({"AAPL": None}).tolist() == []
+
+    def test_incremental_totals_match_a_full_revaluation(self):
+        rng = random.Random(3)
+        symbols = [f"S{i}" for i in range(50)]
+        positions = [
+            _position(i, rng.choice(symbols), rng.uniform(1, 100), rng.uniform(1, 100))
+            for i in range(300)
+        ]
+        book = PortfolioBook(positions)
+        latest = {}
+        for _ in range(200):
+            tick = {s: rng.uniform(1, 100) for s in rng.sample(symbols, 5)}
+            latest.update(tick)
+            book.reprice(tick)
+
+        fresh = PortfolioBook(positions)
+        fresh.reprice(latest)
+        assert book.totals() == pytest.approx(fresh.totals())
+        assert book.totals()["total_value"] == pytest.approx(
+            sum(p.qty * latest[p.symbol] for p in positions if p.symbol in latest)
+        )
+
+
+class TestValuationService:
+    @pytest.mark.asyncio
+    async def test_one_batch_price_call(self):
+        prices = {
+            "BTC": PriceData(symbol="BTC", price=50000.0),
+            "ETH": PriceData(symbol="ETH", price=1500.0),
+        }
+        with patch.object(
+            valuation_module.SmartPriceService,
+            "get_batch_prices",
+            AsyncMock(return_value=prices),
+        ) as batch:
+            book = await PortfolioValuationService().value(POSITIONS)
+
+        batch.assert_awaited_once()
+        assert sorted(batch.await_args.args[0]) == ["AAPL", "BTC", "ETH"]
+        assert [p["current_price"] for p in book.positions()] == [50000.0, 1500.0, None]
+
+    @pytest.mark.asyncio
+    async def test_pricing_failure_leaves_positions_unpriced(self):
+        with patch.object(
+            valuation_module.SmartPriceService,
+            "get_batch_prices",
+            AsyncMock(side_effect=RuntimeError("provider down")),
+        ):
+            book = await PortfolioValuationService().value(POSITIONS)
+        assert book.totals()["total_value"] == 0.0
+        assert all(p["current_price"] is None for p in book.positions())
+
+
+# ============================================================================
+# Live revaluation over the price WebSocket
+# ============================================================================
+
+
+@pytest_asyncio.fixture
+async def manager():
+    manager = PriceWebSocketManager()
+    with patch.object(manager, "_price_update_loop", AsyncMock()):
+        yield manager
+    for client_id in list(manager.clients):
+        manager.disconnect(client_id)
+
+
+async def _subscribe(manager, client_id, prices):
+    ws = MagicMock()
+    ws.accept = AsyncMock()
+    ws.send_text = AsyncMock()
+    await manager.connect(ws, client_id)
+    book = PortfolioBook(POSITIONS)
+    book.reprice(prices)
+    with patch.object(valuation_module.portfolio_valuation, "load", AsyncMock(return_value=book)):
+        await manager.subscribe_portfolio(client_id, "alice")
+    return ws
+
+
+class TestLiveRevaluation:
+    @pytest.mark.asyncio
+    async def test_held_symbols_are_fetched(self, manager):
+        await _subscribe(manager, "a", {})
+        await manager.subscribe("a", ["SOL"])
+        assert manager.demand == {"BTC", "ETH", "AAPL", "SOL"}
+
+        manager.disconnect("a")
+        assert manager.demand == set() and not manager.portfolios
+
+    @pytest.mark.asyncio
+    async def test_ticks_push_only_moved_positions(self, manager):
+        ws = await _subscribe(manager, "a", {"BTC": 50000.0, "ETH": 1500.0, "AAPL": 150.0})
+        prices = {
+            "BTC": PriceData(symbol="BTC", price=50000.0),
+            "ETH": PriceData(symbol="ETH", price=1600.0),
+            "SOL": PriceData(symbol="SOL", price=20.0),
+        }
+        manager._fan_out(prices, {})
+        manager._fan_out(prices, {})
+        await asyncio.sleep(0)
+
+        frames = [json.loads(call.args[0]) for call in ws.send_text.await_args_list]
+        updates = [f for f in frames if f["type"] == "portfolio_update"]
+        assert len(updates) == 1
+        assert [p["symbol"] for p in updates[0]["positions"]] == ["eth"]
+        assert updates[0]["positions"][0]["market_value"] == 6400.0
+        assert updates[0]["totals"]["total_value"] == 25000.0 + 6400.0 + 1500.0
@@ -0,0 +1,110 @@
+"""
+Tests for app.services.price_distribution and the clustered price loop
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.routers.websocket_prices import PriceWebSocketManager
+from app.services.price_distribution import PriceDistributor
+from app.services.smart_price_service import PriceData
+
+
+@pytest.fixture
+def redis(fake_redis):
+    with patch(
+        "app.services.price_distribution.advanced_redis_client", MagicMock(client=fake_redis)
+    ):
+        yield fake_redis
+
+
+# ============================================================================
+# PriceDistributor
+# ============================================================================
+
+
+class TestLeadership:
+    @pytest.mark.asyncio
+    async def test_single_leader_and_handover(self, redis):
+        a, b = PriceDistributor(), PriceDistributor()
+        assert await a.acquire_leadership() is True
+        assert await b.acquire_leadership() is False
+        assert await a.acquire_leadership() is True  # renewal
+
+        await a.release_leadership()
+        assert await b.acquire_leadership() is True and not a.is_leader
+
+    @pytest.mark.asyncio
+    async def test_without_redis(self):
+        with patch("app.services.price_distribution.advanced_redis_client", MagicMock(client=None)):
+            assert await PriceDistributor().acquire_leadership() is None
+
+    @pytest.mark.asyncio
+    async def test_demand_is_union_of_workers(self, redis):
+        a, b = PriceDistributor(), PriceDistributor()
+        await a.advertise({"BTC", "ETH"})
+        await b.advertise({"AAPL"})
+        assert await a.demand() == {"BTC", "ETH", "AAPL"}
+
+
+class TestStream:
+    @pytest.mark.asyncio
+    async def test_new_reader_starts_at_latest_entry(self, redis):
+        producer, reader = PriceDistributor(), PriceDistributor()
+        await producer.publish({"n": 1})
+        await producer.publish({"n": 2})
+        assert await reader.read_new() == [{"n": 2}]
+        assert await reader.read_new() == []
+
+    @pytest.mark.asyncio
+    async def test_reader_catches_up_after_a_gap(self, redis):
+        producer, reader = PriceDistributor(), PriceDistributor()
+        assert await reader.read_new() == []
+        for n in range(3):
+            await producer.publish({"n": n})
+        assert await reader.read_new() == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+# ============================================================================
+# Clustered PriceWebSocketManager
+# ============================================================================
+
+
+async def _worker(symbols):
+    manager = PriceWebSocketManager()
+    ws = MagicMock(accept=AsyncMock(), send_text=AsyncMock())
+    with patch.object(manager, "_price_update_loop", AsyncMock()):
+        await manager.connect(ws, "client")
+    await manager.subscribe("client", symbols)
+    return manager
+
+
+class TestClusteredLoop:
+    @pytest.mark.asyncio
+    async def test_one_fetch_serves_every_worker(self, redis):
+        workers = [await _worker(["BTC"]), await _worker(["ETH"])]
+        fetched = []
+
+        async def fetch(symbols):
+            fetched.append(set(symbols))
+            return {s: PriceData(symbol=s, price=1.0) for s in symbols}, {}
+
+        for worker in workers:
+            worker._fetch_prices = fetch
+            worker.broadcast = MagicMock(return_value=1)
+
+        # The follower's demand is already advertised when the leader fetches
+        await workers[1].distributor.advertise(workers[1].topics)
+        await workers[0]._tick()
+        await workers[1]._tick()
+
+        assert fetched == [{"BTC", "ETH"}]
+        for worker in workers:
+            prices = worker.broadcast.call_args.args[0]
+            assert set(prices) == {"BTC", "ETH"}
+            assert isinstance(prices["BTC"], PriceData) and not prices["BTC"].cached
+        for worker in workers:
+            worker.disconnect("client")
+        await asyncio.sleep(0)
@@ -0,0 +1,115 @@
+"""
+Tests for app.services.resampling and base-derived timeframes in prices.get_ohlc
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from app.services import prices
+from app.services.candle_store import CandleStore
+from app.services.indicator_engine import OHLCV
+from app.services.resampling import bucket_start, derive_from_base, resample
+
+MIN_MS = 60_000
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+
+
+def _minutes(start_ms, count):
+    """1m candles whose open/close encode the minute index."""
+    return [
+        {
+            "ts": start_ms + i * MIN_MS,
+            "o": float(i),
+            "h": float(i) + 0.5,
+            "l": float(i) - 0.5,
+            "c": float(i) + 0.25,
+            "v": 1.0,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CandleStore(tmp_path)
+
+
+class TestResample:
+    def test_hourly_aggregation(self):
+        bars = OHLCV.from_candles(_minutes(DAY_MS, 150))
+        out = resample(bars, "1h")
+        assert out.ts.tolist() == [DAY_MS, DAY_MS + HOUR_MS, DAY_MS + 2 * HOUR_MS]
+        assert out.open.tolist() == [0.0, 60.0, 120.0]
+        assert out.high.tolist() == [59.5, 119.5, 149.5]
+        assert out.low.tolist() == [-0.5, 59.5, 119.5]
+        assert out.close.tolist() == [59.25, 119.25, 149.25]
+        assert out.volume.tolist() == [60.0, 60.0, 30.0]
+
+    def test_buckets_align_to_utc(self):
+        assert bucket_start(DAY_MS + 5 * HOUR_MS + 123, "4h") == DAY_MS + 4 * HOUR_MS
+        assert bucket_start(DAY_MS + 23 * HOUR_MS, "1d") == DAY_MS
+        # Session-anchored daily buckets (e.g. 13:30 UTC open).
+        offset = 13 * HOUR_MS + 30 * MIN_MS
+        assert bucket_start(DAY_MS + 14 * HOUR_MS, "1d", offset) == DAY_MS + offset
+
+    def test_gaps_are_skipped(self):
+        candles = _minutes(DAY_MS, 5) + _minutes(DAY_MS + 3 * HOUR_MS, 5)
+        out = resample(OHLCV.from_candles(candles), "1h")
+        assert out.ts.tolist() == [DAY_MS, DAY_MS + 3 * HOUR_MS]
+        np.testing.assert_array_equal(out.volume, [5.0, 5.0])
+
+
+class TestDeriveFromBase:
+    def test_skips_partially_covered_leading_bucket(self, store):
+        # Base history starts 30 minutes into the hour.
+        store.write("AAPL", "1m", _minutes(DAY_MS + 30 * MIN_MS, 90))
+        updated = derive_from_base(store, "AAPL", DAY_MS + 30 * MIN_MS)
+        hourly = store.read("AAPL", "1h")
+        assert hourly.ts.tolist() == [DAY_MS + HOUR_MS]
+        assert "1h" in updated and "1d" not in updated
+
+    def test_incremental_update_rebuilds_open_bucket(self, store):
+        store.write("AAPL", "1m", _minutes(DAY_MS, 90))
+        derive_from_base(store, "AAPL", DAY_MS)
+        new_bars = _minutes(DAY_MS + 90 * MIN_MS, 10)
+        for c in new_bars:
+            c["h"] = 1000.0
+        store.write("AAPL", "1m", new_bars)
+        derive_from_base(store, "AAPL", new_bars[0]["ts"])
+
+        hourly = store.read("AAPL", "1h")
+        assert hourly.ts.tolist() == [DAY_MS, DAY_MS + HOUR_MS]
+        assert hourly.high.tolist() == [59.5, 1000.0]
+        assert hourly.volume.tolist() == [60.0, 40.0]
+        assert store.read("AAPL", "1d").volume.tolist() == [100.0]
+
+
+class TestDerivedGetOhlc:
+    @pytest.fixture(autouse=True)
+    def _isolated(self, store):
+        prices._synced_at.clear()
+        prices._backfilled.clear()
+        with patch.object(prices, "candle_store", store):
+            yield
+        prices._synced_at.clear()
+        prices._backfilled.clear()
+
+    @pytest.mark.asyncio
+    async def test_higher_timeframes_come_from_one_base_fetch(self):
+        now = DAY_MS + 6 * HOUR_MS
+        fetch = AsyncMock(side_effect=lambda s, tf, n: _minutes(DAY_MS, 360) if tf == "1m" else [])
+        with (
+            patch.object(prices, "_fetch_ohlc", fetch),
+            patch.object(prices.time, "time", return_value=now / 1000),
+        ):
+            five = await prices.get_ohlc("AAPL", "5m", 50)
+            hourly = await prices.get_ohlc("AAPL", "1h", 6)
+            four = await prices.get_ohlc("AAPL", "4h", 2)
+
+        assert len(five) == 50 and five[-1]["ts"] == now - 5 * MIN_MS
+        assert [c["ts"] for c in hourly] == [DAY_MS + i * HOUR_MS for i in range(6)]
+        assert four[-1]["v"] == 120.0
+        assert [c.args[1] for c in fetch.await_args_list] == ["1m"]
@@ -0,0 +1,129 @@
+"""
+Tests for app.core.single_flight request coalescing
+"""
+
+import asyncio
+import json
+import time
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.redis_keys import redis_keys
+from app.core.single_flight import SingleFlight
+from app.services.smart_price_service import PriceData
+
+
+@pytest.fixture
+def redis(fake_redis):
+    with patch("app.core.single_flight.advanced_redis_client", MagicMock(client=fake_redis)):
+        yield fake_redis
+
+
+@pytest.fixture
+def flight():
+    return SingleFlight(lease_seconds=1, wait_timeout=1, poll_interval=0.01)
+
+
+def _envelope(value, fresh_for):
+    return json.dumps({"v": value, "exp": time.time() + fresh_for})
+
+
+# ============================================================================
+# Coalescing
+# ============================================================================
+
+
+class TestCoalescing:
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_fetch(self, redis, flight):
+        async def slow():
+            await asyncio.sleep(0.02)
+            return {"price": 1}
+
+        fetch = AsyncMock(side_effect=slow)
+        results = await asyncio.gather(
+            *(flight.get_or_fetch("price:BTC", fetch, ttl=60) for _ in range(10))
+        )
+        assert results == [{"price": 1}] * 10
+        assert fetch.await_count == 1
+        assert flight.stats["coalesced"] == 9
+        assert await flight.read("price:BTC") == ({"price": 1}, True)
+        assert not await redis.exists(redis_keys.single_flight_lease_key("price:BTC"))
+
+    @pytest.mark.asyncio
+    async def test_fresh_hit_skips_fetch(self, redis, flight):
+        await redis.set("price:BTC", _envelope(5, 60))
+        fetch = AsyncMock(return_value=6)
+        assert await flight.get_or_fetch("price:BTC", fetch, ttl=60) == 5
+        fetch.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_without_redis_still_coalesces_in_process(self, flight):
+        async def slow():
+            await asyncio.sleep(0.01)
+            return 7
+
+        fetch = AsyncMock(side_effect=slow)
+        with patch("app.core.single_flight.advanced_redis_client", MagicMock(client=None)):
+            results = await asyncio.gather(
+                flight.get_or_fetch("k", fetch, ttl=60), flight.get_or_fetch("k", fetch, ttl=60)
+            )
+        assert results == [7, 7]
+        assert fetch.await_count == 1
+
+
+# ============================================================================
+# Stale-while-revalidate and leases
+# ============================================================================
+
+
+class TestStaleAndLeases:
+    @pytest.mark.asyncio
+    async def test_stale_value_served_while_refreshing(self, redis, flight):
+        await redis.set("price:ETH", _envelope(1, -1))
+        fetch = AsyncMock(return_value=2)
+        assert await flight.get_or_fetch("price:ETH", fetch, ttl=60, stale_ttl=60) == 1
+        await asyncio.sleep(0.01)
+        fetch.assert_awaited_once()
+        assert await flight.read("price:ETH") == (2, True)
+
+    @pytest.mark.asyncio
+    async def test_waits_for_other_workers_lease(self, redis, flight):
+        lease = redis_keys.single_flight_lease_key("price:SOL")
+        await redis.set(lease, "other-worker")
+
+        async def other_worker_finishes():
+            await asyncio.sleep(0.03)
+            await redis.set("price:SOL", _envelope(42, 60))
+            await redis.delete(lease)
+
+        fetch = AsyncMock(return_value=0)
+        result, _ = await asyncio.gather(
+            flight.get_or_fetch("price:SOL", fetch, ttl=60), other_worker_finishes()
+        )
+        assert result == 42
+        fetch.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_run_exclusive_yields_to_lease_holder(self, redis, flight):
+        await redis.set(redis_keys.single_flight_lease_key("sync"), "other-worker")
+        fn = AsyncMock(return_value=1)
+        assert await flight.run_exclusive("sync", fn) == (False, None)
+        fn.assert_not_awaited()
+
+
+class TestPriceDataCache:
+    def test_round_trip_through_json(self):
+        price = PriceData(
+            symbol="BTC",
+            price=50000.0,
+            change_percent=1.5,
+            last_updated=datetime(2025, 1, 1, tzinfo=UTC),
+            source="coingecko",
+        )
+        restored = PriceData.from_cache(json.loads(json.dumps(price.to_cache())))
+        assert restored.cached is True
+        assert restored.last_updated == price.last_updated
+        assert restored.price == 50000.0 and restored.source == "coingecko"
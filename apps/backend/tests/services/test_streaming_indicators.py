@@ -0,0 +1,132 @@
+"""
+Tests for app.services.streaming_indicators
+
+Streaming state must reproduce the batch engine bar for bar and survive a
+JSON round-trip.
+"""
+
+import json
+import random
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from app.services import indicator_engine
+from app.services.streaming_indicators import (
+    IndicatorSet,
+    IndicatorStateStore,
+    StreamingEMA,
+    StreamingRSI,
+    StreamingSMA,
+    make_indicator,
+)
+
+
+@pytest.fixture
+def closes():
+    rng = random.Random(3)
+    price, out = 50.0, []
+    for _ in range(300):
+        price *= 1 + rng.gauss(0, 0.02)
+        out.append(price)
+    return out
+
+
+def _stream(indicator, values):
+    return [np.nan if (v := indicator.update(x)) is None else v for x in values]
+
+
+class TestStreamingIndicators:
+    @pytest.mark.parametrize(
+        "indicator,batch",
+        [
+            (StreamingSMA(20), lambda xs: indicator_engine.sma(xs, 20)),
+            (StreamingEMA(12), lambda xs: indicator_engine.ema(xs, 12)),
+            (StreamingRSI(14), lambda xs: indicator_engine.rsi(xs, 14)),
+        ],
+    )
+    def test_matches_batch_engine(self, closes, indicator, batch):
+        np.testing.assert_allclose(_stream(indicator, closes), batch(closes), rtol=1e-9)
+
+    @pytest.mark.parametrize("spec", ["sma:5", "ema:5", "rsi:5"])
+    def test_peek_does_not_mutate(self, closes, spec):
+        ind = make_indicator(spec)
+        for x in closes[:50]:
+            ind.update(x)
+        before = ind.to_dict()
+        peeked = ind.peek(closes[50])
+        assert ind.to_dict() == before
+        assert peeked == pytest.approx(ind.update(closes[50]))
+
+    @pytest.mark.parametrize("spec", ["sma:10", "ema:10", "rsi:10"])
+    def test_snapshot_round_trip(self, closes, spec):
+        ind = make_indicator(spec)
+        for x in closes[:100]:
+            ind.update(x)
+        restored = type(ind).from_dict(json.loads(json.dumps(ind.to_dict())))
+        for x in closes[100:]:
+            assert restored.update(x) == pytest.approx(ind.update(x))
+
+    def test_unknown_kind_raises(self):
+        with pytest.raises(ValueError):
+            make_indicator("vwap")
+
+
+class TestIndicatorSet:
+    def test_ticks_commit_on_bar_rollover(self):
+        state = IndicatorSet("btc", "1m", specs=["sma:2"])
+        assert state.on_tick(10.0, 0)["sma_2"] is None
+        # Intrabar ticks only replace the open bar's close.
+        assert state.on_tick(11.0, 30)["sma_2"] is None
+        # New bar: 11 is committed, 13 is the open bar.
+        assert state.on_tick(13.0, 60)["sma_2"] == pytest.approx(12.0)
+        assert state.on_tick(15.0, 90)["sma_2"] == pytest.approx(13.0)
+        # Late ticks from an older bar are ignored.
+        assert state.on_tick(1.0, 10)["sma_2"] == pytest.approx(13.0)
+
+    def test_prime_and_round_trip(self, closes):
+        state = IndicatorSet("ETH", "5m")
+        state.prime(closes)
+        state.on_tick(closes[-1] * 1.01, 600)
+        restored = IndicatorSet.from_dict(json.loads(json.dumps(state.to_dict())))
+        assert restored.timeframe == "5m"
+        assert restored.values() == state.values()
+        assert restored.values()["rsi_14"] is not None
+
+    def test_needs_prime_after_missed_bars(self, closes):
+        state = IndicatorSet("btc", "1m")
+        assert state.needs_prime(0)
+        state.prime(closes)
+        state.on_tick(closes[-1], 60)
+        assert not state.needs_prime(90) and not state.needs_prime(120)
+        assert state.needs_prime(180)
+        state.reset()
+        assert state.bar_start is None and state.values() == dict.fromkeys(state.indicators)
+        assert state.warmup_bars == 200
+
+
+class TestIndicatorStateStore:
+    @pytest.mark.asyncio
+    async def test_save_and_load_use_symbol_key(self):
+        saved = {}
+
+        async def fake_set(key, value, expire=None):
+            saved[key] = json.loads(json.dumps(value))
+            return True
+
+        async def fake_get(key):
+            return saved.get(key)
+
+        store = IndicatorStateStore()
+        state = IndicatorSet("sol", "1m")
+        state.prime([1.0, 2.0, 3.0])
+        with patch("app.services.streaming_indicators.advanced_redis_client") as client:
+            client.set = AsyncMock(side_effect=fake_set)
+            client.get = AsyncMock(side_effect=fake_get)
+            assert await store.save(state)
+            loaded = await store.load("SOL", "1m")
+            assert await store.load("DOGE", "1m") is None
+
+        assert list(saved) == ["lokifi:dev:market:indicators:SOL:1m"]
+        assert loaded.to_dict() == state.to_dict()
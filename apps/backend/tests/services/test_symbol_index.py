@@ -0,0 +1,294 @@
+"""
+Tests for the in-memory symbol index and its use by SymbolDirectory,
+UnifiedAssetService and crypto search
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.advanced_redis_client import AdvancedRedisClient
+from app.services import crypto_discovery_service
+from app.services.crypto_discovery_service import CryptoAsset, CryptoDiscoveryService
+from app.services.data_service import AssetType, SymbolDirectory
+from app.services.symbol_index import SymbolIndex
+from app.services.unified_asset_service import UnifiedAsset, UnifiedAssetService
+
+
+def _index(*entries):
+    index = SymbolIndex()
+    for symbol, name, alias, rank in entries:
+        index.upsert(symbol, symbol, symbol, (name, alias), rank)
+    return index
+
+
+def _crypto(symbol, name, coin_id, rank):
+    return UnifiedAsset(
+        symbol=symbol,
+        name=name,
+        type="crypto",
+        provider="coingecko",
+        provider_id=coin_id,
+        market_cap_rank=rank,
+    )
+
+
+COINS = [
+    ("BTC", "Bitcoin", "bitcoin", 1),
+    ("ETH", "Ethereum", "ethereum", 2),
+    ("WBTC", "Wrapped Bitcoin", "wrapped-bitcoin", 15),
+    ("BCH", "Bitcoin Cash", "bitcoin-cash", 20),
+    ("ETC", "Ethereum Classic", "ethereum-classic", 30),
+    ("STETH", "Lido Staked Ether", "staked-ether", 8),
+]
+
+
+# ============================================================================
+# SymbolIndex
+# ============================================================================
+
+
+class TestSymbolIndex:
+    def test_tiers_then_rank(self):
+        index = _index(*COINS)
+        # exact name/alias word first (by rank), then name prefixes
+        assert index.search("bitcoin") == ["BTC", "WBTC", "BCH"]
+        # exact symbol, then name prefixes (stETH's "ether" outranks "ethereum classic")
+        assert index.search("eth") == ["ETH", "STETH", "ETC"]
+        # symbol prefixes before name prefixes, infixes last
+        assert index.search("wbt") == ["WBTC"]
+        assert index.search("bt") == ["BTC", "WBTC"]
+        assert index.search("bitcoin cash") == ["BCH"]
+        assert index.search("wrapped-bitcoin") == ["WBTC"]
+
+    def test_accept_and_limit(self):
+        index = _index(*COINS)
+        assert index.search("bitcoin", limit=2) == ["BTC", "WBTC"]
+        assert index.search("bitcoin", accept=lambda s: s != "BTC") == ["WBTC", "BCH"]
+
+    def test_fuzzy_is_optional(self):
+        index = _index(*COINS)
+        assert index.search("etherium") == []
+        assert index.search("etherium", fuzzy=True)[0] == "ETH"
+
+    def test_updates_are_incremental(self):
+        index = _index(*COINS)
+        index.remove("BCH")
+        assert index.search("cash") == [] and "BCH" not in index
+        assert index.search("bitcoin") == ["BTC", "WBTC"]
+
+        index.upsert("BTC", "BTC", "BTC", ("Bitcoin", "bitcoin"), 1)
+        index.upsert("WBTC", "WBTC", "WBTC", ("Wrapped BTC",), 15)
+        assert index.search("bitcoin") == ["BTC"]
+        assert index.search("wrapped") == ["WBTC"]
+
+    def test_removing_everything_empties_the_tries(self):
+        index = _index(*COINS)
+        for symbol, *_ in COINS:
+            index.remove(symbol)
+        assert len(index) == 0
+        assert not index._symbols.children and not index._terms.children
+        assert not index._infixes.children and not index._grams
+
+
+# ============================================================================
+# SymbolDirectory
+# ============================================================================
+
+
+class TestSymbolDirectory:
+    @pytest.mark.asyncio
+    async def test_default_symbols(self):
+        directory = SymbolDirectory()
+        results = await directory.search_symbols("USD", limit=50)
+        assert {"EURUSD", "GBPUSD", "BTCUSD"} <= {s.symbol for s in results}
+
+        forex = await directory.search_symbols("usd", AssetType.FOREX)
+        assert forex and all(s.asset_type == AssetType.FOREX for s in forex)
+
+        results = await directory.search_symbols("appl inc", fuzzy=True)
+        assert results[0].symbol == "AAPL"
+
+    @pytest.mark.asyncio
+    async def test_sync_registry(self):
+        directory = SymbolDirectory()
+        directory.sync_registry([_crypto(*coin) for coin in COINS], asset_type="crypto")
+
+        assert directory.coingecko_id("eth") == "ethereum"
+        assert directory.search_coingecko_ids("bitcoin") == [
+            "bitcoin",
+            "wrapped-bitcoin",
+            "bitcoin-cash",
+        ]
+        top = await directory.search_symbols("bitcoin", AssetType.CRYPTO, limit=1)
+        assert top[0].symbol == "BTC"
+
+        # A refresh without BCH drops it and leaves built-in symbols alone
+        directory.sync_registry(
+            [_crypto(*coin) for coin in COINS if coin[0] != "BCH"], asset_type="crypto"
+        )
+        assert "BCH" not in directory.symbols and directory.coingecko_id("BCH") is None
+        assert directory.get_symbol("BTCUSD") is not None
+
+    def test_registry_does_not_replace_builtin_symbols(self):
+        directory = SymbolDirectory()
+        before = directory.get_symbol("AAPL")
+        directory.sync_registry(
+            [UnifiedAsset(symbol="AAPL", name="Apple", type="stock", provider="finnhub")]
+        )
+        assert directory.get_symbol("AAPL") is before
+
+
+class TestUnifiedRegistry:
+    @pytest.mark.asyncio
+    async def test_registry_refresh_feeds_the_directory(self):
+        directory = SymbolDirectory()
+        markets = [
+            {"id": coin_id, "symbol": symbol.lower(), "name": name, "market_cap_rank": rank}
+            for symbol, name, coin_id, rank in COINS
+        ]
+        response = AsyncMock()
+        response.raise_for_status = lambda: None
+        response.json = lambda: markets
+        service = UnifiedAssetService()
+        service.client = AsyncMock()
+        service.client.get = AsyncMock(return_value=response)
+
+        with patch("app.services.unified_asset_service.symbol_directory", directory):
+            await service._fetch_crypto_symbols()
+            markets.pop()
+            await service._fetch_crypto_symbols()
+            service.register_stock("ACME", "Acme Corp")
+
+        assert service.get_coingecko_id("ETH") == "ethereum"
+        assert not service.is_crypto("STETH") and directory.get_symbol("STETH") is None
+        assert directory.search_coingecko_ids("ether") == ["ethereum", "ethereum-classic"]
+        assert (await directory.search_symbols("acme"))[0].symbol == "ACME"
+
+    @pytest.fixture
+    def shared_cache(self, fake_redis):
+        """Registry cache and refresh lease shared by every service instance"""
+        client = AdvancedRedisClient()
+        client.client = fake_redis
+        with (
+            patch("app.services.unified_asset_service.advanced_redis_client", client),
+            patch("app.core.single_flight.advanced_redis_client", client),
+        ):
+            yield fake_redis
+
+    @staticmethod
+    def _service(coins):
+        response = AsyncMock()
+        response.raise_for_status = lambda: None
+        response.json = lambda: [
+            {"id": coin_id, "symbol": symbol.lower(), "name": name, "market_cap_rank": rank}
+            for symbol, name, coin_id, rank in coins
+        ]
+        service = UnifiedAssetService()
+        service.client = AsyncMock()
+        service.client.get = AsyncMock(return_value=response)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_refresh_adopts_the_registry_another_worker_cached(self, shared_cache):
+        directory = SymbolDirectory()
+        fetcher, follower = self._service(COINS), self._service(COINS[:2])
+        with patch("app.services.unified_asset_service.symbol_directory", directory):
+            await follower._initialize_registry()
+            follower.register_stock("ACME", "Acme Corp")
+            await shared_cache.flushall()
+            await fetcher.refresh_registry()
+            await follower.refresh_registry()
+
+        assert follower.client.get.await_count == 1  # only its own initial fetch
+        assert follower.get_coingecko_id("STETH") == "staked-ether"
+        assert follower.is_stock("ACME") and follower.get_asset_info("ACME").name == "Acme Corp"
+        assert directory.search_coingecko_ids("lido") == ["staked-ether"]
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_the_registry_and_caches_nothing(self, shared_cache):
+        service = self._service(COINS)
+        with patch("app.services.unified_asset_service.symbol_directory", SymbolDirectory()):
+            await service._initialize_registry()
+            await shared_cache.flushall()
+            service.client.get.side_effect = RuntimeError("rate limited")
+            await service.refresh_registry()
+
+        assert service.get_coingecko_id("BTC") == "bitcoin"
+        assert await shared_cache.get("unified:asset_registry") is None
+
+
+# ============================================================================
+# Crypto search
+# ============================================================================
+
+
+def _asset(coin_id, symbol, rank):
+    return CryptoAsset(
+        id=coin_id,
+        symbol=symbol,
+        name=coin_id.title(),
+        market_cap_rank=rank,
+        current_price=1.0,
+        market_cap=1.0,
+        total_volume=1.0,
+        price_change_24h=0.0,
+        price_change_percentage_24h=0.0,
+        image="",
+    )
+
+
+class TestCryptoSearch:
+    @pytest.fixture
+    def directory(self):
+        directory = SymbolDirectory()
+        directory.sync_registry([_crypto(*coin) for coin in COINS], asset_type="crypto")
+        with (
+            patch.object(crypto_discovery_service, "symbol_directory", directory),
+            patch.dict(crypto_discovery_service._market_data, clear=True),
+        ):
+            yield directory
+
+    @pytest.mark.asyncio
+    async def test_served_in_process(self, directory):
+        service = CryptoDiscoveryService()
+        with patch.object(crypto_discovery_service.advanced_redis_client, "set_many", AsyncMock()):
+            await service._cache_assets(
+                [_asset(coin_id, symbol, rank) for symbol, _, coin_id, rank in COINS]
+            )
+
+        with (
+            patch.object(
+                crypto_discovery_service.advanced_redis_client, "get_many", AsyncMock()
+            ) as get_many,
+            patch.object(service, "_fetch_markets", AsyncMock()) as fetch,
+            patch.object(service, "_search_cryptos", AsyncMock()) as coingecko_search,
+        ):
+            results = await service.search_cryptos("bitcoin")
+
+        assert [c.id for c in results] == ["bitcoin", "wrapped-bitcoin", "bitcoin-cash"]
+        get_many.assert_not_awaited()
+        fetch.assert_not_awaited()
+        coingecko_search.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_missing_market_data_is_fetched_once(self, directory):
+        service = CryptoDiscoveryService()
+        cached = {"crypto:asset:ethereum": _asset("ethereum", "ETH", 2).to_dict()}
+        redis = crypto_discovery_service.advanced_redis_client
+        with (
+            patch.object(redis, "get_many", AsyncMock(return_value=cached)),
+            patch.object(redis, "set_many", AsyncMock()),
+            patch.object(
+                service,
+                "_fetch_markets",
+                AsyncMock(return_value=[_asset("ethereum-classic", "ETC", 30)]),
+            ) as fetch,
+        ):
+            results = await service.search_cryptos("ethereum")
+            again = await service.search_cryptos("ethereum")
+
+        assert [c.id for c in results] == ["ethereum", "ethereum-classic"]
+        assert again == results
+        assert fetch.await_count == 1
+        assert fetch.await_args.args[1] == ["ethereum-classic"]
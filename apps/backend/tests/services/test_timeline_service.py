@@ -0,0 +1,176 @@
+"""
+Tests for fan-out-on-write feed timelines (app.services.timeline_service)
+"""
+
+import random
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, delete, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.redis_keys import redis_keys
+from app.db import db as db_module
+from app.db.models import Base, Follow, Post, User
+from app.services import timeline_service as timeline_module
+from app.services.timeline_service import TimelineService, feed_from_db
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.sqlite'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    with patch.object(db_module, "SessionLocal", factory):
+        yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def redis(fake_redis):
+    with patch.object(timeline_module.advanced_redis_client, "client", fake_redis):
+        yield fake_redis
+
+
+def _users(factory, count):
+    with factory() as db:
+        users = [User(handle=f"u{i}") for i in range(count)]
+        db.add_all(users)
+        db.commit()
+        return [u.id for u in users]
+
+
+class Social:
+    """Writes through the database and the timeline hooks, as the routes do"""
+
+    def __init__(self, factory, service):
+        self.factory = factory
+        self.service = service
+
+    async def follow(self, a, b):
+        with self.factory() as db:
+            db.add(Follow(follower_id=a, followee_id=b))
+            db.commit()
+        await self.service.on_follow(a, b)
+
+    async def unfollow(self, a, b):
+        with self.factory() as db:
+            db.execute(delete(Follow).where(Follow.follower_id == a, Follow.followee_id == b))
+            db.commit()
+        await self.service.on_unfollow(a, b)
+
+    async def post(self, author):
+        with self.factory() as db:
+            post = Post(user_id=author, content="hi")
+            db.add(post)
+            db.commit()
+        await self.service.on_post(author, post.id)
+        return post.id
+
+    async def feed(self, user, before=None, limit=50):
+        return [p.id for p, _ in await self.service.feed(user, before=before, limit=limit)]
+
+    def expected(self, user, before=None, limit=50):
+        with self.factory() as db:
+            return [p.id for p, _ in feed_from_db(db, user, before, limit)]
+
+
+class TestTimelines:
+    @pytest.mark.asyncio
+    async def test_fan_out_follow_and_unfollow(self, session_factory, redis):
+        social = Social(session_factory, TimelineService())
+        me, a, b = _users(session_factory, 3)
+        await social.follow(me, a)
+        first = await social.post(a)
+        # Built on first read, then kept up to date on write
+        assert await social.feed(me) == [first]
+        second = await social.post(a)
+        other = await social.post(b)
+        assert await social.feed(me) == [second, first]
+
+        await social.follow(me, b)
+        assert await social.feed(me) == [other, second, first]
+        await social.unfollow(me, a)
+        assert await social.feed(me) == [other]
+
+    @pytest.mark.asyncio
+    async def test_reads_are_one_query_from_redis(self, session_factory, redis):
+        social = Social(session_factory, TimelineService())
+        me, *authors = _users(session_factory, 5)
+        for author in authors:
+            await social.follow(me, author)
+        for _ in range(5):
+            for author in authors:
+                await social.post(author)
+        await social.feed(me)
+
+        expected = social.expected(me, limit=10)
+        statements = []
+        event.listen(
+            session_factory.kw["bind"],
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        page = await social.feed(me, limit=10)
+
+        assert page == expected
+        assert len(statements) == 1 and "follows" not in statements[0]
+
+    @pytest.mark.asyncio
+    async def test_celebrities_are_merged_on_read(self, session_factory, redis):
+        social = Social(session_factory, TimelineService(celebrity_threshold=3))
+        me, fan1, fan2, star, friend = _users(session_factory, 5)
+        for fan in (me, fan1, fan2):
+            await social.follow(fan, star)
+        await social.follow(me, friend)
+        await social.feed(me)
+
+        posts = [await social.post(star), await social.post(friend), await social.post(star)]
+        assert await redis.smembers(social.service.celebrities_key) == {str(star).encode()}
+        assert await social.feed(me) == posts[::-1]
+        for fan in (me, fan1, fan2):
+            timeline = await redis.zrange(redis_keys.feed_timeline_key(fan), 0, -1)
+            assert not {str(posts[0]).encode(), str(posts[2]).encode()} & set(timeline)
+
+    @pytest.mark.asyncio
+    async def test_random_activity_matches_database(self, session_factory, redis):
+        social = Social(session_factory, TimelineService(max_length=8, celebrity_threshold=4))
+        users = _users(session_factory, 8)
+        rng = random.Random(11)
+        edges = set()
+        for _ in range(300):
+            action = rng.random()
+            if action < 0.4:
+                await social.post(rng.choice(users))
+            elif action < 0.8:
+                a, b = rng.sample(users, 2)
+                if (a, b) in edges:
+                    edges.remove((a, b))
+                    await social.unfollow(a, b)
+                else:
+                    edges.add((a, b))
+                    await social.follow(a, b)
+            else:
+                user = rng.choice(users)
+                assert await social.feed(user, limit=5) == social.expected(user, limit=5)
+
+        # Paging past the capped timeline continues from the database
+        for user in users:
+            pages, before = [], None
+            while page := await social.feed(user, before=before, limit=3):
+                pages += page
+                before = page[-1]
+            assert pages == social.expected(user, limit=1000)
+
+    @pytest.mark.asyncio
+    async def test_without_redis_reads_the_database(self, session_factory):
+        social = Social(session_factory, TimelineService())
+        me, a, b = _users(session_factory, 3)
+        with patch.object(timeline_module.advanced_redis_client, "client", None):
+            # Following no one shows everyone's posts
+            posts = [await social.post(a), await social.post(b)]
+            assert await social.feed(me) == posts[::-1]
+            await social.follow(me, a)
+            assert await social.feed(me) == posts[:1]
@@ -0,0 +1,245 @@
+"""
+Tests for the typeahead index (app.services.typeahead) and profile and
+conversation suggestions built on it
+"""
+
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+import app.models.reaction  # Registers MessageReaction for Message's mapper
+from app.models.conversation import Conversation, ConversationParticipant
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.message_search_service import MessageSearchService
+from app.services.profile_service import ProfileService
+from app.services.typeahead import (
+    ProfileTypeahead,
+    TypeaheadEntry,
+    TypeaheadIndex,
+    normalize,
+)
+
+
+def _index(*names_and_weights):
+    return TypeaheadIndex(
+        TypeaheadEntry(key=name, texts=(name,), weight=weight) for name, weight in names_and_weights
+    )
+
+
+def _keys(entries):
+    return [e.key for e in entries]
+
+
+# ============================================================================
+# TypeaheadIndex
+# ============================================================================
+
+
+class TestTypeaheadIndex:
+    def test_normalize_folds_case_accents_and_punctuation(self):
+        assert normalize("  José_Núñez-Ortiz ") == "jose nunez ortiz"
+
+    def test_prefix_on_any_word_most_popular_first(self):
+        index = _index(("Mary Jones", 5), ("Jonah Hill", 50), ("Ben Jonsson", 10), ("Al", 99))
+        assert _keys(index.suggest("jon")) == ["Jonah Hill", "Ben Jonsson", "Mary Jones"]
+        assert _keys(index.suggest("jon", limit=2)) == ["Jonah Hill", "Ben Jonsson"]
+        assert _keys(index.suggest("JONES", limit=1)) == ["Mary Jones"]
+
+    def test_short_prefixes_use_precomputed_tops(self):
+        index = _index(*((f"user{n:03}", n) for n in range(200)))
+        assert _keys(index.suggest("u", limit=3)) == ["user199", "user198", "user197"]
+        assert _keys(index.suggest("user00", limit=3)) == ["user009", "user008", "user007"]
+
+    def test_similar_names_fill_after_prefixes(self):
+        index = _index(("Mary Jones", 5), ("Jonse", 1), ("Zed", 1))
+        # "jonse" is a prefix of one entry and a misspelling of the other
+        assert _keys(index.suggest("jonse")) == ["Jonse", "Mary Jones"]
+        assert index.suggest("zzz") == [] and index.suggest("") == []
+
+    def test_entries_match_on_any_text(self):
+        index = TypeaheadIndex(
+            [TypeaheadEntry(key=1, texts=("mjones", "Mary Jones"), payload={"id": 1})]
+        )
+        assert [e.payload for e in index.suggest("mary")] == [{"id": 1}]
+        assert [e.payload for e in index.suggest("mjo")] == [{"id": 1}]
+
+
+# ============================================================================
+# Profile suggestions
+# ============================================================================
+
+
+async def _profile(db, username, display_name, follower_count=0, is_public=True):
+    user = User(id=uuid.uuid4(), email=f"{username}@example.com", full_name=display_name)
+    db.add_all(
+        [
+            user,
+            Profile(
+                user_id=user.id,
+                username=username,
+                display_name=display_name,
+                follower_count=follower_count,
+                is_public=is_public,
+            ),
+        ]
+    )
+    await db.flush()
+    return user
+
+
+class TestProfileTypeahead:
+    @pytest.mark.asyncio
+    async def test_suggests_public_profiles_from_memory(self, sqlite_session):
+        db = sqlite_session
+        await _profile(db, "satoshi", "Satoshi N", follower_count=100)
+        await _profile(db, "sato", "Sato Hidden", is_public=False)
+        await _profile(db, "vitalik", "Vitalik B", follower_count=50)
+        await db.commit()
+        typeahead = ProfileTypeahead()
+
+        with (
+            patch("app.services.typeahead.advanced_redis_client", MagicMock(client=None)),
+            patch.object(db, "execute", wraps=db.execute) as execute,
+        ):
+            assert [s["username"] for s in await typeahead.suggest(db, "sat")] == ["satoshi"]
+            assert [s["username"] for s in await typeahead.suggest(db, "vit")] == ["vitalik"]
+        assert execute.await_count == 1  # built once, then served from memory
+
+    @pytest.mark.asyncio
+    async def test_changes_reach_other_workers_without_a_full_reload(self, db, fake_redis):
+        alice = await _profile(db, "alice", "Alice")
+        await db.commit()
+        a, b = ProfileTypeahead(check_interval=0), ProfileTypeahead(check_interval=0)
+
+        with patch("app.services.typeahead.advanced_redis_client", MagicMock(client=fake_redis)):
+            assert await b.suggest(db, "bob") == []
+            bob = await _profile(db, "bob", "Bob")
+            await db.commit()
+            assert await b.suggest(db, "bob") == []  # version unchanged: still cached
+
+            await a.invalidate(bob.id)
+            with patch.object(db, "execute", wraps=db.execute) as execute:
+                # The old index keeps serving while the next one is built
+                assert await b.suggest(db, "bob") == []
+                await b._refreshing
+                assert [s["username"] for s in await b.suggest(db, "bob")] == ["bob"]
+
+            # Only the published profile was re-read
+            (statement,) = [call.args[0] for call in execute.await_args_list]
+            assert statement.compile().params["user_id_1"] == [bob.id]
+            assert [s["username"] for s in await b.suggest(db, "ali")] == ["alice"]
+
+            # Going private removes the profile
+            await db.execute(
+                update(Profile).where(Profile.user_id == alice.id).values(is_public=False)
+            )
+            await db.commit()
+            await a.invalidate(alice.id)
+            await b.suggest(db, "ali")
+            await b._refreshing
+            assert await b.suggest(db, "ali") == []
+
+    @pytest.mark.asyncio
+    async def test_worker_behind_the_change_log_reloads_everything(self, db, fake_redis):
+        await _profile(db, "alice", "Alice")
+        await db.commit()
+        a, b = ProfileTypeahead(max_changes=1), ProfileTypeahead(check_interval=0, max_changes=1)
+
+        with patch("app.services.typeahead.advanced_redis_client", MagicMock(client=fake_redis)):
+            await b.suggest(db, "a")
+            users = [await _profile(db, name, name.title()) for name in ("bob", "bobby")]
+            await db.commit()
+            for user in users:
+                await a.invalidate(user.id)
+            assert await fake_redis.zcard("lokifi:dev:cache:typeahead:profiles:changes") == 1
+
+            await b.suggest(db, "bob")
+            await b._refreshing
+            assert len(await b.suggest(db, "bob")) == 2
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_after_max_age_without_redis(self, db):
+        typeahead = ProfileTypeahead(max_age=60)
+        with patch("app.services.typeahead.advanced_redis_client", MagicMock(client=None)):
+            assert await typeahead.suggest(db, "carol") == []
+            await _profile(db, "carol", "Carol")
+            await db.commit()
+            typeahead._built_at = time.monotonic() - 61
+            assert await typeahead.suggest(db, "carol") == []  # rebuilt in the background
+            await typeahead._refreshing
+            assert len(await typeahead.suggest(db, "carol")) == 1
+
+    @pytest.mark.asyncio
+    async def test_profile_service_uses_memory_index_off_postgres(self, sqlite_session):
+        db = sqlite_session
+        user = await _profile(db, "dave", "Dave Smith")
+        await db.commit()
+        with patch("app.services.profile_service.profile_typeahead", ProfileTypeahead()):
+            with patch("app.services.typeahead.advanced_redis_client", MagicMock(client=None)):
+                (suggestion,) = await ProfileService(db).suggest_profiles("smi")
+        assert suggestion.user_id == user.id and suggestion.display_name == "Dave Smith"
+
+    @pytest.mark.asyncio
+    async def test_postgres_uses_trigram_operators(self):
+        db = MagicMock()
+        db.bind.dialect.name = "postgresql"
+        db.execute = AsyncMock(return_value=[])
+        await ProfileService(db).suggest_profiles("50%_off")
+
+        compiled = db.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+        assert "profiles.username ILIKE %(username_1)s ESCAPE" in sql
+        assert "profiles.username %% %(username_2)s" in sql
+        assert "similarity(profiles.display_name, %(similarity_2)s)" in sql
+        # Wildcards in the query are matched literally in the prefix test
+        assert compiled.params["username_1"] == "50\\%\\_off%"
+        assert compiled.params["username_2"] == "50%_off"
+
+
+# ============================================================================
+# Conversation suggestions
+# ============================================================================
+
+
+class TestConversationSuggestions:
+    @pytest.mark.asyncio
+    async def test_only_own_conversations_by_name_or_peer(self, sqlite_session):
+        db = sqlite_session
+        me = await _profile(db, "me", "Me")
+        trader = await _profile(db, "trader", "Pat Trader")
+        stranger = await _profile(db, "stranger", "Stranger")
+        now = datetime.now(UTC)
+        dm = Conversation(id=uuid.uuid4(), last_message_at=now)
+        group = Conversation(
+            id=uuid.uuid4(), is_group=True, name="Trading Desk", last_message_at=now - timedelta(1)
+        )
+        private = Conversation(id=uuid.uuid4(), is_group=True, name="Trading Secrets")
+        db.add_all([dm, group, private])
+        await db.flush()
+        db.add_all(
+            [
+                ConversationParticipant(conversation_id=dm.id, user_id=me.id),
+                ConversationParticipant(conversation_id=dm.id, user_id=trader.id),
+                ConversationParticipant(conversation_id=group.id, user_id=me.id),
+                ConversationParticipant(conversation_id=private.id, user_id=stranger.id),
+                ConversationParticipant(conversation_id=private.id, user_id=trader.id),
+            ]
+        )
+        await db.commit()
+        service = MessageSearchService(db)
+
+        results = await service.suggest_conversations(me.id, "trad")
+        # Most recently active first; the stranger's group is not visible
+        assert [r["id"] for r in results] == [str(dm.id), str(group.id)]
+        assert [r["name"] for r in await service.search_conversations(me.id, "desk")] == [
+            "Trading Desk"
+        ]
+        assert await service.search_conversations(me.id, "trad", page=2, page_size=1) == [
+            results[1]
+        ]